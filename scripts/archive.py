@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Archive a cycle's output to HPSS, running several transfers at once.
+
+Each archive unit is either a single file, streamed through hsi while its MD5 checksum is computed,
+or a set of files bundled by htar and checksummed alongside it. A JSON manifest recording the size,
+modification and change times, and MD5 checksum of everything archived is written per unit to the
+manifest directory. A unit whose files have the sizes and times recorded in its manifest, and whose
+archive exists on HPSS, is skipped without reading them.
+
+NetCDF files can first be compressed to netCDF4 with deflate and shuffle, and MPASSIT history
+output optionally quantized, several files at a time. A strided sample of the values of some of
+each compressed file's variables is checked against the original, and the compressed copy is
+archived in its place, with its compression ratio and throughput added to the manifest.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import re
+import shlex
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import BoundedSemaphore
+from typing import TYPE_CHECKING
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+from scripts.common import parse_args
+from scripts.utils import walk_key_path
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from uwtools.api.config import Config
+
+BUFSIZE = 16 * 1024 * 1024
+# The most values of each sampled variable compared after compression.
+SAMPLE = 1000
+HISTORY = ("mpassit",)
+# The file stats recorded in a manifest, which must be unchanged for a unit to be skipped.
+STATS = ("ctime_ns", "mtime_ns", "size")
+NETCDF = ("init", "mpassit")
+UNITS = ("init", "mpassit", "upp")
+
+
+@dataclass
+class Unit:
+    """
+    Files archived together to one HPSS path.
+    """
+
+    kind: str
+    name: str
+    destination: str
+    files: list[Path] = field(default_factory=list)
+    bundle: bool = True
+
+
+class Archiver:
+    """
+    Archive units of a cycle's files, relative to the experiment directory, to an HPSS directory.
+    """
+
+    def __init__(
+        self,
+        expt_dir: Path,
+        archive_dir: str,
+        manifest_dir: Path,
+        compression: dict | None = None,
+    ):
+        """
+        :param expt_dir: The experiment directory, to which archived paths are relative.
+        :param archive_dir: The HPSS directory to archive to.
+        :param manifest_dir: The directory for the manifest of each unit.
+        :param compression: The compression config, if netCDF files are to be compressed.
+        """
+        self.expt_dir = expt_dir
+        self.archive_dir = archive_dir
+        self.manifest_dir = manifest_dir
+        self.compression = compression
+        # Compression jobs are shared by all units being archived at once.
+        self.workers = int((compression or {}).get("workers", 4))
+        self.compressing = BoundedSemaphore(self.workers)
+
+    def archive(self, unit: Unit) -> bool:
+        """
+        Archive a unit, unless it is already archived.
+
+        :param unit: The unit to archive.
+        :return: Did the unit archive, or was it already archived?
+        """
+        stats = self.stats(unit)
+        manifest = self.manifest_dir / f"{unit.name}.json"
+        if self.archived(unit, stats, manifest):
+            logging.info("%s: Already archived to %s", unit.name, unit.destination)
+            return True
+        root = self.expt_dir
+        compressed: dict[str, dict] = {}
+        if self.compression and unit.kind in NETCDF:
+            root = self.manifest_dir / "staged"
+            compressed = self.compress(unit, root)
+            if not compressed:
+                return False
+        try:
+            checksums = self.htar(unit, root) if unit.bundle else self.put(unit, root)
+        finally:
+            for name in compressed:
+                (root / name).unlink(missing_ok=True)
+        if checksums:
+            files = {
+                name: {
+                    **stat,
+                    **({"compression": compressed[name]} if name in compressed else {}),
+                    "md5": checksums[name],
+                }
+                for name, stat in stats.items()
+            }
+            _write_json(
+                manifest,
+                {
+                    "archived": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "destination": unit.destination,
+                    "files": files,
+                },
+            )
+            logging.info("%s: Archived %s files to %s", unit.name, len(files), unit.destination)
+        return bool(checksums)
+
+    def archived(self, unit: Unit, stats: dict[str, dict], manifest: Path) -> bool:
+        """
+        Is the unit recorded in its manifest with unchanged files, and present on HPSS?
+
+        Files are not read again: a file is unchanged if its size and modification and change times
+        are those recorded when it was archived. Rewriting a file and resetting its modification
+        time still updates its change time.
+
+        :param unit: The unit.
+        :param stats: The current size and times of each file in the unit.
+        :param manifest: The unit's manifest file.
+        """
+        if not manifest.is_file():
+            return False
+        recorded = json.loads(manifest.read_text())
+        unchanged = recorded["destination"] == unit.destination and stats == {
+            name: {k: entry.get(k) for k in STATS} for name, entry in recorded["files"].items()
+        }
+        return unchanged and self.hsi("-q", "ls", unit.destination)
+
+    def compress(self, unit: Unit, root: Path) -> dict[str, dict]:
+        """
+        Compress a unit's files concurrently, under a staging directory, running at most the
+        configured number of compression jobs across all units.
+
+        :param unit: The unit.
+        :param root: The staging directory, under which each file keeps its relative path.
+        :return: The compression statistics of each file, or nothing if any file failed.
+        """
+        assert self.compression is not None
+        digits = self.compression.get("history_significant_digits")
+        quantize = digits if unit.kind in HISTORY else None
+        compression = self.compression
+
+        def job(path: Path) -> dict | None:
+            with self.compressing:
+                return compress(self.expt_dir / path, root / path, compression, quantize)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = [r for r in executor.map(job, unit.files) if r is not None]
+        if len(results) < len(unit.files):
+            logging.error("%s: Compression failed", unit.name)
+            for path in unit.files:
+                (root / path).unlink(missing_ok=True)
+            return {}
+        for path, result in zip(unit.files, results):
+            logging.info(
+                "%s: Compressed %s by %.2fx at %.1f MB/s",
+                unit.name,
+                path,
+                result["ratio"],
+                result["mb_per_s"],
+            )
+        return {str(path): result for path, result in zip(unit.files, results)}
+
+    def hsi(self, *args: str, stdin: bytes | None = None) -> bool:
+        """
+        Run an hsi command.
+
+        :param args: The hsi arguments.
+        :param stdin: Bytes to send to hsi's standard input.
+        :return: Did the command succeed?
+        """
+        result = subprocess.run(
+            shlex.join(["hsi", *args]),
+            capture_output=True,
+            check=False,
+            cwd=self.expt_dir,
+            input=stdin,
+            shell=True,
+        )
+        return result.returncode == 0
+
+    def htar(self, unit: Unit, root: Path) -> dict[str, str]:
+        """
+        Bundle a unit's files into a tar archive on HPSS, checksumming the files alongside htar,
+        which reads each of them again.
+
+        :param unit: The unit.
+        :param root: The directory the unit's file paths are relative to.
+        :return: The checksum of each file by name, or nothing if htar failed.
+        """
+        cmd = shlex.join(["htar", "-chpvf", unit.destination, *map(str, unit.files)])
+        with (
+            ThreadPoolExecutor(max_workers=1) as executor,
+            subprocess.Popen(
+                cmd,
+                cwd=root,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            ) as proc,
+        ):
+            hashed = executor.map(lambda path: _md5(root / path), unit.files)
+            output = proc.communicate()[0]
+            checksums = dict(zip(map(str, unit.files), hashed))
+        if proc.returncode != 0:
+            logging.error("%s: htar failed with status %s", unit.name, proc.returncode)
+            for line in output.splitlines():
+                logging.error("%s:   %s", unit.name, line)
+            return {}
+        return checksums
+
+    def put(self, unit: Unit, root: Path) -> dict[str, str]:
+        """
+        Stream a unit's single file to HPSS, reading it once to both transfer and checksum it.
+
+        The file is written to a temporary name and moved into place, and an md5sum-style checksum
+        file is written next to it.
+
+        :param unit: The unit.
+        :param root: The directory the unit's file path is relative to.
+        :return: The file's checksum by name, or nothing if the transfer failed.
+        """
+        (path,) = unit.files
+        part = f"{unit.destination}.part"
+        md5 = hashlib.md5()  # noqa: S324
+        with (
+            (root / path).open("rb") as src,
+            subprocess.Popen(
+                shlex.join(["hsi", "put", "-", ":", part]),
+                cwd=self.expt_dir,
+                shell=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+            ) as proc,
+        ):
+            assert proc.stdin is not None
+            try:
+                for chunk in iter(lambda: src.read(BUFSIZE), b""):
+                    md5.update(chunk)
+                    proc.stdin.write(chunk)
+                proc.stdin.close()
+            except BrokenPipeError:
+                # hsi exited early; its status reports the failure.
+                pass
+        checksum = md5.hexdigest()
+        ok = (
+            proc.returncode == 0
+            and self.hsi("mv", "-f", part, unit.destination)
+            and self.hsi(
+                "put", "-", ":", f"{unit.destination}.md5", stdin=f"{checksum}  {path}\n".encode()
+            )
+        )
+        if not ok:
+            logging.error("%s: Transfer of %s to %s failed", unit.name, path, unit.destination)
+            return {}
+        return {str(path): checksum}
+
+    def run(self, units: list[Unit], max_transfers: int) -> bool:
+        """
+        Archive units concurrently.
+
+        :param units: The units to archive.
+        :param max_transfers: The most transfers to run at once.
+        :return: Did every unit archive?
+        """
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self.hsi("mkdir", "-p", self.archive_dir)
+        with ThreadPoolExecutor(max_workers=max_transfers) as executor:
+            return all(executor.map(self.archive, units))
+
+    def stats(self, unit: Unit) -> dict[str, dict]:
+        """
+        The size and modification and change times of each file in a unit.
+
+        :param unit: The unit.
+        """
+        stats = {}
+        for path in unit.files:
+            stat = (self.expt_dir / path).stat()
+            stats[str(path)] = {
+                "ctime_ns": stat.st_ctime_ns,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+        return stats
+
+
+# Public functions
+
+
+def compress(src: Path, dst: Path, compression: dict, digits: int | None = None) -> dict | None:
+    """
+    Write a netCDF4 copy of a netCDF file with deflate and shuffle, and check a sample of its
+    variables against the original.
+
+    :param src: The original file.
+    :param dst: The compressed copy.
+    :param compression: The compression config.
+    :param digits: Significant digits to keep in floating-point variables, or None for lossless.
+    :return: The sizes, ratio, and throughput of the compression, or None if it failed.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    level = str(compression.get("deflate_level", 1))
+    if digits:
+        # NCO quantizes by significant digits, and shuffles whenever it deflates.
+        cmd = ["ncks", "-O", "-4", "-L", level, "--ppc", f"default={digits}", str(src), str(dst)]
+    else:
+        shuffle = ["-s"] if compression.get("shuffle", True) else []
+        cmd = ["nccopy", "-k", "nc4", "-d", level, *shuffle, str(src), str(dst)]
+    start = time.monotonic()
+    result = subprocess.run(
+        shlex.join(cmd), capture_output=True, check=False, shell=True, text=True
+    )
+    seconds = max(time.monotonic() - start, 1e-6)
+    if result.returncode != 0:
+        logging.error("Compressing %s failed: %s", src, result.stderr.strip())
+        return None
+    mismatched = verify(src, dst, int(compression.get("verify_variables", 2)), digits)
+    if mismatched:
+        logging.error("Compressed %s differs from the original in %s", dst, ", ".join(mismatched))
+        return None
+    size, compressed = src.stat().st_size, dst.stat().st_size
+    return {
+        "compressed_size": compressed,
+        "mb_per_s": round(size / seconds / 1e6, 1),
+        "ratio": round(size / max(compressed, 1), 2),
+        "seconds": round(seconds, 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument("--unit", action="append", choices=UNITS, required=True)
+    unit_args, rest = parser.parse_known_args(argv)
+    args = parse_args(rest)
+    use_uwtools_logger()
+    expt_config = get_yaml_config(args.config_file)
+    expt_config.dereference(context={**expt_config, "cycle": args.cycle})
+    if not run_archive(expt_config, args.cycle, args.key_path, unit_args.unit, args.leadtime):
+        sys.exit(1)
+
+
+def run_archive(
+    expt_config: Config,
+    cycle: datetime,
+    key_path: list[str],
+    names: list[str],
+    leadtime: timedelta | None = None,
+) -> bool:
+    """
+    Archive the named units of a cycle.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the archiving config block.
+    :param names: The kinds of unit to archive: init, mpassit, or upp.
+    :param leadtime: A lead time whose MPASSIT output alone is archived.
+    :return: Did every unit archive?
+    """
+    archiving = walk_key_path(expt_config, key_path)
+    expt_dir = Path(expt_config["user"]["experiment_dir"])
+    archive_dir = str(expt_config["user"]["hpss_archive_dir"])
+    length = timedelta(hours=int(expt_config["forecast"]["mpas"]["length"]))
+    units = [
+        u for u in cycle_units(expt_dir, archive_dir, cycle, length, leadtime) if u.kind in names
+    ]
+    compression = archiving.get("compress") or {}
+    archiver = Archiver(
+        expt_dir,
+        archive_dir,
+        Path(archiving["manifest_dir"]),
+        compression if compression.get("enabled") else None,
+    )
+    return archiver.run(units, int(archiving.get("max_transfers", 4)))
+
+
+def cycle_units(
+    expt_dir: Path,
+    archive_dir: str,
+    cycle: datetime,
+    length: timedelta,
+    leadtime: timedelta | None = None,
+) -> Iterator[Unit]:
+    """
+    The archive units for a cycle's files that exist.
+
+    :param expt_dir: The experiment directory.
+    :param archive_dir: The HPSS directory to archive to.
+    :param cycle: The cycle.
+    :param length: The forecast length.
+    :param leadtime: A lead time whose MPASSIT output is the only unit.
+    """
+    yyyymmddhh = cycle.strftime("%Y%m%d%H")
+
+    def files(*patterns: str) -> list[Path]:
+        return sorted({p.relative_to(expt_dir) for pat in patterns for p in expt_dir.glob(pat)})
+
+    if leadtime is not None:
+        # Archived as soon as MPASSIT finishes the lead time, so its files can be scrubbed.
+        fhr = f"{int(leadtime.total_seconds() // 3600):03d}"
+        mpassit = files(f"{yyyymmddhh}/mpassit/{fhr}/MPAS-A_out.*")
+        if mpassit:
+            yield Unit(
+                kind="mpassit",
+                name=f"mpassit-f{fhr}",
+                destination=f"{archive_dir}/{yyyymmddhh}-mpassit-f{fhr}.tar",
+                files=mpassit,
+            )
+        return
+
+    init = files(f"{yyyymmddhh}/forecast/*init.nc")
+    if init:
+        yield Unit(
+            kind="init",
+            name="init",
+            destination=f"{archive_dir}/{yyyymmddhh}-{init[0].name}",
+            files=init[:1],
+            bundle=False,
+        )
+    upp = files(
+        *[f"{yyyymmddhh}/upp/*/{p}" for p in ("*GrbF*", "itag")],
+        *[f"{yyyymmddhh}/upp/000/{p}" for p in ("*dat", "*txt", "*xml", "params_grib2_tbl_new")],
+    )
+    if upp:
+        yield Unit(
+            kind="upp", name="upp", destination=f"{archive_dir}/{yyyymmddhh}-upp.tar", files=upp
+        )
+    # MPASSIT output is bundled by valid day, as a single archive of it may exceed htar limits.
+    day = cycle.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= cycle + length:
+        mpassit = files(f"{yyyymmddhh}/mpassit/*/MPAS-A_out.{day:%Y-%m-%d}*")
+        if mpassit:
+            yield Unit(
+                kind="mpassit",
+                name=f"mpassit-{day:%Y%m%d}",
+                destination=f"{archive_dir}/{yyyymmddhh}-mpassit-{day:%Y%m%d}.tar",
+                files=mpassit,
+            )
+        day += timedelta(days=1)
+
+
+def verify(original: Path, compressed: Path, count: int, digits: int | None = None) -> list[str]:
+    """
+    Compare a sample of variables, spread across the file, between two netCDF files.
+
+    Only a strided hyperslab of at most about SAMPLE values of each variable is read from each
+    file. Values must match as ncdump prints them, or to within the quantization error when the
+    compressed file keeps only some significant digits, relative to the value or, near zero, to
+    the largest value sampled.
+
+    :param original: The original file.
+    :param compressed: The compressed copy.
+    :param count: The number of variables to compare.
+    :param digits: Significant digits kept in the compressed file's floating-point variables.
+    :return: The names of the sampled variables that differ.
+    """
+    dims, variables = _header(original)
+    names = list(variables)
+    n = min(count, len(names))
+    sample = [names[i * len(names) // n] for i in range(n)]
+    tolerance = 10.0 ** (1 - digits) if digits else 0.0
+    mismatched = []
+    for name in sample:
+        hyperslab = _hyperslab(dims, variables[name])
+        a, b = _values(original, name, hyperslab), _values(compressed, name, hyperslab)
+        scale = max((abs(x) for x in map(_float, a) if x is not None), default=0.0)
+        if len(a) != len(b) or not all(
+            _close(x, y, tolerance, tolerance * scale) for x, y in zip(a, b)
+        ):
+            mismatched.append(name)
+    return mismatched
+
+
+# Private
+
+
+def _close(a: str, b: str, rel_tol: float, abs_tol: float) -> bool:
+    if a == b:
+        return True
+    try:
+        return math.isclose(float(a), float(b), rel_tol=rel_tol, abs_tol=abs_tol)
+    except ValueError:
+        return False
+
+
+def _float(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _header(path: Path) -> tuple[dict[str, int], dict[str, list[str]]]:
+    """
+    The sizes of the dimensions of a netCDF file, and the dimensions of each of its variables, in
+    the order the file defines them.
+    """
+    header = _ncdump("-h", str(path))
+    dims = {
+        name: int(current or size)
+        for name, current, size in re.findall(
+            r"^\t(\S+) = (?:UNLIMITED ; // \((\d+) currently\)|(\d+) ;)$", header, re.MULTILINE
+        )
+    }
+    variables = {
+        name: shape.split(", ") if shape else []
+        for name, shape in re.findall(
+            r"^\t[a-z0-9]+ ([^\s(]+)(?:\((.*)\))? ;$", header, re.MULTILINE
+        )
+    }
+    return dims, variables
+
+
+def _hyperslab(dims: dict[str, int], shape: list[str]) -> list[str]:
+    """
+    ncks arguments selecting a strided hyperslab of at most about SAMPLE values of a variable.
+    """
+    if not shape:
+        return []
+    per_dim = max(1, round(SAMPLE ** (1 / len(shape))))
+    args = []
+    for dim in shape:
+        stride = math.ceil(dims[dim] / per_dim)
+        if stride > 1:
+            args += ["-d", f"{dim},0,,{stride}"]
+    return args
+
+
+def _md5(path: Path) -> str:
+    md5 = hashlib.md5()  # noqa: S324
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(BUFSIZE), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _ncdump(*args: str) -> str:
+    result = subprocess.run(
+        shlex.join(["ncdump", *args]), capture_output=True, check=True, shell=True, text=True
+    )
+    return result.stdout
+
+
+def _values(path: Path, name: str, hyperslab: list[str]) -> list[str]:
+    """
+    The values of a hyperslab of a variable, as ncdump prints them.
+    """
+    with TemporaryDirectory() as tmp:
+        subset = Path(tmp, path.name)
+        cmd = ["ncks", "-O", "-C", "-v", name, *hyperslab, str(path), str(subset)]
+        subprocess.run(shlex.join(cmd), capture_output=True, check=True, shell=True)
+        data = _ncdump("-v", name, str(subset)).partition("\ndata:\n")[2]
+    return re.split(r"[\s,;=]+", data.partition(f" {name} =")[2].partition(";")[0].strip())
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
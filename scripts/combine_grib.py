@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Concatenate the UPP GRIB output for a lead time into one combined file, with a byte-offset index.
+
+The index, written next to the combined file with an added .idx suffix, has one line per field in
+the style of a wgrib2 inventory:
+
+    <message>:<offset>:d=<YYYYMMDDHH>:<discipline>.<category>.<number>:lev=<type>:<value>:ft=<time>:
+
+Fields are identified by their GRIB2 code numbers, since names would need parameter tables. A
+message holding several fields numbers them <message>.<field>, all sharing the message offset. The
+length of a message is the distance to the next message's offset, so a reader can fetch one field
+with a ranged read. Missing values are written as -.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from argparse import ArgumentParser
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.staging import copy_range
+
+if TYPE_CHECKING:
+    from typing import BinaryIO
+
+MAGIC = b"GRIB"
+END = b"7777"
+
+
+def combine(inputs: list[Path], output: Path) -> Path:
+    """
+    Concatenate the input files and index the result, atomically replacing both.
+
+    Writing to temporary files and renaming them means a retried task never appends duplicate
+    records, and readers never see a partial file. The index is renamed into place first, so it
+    exists whenever the combined file does.
+
+    :param inputs: The GRIB2 files to concatenate, in order.
+    :param output: The combined file.
+    :return: The combined file.
+    """
+    lines = []
+    base = 0
+    count = 0
+    for path in inputs:
+        for offset, entries in inventory(path):
+            count += 1
+            for i, entry in enumerate(entries, start=1):
+                label = f"{count}.{i}" if len(entries) > 1 else str(count)
+                lines.append(f"{label}:{base + offset}:{entry}\n")
+        base += path.stat().st_size
+    index = output.with_name(f"{output.name}.idx")
+    tmp = output.with_name(f".{output.name}.tmp")
+    tmp_index = index.with_name(f".{index.name}.tmp")
+    with tmp.open("wb") as dst:
+        for path in inputs:
+            with path.open("rb") as src:
+                _copy(src, dst)
+    tmp_index.write_text("".join(lines))
+    tmp_index.replace(index)
+    tmp.replace(output)
+    return output
+
+
+def inventory(path: Path) -> list[tuple[int, list[str]]]:
+    """
+    Describe the fields in each GRIB2 message of a file, reading only the section headers.
+
+    :param path: The GRIB2 file.
+    :return: The byte offset of each message and its inventory entries.
+    :raises: ValueError if the file is not a sequence of complete GRIB2 messages.
+    """
+    messages = []
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        offset = 0
+        while offset < size:
+            length, entries = _message(f, path, offset)
+            messages.append((offset, entries))
+            offset += length
+    return messages
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", required=True, type=Path, help="The combined file.")
+    parser.add_argument("inputs", nargs="+", type=Path, help="The GRIB2 files to combine.")
+    args = parser.parse_args(argv)
+    combine(args.inputs, args.output)
+
+
+# Private
+
+
+def _copy(src: BinaryIO, dst: BinaryIO) -> None:
+    """
+    Append one open file to another, in the kernel where possible.
+
+    :raises: OSError if the destination did not grow by the size of the source.
+    """
+    size = os.fstat(src.fileno()).st_size
+    dst.flush()
+    start = dst.tell()
+    copy_range(src.fileno(), dst.fileno(), 0, size, start)
+    dst.seek(start + size)
+    if os.fstat(dst.fileno()).st_size != start + size:
+        msg = f"Copied {os.fstat(dst.fileno()).st_size - start} of {size} bytes of {src.name}"
+        raise OSError(msg)
+
+
+def _message(f: BinaryIO, path: Path, offset: int) -> tuple[int, list[str]]:
+    """
+    The length of, and inventory entries for the fields of, the GRIB2 message at the offset.
+    """
+    f.seek(offset)
+    indicator = f.read(16)
+    size = int.from_bytes(indicator[8:16], "big")
+    if len(indicator) < 16 or indicator[:4] != MAGIC or indicator[7] != 2 or size < 20:
+        msg = f"No GRIB2 message at byte {offset} of {path}"
+        raise ValueError(msg)
+    discipline = indicator[6]
+    end = offset + size
+    date = ""
+    entries = []
+    position = offset + 16
+    while position < end - 4:
+        f.seek(position)
+        header = f.read(5)
+        length = int.from_bytes(header[:4], "big")
+        if len(header) < 5 or length < 5:
+            msg = f"Truncated GRIB2 message at byte {offset} of {path}"
+            raise ValueError(msg)
+        if header[4] == 1:
+            date = _reference_time(f.read(16))
+        elif header[4] == 4:
+            entries.append(f"d={date}:{discipline}.{_product(f.read(min(length, 34) - 5))}:")
+        position += length
+    f.seek(end - 4)
+    if f.read(4) != END:
+        msg = f"Truncated GRIB2 message at byte {offset} of {path}"
+        raise ValueError(msg)
+    return size, entries
+
+
+def _product(section: bytes) -> str:
+    """
+    The parameter, level, and forecast time from a product definition section, after its header.
+    """
+    category, number = section[4], section[5]
+    if len(section) < 23:
+        return f"{category}.{number}:lev=-:-:ft=-"
+    unit = {0: "m", 1: "h", 2: "d"}.get(section[12], f"u{section[12]}")
+    forecast = int.from_bytes(section[13:17], "big")
+    surface, scale, value = section[17], section[18], section[19:23]
+    if scale == 0xFF or value == b"\xff" * 4:
+        level = "-"
+    else:
+        level = f"{_signed(value) / 10 ** _signed(bytes([scale])):g}"
+    return f"{category}.{number}:lev={surface}:{level}:ft={forecast}{unit}"
+
+
+def _reference_time(section: bytes) -> str:
+    """
+    The reference time, as YYYYMMDDHH, from an identification section, after its header.
+    """
+    year = int.from_bytes(section[7:9], "big")
+    return datetime(year, *section[9:12]).strftime("%Y%m%d%H")  # noqa: DTZ001
+
+
+def _signed(value: bytes) -> int:
+    """
+    A GRIB2 sign-and-magnitude integer.
+    """
+    n = int.from_bytes(value, "big")
+    sign = 1 << (8 * len(value) - 1)
+    return -(n & (sign - 1)) if n & sign else n
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])  # pragma: no cover
@@ -2,20 +2,28 @@ from __future__ import annotations
 
 import logging
 import sys
+import time
 from argparse import ArgumentParser, Namespace
+from contextlib import nullcontext
+from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from uwtools.api.config import get_yaml_config
 from uwtools.api.logging import use_uwtools_logger
 
+from scripts.scratch import relocate, scratch_dir, staging_back
+from scripts.staging import stage
+
 if TYPE_CHECKING:
+    from uwtools.api.config import Config
     from uwtools.api.driver import Driver
 
 # Public functions
 
 
-def parse_args(argv=None, *, lead_required: bool = False) -> Namespace:
+def parse_args(argv=None, *, lead_required: bool = False, leads: bool = False) -> Namespace:
     parser = ArgumentParser(description="Common driver script parser.")
     parser.add_argument(
         "-c", "--config-file", required=True, type=Path, help="Path to config file."
@@ -27,31 +35,82 @@ def parse_args(argv=None, *, lead_required: bool = False) -> Namespace:
         type=lambda x: timedelta(hours=int(x)),
         help="Lead time in hours.",
     )
+    if leads:
+        parser.add_argument(
+            "--leadtimes",
+            required=True,
+            type=lambda x: [timedelta(hours=int(h)) for h in x.split(",")],
+            help="Comma-separated lead times in hours.",
+        )
     parser.add_argument(
         "--key-path",
         required=True,
         type=lambda s: s.split("."),
         help="Dot-separated key path, e.g., forecast or post.processing.",
     )
+    parser.add_argument("--member", type=int, help="Ensemble member, e.g., 1 or 001.")
     return parser.parse_args(argv)
 
 
+def member_config(config_file: Path | Config, member: int | None) -> Config:
+    """
+    The experiment config, set for an ensemble member if one is given, so that the member's rundirs
+    are in its own directory under the cycle's.
+
+    :param config_file: Path to the experiment config, or the config itself.
+    :param member: The ensemble member, if any.
+    """
+    config = get_yaml_config(config_file) if isinstance(config_file, Path) else config_file
+    if member is not None:
+        config.update_from({"user": {"ensemble": {"member": member}}})
+    return config
+
+
 def run_component(
-    driver_class: type,
-    config_file: Path,
+    driver_class: type[Driver],
+    config_file: Path | Config,
     cycle: datetime,
     key_path: list[str],
     leadtime: timedelta | None = None,
+    staging: dict | None = None,
+    scratch: dict | None = None,
+    member: int | None = None,
 ) -> Driver:
     use_uwtools_logger()
+    start = time.monotonic()
+    name = driver_class.__name__
+    if member is not None:
+        config_file = member_config(config_file, member)
     kwargs = {"config": config_file, "cycle": cycle, "key_path": key_path}
     if leadtime is not None:
         kwargs["leadtime"] = leadtime
     driver: Driver = driver_class(**kwargs)
     rundir = Path(driver.config["rundir"])
-    logging.info("Running %s in %s", driver_class.__name__, rundir)
-    task = driver.run()
-    if not task.ready:
+    runner = driver
+    workdir = None
+    if scratch and name in scratch.get("components", []):
+        workdir = scratch_dir(scratch, name)
+    if workdir is not None:
+        source = get_yaml_config(config_file) if isinstance(config_file, Path) else config_file
+        config = relocate(deepcopy(dict(source)), key_path, driver_class.driver_name(), workdir)
+        runner = driver_class(**{**kwargs, "config": config})
+    if staging:
+        # Files already in the rundir are not copied again by the driver.
+        stage(runner.config.get("files_to_copy", {}), Path(runner.config["rundir"]), staging)
+    logging.info("Running %s in %s", name, runner.config["rundir"])
+    setup = time.monotonic()
+    context = (
+        staging_back(workdir, rundir, scratch, scratch["outputs"][name])
+        if scratch and workdir is not None
+        else nullcontext()
+    )
+    with context:
+        task = runner.run()
+        ready = task.ready
+        logging.info(
+            "%s timings: setup %.1f s, run %.1f s", name, setup - start, time.monotonic() - setup
+        )
+    if not ready:
         logging.error("Error occurred. Expected file %s not found.", task.refs[0])
         sys.exit(1)
     return driver
@@ -29,5 +29,8 @@ fi
 if [[ -n "${FILE_TEMPLATES:-}" ]]; then
   args+=(--file-templates "$FILE_TEMPLATES")
 fi
+if [[ -n "${MEMBERS:-}" ]]; then
+  args+=(--members $MEMBERS)
+fi
 set -x
 python -u $MPAS_APP/ush/retrieve_data.py "${args[@]}"
@@ -0,0 +1,228 @@
+"""
+Monitor the progress of a running MPAS forecast.
+
+The monitor tails the MPAS log, counts the history and diagnostic files that have appeared in the
+forecast rundir, and writes a small JSON status file with throughput and projected completion.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from subprocess import STDOUT, CalledProcessError, check_output
+from threading import Event, Thread
+from typing import TYPE_CHECKING
+
+from scripts.streams import output_files
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+LOGFILE = "log.atmosphere.0000.out"
+OUTPUT_STREAMS = ["output", "diagnostics"]
+
+
+class ForecastMonitor:
+    """
+    Track the progress of one MPAS forecast and report it in a status file.
+    """
+
+    def __init__(self, block: dict, cycle: datetime):
+        """
+        :param block: The dereferenced config block containing the mpas and monitor sections.
+        :param cycle: The forecast cycle.
+        """
+        mpas = block["mpas"]
+        self.config = block["monitor"]
+        self.cycle = cycle
+        self.length = timedelta(hours=int(mpas["length"]))
+        self.expected = output_files(mpas["streams"], OUTPUT_STREAMS, cycle, self.length)
+        self.rundir = Path(mpas["rundir"])
+        self.started = _now()
+        self.deadline = self.started + walltime(str(mpas["execution"]["batchargs"]["walltime"]))
+        self.aborted = False
+        self._first: tuple[datetime, datetime] | None = None
+        self._model_time: datetime | None = None
+        self._offset = 0
+
+    @property
+    def status_file(self) -> Path:
+        return self.rundir / str(self.config.get("status_file", "forecast_status.json"))
+
+    def read_log(self) -> datetime | None:
+        """
+        Read any new lines in the MPAS log and return the latest model time seen.
+        """
+        path = self.rundir / LOGFILE
+        if not path.is_file():
+            return self._model_time
+        with path.open("rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines, leaving a partial last line for the next read.
+        complete = data[: data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for match in _TIMESTEP.finditer(complete.decode(errors="replace")):
+            self._model_time = datetime.strptime(match.group(1), "%Y-%m-%d_%H:%M:%S").replace(
+                tzinfo=timezone.utc
+            )
+        return self._model_time
+
+    def run(self, stop: Event) -> None:
+        """
+        Update the status file periodically until asked to stop.
+
+        :param stop: An event signaling that the forecast has ended.
+        """
+        interval = float(self.config.get("interval", 60))
+        while not stop.wait(interval):
+            self.update()
+
+    def update(self, *, final: bool = False) -> dict:
+        """
+        Refresh and write the forecast status, aborting the job if it cannot finish in time.
+
+        :param final: Is the forecast process known to have ended?
+        :return: The status.
+        """
+        now = _now()
+        model_time = self.read_log()
+        present = _present(self.rundir)
+        status: dict = {
+            "cycle": self.cycle.isoformat(),
+            "deadline": self.deadline.isoformat(),
+            "elapsed_seconds": round((now - self.started).total_seconds()),
+            "outputs_expected": len(self.expected),
+            "outputs_present": sum(1 for _, name in self.expected if name in present),
+            "updated": now.isoformat(),
+        }
+        end = self.cycle + self.length
+        if model_time is None:
+            status["state"] = "waiting"
+        else:
+            if self._first is None:
+                self._first = (now, model_time)
+            simulated = model_time - self.cycle
+            status["model_time"] = model_time.isoformat()
+            status["percent_complete"] = round(100 * simulated / self.length, 1)
+            projected = self._projected_end(now, model_time)
+            if projected is not None:
+                wall = (now - self._first[0]).total_seconds()
+                sim = (model_time - self._first[1]).total_seconds()
+                status["throughput"] = round(sim / wall, 2)
+                status["projected_end"] = projected.isoformat()
+            status["state"] = "late" if projected and projected > self.deadline else "running"
+            if model_time >= end and status["outputs_present"] == len(self.expected):
+                status["state"] = "complete"
+        if status["state"] == "late":
+            self._abort_if_hopeless(model_time)
+        if self.aborted:
+            status["state"] = "aborted"
+        elif final and status["state"] != "complete":
+            status["state"] = "stopped"
+        _write(self.status_file, status)
+        return status
+
+    def _abort_if_hopeless(self, model_time: datetime | None) -> None:
+        """
+        Abort the job when configured to, once enough progress has been seen to trust the rate.
+        """
+        if self.aborted or not self.config.get("abort_if_late", False) or model_time is None:
+            return
+        if (model_time - self.cycle) / self.length < float(self.config.get("min_progress", 0.1)):
+            return
+        cmd = self.config.get("abort_command", "scancel $SLURM_JOB_ID")
+        logging.error("Forecast cannot finish before %s, aborting: %s", self.deadline, cmd)
+        try:
+            check_output(cmd, encoding="utf=8", shell=True, stderr=STDOUT, text=True)
+        except CalledProcessError as e:
+            logging.error("Abort command failed with status: %s", e.returncode)
+        self.aborted = True
+
+    def _projected_end(self, now: datetime, model_time: datetime) -> datetime | None:
+        """
+        Project the wall-clock completion time from the model rate seen so far.
+        """
+        assert self._first is not None
+        first_wall, first_model = self._first
+        advanced = model_time - first_model
+        if advanced <= timedelta(0) or now <= first_wall:
+            return None
+        remaining = self.cycle + self.length - model_time
+        return now + remaining * ((now - first_wall) / advanced)
+
+
+# Public functions
+
+
+@contextmanager
+def monitoring(block: dict, cycle: datetime) -> Iterator[ForecastMonitor | None]:
+    """
+    Monitor a forecast in a background thread for the duration of the context.
+
+    Nothing is monitored if the block has no monitor section.
+
+    :param block: The dereferenced config block containing the mpas and monitor sections.
+    :param cycle: The forecast cycle.
+    """
+    if "monitor" not in block:
+        yield None
+        return
+    monitor = ForecastMonitor(block, cycle)
+    logging.info("Monitoring forecast progress in %s", monitor.status_file)
+    stop = Event()
+    thread = Thread(target=monitor.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        yield monitor
+    finally:
+        stop.set()
+        thread.join()
+        monitor.update(final=True)
+
+
+def walltime(value: str) -> timedelta:
+    """
+    Convert a batch walltime like 02:30:00 or 1:10:00 to a timedelta.
+
+    :param value: The walltime string.
+    """
+    parts = [int(x) for x in value.split(":")]
+    while len(parts) < 3:
+        parts.insert(0, 0)
+    hours, minutes, seconds = parts
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+# Private
+
+_TIMESTEP = re.compile(r"Begin timestep (\d{4}-\d{2}-\d{2}_\d{2}:\d{2}:\d{2})")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _present(rundir: Path) -> set[str]:
+    """
+    The names of the non-empty files in the rundir.
+    """
+    if not rundir.is_dir():
+        return set()
+    with os.scandir(rundir) as entries:
+        return {e.name for e in entries if e.is_file() and e.stat().st_size > 0}
+
+
+def _write(path: Path, status: dict) -> None:
+    """
+    Atomically replace the status file so readers never see a partial write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(status, indent=2) + "\n")
+    tmp.replace(path)
@@ -1,26 +1,307 @@
 #!/usr/bin/env python3
 """
 The run script for the MPAS forecast.
+
+A long forecast can be run as a chain of segments, each its own job, with every segment after the
+first restarting from the restart file the one before it wrote at its end. All segments run in the
+forecast rundir, so a failed segment is retried from the last restart rather than from the start.
+
+The forecasts of several ensemble members can be packed into one job, running at the same time,
+each in its member's rundir and, where the forecast's node layout is known, on its own nodes.
 """
 
+from __future__ import annotations
+
+import logging
+import math
 import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 sys.path.append(str(Path(__file__).parent.parent))
 
 from uwtools.api.mpas import MPAS
 
-from scripts.common import parse_args, run_component
+from scripts.common import member_config, parse_args, run_component
+from scripts.monitor import OUTPUT_STREAMS, monitoring
+from scripts.readiness import ready_files, scan, watching
+from scripts.streams import filename, output_files
+from scripts.utils import walk_key_path
+
+if TYPE_CHECKING:
+    from uwtools.api.config import Config
+
+# The namelist and streams files the driver writes in the rundir.
+SEGMENT_FILES = ("namelist.atmosphere", "streams.atmosphere")
+# Cancel only the srun step with a given name in the current job, not the whole job.
+STEP_ABORT = (
+    "scancel $(squeue -h -s -j $SLURM_JOB_ID -o '%i %j' | awk '$2 == \"{step}\" {{print $1}}')"
+)
+
+
+def check_forecast(block: dict, cycle: datetime) -> list[Path]:
+    """
+    Check that the forecast wrote every output file, once its segments have all run.
+
+    A file no longer in the rundir was written if its lead time was marked ready, as scrubbing may
+    have removed it once post-processing read it.
+
+    :param block: The dereferenced config block containing the mpas section.
+    :param cycle: The cycle.
+    :return: The output files.
+    """
+    mpas = block["mpas"]
+    rundir = Path(mpas["rundir"])
+    length = timedelta(hours=int(mpas["length"]))
+    names = [name for name in OUTPUT_STREAMS if name in mpas["streams"]]
+    expected = [rundir / name for _, name in output_files(mpas["streams"], names, cycle, length)]
+    gone = [path.name for path in expected if not path.is_file()]
+    ready = ready_files(block, cycle) if gone else set()
+    missing = [name for name in gone if name not in ready]
+    if missing:
+        logging.error("Missing forecast output in %s: %s", rundir, " ".join(missing))
+        sys.exit(1)
+    logging.info(
+        "Found all %s forecast output files in %s, %s of them already marked ready and removed",
+        len(expected),
+        rundir,
+        len(gone),
+    )
+    return expected
+
+
+def forecast_segments(length: int, segment_length: int) -> list[tuple[int, int]]:
+    """
+    Split the forecast into consecutive segments, the last of which may be shorter.
+
+    :param length: The forecast length in hours.
+    :param segment_length: The segment length in hours.
+    :return: The offset from the cycle and length, in hours, of each segment.
+    """
+    segment_length = max(1, segment_length)
+    return [
+        (offset, min(segment_length, length - offset))
+        for offset in range(0, max(length, 1), segment_length)
+    ]
+
+
+def member_nodes(expt_config: Config, key_path: list[str]) -> int | None:
+    """
+    The nodes one member's forecast needs, from the forecast's batchargs and the node layout.
+
+    :param expt_config: The dereferenced experiment config.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :return: The node count, unless neither it nor the tasks per node are known.
+    """
+    batchargs = walk_key_path(expt_config, key_path)["mpas"]["execution"]["batchargs"]
+    if batchargs.get("nodes"):
+        return int(batchargs["nodes"])
+    per_node = batchargs.get("tasks_per_node") or expt_config["platform"].get("cores_per_node")
+    if not per_node:
+        return None
+    return math.ceil(int(batchargs["cores"]) / int(per_node))
+
+
+def name_step(expt_config: Config, key_path: list[str], step: str) -> None:
+    """
+    Name a packed member's srun step, and have the monitor abort only that step if the forecast
+    will be late, rather than the job the member shares with others.
 
+    :param expt_config: The dereferenced experiment config, updated in place.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param step: The step name.
+    """
+    block = walk_key_path(expt_config, key_path)
+    execution = block["mpas"]["execution"]
+    execution["mpiargs"] = [*execution.get("mpiargs", []), f"--job-name={step}"]
+    if "monitor" in block:
+        block["monitor"]["abort_command"] = STEP_ABORT.format(step=step)
 
-def main():
-    args = parse_args()
-    run_component(
-        driver_class=MPAS,
-        config_file=args.config_file,
-        cycle=args.cycle,
-        key_path=args.key_path,
+
+def place_member(expt_config: Config, key_path: list[str], slot: int) -> bool:
+    """
+    Confine a member's forecast to its own nodes of a packed job, the slot-th group of as many
+    nodes as the forecast needs.
+
+    :param expt_config: The dereferenced experiment config, updated in place.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param slot: The member's index in the job.
+    :return: Was the forecast placed?
+    """
+    nodes = member_nodes(expt_config, key_path)
+    if nodes is None:
+        logging.warning(
+            "Cannot place packed forecasts on their own nodes without nodes, tasks_per_node, "
+            "or platform.cores_per_node"
+        )
+        return False
+    execution = walk_key_path(expt_config, key_path)["mpas"]["execution"]
+    execution["mpiargs"] = [
+        *execution.get("mpiargs", []),
+        f"--nodes={nodes}",
+        f"--relative={slot * nodes}",
+        "--exact",
+    ]
+    return True
+
+
+def run_forecast(
+    config_file: Path,
+    cycle: datetime,
+    key_path: list[str],
+    member: int | None,
+    slot: int | None = None,
+) -> None:
+    """
+    Run the forecast, monitored and watched for lead times ready for post-processing.
+
+    :param config_file: Path to the experiment config.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param member: The ensemble member, if any.
+    :param slot: The member's index in a packed job, if any.
+    """
+    expt_config = member_config(config_file, member)
+    expt_config.dereference(context={**expt_config, "cycle": cycle})
+    block = walk_key_path(expt_config, key_path)
+    if slot is not None:
+        place_member(expt_config, key_path, slot)
+        name_step(expt_config, key_path, f"mpas_mem{member:03d}")
+    with monitoring(block, cycle), watching(block, cycle):
+        run_component(
+            driver_class=MPAS,
+            config_file=config_file if slot is None else expt_config,
+            cycle=cycle,
+            key_path=key_path,
+            staging=expt_config.get("staging"),
+            scratch=expt_config.get("scratch"),
+            member=member,
+        )
+
+
+def run_members(
+    config_file: Path, cycle: datetime, key_path: list[str], members: list[int]
+) -> None:
+    """
+    Run the forecasts of several ensemble members at the same time, in one job.
+
+    Each member's forecast is launched with the forecast's own MPI arguments, so the job needs the
+    cores of all of them, and is placed on the next of the job's groups of the nodes it needs.
+
+    :param config_file: Path to the experiment config.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param members: The ensemble members.
+    """
+    logging.info("Running the forecasts of members %s", " ".join(map(str, members)))
+    with ThreadPoolExecutor(max_workers=len(members)) as executor:
+        futures = {
+            member: executor.submit(run_forecast, config_file, cycle, key_path, member, slot)
+            for slot, member in enumerate(members)
+        }
+    failed = [str(member) for member, future in futures.items() if future.exception()]
+    if failed:
+        logging.error("Forecasts failed for members %s", " ".join(failed))
+        sys.exit(1)
+
+
+def run_segment(expt_config: Config, cycle: datetime, key_path: list[str], segment: int) -> None:
+    """
+    Run one segment of the forecast in the forecast rundir.
+
+    The driver is run for a cycle at the start of the segment, which sets the namelist start time
+    and the LBC files linked, with the rest of the config dereferenced for the real cycle. Restart
+    files are written at the end of each segment, and every segment after the first reads the one
+    written at its start.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param segment: The segment index.
+    """
+    block = walk_key_path(expt_config, key_path)
+    segments = block["segments"]
+    windows = forecast_segments(int(block["mpas"]["length"]), int(segments["length"]))
+    if not 0 <= segment < len(windows):
+        logging.error("Segment %s is not one of the %s forecast segments", segment, len(windows))
+        sys.exit(1)
+    offset, length = windows[segment]
+    start = cycle + timedelta(hours=offset)
+    config = deepcopy(dict(expt_config))
+    segment_block = walk_key_path(config, key_path)
+    mpas = segment_block["mpas"]
+    mpas["length"] = length
+    mpas["execution"]["batchargs"]["walltime"] = segments["walltime"]
+    days, hours = divmod(int(segments["length"]), 24)
+    mpas["streams"]["restart"]["output_interval"] = (
+        f"{days}_{hours:02d}:00:00" if days else f"{hours:02d}:00:00"
+    )
+    rundir = Path(mpas["rundir"])
+    if segment > 0:
+        restart = rundir / filename(mpas["streams"]["restart"]["filename_template"], start)
+        if not restart.is_file():
+            logging.error("Cannot run segment %s without %s", segment, restart)
+            sys.exit(1)
+        mpas["namelist"]["update_values"].setdefault("restart", {})["config_do_restart"] = True
+    # Every segment runs in the same rundir, where an earlier segment's run is already complete.
+    # The driver does not rewrite a namelist, streams file, or runscript that is already there, so
+    # remove those written for an earlier segment's start time, length, and restart setting.
+    runscript = f"runscript.{MPAS.driver_name()}"
+    for name in (*SEGMENT_FILES, runscript, f"{runscript}.done"):
+        (rundir / name).unlink(missing_ok=True)
+    # A restarted segment leaves the lead time it starts from to the segment before it.
+    leads = (offset + 1 if segment > 0 else 0, offset + length)
+    logging.info("Running forecast segment %s from %s for %s h", segment, start, length)
+    with monitoring(segment_block, start), watching(block, cycle, leads):
+        # Segments read and write restart files in the rundir, so they do not run in scratch.
+        run_component(
+            driver_class=MPAS,
+            config_file=config,
+            cycle=start,
+            key_path=key_path,
+            staging=expt_config.get("staging"),
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(add_help=False)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--segment", type=int, help="Run this forecast segment.")
+    mode.add_argument(
+        "--check", action="store_true", help="Check the output of all forecast segments."
+    )
+    mode.add_argument(
+        "--readiness",
+        action="store_true",
+        help="Mark ready, in one pass, the lead times whose output is complete.",
+    )
+    mode.add_argument(
+        "--members",
+        type=lambda x: [int(m) for m in x.split(",")],
+        help="Run the comma-separated ensemble members' forecasts together.",
     )
+    segment_args, rest = parser.parse_known_args(argv)
+    args = parse_args(rest)
+    if segment_args.members:
+        run_members(args.config_file, args.cycle, args.key_path, segment_args.members)
+        return
+    if not (segment_args.check or segment_args.readiness or segment_args.segment is not None):
+        run_forecast(args.config_file, args.cycle, args.key_path, args.member)
+        return
+    expt_config = member_config(args.config_file, args.member)
+    expt_config.dereference(context={**expt_config, "cycle": args.cycle})
+    block = walk_key_path(expt_config, args.key_path)
+    if segment_args.check:
+        check_forecast(block, args.cycle)
+        return
+    if segment_args.readiness:
+        scan(block, args.cycle)
+        return
+    run_segment(expt_config, args.cycle, args.key_path, segment_args.segment)
 
 
 if __name__ == "__main__":
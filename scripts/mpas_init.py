@@ -1,19 +1,121 @@
 #!/usr/bin/env python3
 """
 The run script for the MPAS init_atmosphere.
+
+LBC generation can be split into segments, each covering a sub-window of the forecast in its own
+rundir under the LBC rundir, after which a gather step moves their lbc files up into the LBC
+rundir. LBCs at different times are independent, so the segments can run at the same time.
 """
 
+from __future__ import annotations
+
 import inspect
+import logging
 import sys
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from uwtools.api.config import Config, get_yaml_config
 from uwtools.api.mpas_init import MPASInit
 
-from scripts.common import parse_args, run_component
-from scripts.utils import run_shell_cmd
+from scripts.common import member_config, parse_args, run_component
+from scripts.streams import filename
+from scripts.utils import run_shell_cmd, walk_key_path
+
+if TYPE_CHECKING:
+    from uwtools.api.config import Config
+
+
+def gather_lbcs(block: dict, cycle: datetime) -> list[Path]:
+    """
+    Move the lbc files written by each segment into the LBC rundir, and check that none are missing.
+
+    :param block: The dereferenced config block containing the mpas_init section and segments.
+    :param cycle: The cycle.
+    :return: The lbc files.
+    """
+    mpas_init = block["mpas_init"]
+    rundir = Path(mpas_init["rundir"])
+    bcs = mpas_init["boundary_conditions"]
+    windows = lbc_segments(int(bcs["length"]), int(bcs["interval_hours"]), block["segments"])
+    for segment in range(len(windows)):
+        for path in sorted(segment_rundir(rundir, segment).glob("lbc.*.nc")):
+            path.replace(rundir / path.name)
+    template = mpas_init["streams"]["lbc"]["filename_template"]
+    every = timedelta(hours=int(bcs["interval_hours"]))
+    steps = int(bcs["length"]) // int(bcs["interval_hours"])
+    expected = [rundir / filename(template, cycle + i * every) for i in range(steps + 1)]
+    missing = [path.name for path in expected if not path.is_file()]
+    if missing:
+        logging.error("Missing LBC files in %s: %s", rundir, " ".join(missing))
+        sys.exit(1)
+    logging.info(
+        "Gathered %s LBC files from %s segments in %s", len(expected), len(windows), rundir
+    )
+    return expected
+
+
+def lbc_segments(length: int, interval: int, count: int) -> list[tuple[int, int]]:
+    """
+    Split the LBC window into contiguous sub-windows of as nearly equal length as possible.
+
+    Neighboring sub-windows share their boundary time, so each starts and ends on an LBC time.
+
+    :param length: The LBC window length in hours.
+    :param interval: The LBC interval in hours.
+    :param count: The number of sub-windows wanted, reduced to the number of LBC intervals.
+    :return: The offset from the cycle and length, in hours, of each sub-window.
+    """
+    steps = length // interval
+    count = max(1, min(count, steps))
+    bounds = [i * steps // count for i in range(count + 1)]
+    return [(bounds[i] * interval, (bounds[i + 1] - bounds[i]) * interval) for i in range(count)]
+
+
+def run_segment(expt_config: Config, cycle: datetime, key_path: list[str], segment: int) -> None:
+    """
+    Run init_atmosphere for one sub-window of the LBCs, in its own rundir.
+
+    The driver is run for a cycle at the start of the sub-window, which sets the namelist start
+    time and the ungrib files linked, with the rest of the config dereferenced for the real cycle.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the config block containing the mpas_init section.
+    :param segment: The index of the sub-window.
+    """
+    block = walk_key_path(expt_config, key_path)
+    mpas_init = block["mpas_init"]
+    bcs = mpas_init["boundary_conditions"]
+    windows = lbc_segments(int(bcs["length"]), int(bcs["interval_hours"]), block["segments"])
+    if not 0 <= segment < len(windows):
+        logging.error("Segment %s is not one of the %s LBC segments", segment, len(windows))
+        sys.exit(1)
+    offset, length = windows[segment]
+    bcs["length"] = length
+    mpas_init["rundir"] = str(segment_rundir(Path(mpas_init["rundir"]), segment))
+    logging.info("Running LBC segment %s: hours %s to %s", segment, offset, offset + length)
+    run_component(
+        driver_class=MPASInit,
+        config_file=expt_config,
+        cycle=cycle + timedelta(hours=offset),
+        key_path=key_path,
+        staging=expt_config.get("staging"),
+        scratch=expt_config.get("scratch"),
+    )
+
+
+def segment_rundir(rundir: Path, segment: int) -> Path:
+    """
+    The rundir of an LBC segment.
+
+    :param rundir: The LBC rundir.
+    :param segment: The index of the segment.
+    """
+    return rundir / f"segment_{segment:02d}"
 
 
 def variables_from_fix(expt_config: Config, driver_config: dict) -> None:
@@ -35,16 +137,31 @@ def variables_from_fix(expt_config: Config, driver_config: dict) -> None:
         )
 
 
-def main():
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(add_help=False)
+    split = parser.add_mutually_exclusive_group()
+    split.add_argument("--segment", type=int, help="Run one segment of the LBCs.")
+    split.add_argument("--gather", action="store_true", help="Gather the LBC segments' files.")
+    split_args, rest = parser.parse_known_args(argv)
+    args = parse_args(rest)
+    expt_config = member_config(args.config_file, args.member)
+    if split_args.segment is not None or split_args.gather:
+        expt_config.dereference(context={**expt_config, "cycle": args.cycle})
+        if split_args.gather:
+            gather_lbcs(walk_key_path(expt_config, args.key_path), args.cycle)
+        else:
+            run_segment(expt_config, args.cycle, args.key_path, split_args.segment)
+        return
     mpas_init_driver = run_component(
         driver_class=MPASInit,
         config_file=args.config_file,
         cycle=args.cycle,
         key_path=args.key_path,
+        staging=expt_config.get("staging"),
+        scratch=expt_config.get("scratch"),
+        member=args.member,
     )
     # For RRFS ICS, use some variables from fix files.
-    expt_config = get_yaml_config(args.config_file)
     external_model = expt_config["user"]["ics"]["external_model"]
     if external_model == "RRFS" and "ics" in args.key_path:
         variables_from_fix(expt_config, mpas_init_driver.config)
@@ -109,7 +109,12 @@ for fn in "${parmfiles[@]}"; do
     fi
 done
 
-ln -sf $EXEC_DIR/../parm/mpassit/diaglist diaglist
+# The diaglist in PARM_DIR is the one ush/stream_lists.py prunes the diagnostics stream to.
+if [[ -e $PARM_DIR/diaglist ]]; then
+    ln -sf $PARM_DIR/diaglist diaglist
+else
+    ln -sf $EXEC_DIR/../parm/mpassit/diaglist diaglist
+fi
 
 ln -sf $INIT_DIR/${MESH_LABEL}.init.nc .
 ln -sf $EXEC_DIR/mpassit .
@@ -127,7 +132,7 @@ sed -i "s|BLOCKFILE|$block_file|g" $nmlfile
 sed -i "s/FCSTTIME/$fcst_time_str/g" $nmlfile
 sed -i "s/MESH_LABEL/$MESH_LABEL/g" $nmlfile
 
-srun -n $SLURM_NTASKS mpassit $nmlfile
+srun -n $SLURM_NTASKS ${MPASSIT_SRUN_ARGS:-} mpassit $nmlfile
 
 outfile="${WORK_DIR}/${FCST_HOUR}/MPAS-A_out.${fcst_time_str}.nc"
 if [[ -e $outfile ]]; then
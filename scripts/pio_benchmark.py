@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark MPAS output with several PIO layouts.
+
+Each layout runs a short forecast in its own directory under the forecast rundir, writing a restart
+file at its end along with the usual output. The time spent writing is estimated from the MPAS
+timers as the total time less initialization and time integration, and the write bandwidth as the
+bytes of output written over that time. The results are logged and written to pio_benchmark.json
+in the forecast rundir.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import sys
+from copy import deepcopy
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from uwtools.api.config import Config, get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+from uwtools.api.mpas import MPAS
+
+from scripts.common import parse_args, run_component
+from scripts.monitor import LOGFILE
+from scripts.streams import output_files
+from scripts.utils import walk_key_path
+
+RESULTS = "pio_benchmark.json"
+_TIMER = re.compile(r"^\s*\d+\s+(.+?)\s+([\d.]+)\s+\d+\s", re.MULTILINE)
+
+
+def candidates(cores: int, tasks_per_node: int) -> list[tuple[int, int]]:
+    """
+    Layouts with one I/O task on every node, every other node, and so on, for each divisor of the
+    node count.
+
+    :param cores: The number of MPI tasks.
+    :param tasks_per_node: The number of MPI tasks on each node.
+    :return: The number of I/O tasks and the stride between them, for each layout.
+    """
+    nodes = math.ceil(cores / tasks_per_node)
+    return [(nodes // n, n * tasks_per_node) for n in range(1, nodes + 1) if nodes % n == 0]
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    use_uwtools_logger()
+    expt_config = get_yaml_config(args.config_file)
+    expt_config.dereference(context={**expt_config, "cycle": args.cycle})
+    block = walk_key_path(expt_config, args.key_path)
+    batchargs = block["mpas"]["execution"]["batchargs"]
+    tasks_per_node = int(
+        batchargs.get("tasks_per_node") or expt_config["platform"]["cores_per_node"]
+    )
+    cores = int(batchargs.get("cores") or batchargs["nodes"] * batchargs["tasks_per_node"])
+    benchmark = expt_config["pio"]["benchmark"]
+    layouts = [tuple(x) for x in benchmark["layouts"]] or candidates(cores, tasks_per_node)
+    results = [
+        run_layout(expt_config, args.cycle, args.key_path, layout, int(benchmark["hours"]))
+        for layout in layouts
+    ]
+    path = Path(block["mpas"]["rundir"], RESULTS)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    report(results)
+    logging.info("Wrote results to %s", path)
+
+
+def read_timers(log: Path) -> dict[str, float]:
+    """
+    The total seconds of each timer in the summary at the end of an MPAS log.
+
+    :param log: Path to the MPAS log.
+    """
+    return {name: float(total) for name, total in _TIMER.findall(log.read_text())}
+
+
+def report(results: list[dict]) -> dict | None:
+    """
+    Log the results and the layout with the highest write bandwidth.
+
+    :param results: The result of each layout.
+    :return: The best result, if any layout succeeded.
+    """
+    logging.info("%8s %8s %10s %10s %10s", "iotasks", "stride", "MiB", "write s", "MiB/s")
+    for result in results:
+        if result["ok"]:
+            logging.info(
+                "%8s %8s %10.1f %10.1f %10.1f",
+                result["iotasks"],
+                result["stride"],
+                result["bytes"] / 2**20,
+                result["write_seconds"],
+                result["mb_per_s"],
+            )
+        else:
+            logging.info("%8s %8s %10s", result["iotasks"], result["stride"], "failed")
+    done = [result for result in results if result["ok"]]
+    if not done:
+        logging.error("No layout completed")
+        return None
+    best = max(done, key=lambda result: result["mb_per_s"])
+    logging.info(
+        "Best: config_pio_num_iotasks %s, config_pio_stride %s", best["iotasks"], best["stride"]
+    )
+    return best
+
+
+def run_layout(
+    expt_config: Config, cycle: datetime, key_path: list[str], layout: tuple[int, int], hours: int
+) -> dict:
+    """
+    Run a short forecast with a PIO layout and measure its write bandwidth.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the block holding the mpas config.
+    :param layout: The number of I/O tasks and the stride between them.
+    :param hours: The forecast length in hours.
+    :return: The layout, the bytes written, the estimated seconds spent writing, and their ratio.
+    """
+    iotasks, stride = layout
+    config = deepcopy(dict(expt_config))
+    mpas = walk_key_path(config, key_path)["mpas"]
+    rundir = Path(mpas["rundir"], "pio_benchmark", f"{iotasks}x{stride}")
+    mpas["rundir"] = str(rundir)
+    mpas["length"] = hours
+    mpas["streams"]["restart"]["output_interval"] = f"{hours:02d}:00:00"
+    mpas["namelist"]["update_values"]["io"] = {
+        "config_pio_num_iotasks": iotasks,
+        "config_pio_stride": stride,
+    }
+    result = {"iotasks": iotasks, "stride": stride, "ok": False}
+    logging.info("Running %s with %s I/O tasks, stride %s, in %s", MPAS.__name__, *layout, rundir)
+    try:
+        run_component(driver_class=MPAS, config_file=config, cycle=cycle, key_path=key_path)
+    except SystemExit:
+        return result
+    timers = read_timers(rundir / LOGFILE)
+    seconds = timers.get("total time", 0.0) - sum(
+        timers.get(name, 0.0) for name in ("initialize", "time integration")
+    )
+    written = written_bytes(mpas["streams"], rundir, cycle, timedelta(hours=hours))
+    return {
+        **result,
+        "bytes": written,
+        "mb_per_s": written / 2**20 / seconds if seconds > 0 else 0.0,
+        "ok": True,
+        "write_seconds": seconds,
+    }
+
+
+def written_bytes(streams: dict, rundir: Path, start: datetime, length: timedelta) -> int:
+    """
+    The bytes of output the forecast wrote, from every stream with an output interval.
+
+    :param streams: The MPAS driver streams config.
+    :param rundir: The forecast rundir.
+    :param start: The forecast start time.
+    :param length: The forecast length.
+    """
+    names = [
+        name
+        for name, stream in streams.items()
+        if "output" in stream["type"]
+        and str(stream.get("output_interval", "none")) not in ("none", "initial_only")
+    ]
+    paths = {rundir / name for _, name in output_files(streams, names, start, length)}
+    return sum(path.stat().st_size for path in paths if path.is_file())
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+The run script for packed post-processing of a group of lead times in one allocation.
+
+For each lead time in turn, the script waits for the forecast output to be marked ready, then runs
+MPASSIT, UPP, and the GRIB combine step. Files UPP copies into its rundir are copied once, for the
+first lead time, and linked for the rest. In pipelined mode, MPASSIT for the next lead time runs
+on one subset of the allocation's nodes while UPP processes the current lead time on the rest.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event
+from typing import TYPE_CHECKING
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+from uwtools.api.upp import UPP
+
+from scripts.combine_grib import combine
+from scripts.common import parse_args, run_component
+from scripts.scrub import release
+from scripts.utils import run_shell_cmd, walk_key_path
+
+if TYPE_CHECKING:
+    from datetime import datetime, timedelta
+
+    from uwtools.api.config import Config
+
+
+def combine_upp_output(post: dict, rundir: Path, leadtime: timedelta) -> Path:
+    """
+    Combine the UPP GRIB files for a lead time into one file next to the lead time rundirs.
+
+    :param post: The post config block.
+    :param rundir: The UPP rundir for the lead time.
+    :param leadtime: The lead time.
+    """
+    fhr = "%02d" % _hours(leadtime)
+    inputs = [rundir / f"{name}.GrbF{fhr}" for name in post["combine"]["inputs"]]
+    output = combine(inputs, rundir.parent / f"{post['combine']['name']}.GrbF{fhr}")
+    logging.info("Combined %s into %s", " ".join(p.name for p in inputs), output)
+    return output
+
+
+def main():
+    args = parse_args(leads=True)
+    use_uwtools_logger()
+    run_post(
+        config_file=args.config_file,
+        cycle=args.cycle,
+        key_path=args.key_path,
+        leadtimes=args.leadtimes,
+    )
+
+
+def place_upp(upp: dict, relative: int = 0) -> None:
+    """
+    Confine UPP to the node count and layout it requests, within a larger packed allocation.
+
+    :param upp: The UPP driver config, updated in place.
+    :param relative: Index of the first allocation node UPP may use.
+    """
+    batchargs = upp["execution"]["batchargs"]
+    placement = [
+        f"--nodes={batchargs['nodes']}",
+        f"--ntasks-per-node={batchargs['tasks_per_node']}",
+    ]
+    if relative:
+        placement.append(f"--relative={relative}")
+    upp["execution"]["mpiargs"] = [*placement, *upp["execution"].get("mpiargs", [])]
+
+
+def prepare(
+    expt_config: Config,
+    cycle: datetime,
+    leadtime: timedelta,
+    srun_args: str,
+    stop: Event | None = None,
+) -> str:
+    """
+    Wait for the forecast output for a lead time, then run MPASSIT on it, releasing the forecast
+    output for scrubbing if configured to.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param leadtime: The lead time.
+    :param srun_args: Extra srun arguments placing MPASSIT in the allocation.
+    :param stop: An event signaling that the run has failed and the lead time is abandoned.
+    :return: An error message, empty on success.
+    """
+    if not wait_for_output(expt_config, leadtime, stop):
+        return f"Timed out waiting for forecast output at lead time {leadtime}"
+    if stop is not None and stop.is_set():
+        return f"Abandoned lead time {leadtime}"
+    if not run_mpassit(expt_config, cycle, leadtime, srun_args):
+        return f"MPASSIT failed for lead time {leadtime}"
+    if expt_config["post"]["packing"].get("scrub"):
+        release(expt_config, "forecast", ["mpassit"], cycle, leadtime)
+    return ""
+
+
+def reuse_staged_files(upp: dict, rundir: Path) -> None:
+    """
+    Link, instead of copy, the files already copied into an earlier lead time's UPP rundir.
+
+    :param upp: The UPP driver config, updated in place.
+    :param rundir: The UPP rundir holding the copies.
+    """
+    copies = upp.pop("files_to_copy", {})
+    upp.setdefault("files_to_link", {}).update({dst: str(rundir / dst) for dst in copies})
+
+
+def run_mpassit(
+    expt_config: Config, cycle: datetime, leadtime: timedelta, srun_args: str = ""
+) -> bool:
+    """
+    Run the MPASSIT run script for one lead time.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param cycle: The cycle.
+    :param leadtime: The lead time.
+    :param srun_args: Extra srun arguments placing MPASSIT in the allocation.
+    :return: Did MPASSIT succeed?
+    """
+    mpas_app = expt_config["user"]["mpas_app"]
+    mpassit = expt_config["post"]["mpassit"]
+    batchargs = mpassit["execution"]["batchargs"]
+    cores = batchargs.get("cores") or batchargs["nodes"] * batchargs["tasks_per_node"]
+    fhr = "%03d" % _hours(leadtime)
+    yyyymmddhh = cycle.strftime("%Y%m%d%H")
+    env = {
+        "CYCLE": yyyymmddhh,
+        "FCST_DIR": expt_config["forecast"]["mpas"]["rundir"],
+        "INIT_DIR": expt_config["create_ics"]["mpas_init"]["rundir"],
+        "MESH_LABEL": expt_config["user"]["mesh_label"],
+        "SLURM_NTASKS": cores,
+    }
+    if srun_args:
+        env["MPASSIT_SRUN_ARGS"] = f"'{srun_args}'"
+    cmd = " ".join(
+        [
+            *[f"{k}={v}" for k, v in env.items()],
+            f"{mpas_app}/scripts/mpassit.sh",
+            f"-m {mpassit['modulefile']}",
+            f"-w {mpassit['rundir']}",
+            f"-f {fhr}",
+            f"-i {yyyymmddhh}",
+            f"-x {mpassit['fixdir']}",
+            f"-n {mpassit['nmldir']}",
+            f"-p {mpassit['parmdir']}",
+            f"-e {mpas_app}/exec",
+        ]
+    )
+    success, _ = run_shell_cmd(cmd=cmd, log_output=True, taskname=f"mpassit {fhr}")
+    return success
+
+
+def run_post(config_file: Path, cycle: datetime, key_path: list[str], leadtimes: list[timedelta]):
+    """
+    Run MPASSIT, UPP, and the combine step for each lead time in turn.
+
+    :param config_file: Path to the experiment config.
+    :param cycle: The cycle.
+    :param key_path: Path of keys to the post config block.
+    :param leadtimes: The lead times to process, in order.
+    """
+    expt_config = get_yaml_config(config_file)
+    expt_config.dereference(context={**expt_config, "cycle": cycle})
+    post = walk_key_path(expt_config, key_path)
+    pipelined = bool(post["packing"].get("pipelined", False))
+    srun_args = ""
+    if pipelined:
+        # MPASSIT takes the first nodes of the allocation and UPP the ones after them.
+        nodes = post["mpassit"]["execution"]["batchargs"]["nodes"]
+        srun_args = f"--nodes={nodes} --relative=0"
+        place_upp(post["upp"], relative=nodes)
+    else:
+        place_upp(post["upp"])
+    staged: Path | None = None
+    stop = Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(prepare, expt_config, cycle, leadtimes[0], srun_args, stop)
+        for i, leadtime in enumerate(leadtimes):
+            error = future.result()
+            if error:
+                logging.error(error)
+                sys.exit(1)
+            following = leadtimes[i + 1 : i + 2]
+            if pipelined and following:
+                future = executor.submit(prepare, expt_config, cycle, following[0], srun_args, stop)
+            if staged is not None:
+                reuse_staged_files(post["upp"], staged)
+            driver = run_component(
+                driver_class=UPP,
+                config_file=expt_config,
+                cycle=cycle,
+                key_path=key_path,
+                leadtime=leadtime,
+                scratch=expt_config.get("scratch"),
+            )
+            rundir = Path(driver.config["rundir"])
+            staged = staged or rundir
+            combine_upp_output(post, rundir, leadtime)
+            if not pipelined and following:
+                future = executor.submit(prepare, expt_config, cycle, following[0], srun_args, stop)
+    finally:
+        # After a failure, e.g. UPP exiting, abandon the next lead time instead of waiting hours
+        # for its forecast output.
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def wait_for_output(expt_config: Config, leadtime: timedelta, stop: Event | None = None) -> bool:
+    """
+    Wait for the forecast readiness sentinel for a lead time.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param leadtime: The lead time.
+    :param stop: An event that ends the wait early.
+    :return: Did the sentinel appear before the timeout, without the wait being stopped?
+    """
+    readiness = expt_config["forecast"]["readiness"]
+    packing = expt_config["post"]["packing"]
+    sentinel = Path(
+        expt_config["forecast"]["mpas"]["rundir"],
+        readiness["sentinel_dir"],
+        "%03d" % _hours(leadtime),
+    )
+    deadline = time.monotonic() + float(packing["wait_timeout"])
+    logged = False
+    while not sentinel.is_file():
+        if time.monotonic() >= deadline:
+            return False
+        if not logged:
+            logging.info("Waiting for %s", sentinel)
+            logged = True
+        if stop is None:
+            time.sleep(float(readiness["interval"]))
+        elif stop.wait(float(readiness["interval"])):
+            return False
+    return True
+
+
+def _hours(leadtime: timedelta) -> int:
+    return int(leadtime.total_seconds() // 3600)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
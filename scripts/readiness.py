@@ -0,0 +1,320 @@
+"""
+Watch a running MPAS forecast and mark each lead time ready for post-processing.
+
+Once every output file valid at a lead time looks complete, an atomic sentinel file named for the
+three-digit lead hour is written to the sentinel directory, so that Rocoto can start
+post-processing that lead time with a cheap data dependency. A file looks complete once its header
+records at least one record and it has stopped changing; neither proves that the model has closed
+it, so the settle time should cover the longest pause between the model's writes to a file. Each
+pass scans the rundir once for every lead time at once, and keeps a status table of all lead times
+in the sentinel directory.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Event, Thread
+from typing import TYPE_CHECKING
+
+from scripts.streams import filename, interval, output_times
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Magic numbers opening netCDF classic (CDF-1, CDF-2), CDF-5, and netCDF-4/HDF5 files.
+CLASSIC = (b"CDF\x01", b"CDF\x02")
+CDF5 = b"CDF\x05"
+HDF5 = b"\x89HDF\r\n\x1a\n"
+# The record counts a classic or CDF-5 header carries while the file is still being written: the
+# indeterminate streaming value, or zero until PnetCDF or PIO first syncs the header.
+INCOMPLETE = (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF)
+# The status table in the sentinel directory, with a line per lead time.
+STATUS = "status"
+
+
+class ReadinessWatcher:
+    """
+    Poll a forecast rundir and write a sentinel for each lead time whose output is complete.
+    """
+
+    def __init__(self, block: dict, cycle: datetime, hours: tuple[int, int] | None = None):
+        """
+        :param block: The dereferenced config block containing the mpas and readiness sections.
+        :param cycle: The forecast cycle.
+        :param hours: The first and last lead hours to watch, if not the whole forecast.
+        """
+        mpas = block["mpas"]
+        self.config = block["readiness"]
+        self.rundir = Path(mpas["rundir"])
+        self.sentinel_dir = self.rundir / str(self.config.get("sentinel_dir", "ready"))
+        self.leads = lead_files(
+            mpas["streams"],
+            self.config.get("streams", ["output", "diagnostics"]),
+            cycle,
+            timedelta(hours=int(mpas["length"])),
+        )
+        if hours is not None:
+            first, last = hours
+            self.leads = {h: names for h, names in self.leads.items() if first <= h <= last}
+        self._previous: dict[str, tuple[int, int]] = {}
+        self._status = ""
+
+    def pending(self) -> list[int]:
+        """
+        The lead hours not yet marked ready, from a single scan of the sentinel directory.
+        """
+        marked = _names(self.sentinel_dir)
+        return [hour for hour in self.leads if f"{hour:03d}" not in marked]
+
+    def poll(self, *, final: bool = False, once: bool = False) -> list[int]:
+        """
+        Make one pass over the rundir, marking newly completed lead times ready.
+
+        Only the files of lead times still pending are checked, and the status table is rewritten
+        when it changes.
+
+        :param final: Has the model exited? If so, files need not be seen unchanged across polls.
+        :param once: Is this the only pass? If so, files need only have settled.
+        :return: The lead hours newly marked ready.
+        """
+        pending = self.pending()
+        expected = {name for hour in pending for name in self.leads[hour]}
+        current = {k: v for k, v in _stat_all(self.rundir).items() if k in expected}
+        settle = float(self.config.get("settle", 30))
+        now = time.time()
+        complete = {
+            name
+            for name, (size, mtime_ns) in current.items()
+            if size > 0
+            and (final or once or (self._previous.get(name) == (size, mtime_ns)))
+            and (final or now - mtime_ns / 1e9 >= settle)
+            and is_closed(self.rundir / name)
+        }
+        self._previous = current
+        ready = []
+        for hour in pending:
+            names = self.leads[hour]
+            if all(name in complete for name in names):
+                _write_sentinel(self.sentinel(hour), [(n, current[n][0]) for n in names])
+                logging.info("Lead time %03d is ready: %s", hour, " ".join(names))
+                ready.append(hour)
+        self.write_status([h for h in pending if h not in ready], complete)
+        return ready
+
+    def reset(self) -> None:
+        """
+        Remove sentinels and the status table left by an earlier attempt, whose output the model is
+        about to replace.
+        """
+        for hour in self.leads:
+            self.sentinel(hour).unlink(missing_ok=True)
+        (self.sentinel_dir / STATUS).unlink(missing_ok=True)
+        self._status = ""
+
+    def run(self, stop: Event) -> None:
+        """
+        Poll periodically until asked to stop or until every lead time is ready.
+
+        :param stop: An event signaling that the forecast has ended.
+        """
+        every = float(self.config.get("interval", 30))
+        while self.pending() and not stop.wait(every):
+            self.poll()
+
+    def sentinel(self, hour: int) -> Path:
+        """
+        The path to the sentinel file for a lead hour.
+
+        :param hour: The lead hour.
+        """
+        return self.sentinel_dir / f"{hour:03d}"
+
+    def write_status(self, pending: list[int], complete: set[str]) -> None:
+        """
+        Atomically write the status table, if it has changed, with a line per lead time giving its
+        three-digit lead hour, whether it is ready or pending, and how many of its files are
+        complete, e.g. "006 pending 1/2".
+
+        :param pending: The lead hours not marked ready.
+        :param complete: Names of the complete files of pending lead times.
+        """
+        lines = []
+        for hour, names in self.leads.items():
+            done = sum(name in complete for name in names) if hour in pending else len(names)
+            state = "pending" if hour in pending else "ready"
+            lines.append(f"{hour:03d} {state} {done}/{len(names)}\n")
+        status = "".join(lines)
+        if status != self._status:
+            _write_atomically(self.sentinel_dir / STATUS, status)
+            self._status = status
+
+
+# Public functions
+
+
+def is_closed(path: Path) -> bool:
+    """
+    Does the file look like a complete netCDF file that is no longer being written?
+
+    A classic or CDF-5 header whose record count is zero, as PnetCDF and PIO leave it until the
+    header is synced, or the indeterminate streaming value belongs to a file being written.
+    HDF5-based files offer no such marker, so only their magic number is checked.
+
+    :param path: Path to the file.
+    """
+    try:
+        with path.open("rb") as f:
+            header = f.read(12)
+    except OSError:
+        return False
+    if header.startswith(CLASSIC) and len(header) >= 8:
+        return int.from_bytes(header[4:8], "big") not in INCOMPLETE
+    if header.startswith(CDF5) and len(header) >= 12:
+        return int.from_bytes(header[4:12], "big") not in INCOMPLETE
+    return header.startswith(HDF5)
+
+
+def lead_files(
+    streams: dict, names: list[str], cycle: datetime, length: timedelta
+) -> dict[int, list[str]]:
+    """
+    Map each lead hour with output from the first named stream to the files valid at that time.
+
+    :param streams: The MPAS driver streams config.
+    :param names: Names of the output streams post-processing reads, the first setting the leads.
+    :param cycle: The forecast cycle.
+    :param length: The forecast length.
+    """
+    every = {name: interval(streams[name]["output_interval"]) for name in names}
+    leads = {}
+    for valid in output_times(cycle, length, every[names[0]]):
+        offset = valid - cycle
+        leads[int(offset.total_seconds()) // 3600] = [
+            filename(streams[name]["filename_template"], valid)
+            for name in names
+            if offset % every[name] == timedelta(0)
+        ]
+    return leads
+
+
+def ready_files(block: dict, cycle: datetime) -> set[str]:
+    """
+    The names of the files listed in the sentinels of lead times marked ready, which
+    post-processing may since have read and scrubbing removed.
+
+    :param block: The dereferenced config block containing the mpas and readiness sections.
+    :param cycle: The forecast cycle.
+    """
+    if "readiness" not in block:
+        return set()
+    watcher = ReadinessWatcher(block, cycle)
+    marked = _names(watcher.sentinel_dir)
+    names: set[str] = set()
+    for hour in watcher.leads:
+        if f"{hour:03d}" in marked:
+            lines = watcher.sentinel(hour).read_text().splitlines()
+            names.update(line.split()[0] for line in lines if line.strip())
+    return names
+
+
+def scan(block: dict, cycle: datetime, *, final: bool = False) -> list[int]:
+    """
+    Make a single pass over a forecast rundir, from outside the forecast job, marking ready every
+    lead time whose files are closed and have settled.
+
+    :param block: The dereferenced config block containing the mpas and readiness sections.
+    :param cycle: The forecast cycle.
+    :param final: Has the model exited? If so, files need not have settled.
+    :return: The lead hours newly marked ready.
+    """
+    if "readiness" not in block:
+        logging.error("No readiness section in the forecast config")
+        sys.exit(1)
+    watcher = ReadinessWatcher(block, cycle)
+    ready = watcher.poll(final=final, once=True)
+    logging.info("Marked %s lead times ready, %s still pending", len(ready), len(watcher.pending()))
+    return ready
+
+
+@contextmanager
+def watching(
+    block: dict, cycle: datetime, hours: tuple[int, int] | None = None
+) -> Iterator[ReadinessWatcher | None]:
+    """
+    Watch a forecast in a background thread for the duration of the context.
+
+    Sentinels from an earlier attempt are removed first. When the context exits normally, the model
+    has finished writing, so a final pass marks ready every lead time whose files are present.
+    Nothing is watched if the block has no readiness section.
+
+    :param block: The dereferenced config block containing the mpas and readiness sections.
+    :param cycle: The forecast cycle.
+    :param hours: The first and last lead hours to watch, for a run covering part of the forecast.
+        Sentinels for other lead hours are left alone.
+    """
+    if "readiness" not in block:
+        yield None
+        return
+    watcher = ReadinessWatcher(block, cycle, hours)
+    watcher.reset()
+    logging.info("Writing lead time readiness sentinels to %s", watcher.sentinel_dir)
+    stop = Event()
+    thread = Thread(target=watcher.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        yield watcher
+    finally:
+        stop.set()
+        thread.join()
+    watcher.poll(final=True)
+
+
+# Private
+
+
+def _names(directory: Path) -> set[str]:
+    """
+    The names in a directory, from a single directory scan.
+    """
+    if not directory.is_dir():
+        return set()
+    with os.scandir(directory) as entries:
+        return {entry.name for entry in entries}
+
+
+def _stat_all(rundir: Path) -> dict[str, tuple[int, int]]:
+    """
+    The size and modification time of every file in the rundir, from a single directory scan.
+    """
+    if not rundir.is_dir():
+        return {}
+    stats = {}
+    with os.scandir(rundir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def _write_sentinel(path: Path, files: list[tuple[str, int]]) -> None:
+    """
+    Atomically write a sentinel listing the files, and their sizes, that made a lead time ready.
+    """
+    _write_atomically(path, "".join(f"{name} {size}\n" for name, size in files))
+
+
+def _write_atomically(path: Path, text: str) -> None:
+    """
+    Write a file under a temporary name and rename it into place.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
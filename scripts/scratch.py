@@ -0,0 +1,253 @@
+"""
+Run a component in node-local scratch, copying its declared outputs back to the shared rundir.
+
+The driver provisions its rundir in a directory under the scratch location, so namelists, linked
+tables, logs, and temporaries stay off the shared filesystem's metadata servers. While the
+component runs, a background thread copies each output matching the configured patterns back to
+the real rundir once it has stopped changing, and a final pass copies the rest after the component
+exits. Each copy is written under a temporary name, checked against a checksum of the source, and
+renamed into place with the source's modification time. Files matching the follow patterns, like
+logs, are copied whenever they change, so they can be watched from the rundir.
+
+Scratch is only used for a job on a single node, since every rank must see the same rundir.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Event, Thread
+from typing import TYPE_CHECKING
+
+from scripts.readiness import is_closed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+BUFSIZE = 16 * 1024 * 1024
+
+
+class StageBack:
+    """
+    Copy outputs from a scratch rundir back to the shared rundir.
+    """
+
+    def __init__(self, workdir: Path, rundir: Path, scratch: dict, outputs: list[str]):
+        """
+        :param workdir: The scratch rundir.
+        :param rundir: The shared rundir.
+        :param scratch: The scratch config.
+        :param outputs: Patterns of file names, relative to the rundir, to copy back.
+        """
+        self.workdir = workdir
+        self.rundir = rundir
+        self.outputs = outputs
+        self.follow = list(scratch.get("follow", []))
+        self.settle = float(scratch.get("settle", 10))
+        self.verify = bool(scratch.get("verify", True))
+        self.bytes = 0
+        self.failed: list[str] = []
+        self._copied: dict[str, tuple[int, int]] = {}
+        self._previous: dict[str, tuple[int, int]] = {}
+
+    def poll(self, *, final: bool = False) -> list[str]:
+        """
+        Copy back the outputs that are complete and changed since they were last copied.
+
+        :param final: Has the component exited? If so, every output is complete.
+        :return: The names of the files copied.
+        """
+        current = _stat_all(self.workdir)
+        now = time.time()
+        copied = []
+        for name, stat in current.items():
+            if self._copied.get(name) == stat:
+                continue
+            if _matches(name, self.follow):
+                ready = True
+            elif _matches(name, self.outputs):
+                _, mtime_ns = stat
+                ready = final or (
+                    self._previous.get(name) == stat
+                    and now - mtime_ns / 1e9 >= self.settle
+                    and (not name.endswith(".nc") or is_closed(self.workdir / name))
+                )
+            else:
+                continue
+            if ready and self.copy(name, check=self.verify and not _matches(name, self.follow)):
+                self._copied[name] = stat
+                copied.append(name)
+        self._previous = current
+        return copied
+
+    def copy(self, name: str, *, check: bool) -> bool:
+        """
+        Copy one file back, atomically.
+
+        :param name: The file name, relative to the rundir.
+        :param check: Read the copy back and compare its checksum with the source's?
+        :return: Did the copy succeed?
+        """
+        src, dst = self.workdir / name, self.rundir / name
+        tmp = dst.with_name(f".{dst.name}.tmp")
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            if src.is_symlink():
+                tmp.unlink(missing_ok=True)
+                tmp.symlink_to(src.readlink())
+            else:
+                _copy(src, tmp, check=check)
+                shutil.copystat(src, tmp)
+                self.bytes += tmp.stat().st_size
+            tmp.replace(dst)
+        except OSError as e:
+            logging.error("Could not copy %s back to %s: %s", src, dst, e)
+            tmp.unlink(missing_ok=True)
+            if name not in self.failed:
+                self.failed.append(name)
+            return False
+        if name in self.failed:
+            self.failed.remove(name)
+        return True
+
+    def run(self, stop: Event, every: float) -> None:
+        """
+        Poll periodically until asked to stop.
+
+        :param stop: An event signaling that the component has exited.
+        :param every: Seconds between polls.
+        """
+        while not stop.wait(every):
+            self.poll()
+
+
+# Public functions
+
+
+def relocate(config: dict, key_path: list[str], name: str, workdir: Path) -> dict:
+    """
+    Point a driver's rundir at a scratch directory, in a copy of the config.
+
+    :param config: The experiment config.
+    :param key_path: Path of keys to the block holding the driver's config.
+    :param name: The driver's config key within the block.
+    :param workdir: The scratch rundir.
+    """
+    block = config
+    for key in key_path:
+        block = block[key]
+    block[name]["rundir"] = str(workdir)
+    return config
+
+
+def scratch_dir(scratch: dict, name: str) -> Path | None:
+    """
+    Make a scratch directory for a component, if it can run in scratch on this node.
+
+    :param scratch: The scratch config.
+    :param name: The component name, used as a prefix for the directory.
+    :return: The directory, or None if the job spans several nodes.
+    """
+    nodes = int(os.environ.get("SLURM_JOB_NUM_NODES", "1"))
+    if nodes > 1:
+        logging.warning("Not using scratch for %s, which runs on %s nodes", name, nodes)
+        return None
+    base = os.path.expandvars(str(scratch.get("dir", "$TMPDIR")))
+    if "$" in base or not Path(base).is_dir():
+        base = tempfile.gettempdir()
+    return Path(tempfile.mkdtemp(prefix=f"{name}.", dir=base))
+
+
+@contextmanager
+def staging_back(
+    workdir: Path, rundir: Path, scratch: dict, outputs: list[str]
+) -> Iterator[StageBack]:
+    """
+    Copy outputs back in a background thread for the duration of the context, then copy the rest
+    and remove the scratch directory.
+
+    The scratch directory is kept if any output could not be copied back.
+
+    :param workdir: The scratch rundir.
+    :param rundir: The shared rundir.
+    :param scratch: The scratch config.
+    :param outputs: Patterns of file names, relative to the rundir, to copy back.
+    """
+    rundir.mkdir(parents=True, exist_ok=True)
+    stager = StageBack(workdir, rundir, scratch, outputs)
+    stop = Event()
+    thread = Thread(target=stager.run, args=(stop, float(scratch.get("interval", 30))), daemon=True)
+    thread.start()
+    start = time.monotonic()
+    try:
+        yield stager
+    finally:
+        stop.set()
+        thread.join()
+        during = stager.bytes
+        drain = time.monotonic()
+        stager.poll(final=True)
+        logging.info(
+            "Copied %.1f MiB back to %s while running and %.1f MiB in %.1f s after %.1f s",
+            during / 2**20,
+            rundir,
+            (stager.bytes - during) / 2**20,
+            time.monotonic() - drain,
+            drain - start,
+        )
+        if stager.failed:
+            logging.error("Keeping %s, as %s could not be copied back", workdir, stager.failed)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+# Private
+
+
+def _copy(src: Path, dst: Path, *, check: bool) -> None:
+    """
+    Copy a file, optionally reading the copy back to compare its CRC-32 with that of the source.
+    """
+    crc = 0
+    with src.open("rb") as s, dst.open("wb") as d:
+        for chunk in iter(lambda: s.read(BUFSIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            d.write(chunk)
+    if check and (_crc(dst) != crc or dst.stat().st_size != src.stat().st_size):
+        msg = f"Copy of {src} does not match it"
+        raise OSError(msg)
+
+
+def _crc(path: Path) -> int:
+    crc = 0
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(BUFSIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _matches(name: str, patterns: list[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def _stat_all(root: Path) -> dict[str, tuple[int, int]]:
+    """
+    The size and modification time of every file and link under a directory, by relative name.
+    """
+    stats = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = Path(directory, name)
+            try:
+                stat = path.lstat()
+            except FileNotFoundError:
+                continue
+            stats[str(path.relative_to(root))] = (stat.st_size, stat.st_mtime_ns)
+    return stats
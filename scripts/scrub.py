@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Delete a cycle's files for a lead time as soon as every task that reads them has finished.
+
+Each group in the scrubber config lists the consumers of its files. A consumer releases a group's
+files for a lead time by leaving a marker in the cycle's ledger directory, and the files are
+deleted once every consumer has done so. Each release also records the cycle's disk footprint.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+from scripts.common import parse_args
+from scripts.readiness import lead_files
+
+if TYPE_CHECKING:
+    from uwtools.api.config import Config
+
+FOOTPRINT = "footprint.json"
+
+
+def files_for(expt_config: Config, group: str, cycle: datetime, leadtime: timedelta) -> list[Path]:
+    """
+    The files in a group that belong to a lead time.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param group: The group name: forecast for the MPAS output streams valid at the lead time, or
+        mpassit for the MPASSIT rundir of the lead time.
+    :param cycle: The cycle.
+    :param leadtime: The lead time.
+    :raises: KeyError for an unknown group.
+    """
+    hour = int(leadtime.total_seconds() // 3600)
+    if group == "mpassit":
+        return [Path(expt_config["post"]["mpassit"]["rundir"], f"{hour:03d}")]
+    if group == "forecast":
+        mpas = expt_config["forecast"]["mpas"]
+        names = expt_config["scrubber"]["groups"]["forecast"]["streams"]
+        leads = lead_files(mpas["streams"], names, cycle, timedelta(hours=int(mpas["length"])))
+        return [Path(mpas["rundir"], name) for name in leads.get(hour, [])]
+    msg = f"Unknown scrubber group '{group}'"
+    raise KeyError(msg)
+
+
+def footprint(cycle_dir: Path) -> dict[str, int]:
+    """
+    The bytes on disk under each top-level directory of a cycle, without following links.
+
+    :param cycle_dir: The cycle directory.
+    """
+    usage = {}
+    with os.scandir(cycle_dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                usage[entry.name] = _du(Path(entry.path))
+    return dict(sorted(usage.items()))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument("--group", required=True, help="The group of files to release.")
+    parser.add_argument(
+        "--consumer", action="append", required=True, help="A consumer releasing the files."
+    )
+    release_args, rest = parser.parse_known_args(argv)
+    args = parse_args(rest, lead_required=True)
+    use_uwtools_logger()
+    expt_config = get_yaml_config(args.config_file)
+    expt_config.dereference(context={**expt_config, "cycle": args.cycle})
+    release(
+        expt_config=expt_config,
+        group=release_args.group,
+        consumers=release_args.consumer,
+        cycle=args.cycle,
+        leadtime=args.leadtime,
+    )
+
+
+def release(
+    expt_config: Config,
+    group: str,
+    consumers: list[str],
+    cycle: datetime,
+    leadtime: timedelta,
+) -> list[Path]:
+    """
+    Record that consumers are done with a group's files for a lead time, deleting the files if no
+    other consumer still needs them.
+
+    :param expt_config: The experiment config, dereferenced for the cycle.
+    :param group: The group name.
+    :param consumers: The consumers releasing the files.
+    :param cycle: The cycle.
+    :param leadtime: The lead time.
+    :return: The deleted files.
+    """
+    scrubber = expt_config["scrubber"]
+    expected = scrubber["groups"][group]["consumers"]
+    unknown = sorted(set(consumers) - set(expected))
+    if unknown:
+        msg = f"{', '.join(unknown)} not listed as consumers of scrubber group '{group}'"
+        raise ValueError(msg)
+    hour = int(leadtime.total_seconds() // 3600)
+    markers = Path(scrubber["ledger"], group, f"{hour:03d}")
+    markers.mkdir(parents=True, exist_ok=True)
+    for consumer in consumers:
+        (markers / consumer).touch()
+    waiting = [c for c in expected if not (markers / c).exists()]
+    deleted = []
+    if waiting:
+        logging.info("Keeping %s files for lead time %03d for %s", group, hour, ", ".join(waiting))
+    else:
+        for path in files_for(expt_config, group, cycle, leadtime):
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            deleted.append(path)
+        logging.info("Deleted %s files for lead time %03d", group, hour)
+    _report(Path(scrubber["ledger"]).parent, Path(scrubber["ledger"], FOOTPRINT))
+    return deleted
+
+
+# Private
+
+
+def _du(path: Path) -> int:
+    """
+    The bytes on disk under a directory, from one scan of each directory.
+    """
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total += _du(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                total += entry.stat(follow_symlinks=False).st_blocks * 512
+    return total
+
+
+def _report(cycle_dir: Path, path: Path) -> None:
+    """
+    Log the cycle's disk footprint and atomically write it to a JSON file.
+    """
+    usage = footprint(cycle_dir)
+    total = sum(usage.values())
+    logging.info("Disk footprint of %s: %.1f GiB", cycle_dir, total / 2**30)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(
+        json.dumps(
+            {
+                "bytes": total,
+                "directories": usage,
+                "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            },
+            indent=2,
+        )
+    )
+    tmp.replace(path)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,148 @@
+"""
+Deliver large input files into a rundir without copying their data where the filesystem allows.
+
+Each file is placed by the first configured method that works: a reflink, which shares the
+source's blocks copy-on-write; a hardlink, which shares the source's inode; or a copy of the file
+in chunks by several threads at once. Files are written under a temporary name, checked against
+the source's size, and renamed into place. A file already in the rundir is left alone, so the
+driver then skips copying it.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+FICLONE = 0x40049409  # From linux/fs.h.
+MB = 2**20
+
+
+def deliver(
+    src: Path, dst: Path, methods: list[str], workers: int = 8, chunk: int = 256 * MB
+) -> str:
+    """
+    Place a file by the first method that works.
+
+    :param src: The source file.
+    :param dst: The destination path.
+    :param methods: The methods to try, in order: reflink, hardlink, or copy.
+    :param workers: The most threads copying chunks at once.
+    :param chunk: The bytes each copy thread copies at a time.
+    :return: The method used, or an empty string if none worked.
+    """
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    size = src.stat().st_size
+    for method in methods:
+        tmp.unlink(missing_ok=True)
+        try:
+            if method == "reflink":
+                _reflink(src, tmp)
+            elif method == "hardlink":
+                os.link(src, tmp)
+            else:
+                _copy(src, tmp, workers, chunk)
+        except OSError as e:
+            logging.debug("Cannot %s %s: %s", method, src, e)
+            continue
+        if tmp.stat().st_size != size:
+            logging.warning("Size of %s by %s differs from %s", dst, method, src)
+            continue
+        tmp.replace(dst)
+        return method
+    tmp.unlink(missing_ok=True)
+    return ""
+
+
+def copy_range(src: int, dst: int, offset: int, count: int, dst_offset: int | None = None) -> None:
+    """
+    Copy bytes between open files, in the kernel where possible, and through user space for any
+    part the kernel does not copy.
+
+    :param src: The source file descriptor.
+    :param dst: The destination file descriptor.
+    :param offset: The offset in the source of the first byte to copy.
+    :param count: The number of bytes to copy.
+    :param dst_offset: The offset in the destination to copy to, by default the source offset.
+    :raises: OSError if the source ends before count bytes are copied.
+    """
+    position = offset if dst_offset is None else dst_offset
+    end = offset + count
+    try:
+        while offset < end:
+            n = os.copy_file_range(src, dst, end - offset, offset, position)
+            if n == 0:
+                break
+            offset += n
+            position += n
+    except OSError:
+        # Cross-filesystem copy_file_range is unsupported by older kernels.
+        pass
+    while offset < end:
+        data = os.pread(src, min(end - offset, 16 * MB), offset)
+        if not data:
+            msg = "Unexpected end of source file"
+            raise OSError(msg)
+        n = os.pwrite(dst, data, position)
+        offset += n
+        position += n
+
+
+def stage(files: dict[str, str], rundir: Path, staging: dict) -> dict[str, str]:
+    """
+    Deliver the large files among a driver's files to copy into its rundir.
+
+    :param files: Source paths by destination name, relative to the rundir.
+    :param rundir: The rundir.
+    :param staging: The staging config.
+    :return: The method used for each staged destination.
+    """
+    min_size = float(staging.get("min_size_mb", 64)) * MB
+    methods = list(staging.get("methods", ["reflink", "hardlink", "copy"]))
+    workers = int(staging.get("workers", 8))
+    chunk = int(float(staging.get("chunk_mb", 256)) * MB)
+    staged = {}
+    for name, source in files.items():
+        src, dst = Path(source), rundir / name
+        if dst.exists() or not src.is_file() or src.stat().st_size < min_size:
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        method = deliver(src, dst, methods, workers, chunk)
+        if method:
+            logging.info("Staged %s by %s in %.1f s", dst, method, time.monotonic() - start)
+            staged[name] = method
+        else:
+            logging.warning("Could not stage %s; leaving it to be copied", dst)
+    return staged
+
+
+# Private
+
+
+def _copy(src: Path, dst: Path, workers: int, chunk: int) -> None:
+    """
+    Copy a file in chunks, several at once, each at its own offset.
+    """
+    size = src.stat().st_size
+    with src.open("rb") as s, dst.open("wb") as d:
+        os.ftruncate(d.fileno(), size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(
+                executor.map(
+                    lambda offset: copy_range(
+                        s.fileno(), d.fileno(), offset, min(chunk, size - offset)
+                    ),
+                    range(0, size, chunk),
+                )
+            )
+    shutil.copymode(src, dst)
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    with src.open("rb") as s, dst.open("wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
@@ -0,0 +1,77 @@
+"""
+Helpers for reasoning about the files written by MPAS streams.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+
+# Public functions
+
+
+def filename(template: str, time: datetime) -> str:
+    """
+    Expand the time tokens in an MPAS stream filename template.
+
+    :param template: A template like history.$Y-$M-$D_$h.$m.$s.nc.
+    :param time: The valid time to substitute.
+    :return: The expanded filename.
+    """
+    return re.sub(r"\$([YMDhms])", lambda m: time.strftime(_TOKENS[m.group(1)]), template)
+
+
+def interval(value: str) -> timedelta:
+    """
+    Convert an MPAS interval string, e.g. 06:00:00 or 1_00:00:00, to a timedelta.
+
+    :param value: The MPAS interval string.
+    :return: The equivalent timedelta.
+    """
+    match = re.fullmatch(r"(?:(\d+)_)?(\d+):(\d+):(\d+)", value.strip())
+    if not match:
+        msg = f"Cannot parse MPAS interval '{value}'"
+        raise ValueError(msg)
+    days, hours, minutes, seconds = (int(x or 0) for x in match.groups())
+    return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def output_files(
+    streams: dict, names: list[str], start: datetime, length: timedelta
+) -> list[tuple[datetime, str]]:
+    """
+    The files the named output streams will write over a forecast.
+
+    :param streams: The MPAS driver streams config.
+    :param names: Names of the output streams of interest.
+    :param start: The forecast start time.
+    :param length: The forecast length.
+    :return: Valid time and filename pairs, sorted by valid time.
+    """
+    files: list[tuple[datetime, str]] = []
+    for name in names:
+        stream = streams[name]
+        every = interval(stream["output_interval"])
+        files.extend(
+            (time, filename(stream["filename_template"], time))
+            for time in output_times(start, length, every)
+        )
+    return sorted(files)
+
+
+def output_times(start: datetime, length: timedelta, every: timedelta) -> list[datetime]:
+    """
+    The valid times of output written every given interval, including the start and end.
+
+    :param start: The first valid time.
+    :param length: The span of time covered.
+    :param every: The interval between valid times.
+    :return: The valid times.
+    """
+    count = int(length / every)
+    return [start + i * every for i in range(count + 1)]
+
+
+# Private
+
+_TOKENS = {"Y": "%Y", "M": "%m", "D": "%d", "h": "%H", "m": "%M", "s": "%S"}
@@ -1,12 +1,27 @@
 #!/usr/bin/env python3
 """
 The run script for ungrib.
+
+Ungrib is serial, so the GRIB files can be split by valid time into chunks, each run by its own
+ungrib instance in a rundir under the ungrib rundir, at the same time. Ungrib writes one
+intermediate file per valid time, so the chunks' files are then moved up into the ungrib rundir.
+
+With an ungrib_cache dir, the intermediate files of each run are kept in a cache shared across
+members, cycles, and experiments, and a run on the same inputs and settings as a cached one links
+its files instead of running ungrib.
+
+An ensemble member's ungrib reads the external model data retrieved for the cycle, taking only the
+files in the member's mem### directory of it when the data have members.
 """
 
 from __future__ import annotations
 
 import logging
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import timedelta
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -16,7 +31,8 @@ from uwtools.api.config import get_yaml_config
 from uwtools.api.logging import use_uwtools_logger
 from uwtools.api.ungrib import Ungrib
 
-from scripts.common import parse_args
+from scripts import ungrib_cache
+from scripts.common import member_config, parse_args
 from scripts.utils import run_shell_cmd, walk_key_path
 
 
@@ -112,34 +128,170 @@ def regrid_all(driver: Ungrib, wgrib2_config: dict):
     yield [merge_vector_fields(driver, ingrib, wgrib2_config) for ingrib in gribfiles.ref]
 
 
+def chunk_configs(expt_config: dict, key_path: list[str], chunks: int) -> list[dict]:
+    """
+    Copies of the experiment config, each covering a chunk of the valid times in its own rundir.
+
+    Consecutive GRIB files are taken to hold consecutive valid times when there is one per valid
+    time, and are divided between the chunks. Otherwise, every chunk is given every file.
+
+    :param expt_config: The dereferenced experiment config.
+    :param key_path: Path of keys to the block holding the ungrib config.
+    :param chunks: The number of chunks wanted, reduced to the number of valid times.
+    """
+    ungrib = walk_key_path(config=expt_config, key_path=key_path)["ungrib"]
+    step = ungrib["step"]
+    step = step if isinstance(step, timedelta) else timedelta(hours=int(step))
+    times = [
+        ungrib["start"] + i * step for i in range((ungrib["stop"] - ungrib["start"]) // step + 1)
+    ]
+    gribfiles = list(ungrib["gribfiles"])
+    by_time = len(gribfiles) == len(times)
+    if not by_time:
+        logging.warning(
+            "%s GRIB files for %s valid times: giving every chunk every file",
+            len(gribfiles),
+            len(times),
+        )
+    configs = []
+    for i, (first, last) in enumerate(chunk_windows(len(times), chunks)):
+        config = deepcopy(dict(expt_config))
+        block = walk_key_path(config=config, key_path=key_path)["ungrib"]
+        block["rundir"] = str(chunk_rundir(Path(ungrib["rundir"]), i))
+        block["start"] = times[first]
+        block["stop"] = times[last - 1]
+        block["gribfiles"] = gribfiles[first:last] if by_time else gribfiles
+        configs.append(config)
+    return configs
+
+
+def chunk_rundir(rundir: Path, chunk: int) -> Path:
+    """
+    The rundir of a chunk.
+
+    :param rundir: The ungrib rundir.
+    :param chunk: The chunk index.
+    """
+    return rundir / f"chunk_{chunk:02d}"
+
+
+def chunk_windows(count: int, chunks: int) -> list[tuple[int, int]]:
+    """
+    Split a number of valid times into contiguous chunks of as nearly equal size as possible.
+
+    :param count: The number of valid times.
+    :param chunks: The number of chunks wanted, reduced to the number of valid times.
+    :return: The start and end index of each chunk's valid times.
+    """
+    chunks = max(1, min(chunks, count))
+    bounds = [i * count // chunks for i in range(chunks + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def merge_chunks(driver: Ungrib, chunk_drivers: list[Ungrib]) -> list[Path]:
+    """
+    Move the intermediate files written by each chunk into the ungrib rundir.
+
+    :param driver: The driver for the full set of valid times.
+    :param chunk_drivers: The drivers for the chunks.
+    :return: The intermediate files moved.
+    """
+    driver.rundir.mkdir(parents=True, exist_ok=True)
+    return [
+        path.replace(driver.rundir / path.name)
+        for chunk_driver in chunk_drivers
+        for path in chunk_driver.output["paths"]
+        if path.is_file()
+    ]
+
+
+def run_chunks(chunk_drivers: list[Ungrib], wgrib2_config: dict | None) -> bool:
+    """
+    Run the chunks' ungrib instances at the same time.
+
+    :param chunk_drivers: The drivers for the chunks.
+    :param wgrib2_config: The wgrib2 config, if the GRIB files' winds must first be regridded.
+    :return: Did every chunk succeed?
+    """
+
+    def run(chunk_driver: Ungrib) -> bool:
+        if wgrib2_config is not None:
+            regrid_all(chunk_driver, wgrib2_config)
+        ready = bool(chunk_driver.run().ready)
+        if not ready:
+            logging.error("Ungrib failed in %s", chunk_driver.rundir)
+        return ready
+
+    with ThreadPoolExecutor(max_workers=len(chunk_drivers)) as executor:
+        return all(list(executor.map(run, chunk_drivers)))
+
+
 @task
-def run_ungrib(config_file, cycle, key_path):
+def run_ungrib(config_file, cycle, key_path, member=None):
     """
     Setup and run the ungrib driver.
     """
-    expt_config = get_yaml_config(config_file)
+    expt_config = member_config(config_file, member)
     expt_config.dereference(context={**expt_config, "cycle": cycle})
     ics_or_lbcs = "ics" if "ics" in ".".join(key_path) else "lbcs"
     external_model = expt_config["user"][ics_or_lbcs]["external_model"]
     yield f"run ungrib for {external_model} {ics_or_lbcs}"
     ungrib_block = walk_key_path(config=expt_config, key_path=key_path)
-    rundir = Path(ungrib_block["ungrib"]["rundir"]).parent / external_model
+    cycle_dir = Path(ungrib_block["ungrib"]["rundir"]).parent
+    if member is not None:
+        # A member's rundirs are in its directory under the cycle's, with the data it shares.
+        cycle_dir = cycle_dir.parent
+    rundir = cycle_dir / external_model
     summary = get_yaml_config(rundir / "ICS.yaml")
     gribfiles = [Path(rundir, p) for p in summary]
     if ics_or_lbcs == "lbcs":
         lbcs_summary = get_yaml_config(rundir / "LBCS.yaml")
         gribfiles.extend(Path(rundir, p) for p in lbcs_summary)
+    if member is not None and expt_config["user"]["ensemble"]["member_data"]:
+        gribfiles = [p for p in gribfiles if p.parent.name == f"mem{member:03d}"]
     ungrib_block["ungrib"]["gribfiles"] = [str(p) for p in gribfiles]
     driver = Ungrib(config=expt_config, cycle=cycle, key_path=key_path)
     yield [asset(x, x.is_file) for x in driver.output["paths"]]
+    wgrib2_config = ungrib_block["wgrib2"] if external_model == "RRFS" else None
+    cache = expt_config.get("ungrib_cache") or {}
+    paths = driver.output["paths"]
+    cached = cache.get("dir") and not all(path.is_file() for path in paths)
+    key = ungrib_cache.digest(ungrib_block["ungrib"], wgrib2_config) if cached else ""
+    if key and ungrib_cache.fetch(Path(cache["dir"]), key, driver.rundir, [p.name for p in paths]):
+        # The cached files are the task's assets, so there is nothing left to do.
+        yield None
+        return
+    chunks = int(ungrib_block.get("chunks", 1))
+    configs = chunk_configs(expt_config, key_path, chunks) if chunks > 1 else []
     yield (
-        regrid_all(driver, walk_key_path(config=expt_config, key_path=key_path)["wgrib2"])
-        if external_model == "RRFS"
+        regrid_all(driver, wgrib2_config)
+        if wgrib2_config is not None and len(configs) <= 1
         else None
     )
-    # Run ungrib.
-    logging.info("Running %s in %s", Ungrib.__name__, driver.rundir)
-    driver.run()
+    if len(configs) > 1:
+        chunk_drivers = [Ungrib(config=c, cycle=cycle, key_path=key_path) for c in configs]
+        logging.info(
+            "Running %s in %s chunks under %s", Ungrib.__name__, len(configs), driver.rundir
+        )
+        start = time.monotonic()
+        if not run_chunks(chunk_drivers, wgrib2_config):
+            # Neither merge nor cache the output of the chunks that succeeded.
+            logging.error("Not merging ungrib chunks under %s", driver.rundir)
+            return
+        moved = merge_chunks(driver, chunk_drivers)
+        logging.info(
+            "Ungrib wrote %s files in %s chunks in %.1f s",
+            len(moved),
+            len(configs),
+            time.monotonic() - start,
+        )
+    else:
+        # Run ungrib.
+        logging.info("Running %s in %s", Ungrib.__name__, driver.rundir)
+        driver.run()
+    if key:
+        max_bytes = int(float(cache.get("max_size_gb", 100)) * ungrib_cache.GB)
+        ungrib_cache.store(Path(cache["dir"]), key, paths, max_bytes)
 
 
 def main():
@@ -149,6 +301,7 @@ def main():
         config_file=args.config_file,
         cycle=args.cycle,
         key_path=args.key_path,
+        member=args.member,
     ).ready:
         print("Error occurred running ungrib. Please see component error logs.")
         sys.exit(1)
@@ -0,0 +1,197 @@
+"""
+A content-addressed cache of ungrib's intermediate files, shared by the members and cycles of any
+experiments that run ungrib on the same external model data.
+
+Each entry is a directory named for a digest of what ungrib's output depends on: the contents of
+the GRIB files and Vtable, the wgrib2 settings and files used to regrid winds, and the rest of the
+ungrib config, such as the valid times and namelist, but not the rundir or executable. A run whose
+digest matches an entry places the entry's files in its rundir by hardlink, or a copy, instead of
+running ungrib, and a run that does not stores its files as a new entry. Entries are written under
+a temporary name and renamed into place, so a partly written entry is never used. Using an entry
+marks it as recently used, and the least recently used entries are removed once the cache holds
+more than its size limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from shutil import rmtree
+
+from scripts.staging import deliver
+
+CHUNK = 2**24
+GB = 2**30
+METHODS = ["hardlink", "copy"]
+# Config keys naming files whose contents, rather than paths, the intermediate files depend on.
+_FILES = ("budget_fields", "neighbor_fields", "vtable")
+# Ungrib config keys that do not change the intermediate files.
+_IGNORED = ("execution", "gribfiles", "rundir")
+
+
+def digest(ungrib: dict, wgrib2: dict | None = None, workers: int = 8) -> str:
+    """
+    The cache key of an ungrib run.
+
+    :param ungrib: The dereferenced ungrib config.
+    :param wgrib2: The wgrib2 config, if the GRIB files' winds are regridded.
+    :param workers: The most GRIB files checksummed at once.
+    :return: A hex digest.
+    """
+    gribfiles = [Path(p) for p in ungrib["gribfiles"]]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        checksums = list(executor.map(checksum, gribfiles))
+    settings = {k: v for k, v in ungrib.items() if k not in _IGNORED}
+    described = {
+        "gribfiles": checksums,
+        "ungrib": _contents(settings),
+        "wgrib2": None if wgrib2 is None else _contents(dict(wgrib2)),
+    }
+    text = json.dumps(described, default=str, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def checksum(path: Path) -> str:
+    """
+    The checksum of a file's contents.
+
+    :param path: The file.
+    """
+    h = hashlib.blake2b()
+    with path.open("rb") as f:
+        while data := f.read(CHUNK):
+            h.update(data)
+    return h.hexdigest()
+
+
+def evict(cache_dir: Path, max_bytes: int, keep: str = "") -> list[Path]:
+    """
+    Remove the least recently used entries until the cache holds at most a number of bytes.
+
+    :param cache_dir: The cache directory.
+    :param max_bytes: The most bytes the cache may hold.
+    :param keep: An entry not to remove.
+    :return: The entries removed.
+    """
+    entries = []
+    for entry in cache_dir.iterdir():
+        if entry.is_dir() and not entry.name.startswith("."):
+            size = sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+            entries.append((entry.stat().st_mtime, entry, size))
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for _, entry, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if entry.name == keep:
+            continue
+        if _remove(entry):
+            total -= size
+            removed.append(entry)
+    if removed:
+        logging.info("Evicted %s ungrib cache entries; %.1f GB remain", len(removed), total / GB)
+    return removed
+
+
+def fetch(cache_dir: Path, key: str, rundir: Path, names: list[str]) -> bool:
+    """
+    Place the files of a cache entry in a rundir.
+
+    Where the entry is missing or incomplete, or a file cannot be placed, any of the files already
+    in the rundir are removed, so that ungrib does not write through a hardlink into an entry.
+
+    :param cache_dir: The cache directory.
+    :param key: The entry's cache key.
+    :param rundir: The ungrib rundir.
+    :param names: The names of the intermediate files ungrib would write.
+    :return: Were all the files placed?
+    """
+    entry = cache_dir / key
+    start = time.monotonic()
+    placed = entry.is_dir() and all((entry / name).is_file() for name in names)
+    if placed:
+        rundir.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            (rundir / name).unlink(missing_ok=True)
+            if not deliver(entry / name, rundir / name, METHODS):
+                placed = False
+                break
+    if not placed:
+        for name in names:
+            (rundir / name).unlink(missing_ok=True)
+        logging.info("No ungrib cache entry %s", key)
+        return False
+    os.utime(entry)
+    logging.info(
+        "Placed %s files from ungrib cache entry %s in %.1f s",
+        len(names),
+        key,
+        time.monotonic() - start,
+    )
+    return True
+
+
+def store(cache_dir: Path, key: str, paths: list[Path], max_bytes: int) -> Path | None:
+    """
+    Store the intermediate files of an ungrib run as a cache entry, then evict older entries.
+
+    :param cache_dir: The cache directory.
+    :param key: The entry's cache key.
+    :param paths: The intermediate files.
+    :param max_bytes: The most bytes the cache may hold.
+    :return: The entry, unless a file was missing or could not be stored.
+    """
+    entry = cache_dir / key
+    if entry.is_dir():
+        return entry
+    if not all(path.is_file() for path in paths):
+        logging.warning("Not caching incomplete ungrib output for %s", key)
+        return None
+    tmp = cache_dir / f".{key}.{os.getpid()}"
+    rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    if not all(deliver(path, tmp / path.name, METHODS) for path in paths):
+        logging.warning("Could not store ungrib output in cache entry %s", key)
+        rmtree(tmp)
+        return None
+    try:
+        tmp.rename(entry)
+    except OSError:
+        # Another run stored the entry first.
+        rmtree(tmp)
+    else:
+        logging.info("Stored %s files in ungrib cache entry %s", len(paths), key)
+    evict(cache_dir, max_bytes, keep=key)
+    return entry
+
+
+# Private
+
+
+def _contents(config: dict) -> dict:
+    """
+    A copy of a config with the paths of the files it depends on replaced by their checksums.
+    """
+    return {
+        k: checksum(Path(v)) if k in _FILES and v and Path(v).is_file() else v
+        for k, v in config.items()
+    }
+
+
+def _remove(entry: Path) -> bool:
+    """
+    Remove an entry, first renaming it so that no run finds it partly removed.
+    """
+    doomed = entry.with_name(f".{entry.name}.{os.getpid()}.evicted")
+    try:
+        entry.rename(doomed)
+    except OSError:
+        # Another run removed it first.
+        return False
+    rmtree(doomed, ignore_errors=True)
+    return True
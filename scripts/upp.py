@@ -10,17 +10,20 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from uwtools.api.upp import UPP
 
-from scripts.common import parse_args, run_component
+from scripts.common import member_config, parse_args, run_component
 
 
 def main():
     args = parse_args(lead_required=True)
+    expt_config = member_config(args.config_file, args.member)
     run_component(
         driver_class=UPP,
         config_file=args.config_file,
         cycle=args.cycle,
         leadtime=args.leadtime,
         key_path=args.key_path,
+        scratch=expt_config.get("scratch"),
+        member=args.member,
     )
 
 
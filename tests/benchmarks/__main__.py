@@ -0,0 +1,3 @@
+from tests.benchmarks.suite import main
+
+main()
@@ -0,0 +1,314 @@
+"""
+Benchmarks of the app's Python hot paths, run offline on synthetic inputs.
+
+Each benchmark prepares its inputs in a temporary directory and returns the call to time. The
+suite records each call's best wall-clock time over several runs and its peak traced memory in a
+JSON file, and compares such files to flag regressions against a baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from shutil import rmtree
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+from scripts import ungrib
+from scripts.utils import run_shell_cmd
+from ush import experiment_gen, retrieve_data
+from ush.validation import validate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+MPAS_APP = Path(__file__).parent.parent.parent.resolve()
+CYCLE = datetime(2025, 8, 14, tzinfo=timezone.utc)
+
+BENCHMARKS: dict[str, Callable[[Path], Callable[[], object]]] = {}
+
+
+def benchmark(setup: Callable[[Path], Callable[[], object]]):
+    """
+    Register a benchmark: a function that prepares its inputs in a directory and returns the call
+    to time.
+    """
+    BENCHMARKS[setup.__name__] = setup
+    return setup
+
+
+@benchmark
+def experiment_gen_3km_conus(tmpdir: Path) -> Callable[[], object]:
+    return _experiment_gen(tmpdir, "3km_conus.yaml")
+
+
+@benchmark
+def experiment_gen_hfip_2025(tmpdir: Path) -> Callable[[], object]:
+    return _experiment_gen(tmpdir, "hfip_2025.yaml")
+
+
+@benchmark
+def retrieve_data_plan(tmpdir: Path) -> Callable[[], object]:
+    """
+    The copy configs for 30 GEFS members at 121 hourly lead times, from disk and from HPSS.
+    """
+    config = get_yaml_config(MPAS_APP / "parm" / "data_locations.yml")
+    members = list(range(1, 31))
+    lead_times = [timedelta(hours=h) for h in range(121)]
+    templates = retrieve_data.get_filenames(config["GEFS"]["filenames"], "grib2", "anl")
+    # Archive locations are lists, as in data_locations.yml, though annotated as strings.
+    hpss: dict = {"locations": [str(tmpdir / "hpss")], "archive_internal_dirs": ["./"]}
+
+    def plan() -> int:
+        disk = retrieve_data.prepare_fs_copy_config(
+            config, CYCLE, "GEFS", templates, lead_times, [tmpdir / "data"], members
+        )
+        archives = retrieve_data.possible_hpss_configs(
+            hpss, ["gefs.tar"], config, CYCLE, "GEFS", templates, lead_times, members
+        )
+        return len(next(disk)) + len(next(archives))
+
+    return plan
+
+
+@benchmark
+def run_shell_cmd_large_output(_: Path) -> Callable[[], object]:
+    """
+    A command writing 200,000 lines, about 1.3 MB, with its output logged.
+    """
+    return lambda: run_shell_cmd("seq 1 200000", log_output=True, taskname="benchmark")
+
+
+@benchmark
+def ungrib_rundir_and_chunks(tmpdir: Path) -> Callable[[], object]:
+    """
+    The provisioned ungrib rundir for 500 GRIB files, and the configs and drivers of its split
+    into 8 chunks, without running ungrib.
+    """
+    gribdir = tmpdir / "grib"
+    gribdir.mkdir()
+    gribfiles = []
+    for i in range(500):
+        path = gribdir / f"gfs.t00z.pgrb2.0p25.f{i:03d}"
+        path.touch()
+        gribfiles.append(str(path))
+    (tmpdir / "Vtable.GFS").touch()
+    block = {
+        "ungrib": {
+            "execution": {"executable": "ungrib.exe"},
+            "gribfiles": gribfiles,
+            "rundir": str(tmpdir / "ungrib"),
+            "start": CYCLE.replace(tzinfo=None),
+            "step": 1,
+            "stop": CYCLE.replace(tzinfo=None) + timedelta(hours=len(gribfiles) - 1),
+            "vtable": str(tmpdir / "Vtable.GFS"),
+        },
+    }
+    config = {"prepare_grib_lbcs": block, "user": {"lbcs": {"external_model": "GFS"}}}
+
+    def setup() -> int:
+        rmtree(tmpdir / "ungrib", ignore_errors=True)
+        driver = ungrib.Ungrib(config=config, cycle=CYCLE, key_path=["prepare_grib_lbcs"])
+        driver.provisioned_rundir()
+        configs = ungrib.chunk_configs(config, ["prepare_grib_lbcs"], 8)
+        for chunk in configs:
+            ungrib.Ungrib(config=chunk, cycle=CYCLE, key_path=["prepare_grib_lbcs"])
+        return len(configs)
+
+    return setup
+
+
+@benchmark
+def validate_driver_blocks(tmpdir: Path) -> Callable[[], object]:
+    """
+    Validation of the default driver blocks of the hfip_2025 workflow.
+    """
+    with _in_ush():
+        experiment_config, _, _ = experiment_gen.prepare_configs(
+            _user_configs(tmpdir, "hfip_2025.yaml")
+        )
+    blocks = experiment_config["user"]["driver_validation_blocks"]
+    return lambda: experiment_gen.validate_driver_blocks(blocks, experiment_config)
+
+
+def compare(baseline: dict, results: dict, tolerance: float, floor: float) -> list[str]:
+    """
+    The benchmarks that regressed against a baseline.
+
+    :param baseline: The baseline results.
+    :param results: The results to check.
+    :param tolerance: The fraction by which time or memory may grow before it is a regression.
+    :param floor: Changes in time of fewer seconds than this are not regressions.
+    :return: A description of each regression.
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            logging.info("%s: no baseline", name)
+            continue
+        logging.info(
+            "%s: %.3f s (baseline %.3f s), %.1f MiB peak (baseline %.1f MiB)",
+            name,
+            result["seconds"],
+            before["seconds"],
+            result["peak_mib"],
+            before["peak_mib"],
+        )
+        seconds = result["seconds"] - before["seconds"]
+        if seconds > floor and result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['seconds']:.3f} s, from {before['seconds']:.3f} s")
+        if result["peak_mib"] > before["peak_mib"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {result['peak_mib']:.1f} MiB peak, from {before['peak_mib']:.1f} MiB"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the benchmarks, or compare results to a baseline.
+    """
+    use_uwtools_logger()
+    parser = argparse.ArgumentParser(description="Benchmark the app's Python hot paths.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument(
+        "-o", "--output", type=Path, default=Path("benchmarks.json"), help="Results file to write."
+    )
+    run_parser.add_argument(
+        "-k", "--only", nargs="*", choices=sorted(BENCHMARKS), help="Benchmarks to run."
+    )
+    run_parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each.")
+    compare_parser = subparsers.add_parser("compare", help="Compare results to a baseline.")
+    compare_parser.add_argument("baseline", type=Path, help="Baseline results file.")
+    compare_parser.add_argument("results", type=Path, help="Results file to check.")
+    compare_parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed fractional growth, 0.2 by default."
+    )
+    compare_parser.add_argument(
+        "--floor", type=float, default=0.05, help="Ignore time changes under this many seconds."
+    )
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run(args.only or sorted(BENCHMARKS), args.repeat)
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        logging.info("Wrote results to %s", args.output)
+        return
+    regressions = compare(
+        json.loads(args.baseline.read_text()),
+        json.loads(args.results.read_text()),
+        args.tolerance,
+        args.floor,
+    )
+    for regression in regressions:
+        logging.error("Regression in %s", regression)
+    if regressions:
+        sys.exit(1)
+
+
+def run(names: list[str], repeat: int) -> dict:
+    """
+    Run benchmarks.
+
+    :param names: The benchmarks to run.
+    :param repeat: The number of timed runs of each.
+    :return: The best time in seconds and peak traced memory in MiB of each, and the platform.
+    """
+    results = {}
+    for name in names:
+        with TemporaryDirectory() as tmpdir:
+            call = BENCHMARKS[name](Path(tmpdir))
+            with _quiet():
+                tracemalloc.start()
+                call()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    call()
+                    times.append(time.perf_counter() - start)
+        results[name] = {"peak_mib": peak / 2**20, "seconds": min(times)}
+        logging.info("%s: %.3f s, %.1f MiB peak", name, min(times), peak / 2**20)
+    return {
+        "benchmarks": results,
+        "created": datetime.now(tz=timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+    }
+
+
+# Private
+
+
+def _experiment_gen(tmpdir: Path, workflow: str) -> Callable[[], object]:
+    """
+    The experiment config and workflow files of a shipped workflow.
+    """
+    user_configs = _user_configs(tmpdir, workflow)
+
+    def generate() -> None:
+        with _in_ush():
+            experiment_config, user_config, mpas_app = experiment_gen.prepare_configs(user_configs)
+        validated = validate(experiment_config.as_dict())
+        _, experiment_file = experiment_gen.setup_experiment_directory(validated)
+        experiment_gen.generate_workflow_files(
+            experiment_config, experiment_file, mpas_app, user_config, validated
+        )
+
+    return generate
+
+
+@contextmanager
+def _in_ush() -> Iterator[None]:
+    """
+    Work in the ush directory, where the default config is read from.
+    """
+    cwd = Path.cwd()
+    os.chdir(MPAS_APP / "ush")
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+@contextmanager
+def _quiet() -> Iterator[None]:
+    """
+    Send log messages to /dev/null, so that they are still formatted and written.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers
+    with Path(os.devnull).open("w") as devnull:
+        root.handlers = [logging.StreamHandler(devnull)]
+        try:
+            yield
+        finally:
+            root.handlers = handlers
+
+
+def _user_configs(tmpdir: Path, workflow: str) -> list[Path]:
+    """
+    A shipped workflow config, and one placing the experiment in a directory on a known platform.
+    """
+    override = tmpdir / "benchmark.yaml"
+    get_yaml_config(
+        {
+            "data": {"mesh_files": str(tmpdir / "meshes")},
+            "user": {"experiment_dir": str(tmpdir / "experiment"), "platform": "hera"},
+        }
+    ).dump(override)
+    return [MPAS_APP / "ush" / "workflows" / workflow, override]
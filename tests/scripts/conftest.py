@@ -11,4 +11,5 @@ def args():
     args.config_file = Path("/some/config.yaml")
     args.cycle = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
     args.key_path = ["forecast"]
+    args.member = None
     return args
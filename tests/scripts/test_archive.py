@@ -0,0 +1,429 @@
+import hashlib
+import json
+import os
+import tarfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from pytest import fixture, mark
+
+from scripts import archive
+
+CYCLE = datetime(2025, 1, 1, 18, tzinfo=timezone.utc)
+HSI = """#!/bin/bash
+echo "hsi $*" >> $FAKE_HPSS/calls
+[[ ${FAKE_FAIL:-} == hsi ]] && exit 1
+[[ $1 == -q ]] && shift
+case $1 in
+  mkdir) mkdir -p "$FAKE_HPSS/$3" ;;
+  ls) test -e "$FAKE_HPSS/$2" ;;
+  put) cat > "$FAKE_HPSS/$4" ;;
+  mv) mv "$FAKE_HPSS/$3" "$FAKE_HPSS/$4" ;;
+esac
+"""
+HTAR = """#!/bin/bash
+echo "htar $*" >> $FAKE_HPSS/calls
+[[ ${FAKE_FAIL:-} == htar ]] && { echo "HTAR: no space"; exit 72; }
+tar -cf "$FAKE_HPSS/$2" "${@:3}"
+"""
+
+NCCOPY = """#!/bin/bash
+echo "nccopy $*" >> $FAKE_HPSS/calls
+[[ ${FAKE_FAIL:-} == compress ]] && { echo "NetCDF: Unknown file format" >&2; exit 1; }
+sed "s/${FAKE_CORRUPT:-^$/}/" "${@: -2:1}" | tr -s " " > "${@: -1}"
+"""
+NCKS = """#!/bin/bash
+echo "ncks $*" >> $FAKE_HPSS/calls
+[[ $* == *" -v "* ]] && { cp "${@: -2:1}" "${@: -1}"; exit; }
+sed "s/1.23456/1.235/" "${@: -2:1}" | tr -s " " > "${@: -1}"
+"""
+NCDUMP = """#!/bin/bash
+if [[ $1 == -h ]]; then sed "/^data:/q" "$2"; else tr -s " " < "$3"; fi
+"""
+CDL = """netcdf f {
+dimensions:
+\tTime = UNLIMITED ; // (1 currently)
+\tn = 3 ;
+variables:
+\tfloat t(n) ;
+\t\tt:units = "K" ;
+\tint i(n) ;
+\tchar s ;
+data:
+
+ t = 1.23456,      2.5,      3 ;
+
+ i = 1,      2,      3 ;
+
+ s = "x" ;
+}
+"""
+
+
+@fixture
+def cdl(tmp_path):
+    path = tmp_path / "f.nc"
+    path.write_text(CDL)
+    return path
+
+
+@fixture
+def expt_dir(tmp_path):
+    path = tmp_path / "expt"
+    files = {
+        "2025010118/forecast/mesh.init.nc": b"init" * 1000,
+        "2025010118/upp/000/WRFPRS.GrbF00": b"prs",
+        "2025010118/upp/000/itag": b"itag",
+        "2025010118/upp/000/postxconfig-NT.txt": b"cfg",
+        "2025010118/upp/006/WRFPRS.GrbF06": b"prs",
+        "2025010118/mpassit/000/MPAS-A_out.2025-01-01_18.00.00.nc": b"a",
+        "2025010118/mpassit/006/MPAS-A_out.2025-01-02_00.00.00.nc": b"b",
+        "2025010118/mpassit/012/MPAS-A_out.2025-01-02_06.00.00.nc": b"c",
+    }
+    for name, data in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(data)
+    return path
+
+
+@fixture
+def hpss(monkeypatch, tmp_path):
+    root = tmp_path / "hpss"
+    root.mkdir()
+    (root / "calls").touch()
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    for name, script in (
+        ("hsi", HSI),
+        ("htar", HTAR),
+        ("nccopy", NCCOPY),
+        ("ncdump", NCDUMP),
+        ("ncks", NCKS),
+    ):
+        (bindir / name).write_text(script)
+        (bindir / name).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bindir}:{Path('/usr/bin')}:{Path('/bin')}")
+    monkeypatch.setenv("FAKE_HPSS", str(root))
+    return root
+
+
+@fixture
+def expt_config(expt_dir):
+    return {
+        "archiving": {"manifest_dir": str(expt_dir / "2025010118" / "archive"), "max_transfers": 2},
+        "forecast": {"mpas": {"length": 12}},
+        "user": {"experiment_dir": str(expt_dir), "hpss_archive_dir": "/arch"},
+    }
+
+
+def calls(hpss):
+    return (hpss / "calls").read_text().splitlines()
+
+
+@mark.usefixtures("hpss")
+def test_compress(cdl, tmp_path):
+    result = archive.compress(cdl, tmp_path / "out" / "f.nc", {"deflate_level": 2})
+    assert result is not None
+    assert result["compressed_size"] == (tmp_path / "out" / "f.nc").stat().st_size
+    assert result["ratio"] > 1
+    assert set(result) == {"compressed_size", "mb_per_s", "ratio", "seconds"}
+
+
+def test_compress_commands(cdl, hpss, tmp_path):
+    archive.compress(cdl, tmp_path / "a.nc", {"shuffle": False})
+    archive.compress(cdl, tmp_path / "b.nc", {"deflate_level": 5}, digits=3)
+    assert [c for c in calls(hpss) if " -v " not in c] == [
+        f"nccopy -k nc4 -d 1 {cdl} {tmp_path}/a.nc",
+        f"ncks -O -4 -L 5 --ppc default=3 {cdl} {tmp_path}/b.nc",
+    ]
+
+
+@mark.usefixtures("hpss")
+def test_compress_fails(caplog, cdl, monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_FAIL", "compress")
+    assert archive.compress(cdl, tmp_path / "out.nc", {}) is None
+    assert "Unknown file format" in caplog.text
+
+
+@mark.usefixtures("hpss")
+@mark.parametrize("corrupt", ["2.5/2.6", "1.23456/1.235", "x/y", "2.5,/"])
+def test_compress_mismatch(caplog, cdl, corrupt, monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_CORRUPT", corrupt)
+    assert archive.compress(cdl, tmp_path / "out.nc", {"verify_variables": 3}) is None
+    assert "differs from the original in" in caplog.text
+
+
+@mark.usefixtures("hpss")
+@mark.parametrize(("count", "sample"), [(1, ["t"]), (2, ["t", "i"]), (5, ["t", "i", "s"])])
+def test_verify(cdl, count, monkeypatch, sample):
+    values: list[str] = []
+
+    def sampled(_, name, hyperslab):
+        assert hyperslab == []
+        values.append(name)
+        return [name]
+
+    monkeypatch.setattr(archive, "_values", sampled)
+    assert archive.verify(cdl, cdl, count) == []
+    assert values == [name for name in sample for _ in range(2)]
+
+
+def test_verify_hyperslab(cdl, hpss, monkeypatch):
+    monkeypatch.setattr(archive, "_hyperslab", lambda *_: ["-d", "n,0,,2"])
+    assert archive.verify(cdl, cdl, 1) == []
+    assert [c.split()[:8] for c in calls(hpss)] == [
+        ["ncks", "-O", "-C", "-v", "t", "-d", "n,0,,2", str(cdl)]
+    ] * 2
+
+
+@mark.usefixtures("hpss")
+def test_verify_quantized(cdl, tmp_path):
+    quantized = tmp_path / "q.nc"
+    quantized.write_text(CDL.replace("1.23456", "1.235"))
+    assert archive.verify(cdl, quantized, 3) == ["t"]
+    assert archive.verify(cdl, quantized, 3, digits=3) == []
+    assert archive.verify(cdl, quantized, 3, digits=6) == ["t"]
+
+
+@mark.usefixtures("hpss")
+def test_verify_quantized_zero(cdl, tmp_path):
+    # Values near zero are compared against the magnitude of the variable.
+    cdl.write_text(CDL.replace("2.5", "0.000123"))
+    quantized = tmp_path / "q.nc"
+    quantized.write_text(CDL.replace("1.23456", "1.235").replace("2.5", "0"))
+    assert archive.verify(cdl, quantized, 3, digits=3) == []
+    assert archive.verify(cdl, quantized, 3, digits=6) == ["t"]
+
+
+def test__header(cdl, hpss):
+    assert archive._header(cdl) == ({"Time": 1, "n": 3}, {"t": ["n"], "i": ["n"], "s": []})
+    assert not calls(hpss)
+
+
+def test__hyperslab():
+    assert archive._hyperslab({"n": 3}, []) == []
+    assert archive._hyperslab({"n": 3}, ["n"]) == []
+    assert archive._hyperslab({"n": 10000}, ["n"]) == ["-d", "n,0,,10"]
+    assert archive._hyperslab({"Time": 1, "lat": 1000, "lon": 1500}, ["Time", "lat", "lon"]) == [
+        "-d",
+        "lat,0,,100",
+        "-d",
+        "lon,0,,150",
+    ]
+
+
+def test_cycle_units(expt_dir):
+    units = list(archive.cycle_units(expt_dir, "/arch", CYCLE, timedelta(hours=12)))
+    assert [(u.name, u.destination, u.bundle) for u in units] == [
+        ("init", "/arch/2025010118-mesh.init.nc", False),
+        ("upp", "/arch/2025010118-upp.tar", True),
+        ("mpassit-20250101", "/arch/2025010118-mpassit-20250101.tar", True),
+        ("mpassit-20250102", "/arch/2025010118-mpassit-20250102.tar", True),
+    ]
+    assert units[1].files == [
+        Path("2025010118/upp/000/WRFPRS.GrbF00"),
+        Path("2025010118/upp/000/itag"),
+        Path("2025010118/upp/000/postxconfig-NT.txt"),
+        Path("2025010118/upp/006/WRFPRS.GrbF06"),
+    ]
+    assert len(units[3].files) == 2
+
+
+def test_cycle_units_leadtime(expt_dir):
+    units = list(
+        archive.cycle_units(expt_dir, "/arch", CYCLE, timedelta(hours=12), timedelta(hours=6))
+    )
+    assert [(u.name, u.destination, u.files) for u in units] == [
+        (
+            "mpassit-f006",
+            "/arch/2025010118-mpassit-f006.tar",
+            [Path("2025010118/mpassit/006/MPAS-A_out.2025-01-02_00.00.00.nc")],
+        )
+    ]
+    assert not list(
+        archive.cycle_units(expt_dir, "/arch", CYCLE, timedelta(hours=12), timedelta(hours=18))
+    )
+
+
+def test_cycle_units_empty(tmp_path):
+    assert list(archive.cycle_units(tmp_path, "/arch", CYCLE, timedelta(hours=12))) == []
+
+
+def test_run_archive(expt_config, expt_dir, hpss):
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "mpassit", "upp"])
+    init = (expt_dir / "2025010118/forecast/mesh.init.nc").read_bytes()
+    md5 = hashlib.md5(init).hexdigest()  # noqa: S324
+    assert (hpss / "arch/2025010118-mesh.init.nc").read_bytes() == init
+    assert not (hpss / "arch/2025010118-mesh.init.nc.part").exists()
+    assert (hpss / "arch/2025010118-mesh.init.nc.md5").read_text() == (
+        f"{md5}  2025010118/forecast/mesh.init.nc\n"
+    )
+    with tarfile.open(hpss / "arch/2025010118-mpassit-20250102.tar") as tar:
+        assert tar.getnames() == [
+            "2025010118/mpassit/006/MPAS-A_out.2025-01-02_00.00.00.nc",
+            "2025010118/mpassit/012/MPAS-A_out.2025-01-02_06.00.00.nc",
+        ]
+    manifests = expt_dir / "2025010118/archive"
+    init_manifest = json.loads((manifests / "init.json").read_text())
+    assert init_manifest["files"]["2025010118/forecast/mesh.init.nc"]["md5"] == md5
+    assert init_manifest["files"]["2025010118/forecast/mesh.init.nc"]["size"] == 4000
+    upp_manifest = json.loads((manifests / "upp.json").read_text())
+    assert upp_manifest["destination"] == "/arch/2025010118-upp.tar"
+    assert upp_manifest["files"]["2025010118/upp/000/itag"]["md5"] == (
+        hashlib.md5(b"itag").hexdigest()  # noqa: S324
+    )
+
+
+def test_run_archive_skips_archived(expt_config, expt_dir, hpss):
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "upp"])
+    (hpss / "calls").write_text("")
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "upp"])
+    assert not [c for c in calls(hpss) if "put" in c or c.startswith("htar")]
+    (expt_dir / "2025010118/upp/006/WRFPRS.GrbF06").write_bytes(b"changed")
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "upp"])
+    assert [c for c in calls(hpss) if c.startswith("htar")] == [
+        "htar -chpvf /arch/2025010118-upp.tar 2025010118/upp/000/WRFPRS.GrbF00"
+        " 2025010118/upp/000/itag 2025010118/upp/000/postxconfig-NT.txt"
+        " 2025010118/upp/006/WRFPRS.GrbF06"
+    ]
+
+
+def test_run_archive_skips_without_reading(expt_config, hpss, monkeypatch):
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "upp"])
+    (hpss / "calls").write_text("")
+
+    def md5(path):
+        raise AssertionError(path)
+
+    monkeypatch.setattr(archive, "_md5", md5)
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "upp"])
+    assert not [c for c in calls(hpss) if "put" in c or c.startswith("htar")]
+
+
+def test_run_archive_content_changed(expt_config, expt_dir, hpss):
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["upp"])
+    (hpss / "calls").write_text("")
+    # Same size and modification time, different contents and so a new change time.
+    itag = expt_dir / "2025010118/upp/000/itag"
+    stat = itag.stat()
+    itag.write_bytes(b"ITAG")
+    os.utime(itag, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["upp"])
+    assert [c for c in calls(hpss) if c.startswith("htar")]
+    manifest = json.loads((expt_dir / "2025010118/archive/upp.json").read_text())
+    assert manifest["files"]["2025010118/upp/000/itag"]["md5"] == (
+        hashlib.md5(b"ITAG").hexdigest()  # noqa: S324
+    )
+
+
+def test_run_archive_missing_on_hpss(expt_config, hpss):
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init"])
+    (hpss / "arch/2025010118-mesh.init.nc").unlink()
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init"])
+    assert (hpss / "arch/2025010118-mesh.init.nc").is_file()
+
+
+@mark.usefixtures("hpss")
+@mark.parametrize(("fail", "unit"), [("hsi", "init"), ("htar", "upp")])
+def test_run_archive_failure(caplog, expt_config, fail, monkeypatch, unit):
+    monkeypatch.setenv("FAKE_FAIL", fail)
+    assert not archive.run_archive(expt_config, CYCLE, ["archiving"], [unit])
+    manifest_dir = Path(expt_config["archiving"]["manifest_dir"])
+    assert not (manifest_dir / f"{unit}.json").exists()
+    assert "failed" in caplog.text
+
+
+def test_run_archive_compressed(expt_config, expt_dir, hpss):
+    for path in (expt_dir / "2025010118").rglob("*.nc"):
+        path.write_text(CDL)
+    expt_config["archiving"]["compress"] = {"enabled": True, "history_significant_digits": 3}
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "mpassit"])
+    manifests = expt_dir / "2025010118/archive"
+    assert not list((manifests / "staged").rglob("*.nc"))
+    init = json.loads((manifests / "init.json").read_text())
+    entry = init["files"]["2025010118/forecast/mesh.init.nc"]
+    assert entry["size"] == len(CDL)
+    assert entry["compression"]["compressed_size"] < len(CDL)
+    assert (
+        entry["md5"]
+        == hashlib.md5(  # noqa: S324
+            (hpss / "arch/2025010118-mesh.init.nc").read_bytes()
+        ).hexdigest()
+    )
+    with tarfile.open(hpss / "arch/2025010118-mpassit-20250101.tar") as tar:
+        (member,) = tar.getmembers()
+        assert member.name == "2025010118/mpassit/000/MPAS-A_out.2025-01-01_18.00.00.nc"
+        data = tar.extractfile(member)
+        assert data is not None
+        assert b"1.235" in data.read()
+    tools = sorted(c.split()[0] for c in calls(hpss) if c.startswith("nc") and " -v " not in c)
+    assert tools == ["nccopy", "ncks", "ncks", "ncks"]
+
+
+@mark.usefixtures("hpss")
+def test_run_archive_compression_workers(expt_config, monkeypatch):
+    # Compression jobs are capped across units archived at once, not per unit.
+    expt_config["archiving"]["compress"] = {"enabled": True, "workers": 2}
+    running: list[int] = []
+    lock = threading.Lock()
+
+    def compress(_src, dst, *_):
+        with lock:
+            running.append(running[-1] + 1 if running else 1)
+        time.sleep(0.05)
+        with lock:
+            running.append(running[-1] - 1)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.touch()
+        return {"compressed_size": 1, "mb_per_s": 1.0, "ratio": 1.0, "seconds": 1.0}
+
+    monkeypatch.setattr(archive, "compress", compress)
+    expt_config["archiving"]["max_transfers"] = 3
+    assert archive.run_archive(expt_config, CYCLE, ["archiving"], ["init", "mpassit"])
+    assert max(running) == 2
+
+
+def test_run_archive_compression_fails(caplog, expt_config, expt_dir, hpss, monkeypatch):
+    expt_config["archiving"]["compress"] = {"enabled": True}
+    monkeypatch.setenv("FAKE_FAIL", "compress")
+    assert not archive.run_archive(expt_config, CYCLE, ["archiving"], ["mpassit"])
+    assert "mpassit-20250102: Compression failed" in caplog.text
+    assert not [c for c in calls(hpss) if c.startswith("htar")]
+    assert not list((expt_dir / "2025010118/archive/staged").rglob("*.nc"))
+
+
+def test_put_broken_pipe(expt_dir, hpss, tmp_path):
+    (tmp_path / "bin" / "hsi").write_text("#!/bin/bash\nexit 1\n")
+    archiver = archive.Archiver(expt_dir, "/arch", tmp_path / "manifests")
+    unit = archive.Unit(
+        kind="init",
+        name="init",
+        destination="/arch/init.nc",
+        files=[Path("2025010118/forecast/mesh.init.nc")],
+        bundle=False,
+    )
+    with patch.object(archive, "BUFSIZE", 1):
+        assert archiver.put(unit, expt_dir) == {}
+    assert not (hpss / "arch").exists()
+
+
+@mark.parametrize("ok", [True, False])
+def test_main(args, ok):
+    args.key_path = ["archiving"]
+    args.leadtime = None
+    with (
+        patch.object(archive, "parse_args", return_value=args) as parse_args,
+        patch.object(archive, "use_uwtools_logger"),
+        patch.object(archive, "get_yaml_config") as get_yaml_config,
+        patch.object(archive, "run_archive", return_value=ok) as run_archive,
+        patch.object(archive.sys, "exit") as sysexit,
+    ):
+        archive.main(["--unit", "init", "-c", "x"])
+    parse_args.assert_called_once_with(["-c", "x"])
+    run_archive.assert_called_once_with(
+        get_yaml_config.return_value, args.cycle, ["archiving"], ["init"], None
+    )
+    assert sysexit.called is not ok
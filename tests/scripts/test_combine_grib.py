@@ -0,0 +1,150 @@
+import os
+from unittest.mock import patch
+
+from pytest import fixture, mark, raises
+
+from scripts import combine_grib, staging
+
+HPA500 = (50000).to_bytes(4, "big")
+
+
+def message(fields=((2, 3, 100, 0, HPA500),), data=b"data", discipline=0, hours=6):
+    """
+    A minimal GRIB2 message with a product definition section for each field.
+    """
+
+    def section(number, body):
+        return (len(body) + 5).to_bytes(4, "big") + bytes([number]) + body
+
+    ident = bytes(7) + (2025).to_bytes(2, "big") + bytes([1, 1, 12, 0, 0, 0, 1])
+    body = section(1, ident) + section(3, b"grid")
+    for category, number, surface, scale, value in fields:
+        product = bytes(4) + bytes([category, number]) + bytes(6) + b"\x01"
+        product += hours.to_bytes(4, "big") + bytes([surface, scale]) + value + bytes(6)
+        body += section(4, product) + section(5, b"rep") + section(7, data)
+    length = 16 + len(body) + 4
+    return b"GRIB" + bytes([0, 0, discipline, 2]) + length.to_bytes(8, "big") + body + b"7777"
+
+
+@fixture
+def grib(tmp_path):
+    def write(name, *messages):
+        path = tmp_path / name
+        path.write_bytes(b"".join(messages))
+        return path
+
+    return write
+
+
+def level(value):
+    return value.to_bytes(4, "big")
+
+
+def test_combine(grib, tmp_path):
+    prs = message(fields=[(0, 0, 100, 0, level(50000))])
+    nat = message(fields=[(3, 5, 105, 0, level(1)), (0, 0, 105, 0, level(2))], discipline=0)
+    two = message(fields=[(1, 8, 1, 0xFF, b"\xff" * 4)], hours=30)
+    inputs = [grib("a", prs, prs), grib("b", nat), grib("c", two)]
+    output = tmp_path / "combined"
+    output.write_bytes(b"stale")
+    assert combine_grib.combine(inputs, output) == output
+    assert output.read_bytes() == prs + prs + nat + two
+    assert (tmp_path / "combined.idx").read_text().splitlines() == [
+        "1:0:d=2025010112:0.0.0:lev=100:50000:ft=6h:",
+        f"2:{len(prs)}:d=2025010112:0.0.0:lev=100:50000:ft=6h:",
+        f"3.1:{2 * len(prs)}:d=2025010112:0.3.5:lev=105:1:ft=6h:",
+        f"3.2:{2 * len(prs)}:d=2025010112:0.0.0:lev=105:2:ft=6h:",
+        f"4:{2 * len(prs) + len(nat)}:d=2025010112:0.1.8:lev=1:-:ft=30h:",
+    ]
+    assert not (tmp_path / ".combined.tmp").exists()
+    assert not (tmp_path / ".combined.idx.tmp").exists()
+
+
+def test_combine_not_grib(tmp_path):
+    path = tmp_path / "a"
+    path.write_bytes(b"not a grib file")
+    output = tmp_path / "combined"
+    with raises(ValueError, match=f"No GRIB2 message at byte 0 of {path}"):
+        combine_grib.combine([path], output)
+    assert not output.exists()
+
+
+def test_inventory_bad_end(grib):
+    path = grib("a", message()[:-4] + b"7778")
+    with raises(ValueError, match="Truncated GRIB2 message at byte 0"):
+        combine_grib.inventory(path)
+
+
+def test_inventory_bad_section(grib):
+    data = message()
+    path = grib("a", data[:16] + bytes(len(data) - 16))
+    with raises(ValueError, match="Truncated GRIB2 message at byte 0"):
+        combine_grib.inventory(path)
+
+
+def test_inventory_short_product(grib):
+    data = message()
+    # Replace the product definition section with one holding only the parameter.
+    start = data.index(b"\x00\x00\x00\x22\x04")
+    short = (11).to_bytes(4, "big") + b"\x04" + bytes(4) + b"\x02\x03"
+    data = data[:start] + short + data[start + 34 :]
+    data = data[:8] + len(data).to_bytes(8, "big") + data[16:]
+    assert combine_grib.inventory(grib("a", data)) == [(0, ["d=2025010112:0.2.3:lev=-:-:ft=-:"])]
+
+
+def test_inventory_units_and_signs(grib):
+    data = message(fields=[(2, 3, 103, 0x81, level(0x80000000 | 25))])
+    data = data.replace(b"\x01\x00\x00\x00\x06", b"\x0a\x00\x00\x00\x06")
+    assert combine_grib.inventory(grib("a", data)) == [
+        (0, ["d=2025010112:0.2.3:lev=103:-250:ft=6u10:"])
+    ]
+
+
+def test_main(grib, tmp_path):
+    inputs = [grib("a", message()), grib("b", message())]
+    combine_grib.main(["-o", str(tmp_path / "out"), *map(str, inputs)])
+    assert (tmp_path / "out").read_bytes() == message() * 2
+    assert len((tmp_path / "out.idx").read_text().splitlines()) == 2
+
+
+def unsupported(*_):
+    raise OSError
+
+
+def short(src, dst, _count, offset, position):
+    # A short copy, as when the source is on another filesystem.
+    return os.pwrite(dst, os.pread(src, 10, offset), position)
+
+
+@mark.parametrize("copy_file_range", [unsupported, short, lambda *_: 0])
+def test__copy(copy_file_range, tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.write_bytes(bytes(range(100)))
+    calls: list[int] = []
+
+    def copy(*args):
+        calls.append(args[2])
+        return copy_file_range(*args) if len(calls) == 1 else 0
+
+    with (
+        patch.object(staging.os, "copy_file_range", side_effect=copy),
+        src.open("rb") as s,
+        dst.open("wb") as d,
+    ):
+        d.write(b"head")
+        combine_grib._copy(s, d)
+        d.write(b"tail")
+    assert dst.read_bytes() == b"head" + bytes(range(100)) + b"tail"
+    assert calls[0] == 100
+
+
+def test__copy_short_output(tmp_path):
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.write_bytes(b"x" * 100)
+    with (
+        patch.object(combine_grib, "copy_range"),
+        src.open("rb") as s,
+        dst.open("wb") as d,
+        raises(OSError, match="Copied 0 of 100 bytes"),
+    ):
+        combine_grib._copy(s, d)
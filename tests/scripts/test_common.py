@@ -3,6 +3,7 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 from pytest import fixture, mark, raises
+from uwtools.api.config import get_yaml_config
 
 from scripts import common
 
@@ -39,6 +40,38 @@ def test_parse_args():
     assert args.cycle == datetime(2025, 1, 1, 0, 0, tzinfo=timezone.utc)
     assert args.leadtime == timedelta(seconds=21600)
     assert args.key_path == ["forecast", "model"]
+    assert args.member is None
+
+
+def test_parse_args_member():
+    argv = ["-c", "config.yaml", "--cycle", "2025-01-01T00:00:00", "--key-path", "forecast"]
+    argv += ["--member", "002"]
+    assert common.parse_args(argv).member == 2
+
+
+def test_member_config(tmp_path):
+    path = tmp_path / "config.yaml"
+    get_yaml_config({"user": {"ensemble": {"member": 0, "members": 3}}}).dump(path)
+    assert common.member_config(path, None)["user"]["ensemble"]["member"] == 0
+    config = common.member_config(path, 2)
+    assert config["user"]["ensemble"] == {"member": 2, "members": 3}
+    assert common.member_config(config, 3) is config
+    assert config["user"]["ensemble"]["member"] == 3
+
+
+def test_parse_args_leadtimes():
+    argv = [
+        "-c",
+        "config.yaml",
+        "--cycle",
+        "2025-01-01T00:00:00",
+        "--leadtimes",
+        "0,6,12",
+        "--key-path",
+        "post",
+    ]
+    args = common.parse_args(argv, leads=True)
+    assert args.leadtimes == [timedelta(hours=h) for h in (0, 6, 12)]
 
 
 def test_parse_args_invalid_cycle():
@@ -102,3 +135,104 @@ def test_run_component_failure(caplog, test_driver, args):
         )
     assert "Error occurred. Expected file /some/rundir/file not found." in caplog.text
     sysexit.assert_called_once_with(1)
+
+
+def test_run_component_member(test_driver, args):
+    with (
+        patch.object(test_driver, "run", return_value=Mock(ready=True)),
+        patch("scripts.common.use_uwtools_logger"),
+        patch.object(common, "member_config", return_value={}) as member_config,
+    ):
+        common.run_component(
+            driver_class=test_driver,
+            config_file=args.config_file,
+            cycle=args.cycle,
+            key_path=args.key_path,
+            member=2,
+        )
+    member_config.assert_called_once_with(args.config_file, 2)
+
+
+def test_run_component_staging(test_driver, args):
+    with (
+        patch.object(test_driver, "run", return_value=Mock(ready=True)),
+        patch("scripts.common.use_uwtools_logger"),
+        patch.object(common, "stage") as stage,
+    ):
+        common.run_component(
+            driver_class=test_driver,
+            config_file=args.config_file,
+            cycle=args.cycle,
+            key_path=args.key_path,
+            staging={"min_size_mb": 1},
+        )
+    stage.assert_called_once_with({}, Path("/some/rundir"), {"min_size_mb": 1})
+
+
+@fixture
+def scratch_driver(tmp_path):
+    class Driver:
+        def __init__(self, config, cycle, key_path, leadtime=None):
+            if isinstance(config, Path):
+                config = get_yaml_config(config)
+            self.config = config["forecast"]["mpas"]
+            self.cycle = cycle
+            self.key_path = key_path
+            self.leadtime = leadtime
+
+        @classmethod
+        def driver_name(cls):
+            return "mpas"
+
+        def run(self):
+            rundir = Path(self.config["rundir"])
+            rundir.mkdir(parents=True, exist_ok=True)
+            (rundir / "history.nc").write_text("data")
+            return Mock(ready=True)
+
+    config = {"forecast": {"mpas": {"rundir": str(tmp_path / "rundir")}}}
+    return Driver, config
+
+
+@mark.parametrize("nodes", ["1", "2"])
+def test_run_component_scratch(caplog, monkeypatch, nodes, scratch_driver, tmp_path):
+    caplog.set_level("INFO")
+    monkeypatch.setenv("SLURM_JOB_NUM_NODES", nodes)
+    driver_class, config = scratch_driver
+    (tmp_path / "scratch").mkdir()
+    scratch = {
+        "components": ["Driver"],
+        "dir": str(tmp_path / "scratch"),
+        "outputs": {"Driver": ["*.nc"]},
+    }
+    with patch("scripts.common.use_uwtools_logger"):
+        driver = common.run_component(
+            driver_class=driver_class,
+            config_file=config,
+            cycle=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            key_path=["forecast"],
+            scratch=scratch,
+        )
+    assert driver.config["rundir"] == str(tmp_path / "rundir")
+    assert config["forecast"]["mpas"]["rundir"] == str(tmp_path / "rundir")
+    assert (tmp_path / "rundir" / "history.nc").read_text() == "data"
+    assert not list((tmp_path / "scratch").iterdir())
+    assert "Driver timings: setup" in caplog.text
+    assert ("Copied" in caplog.text) is (nodes == "1")
+
+
+def test_run_component_scratch_from_file(scratch_driver, tmp_path):
+    driver_class, config = scratch_driver
+    config_file = tmp_path / "config.yaml"
+    get_yaml_config(config).dump(config_file)
+    scratch = {"components": ["Driver"], "dir": str(tmp_path), "outputs": {"Driver": ["*.nc"]}}
+    with patch("scripts.common.use_uwtools_logger"):
+        common.run_component(
+            driver_class=driver_class,
+            config_file=config_file,
+            cycle=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            key_path=["forecast"],
+            scratch=scratch,
+        )
+    assert (tmp_path / "rundir" / "history.nc").is_file()
+    assert get_yaml_config(config_file)["forecast"]["mpas"]["rundir"] == str(tmp_path / "rundir")
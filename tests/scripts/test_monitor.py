@@ -0,0 +1,168 @@
+import json
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from unittest.mock import patch
+
+from pytest import fixture, mark
+
+from scripts import monitor
+
+CYCLE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@fixture
+def block(tmp_path):
+    return {
+        "mpas": {
+            "execution": {"batchargs": {"walltime": "01:00:00"}},
+            "length": 6,
+            "rundir": str(tmp_path),
+            "streams": {
+                "output": {
+                    "filename_template": "history.$Y-$M-$D_$h.$m.$s.nc",
+                    "output_interval": "03:00:00",
+                },
+                "diagnostics": {
+                    "filename_template": "diag.$Y-$M-$D_$h.$m.$s.nc",
+                    "output_interval": "06:00:00",
+                },
+            },
+        },
+        "monitor": {"abort_command": "false", "interval": 0.01},
+    }
+
+
+@fixture
+def fm(block):
+    with patch.object(monitor, "_now", return_value=CYCLE):
+        return monitor.ForecastMonitor(block, CYCLE)
+
+
+def log(rundir, *times, partial=None):
+    with (rundir / monitor.LOGFILE).open("a") as f:
+        for time in times:
+            f.write(f" Begin timestep {time}\n Timing for integration step: 0.5 s\n")
+        if partial:
+            f.write(partial)
+
+
+def update(fm, minutes, **kwargs):
+    with patch.object(monitor, "_now", return_value=CYCLE + timedelta(minutes=minutes)):
+        return fm.update(**kwargs)
+
+
+def test_forecast_monitor(fm, tmp_path):
+    assert fm.rundir == tmp_path
+    assert fm.length == timedelta(hours=6)
+    assert fm.deadline == CYCLE + timedelta(hours=1)
+    assert len(fm.expected) == 5
+    assert fm.status_file == tmp_path / "forecast_status.json"
+
+
+def test_forecast_monitor_read_log(fm, tmp_path):
+    assert fm.read_log() is None
+    log(tmp_path, "2025-01-01_00:00:20", partial=" Begin timestep 2025-01-01_00:00")
+    assert fm.read_log() == CYCLE + timedelta(seconds=20)
+    log(tmp_path, partial=":40\n")
+    assert fm.read_log() == CYCLE + timedelta(seconds=40)
+
+
+def test_forecast_monitor_run(fm):
+    stop = Event()
+    with patch.object(fm, "update", side_effect=lambda: stop.set()) as update:
+        fm.run(stop)
+    update.assert_called_once_with()
+
+
+def test_forecast_monitor_update_complete(fm, tmp_path):
+    for _, name in fm.expected:
+        (tmp_path / name).write_text("data")
+    log(tmp_path, "2025-01-01_00:00:00")
+    update(fm, 1)
+    log(tmp_path, "2025-01-01_06:00:00")
+    status = update(fm, 10, final=True)
+    assert status["state"] == "complete"
+    assert status["outputs_present"] == 5
+    assert status["percent_complete"] == 100.0
+    assert json.loads(fm.status_file.read_text()) == status
+
+
+def test_forecast_monitor_update_running(fm, tmp_path):
+    (tmp_path / "history.2025-01-01_00.00.00.nc").write_text("data")
+    (tmp_path / "diag.2025-01-01_00.00.00.nc").touch()
+    assert update(fm, 0)["state"] == "waiting"
+    log(tmp_path, "2025-01-01_00:00:00")
+    status = update(fm, 1)
+    assert status["state"] == "running"
+    assert "projected_end" not in status
+    log(tmp_path, "2025-01-01_01:00:00")
+    status = update(fm, 6)
+    assert status["state"] == "running"
+    assert status["outputs_present"] == 1
+    assert status["throughput"] == 12.0
+    assert status["projected_end"] == (CYCLE + timedelta(minutes=31)).isoformat()
+    assert update(fm, 7, final=True)["state"] == "stopped"
+
+
+@mark.parametrize("abort_if_late", [True, False])
+def test_forecast_monitor_update_late(abort_if_late, fm, tmp_path):
+    fm.config["abort_if_late"] = abort_if_late
+    log(tmp_path, "2025-01-01_00:00:00")
+    update(fm, 0.5)
+    log(tmp_path, "2025-01-01_00:10:00")
+    with patch.object(monitor, "check_output") as check_output:
+        # Too early to trust the rate: no abort yet.
+        assert update(fm, 10.5)["state"] == "late"
+        check_output.assert_not_called()
+        log(tmp_path, "2025-01-01_01:00:00")
+        status = update(fm, 30.5)
+        update(fm, 31)
+    if abort_if_late:
+        assert status["state"] == "aborted"
+        check_output.assert_called_once()
+    else:
+        assert status["state"] == "late"
+        check_output.assert_not_called()
+
+
+def test_forecast_monitor_update_late_abort_fails(caplog, fm, tmp_path):
+    fm.config.update(abort_if_late=True, min_progress=0)
+    log(tmp_path, "2025-01-01_00:00:00")
+    update(fm, 1)
+    log(tmp_path, "2025-01-01_00:10:00")
+    assert update(fm, 11)["state"] == "aborted"
+    assert "Abort command failed with status: 1" in caplog.text
+
+
+def test_forecast_monitor_abort_not_late_without_model_time(fm):
+    fm.config["abort_if_late"] = True
+    with patch.object(monitor, "check_output") as check_output:
+        fm._abort_if_hopeless(None)
+    check_output.assert_not_called()
+
+
+def test_monitoring(block):
+    with patch.object(monitor, "_now", return_value=CYCLE), monitor.monitoring(block, CYCLE) as fm:
+        assert fm is not None
+    assert json.loads(fm.status_file.read_text())["state"] == "stopped"
+
+
+def test_monitoring_disabled(block, tmp_path):
+    del block["monitor"]
+    with monitor.monitoring(block, CYCLE) as fm:
+        assert fm is None
+    assert not (tmp_path / "forecast_status.json").exists()
+
+
+def test_monitoring_missing_rundir(block, tmp_path):
+    block["mpas"]["rundir"] = str(tmp_path / "forecast")
+    block["monitor"]["interval"] = 60
+    with monitor.monitoring(block, CYCLE) as fm:
+        pass
+    assert fm is not None
+    assert json.loads(fm.status_file.read_text())["outputs_present"] == 0
+
+
+def test_walltime():
+    assert monitor.walltime("1:10:00") == timedelta(hours=1, minutes=10)
+    assert monitor.walltime("30:00") == timedelta(minutes=30)
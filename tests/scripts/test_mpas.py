@@ -1,19 +1,323 @@
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import patch
 
+from pytest import fixture, mark, raises
+from uwtools.api.config import get_yaml_config
+
 from scripts import mpas
 
+CYCLE = datetime(2025, 1, 1, 0, tzinfo=timezone.utc)
+
+
+@fixture
+def forecast(tmp_path):
+    return {
+        "forecast": {
+            "mpas": {
+                "execution": {"batchargs": {"walltime": "06:00:00"}},
+                "length": 60,
+                "namelist": {"update_values": {"nhyd_model": {"config_dt": 20.0}}},
+                "rundir": str(tmp_path),
+                "streams": {
+                    "output": {
+                        "filename_template": "history.$Y-$M-$D_$h.nc",
+                        "output_interval": "24:00:00",
+                        "type": "output",
+                    },
+                    "restart": {
+                        "filename_template": "restart.$Y-$M-$D_$h.nc",
+                        "output_interval": "1_00:00:00",
+                        "type": "input;output",
+                    },
+                },
+            },
+            "segments": {"length": 24, "walltime": "01:00:00"},
+        },
+        "staging": {"min_size_mb": 1},
+    }
+
 
 def test_main(args):
+    config = get_yaml_config({"forecast": {"mpas": {}}})
     with (
         patch.object(mpas, "parse_args", return_value=args) as parse_args,
+        patch.object(mpas, "member_config", return_value=config),
+        patch.object(mpas, "monitoring") as monitoring,
+        patch.object(mpas, "watching") as watching,
         patch.object(mpas, "run_component", return_value=Path("/some/rundir")) as run_component,
     ):
-        mpas.main()
+        mpas.main([])
         parse_args.assert_called_once()
+        monitoring.assert_called_once_with({"mpas": {}}, args.cycle)
+        watching.assert_called_once_with({"mpas": {}}, args.cycle)
         run_component.assert_called_once_with(
             driver_class=mpas.MPAS,
             config_file=args.config_file,
             cycle=args.cycle,
             key_path=args.key_path,
+            staging=None,
+            scratch=None,
+            member=None,
         )
+
+
+def test_main_members(args):
+    with (
+        patch.object(mpas, "parse_args", return_value=args),
+        patch.object(mpas, "run_members") as run_members,
+    ):
+        mpas.main(["--members", "1,2,3"])
+    run_members.assert_called_once_with(args.config_file, args.cycle, args.key_path, [1, 2, 3])
+
+
+@mark.parametrize("argv", [["--segment", "1"], ["--check"], ["--readiness"]])
+def test_main_segments(args, argv, forecast):
+    config = get_yaml_config(forecast)
+    with (
+        patch.object(mpas, "parse_args", return_value=args) as parse_args,
+        patch.object(mpas, "member_config", return_value=config),
+        patch.object(mpas, "run_segment") as run_segment,
+        patch.object(mpas, "check_forecast") as check_forecast,
+        patch.object(mpas, "scan") as scan,
+        patch.object(mpas, "run_component") as run_component,
+    ):
+        mpas.main([*argv, "-c", "/some/config.yaml"])
+    parse_args.assert_called_once_with(["-c", "/some/config.yaml"])
+    run_component.assert_not_called()
+    called = {"--check": check_forecast, "--readiness": scan, "--segment": run_segment}
+    for flag, mock in called.items():
+        assert mock.called is (flag == argv[0])
+    if argv[0] == "--check":
+        check_forecast.assert_called_once_with(config["forecast"], args.cycle)
+    elif argv[0] == "--readiness":
+        scan.assert_called_once_with(config["forecast"], args.cycle)
+    else:
+        run_segment.assert_called_once_with(config, args.cycle, args.key_path, 1)
+
+
+def test_run_members(args, caplog):
+    caplog.set_level("INFO")
+    with patch.object(mpas, "run_forecast") as run_forecast:
+        mpas.run_members(args.config_file, args.cycle, args.key_path, [1, 2])
+    assert sorted(c.args[3:] for c in run_forecast.call_args_list) == [(1, 0), (2, 1)]
+    assert "Running the forecasts of members 1 2" in caplog.text
+
+
+def test_run_forecast_placed(args, forecast):
+    forecast["forecast"]["mpas"]["execution"].update(
+        {"batchargs": {"cores": 80, "tasks_per_node": 40}, "mpiargs": ["--ntasks=80"]}
+    )
+    forecast["forecast"]["monitor"] = {"abort_command": "scancel $SLURM_JOB_ID"}
+    config = get_yaml_config(forecast)
+    with (
+        patch.object(mpas, "member_config", return_value=config),
+        patch.object(mpas, "monitoring"),
+        patch.object(mpas, "watching"),
+        patch.object(mpas, "run_component") as run_component,
+    ):
+        mpas.run_forecast(args.config_file, args.cycle, args.key_path, 3, slot=2)
+    assert run_component.call_args.kwargs["config_file"] is config
+    assert config["forecast"]["mpas"]["execution"]["mpiargs"] == [
+        "--ntasks=80",
+        "--nodes=2",
+        "--relative=4",
+        "--exact",
+        "--job-name=mpas_mem003",
+    ]
+    assert config["forecast"]["monitor"]["abort_command"] == (
+        "scancel $(squeue -h -s -j $SLURM_JOB_ID -o '%i %j'"
+        """ | awk '$2 == "mpas_mem003" {print $1}')"""
+    )
+
+
+def test_name_step(forecast):
+    config = get_yaml_config(forecast)
+    mpas.name_step(config, ["forecast"], "mpas_mem001")
+    assert config["forecast"]["mpas"]["execution"]["mpiargs"] == ["--job-name=mpas_mem001"]
+    assert "monitor" not in config["forecast"]
+
+
+@mark.parametrize(
+    ("batchargs", "platform", "expected"),
+    [
+        ({"cores": 800, "nodes": 3}, {}, 3),
+        ({"cores": 810, "tasks_per_node": 40}, {"cores_per_node": 80}, 21),
+        ({"cores": 800}, {"cores_per_node": 192}, 5),
+        ({"cores": 800}, {}, None),
+    ],
+)
+def test_member_nodes(batchargs, expected, forecast, platform):
+    forecast["forecast"]["mpas"]["execution"]["batchargs"] = batchargs
+    config = get_yaml_config({**forecast, "platform": platform})
+    assert mpas.member_nodes(config, ["forecast"]) == expected
+
+
+@mark.parametrize("slot", [0, 1, 2])
+def test_place_member(forecast, slot):
+    forecast["forecast"]["mpas"]["execution"]["batchargs"] = {"cores": 800, "nodes": 20}
+    config = get_yaml_config({**forecast, "platform": {}})
+    assert mpas.place_member(config, ["forecast"], slot)
+    assert config["forecast"]["mpas"]["execution"]["mpiargs"] == [
+        "--nodes=20",
+        f"--relative={slot * 20}",
+        "--exact",
+    ]
+
+
+def test_place_member_unknown_layout(caplog, forecast):
+    forecast["forecast"]["mpas"]["execution"]["batchargs"] = {"cores": 800}
+    config = get_yaml_config({**forecast, "platform": {}})
+    assert not mpas.place_member(config, ["forecast"], 1)
+    assert "mpiargs" not in config["forecast"]["mpas"]["execution"]
+    assert "Cannot place packed forecasts on their own nodes" in caplog.text
+
+
+def test_run_members_failed(args, caplog):
+    def run_forecast(*_args):
+        if _args[3] == 2:
+            raise RuntimeError
+
+    with patch.object(mpas, "run_forecast", side_effect=run_forecast), raises(SystemExit):
+        mpas.run_members(args.config_file, args.cycle, args.key_path, [1, 2, 3])
+    assert "Forecasts failed for members 2" in caplog.text
+
+
+def test_check_forecast(caplog, forecast, tmp_path):
+    caplog.set_level("INFO")
+    for day in ("01", "02", "03"):
+        (tmp_path / f"history.2025-01-{day}_00.nc").touch()
+    found = mpas.check_forecast(forecast["forecast"], CYCLE)
+    assert [path.name for path in found] == [
+        "history.2025-01-01_00.nc",
+        "history.2025-01-02_00.nc",
+        "history.2025-01-03_00.nc",
+    ]
+    assert "Found all 3 forecast output files" in caplog.text
+
+
+def test_check_forecast_missing(caplog, forecast, tmp_path):
+    (tmp_path / "history.2025-01-01_00.nc").touch()
+    with raises(SystemExit):
+        mpas.check_forecast(forecast["forecast"], CYCLE)
+    assert "history.2025-01-02_00.nc history.2025-01-03_00.nc" in caplog.text
+
+
+def test_check_forecast_scrubbed(caplog, forecast, tmp_path):
+    caplog.set_level("INFO")
+    block = {**forecast["forecast"], "readiness": {"sentinel_dir": "ready", "streams": ["output"]}}
+    (tmp_path / "ready").mkdir()
+    for lead, day in (("000", "01"), ("024", "02")):
+        (tmp_path / "ready" / lead).write_text(f"history.2025-01-{day}_00.nc 100\n")
+    (tmp_path / "history.2025-01-03_00.nc").touch()
+    assert len(mpas.check_forecast(block, CYCLE)) == 3
+    assert "Found all 3 forecast output files" in caplog.text
+    assert "2 of them already marked ready and removed" in caplog.text
+    (tmp_path / "ready" / "024").unlink()
+    with raises(SystemExit):
+        mpas.check_forecast(block, CYCLE)
+    assert "Missing forecast output in %s: history.2025-01-02_00.nc" % tmp_path in caplog.text
+
+
+@mark.parametrize(
+    ("length", "segment_length", "expected"),
+    [
+        (60, 24, [(0, 24), (24, 24), (48, 12)]),
+        (48, 24, [(0, 24), (24, 24)]),
+        (6, 24, [(0, 6)]),
+        (3, 0, [(0, 1), (1, 1), (2, 1)]),
+        (0, 24, [(0, 0)]),
+    ],
+)
+def test_forecast_segments(expected, length, segment_length):
+    assert mpas.forecast_segments(length, segment_length) == expected
+
+
+def test_run_segment_namelist(forecast, tmp_path):
+    config = get_yaml_config(forecast)
+
+    def run_component(config_file, cycle, **_):
+        # Like the driver, write the namelist and runscript only where they are missing.
+        mpas_config = config_file["forecast"]["mpas"]
+        restart = mpas_config["namelist"]["update_values"].get("restart", {})
+        namelist = tmp_path / "namelist.atmosphere"
+        if not namelist.is_file():
+            namelist.write_text(
+                f"config_start_time = {cycle:%Y-%m-%d_%H:%M:%S}\n"
+                f"config_run_duration = {mpas_config['length']}:00:00\n"
+                f"config_do_restart = {restart.get('config_do_restart', False)}\n"
+            )
+        for name in ("runscript.mpas", "runscript.mpas.done"):
+            (tmp_path / name).touch()
+        (tmp_path / "restart.2025-01-02_00.nc").touch()
+
+    with (
+        patch.object(mpas, "monitoring"),
+        patch.object(mpas, "watching"),
+        patch.object(mpas, "run_component", side_effect=run_component),
+    ):
+        mpas.run_segment(config, CYCLE, ["forecast"], 0)
+        mpas.run_segment(config, CYCLE, ["forecast"], 1)
+    assert (tmp_path / "namelist.atmosphere").read_text() == (
+        "config_start_time = 2025-01-02_00:00:00\n"
+        "config_run_duration = 24:00:00\n"
+        "config_do_restart = True\n"
+    )
+
+
+@mark.parametrize(("segment", "restart"), [(0, False), (2, True)])
+def test_run_segment(forecast, restart, segment, tmp_path):
+    config = get_yaml_config(forecast)
+    start = CYCLE + timedelta(hours=24 * segment)
+    for name in ("namelist.atmosphere", "streams.atmosphere", "runscript.mpas.done"):
+        (tmp_path / name).touch()
+    if restart:
+        (tmp_path / "restart.2025-01-03_00.nc").touch()
+    with (
+        patch.object(mpas, "monitoring") as monitoring,
+        patch.object(mpas, "watching") as watching,
+        patch.object(mpas, "run_component") as run_component,
+    ):
+        mpas.run_segment(config, CYCLE, ["forecast"], segment)
+    run_component.assert_called_once()
+    kwargs = run_component.call_args.kwargs
+    assert kwargs["cycle"] == start
+    assert kwargs["staging"] == {"min_size_mb": 1}
+    assert "scratch" not in kwargs
+    segment_mpas = kwargs["config_file"]["forecast"]["mpas"]
+    assert segment_mpas["length"] == (12 if restart else 24)
+    assert segment_mpas["execution"]["batchargs"]["walltime"] == "01:00:00"
+    assert segment_mpas["streams"]["restart"]["output_interval"] == "1_00:00:00"
+    assert ("restart" in segment_mpas["namelist"]["update_values"]) == restart
+    assert config["forecast"]["mpas"]["length"] == 60
+    monitoring.assert_called_once_with(kwargs["config_file"]["forecast"], start)
+    watching.assert_called_once_with(config["forecast"], CYCLE, (49, 60) if restart else (0, 24))
+    for name in ("namelist.atmosphere", "streams.atmosphere", "runscript.mpas.done"):
+        assert not (tmp_path / name).exists()
+
+
+def test_run_segment_hourly_restarts(forecast):
+    forecast["forecast"]["segments"]["length"] = 12
+    with (
+        patch.object(mpas, "monitoring"),
+        patch.object(mpas, "watching"),
+        patch.object(mpas, "run_component") as run_component,
+    ):
+        mpas.run_segment(get_yaml_config(forecast), CYCLE, ["forecast"], 0)
+    segment_mpas = run_component.call_args.kwargs["config_file"]["forecast"]["mpas"]
+    assert segment_mpas["streams"]["restart"]["output_interval"] == "12:00:00"
+
+
+def test_run_segment_no_restart(caplog, forecast):
+    with patch.object(mpas, "run_component") as run_component, raises(SystemExit):
+        mpas.run_segment(get_yaml_config(forecast), CYCLE, ["forecast"], 1)
+    run_component.assert_not_called()
+    assert "Cannot run segment 1 without" in caplog.text
+
+
+@mark.parametrize("segment", [-1, 3])
+def test_run_segment_out_of_range(caplog, forecast, segment):
+    with patch.object(mpas, "run_component") as run_component, raises(SystemExit):
+        mpas.run_segment(get_yaml_config(forecast), CYCLE, ["forecast"], segment)
+    run_component.assert_not_called()
+    assert f"Segment {segment} is not one of the 3 forecast segments" in caplog.text
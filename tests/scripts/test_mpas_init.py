@@ -1,6 +1,7 @@
+from datetime import datetime, timedelta, timezone
 from unittest.mock import call, patch
 
-from pytest import mark
+from pytest import fixture, mark, raises
 from uwtools.api.config import get_yaml_config
 from uwtools.api.driver import Driver
 
@@ -24,13 +25,16 @@ def test_main(args, model, tmp_path):
         ) as run_component,
         patch.object(mpas_init, "variables_from_fix") as variables_from_fix,
     ):
-        mpas_init.main()
+        mpas_init.main([])
         parse_args.assert_called_once()
         run_component.assert_called_once_with(
             driver_class=mpas_init.MPASInit,
             config_file=args.config_file,
             cycle=args.cycle,
             key_path=args.key_path,
+            staging=None,
+            scratch=None,
+            member=None,
         )
         if model == "RAP":
             variables_from_fix.assert_not_called()
@@ -59,3 +63,112 @@ def test_variables_from_fix():
     with patch.object(mpas_init, "run_shell_cmd") as run_shell_cmd:
         mpas_init.variables_from_fix(test_config, config)
         run_shell_cmd.assert_has_calls(expected_calls)
+
+
+CYCLE = datetime(2025, 1, 1, 0, tzinfo=timezone.utc)
+
+
+@fixture
+def lbcs_block(tmp_path):
+    return {
+        "mpas_init": {
+            "boundary_conditions": {"interval_hours": 6, "length": 24, "offset": 0},
+            "rundir": str(tmp_path / "mpas_lbcs"),
+            "streams": {"lbc": {"filename_template": "lbc.$Y-$M-$D_$h.$m.$s.nc"}},
+        },
+        "segments": 3,
+    }
+
+
+@mark.parametrize(
+    ("length", "interval", "count", "expected"),
+    [
+        (24, 6, 1, [(0, 24)]),
+        (24, 6, 2, [(0, 12), (12, 12)]),
+        (24, 6, 3, [(0, 6), (6, 6), (12, 12)]),
+        (24, 6, 10, [(0, 6), (6, 6), (12, 6), (18, 6)]),
+        (6, 6, 0, [(0, 6)]),
+        (0, 6, 4, [(0, 0)]),
+    ],
+)
+def test_lbc_segments(count, expected, interval, length):
+    assert mpas_init.lbc_segments(length, interval, count) == expected
+
+
+def test_gather_lbcs(caplog, lbcs_block, tmp_path):
+    caplog.set_level("INFO")
+    rundir = tmp_path / "mpas_lbcs"
+    files = {
+        0: ["lbc.2025-01-01_00.00.00.nc", "lbc.2025-01-01_06.00.00.nc"],
+        1: ["lbc.2025-01-01_06.00.00.nc", "lbc.2025-01-01_12.00.00.nc"],
+        2: ["lbc.2025-01-01_12.00.00.nc", "lbc.2025-01-01_18.00.00.nc"],
+    }
+    files[2].append("lbc.2025-01-02_00.00.00.nc")
+    for segment, names in files.items():
+        segdir = mpas_init.segment_rundir(rundir, segment)
+        segdir.mkdir(parents=True)
+        for name in names:
+            (segdir / name).write_text(str(segment))
+    gathered = mpas_init.gather_lbcs(lbcs_block, CYCLE)
+    assert [p.name for p in gathered] == [
+        f"lbc.2025-01-{d}.00.00.nc" for d in ("01_00", "01_06", "01_12", "01_18", "02_00")
+    ]
+    assert (rundir / "lbc.2025-01-01_06.00.00.nc").read_text() == "1"
+    assert not list(rundir.glob("segment_*/lbc.*"))
+    assert "Gathered 5 LBC files from 3 segments" in caplog.text
+
+
+def test_gather_lbcs_missing(caplog, lbcs_block, tmp_path):
+    (tmp_path / "mpas_lbcs").mkdir()
+    (tmp_path / "mpas_lbcs" / "lbc.2025-01-01_00.00.00.nc").touch()
+    with raises(SystemExit):
+        mpas_init.gather_lbcs(lbcs_block, CYCLE)
+    assert "lbc.2025-01-01_06.00.00.nc lbc.2025-01-01_12.00.00.nc" in caplog.text
+
+
+def test_run_segment(lbcs_block, tmp_path):
+    expt_config = {"create_lbcs": lbcs_block, "staging": {"min_size_mb": 1}}
+    with patch.object(mpas_init, "run_component") as run_component:
+        mpas_init.run_segment(expt_config, CYCLE, ["create_lbcs"], 2)
+    run_component.assert_called_once_with(
+        driver_class=mpas_init.MPASInit,
+        config_file=expt_config,
+        cycle=CYCLE + timedelta(hours=12),
+        key_path=["create_lbcs"],
+        staging={"min_size_mb": 1},
+        scratch=None,
+    )
+    assert lbcs_block["mpas_init"]["boundary_conditions"]["length"] == 12
+    assert lbcs_block["mpas_init"]["rundir"] == str(tmp_path / "mpas_lbcs" / "segment_02")
+
+
+@mark.parametrize("segment", [-1, 3])
+def test_run_segment_out_of_range(caplog, lbcs_block, segment):
+    with patch.object(mpas_init, "run_component") as run_component, raises(SystemExit):
+        mpas_init.run_segment({"create_lbcs": lbcs_block}, CYCLE, ["create_lbcs"], segment)
+    run_component.assert_not_called()
+    assert f"Segment {segment} is not one of the 3 LBC segments" in caplog.text
+
+
+@mark.parametrize("argv", [["--segment", "1"], ["--gather"]])
+def test_main_split(args, argv, lbcs_block, tmp_path):
+    yaml_file = tmp_path / "config.yaml"
+    get_yaml_config({"create_lbcs": lbcs_block}).dump(yaml_file)
+    args.config_file = yaml_file
+    args.key_path = ["create_lbcs"]
+    with (
+        patch.object(mpas_init, "parse_args", return_value=args) as parse_args,
+        patch.object(mpas_init, "run_segment") as run_segment,
+        patch.object(mpas_init, "gather_lbcs") as gather_lbcs,
+        patch.object(mpas_init, "run_component") as run_component,
+    ):
+        mpas_init.main([*argv, "-c", str(yaml_file)])
+    parse_args.assert_called_once_with(["-c", str(yaml_file)])
+    run_component.assert_not_called()
+    if argv[0] == "--gather":
+        gather_lbcs.assert_called_once_with(lbcs_block, args.cycle)
+        run_segment.assert_not_called()
+    else:
+        run_segment.assert_called_once()
+        assert run_segment.call_args.args[1:] == (args.cycle, ["create_lbcs"], 1)
+        gather_lbcs.assert_not_called()
@@ -0,0 +1,157 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from pytest import fixture, mark
+from uwtools.api.config import get_yaml_config
+
+from scripts import pio_benchmark
+
+CYCLE = datetime(2025, 1, 1, 0, tzinfo=timezone.utc)
+TIMERS = """
+ Timer information:
+    globals:
+    total time          calls        min        max        avg
+  1 total time                                   50.00000         1     50.00000
+  2  initialize                                  10.00000         1     10.00000
+  2  time integration                            36.00000        180      0.10000
+  3   atm_rk_integration_setup                    1.00000        180      0.00100
+"""
+
+
+@fixture
+def config(tmp_path):
+    return {
+        "forecast": {
+            "mpas": {
+                "execution": {"batchargs": {"cores": 64}},
+                "length": 48,
+                "namelist": {"update_values": {}},
+                "rundir": str(tmp_path),
+                "streams": {
+                    "input": {"type": "input", "input_interval": "initial_only"},
+                    "output": {
+                        "filename_template": "history.$h.nc",
+                        "output_interval": "01:00:00",
+                        "type": "output",
+                    },
+                    "restart": {
+                        "filename_template": "restart.$h.nc",
+                        "output_interval": "1_00:00:00",
+                        "type": "input;output",
+                    },
+                    "surface": {"output_interval": "none", "type": "output"},
+                },
+            }
+        },
+        "pio": {"benchmark": {"hours": 1, "layouts": []}},
+        "platform": {"cores_per_node": 16},
+    }
+
+
+def test_candidates():
+    assert pio_benchmark.candidates(64, 16) == [(4, 16), (2, 32), (1, 64)]
+    assert pio_benchmark.candidates(100, 40) == [(3, 40), (1, 120)]
+
+
+@mark.parametrize(
+    ("layouts", "expected"), [([], [(4, 16), (2, 32), (1, 64)]), ([[2, 8]], [(2, 8)])]
+)
+def test_main(args, config, expected, layouts, tmp_path):
+    config["pio"]["benchmark"]["layouts"] = layouts
+    results = [{"iotasks": n, "stride": s, "ok": False} for n, s in expected]
+    with (
+        patch.object(pio_benchmark, "parse_args", return_value=args),
+        patch.object(pio_benchmark, "get_yaml_config", return_value=get_yaml_config(config)),
+        patch.object(pio_benchmark, "run_layout", side_effect=results) as run_layout,
+    ):
+        pio_benchmark.main([])
+    assert [c.args[3] for c in run_layout.call_args_list] == expected
+    assert json.loads((tmp_path / "pio_benchmark.json").read_text()) == results
+
+
+def test_read_timers(tmp_path):
+    log = tmp_path / "log.atmosphere.0000.out"
+    log.write_text(TIMERS)
+    assert pio_benchmark.read_timers(log) == {
+        "total time": 50.0,
+        "initialize": 10.0,
+        "time integration": 36.0,
+        "atm_rk_integration_setup": 1.0,
+    }
+
+
+def test_report(caplog):
+    caplog.set_level(logging.INFO)
+    results: list[dict] = [
+        {
+            "iotasks": 1,
+            "stride": 64,
+            "ok": True,
+            "bytes": 2**30,
+            "write_seconds": 4.0,
+            "mb_per_s": 256.0,
+        },
+        {"iotasks": 2, "stride": 32, "ok": False},
+        {
+            "iotasks": 4,
+            "stride": 16,
+            "ok": True,
+            "bytes": 2**30,
+            "write_seconds": 2.0,
+            "mb_per_s": 512.0,
+        },
+    ]
+    assert pio_benchmark.report(results) == results[2]
+    assert "Best: config_pio_num_iotasks 4, config_pio_stride 16" in caplog.text
+    assert "failed" in caplog.text
+
+
+def test_report_none(caplog):
+    assert pio_benchmark.report([{"iotasks": 1, "stride": 64, "ok": False}]) is None
+    assert "No layout completed" in caplog.text
+
+
+def test_run_layout(config, tmp_path):
+    rundir = tmp_path / "pio_benchmark" / "2x32"
+
+    def run(**kwargs):
+        mpas = kwargs["config_file"]["forecast"]["mpas"]
+        assert mpas["rundir"] == str(rundir)
+        assert mpas["length"] == 1
+        assert mpas["streams"]["restart"]["output_interval"] == "01:00:00"
+        assert mpas["namelist"]["update_values"]["io"] == {
+            "config_pio_num_iotasks": 2,
+            "config_pio_stride": 32,
+        }
+        rundir.mkdir(parents=True)
+        (rundir / "log.atmosphere.0000.out").write_text(TIMERS)
+        for name in ("history.00.nc", "history.01.nc", "restart.01.nc"):
+            (rundir / name).write_bytes(b"x" * 2**20)
+
+    with patch.object(pio_benchmark, "run_component", side_effect=run):
+        result = pio_benchmark.run_layout(get_yaml_config(config), CYCLE, ["forecast"], (2, 32), 1)
+    assert result == {
+        "bytes": 3 * 2**20,
+        "iotasks": 2,
+        "mb_per_s": 0.75,
+        "ok": True,
+        "stride": 32,
+        "write_seconds": 4.0,
+    }
+    assert config["forecast"]["mpas"]["rundir"] == str(tmp_path)
+
+
+def test_run_layout_failed(config):
+    with patch.object(pio_benchmark, "run_component", side_effect=SystemExit(1)):
+        result = pio_benchmark.run_layout(get_yaml_config(config), CYCLE, ["forecast"], (1, 64), 1)
+    assert result == {"iotasks": 1, "stride": 64, "ok": False}
+
+
+def test_written_bytes(config, tmp_path):
+    streams = config["forecast"]["mpas"]["streams"]
+    (tmp_path / "history.00.nc").write_bytes(b"x" * 10)
+    (tmp_path / "history.06.nc").write_bytes(b"x" * 20)
+    (tmp_path / "restart.06.nc").write_bytes(b"x" * 30)
+    assert pio_benchmark.written_bytes(streams, tmp_path, CYCLE, timedelta(hours=1)) == 10
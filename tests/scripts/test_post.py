@@ -0,0 +1,290 @@
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Event
+from unittest.mock import Mock, call, patch
+
+from pytest import fixture, mark, raises
+from uwtools.api.config import get_yaml_config
+
+from scripts import post
+
+CYCLE = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@fixture
+def expt_config(tmp_path):
+    return get_yaml_config(
+        {
+            "create_ics": {"mpas_init": {"rundir": "/expt/2025010112/mpas_ics"}},
+            "forecast": {
+                "mpas": {"rundir": str(tmp_path / "forecast")},
+                "readiness": {"interval": 0, "sentinel_dir": "ready"},
+            },
+            "post": {
+                "combine": {"inputs": ["WRFPRS", "WRFNAT"], "name": "COMBINED"},
+                "mpassit": {
+                    "execution": {"batchargs": {"nodes": 2, "tasks_per_node": 4}},
+                    "fixdir": "/fix",
+                    "modulefile": "/mods/build.jet.intel",
+                    "nmldir": "/nml",
+                    "parmdir": "/parm",
+                    "rundir": "/expt/2025010112/mpassit",
+                },
+                "packing": {"wait_timeout": 0},
+                "upp": {
+                    "execution": {"batchargs": {"nodes": 4, "tasks_per_node": 12}},
+                    "files_to_copy": {"postxconfig-NT.txt": "/parm/postxconfig.txt"},
+                    "files_to_link": {"params": "/parm/params"},
+                },
+            },
+            "user": {"mesh_label": "mesh", "mpas_app": "/app"},
+        }
+    )
+
+
+def test_combine_upp_output(expt_config, tmp_path):
+    rundir = tmp_path / "upp" / "006"
+    output = tmp_path / "upp" / "COMBINED.GrbF06"
+    with patch.object(post, "combine", return_value=output) as combine:
+        assert post.combine_upp_output(expt_config["post"], rundir, timedelta(hours=6)) == output
+    combine.assert_called_once_with([rundir / "WRFPRS.GrbF06", rundir / "WRFNAT.GrbF06"], output)
+
+
+def test_main(args):
+    args.leadtimes = [timedelta(hours=0), timedelta(hours=6)]
+    with (
+        patch.object(post, "parse_args", return_value=args) as parse_args,
+        patch.object(post, "use_uwtools_logger"),
+        patch.object(post, "run_post") as run_post,
+    ):
+        post.main()
+    parse_args.assert_called_once_with(leads=True)
+    run_post.assert_called_once_with(
+        config_file=args.config_file,
+        cycle=args.cycle,
+        key_path=args.key_path,
+        leadtimes=args.leadtimes,
+    )
+
+
+def test_place_upp():
+    upp = {"execution": {"batchargs": {"nodes": 4, "tasks_per_node": 12}, "mpiargs": ["-l"]}}
+    post.place_upp(upp)
+    assert upp["execution"]["mpiargs"] == ["--nodes=4", "--ntasks-per-node=12", "-l"]
+
+
+def test_place_upp_relative():
+    upp = {"execution": {"batchargs": {"nodes": 4, "tasks_per_node": 12}}}
+    post.place_upp(upp, relative=2)
+    assert upp["execution"]["mpiargs"] == ["--nodes=4", "--ntasks-per-node=12", "--relative=2"]
+
+
+@mark.parametrize(
+    ("ready", "mpassit", "error"),
+    [
+        (True, True, ""),
+        (False, True, "Timed out waiting for forecast output at lead time 6:00:00"),
+        (True, False, "MPASSIT failed for lead time 6:00:00"),
+    ],
+)
+def test_prepare(error, expt_config, mpassit, ready):
+    with (
+        patch.object(post, "wait_for_output", return_value=ready),
+        patch.object(post, "run_mpassit", return_value=mpassit) as run_mpassit,
+        patch.object(post, "release") as release,
+    ):
+        assert post.prepare(expt_config, CYCLE, timedelta(hours=6), "") == error
+    if ready:
+        run_mpassit.assert_called_once_with(expt_config, CYCLE, timedelta(hours=6), "")
+    release.assert_not_called()
+
+
+def test_prepare_stopped(expt_config):
+    stop = Event()
+    stop.set()
+    with (
+        patch.object(post, "wait_for_output", return_value=True),
+        patch.object(post, "run_mpassit") as run_mpassit,
+    ):
+        assert post.prepare(expt_config, CYCLE, timedelta(hours=6), "", stop) == (
+            "Abandoned lead time 6:00:00"
+        )
+    run_mpassit.assert_not_called()
+
+
+def test_prepare_scrub(expt_config):
+    expt_config["post"]["packing"]["scrub"] = True
+    with (
+        patch.object(post, "wait_for_output", return_value=True),
+        patch.object(post, "run_mpassit", return_value=True),
+        patch.object(post, "release") as release,
+    ):
+        assert post.prepare(expt_config, CYCLE, timedelta(hours=6), "") == ""
+    release.assert_called_once_with(expt_config, "forecast", ["mpassit"], CYCLE, timedelta(hours=6))
+
+
+def test_reuse_staged_files(expt_config):
+    upp = expt_config["post"]["upp"]
+    post.reuse_staged_files(upp, Path("/expt/upp/000"))
+    assert "files_to_copy" not in upp
+    assert upp["files_to_link"] == {
+        "params": "/parm/params",
+        "postxconfig-NT.txt": "/expt/upp/000/postxconfig-NT.txt",
+    }
+
+
+@mark.parametrize("success", [True, False])
+def test_run_mpassit(expt_config, success):
+    with patch.object(post, "run_shell_cmd", return_value=(success, "")) as run_shell_cmd:
+        assert post.run_mpassit(expt_config, CYCLE, timedelta(hours=6)) is success
+    cmd = run_shell_cmd.call_args.kwargs["cmd"]
+    assert cmd.startswith("CYCLE=2025010112 FCST_DIR=")
+    assert "INIT_DIR=/expt/2025010112/mpas_ics MESH_LABEL=mesh SLURM_NTASKS=8" in cmd
+    assert "/app/scripts/mpassit.sh -m /mods/build.jet.intel -w /expt/2025010112/mpassit" in cmd
+    assert "-f 006 -i 2025010112 -x /fix -n /nml -p /parm -e /app/exec" in cmd
+    assert run_shell_cmd.call_args.kwargs["taskname"] == "mpassit 006"
+    assert "MPASSIT_SRUN_ARGS" not in cmd
+
+
+def test_run_mpassit_srun_args(expt_config):
+    with patch.object(post, "run_shell_cmd", return_value=(True, "")) as run_shell_cmd:
+        post.run_mpassit(expt_config, CYCLE, timedelta(hours=6), "--nodes=2 --relative=0")
+    cmd = run_shell_cmd.call_args.kwargs["cmd"]
+    assert "SLURM_NTASKS=8 MPASSIT_SRUN_ARGS='--nodes=2 --relative=0' /app/scripts" in cmd
+
+
+def test_run_post(expt_config, tmp_path):
+    leadtimes = [timedelta(hours=0), timedelta(hours=6)]
+    drivers = [Mock(config={"rundir": str(tmp_path / "upp" / fhr)}) for fhr in ("000", "006")]
+    config_file = tmp_path / "experiment.yaml"
+    expt_config.dump(config_file)
+    with (
+        patch.object(post, "wait_for_output", return_value=True),
+        patch.object(post, "run_mpassit", return_value=True) as run_mpassit,
+        patch.object(post, "run_component", side_effect=drivers) as run_component,
+        patch.object(post, "combine_upp_output") as combine_upp_output,
+    ):
+        post.run_post(config_file, CYCLE, ["post"], leadtimes)
+    assert run_mpassit.call_count == 2
+    assert run_component.call_args_list[1].kwargs["leadtime"] == timedelta(hours=6)
+    upp = run_component.call_args.kwargs["config_file"]["post"]["upp"]
+    assert upp["files_to_link"]["postxconfig-NT.txt"] == str(
+        tmp_path / "upp" / "000" / "postxconfig-NT.txt"
+    )
+    assert upp["execution"]["mpiargs"] == ["--nodes=4", "--ntasks-per-node=12"]
+    block = run_component.call_args.kwargs["config_file"]["post"]
+    assert combine_upp_output.call_args_list == [
+        call(block, tmp_path / "upp" / "000", leadtimes[0]),
+        call(block, tmp_path / "upp" / "006", leadtimes[1]),
+    ]
+
+
+def test_run_post_pipelined(expt_config, tmp_path):
+    expt_config["post"]["packing"]["pipelined"] = True
+    leadtimes = [timedelta(hours=0), timedelta(hours=6), timedelta(hours=12)]
+    drivers = [Mock(config={"rundir": str(tmp_path / "upp" / str(i))}) for i in range(3)]
+    config_file = tmp_path / "experiment.yaml"
+    expt_config.dump(config_file)
+    events: list[tuple] = []
+
+    def mpassit(_config, _cycle, leadtime, srun_args):
+        events.append(("mpassit", leadtime, srun_args))
+        return True
+
+    def upp(**kwargs):
+        events.append(("upp", kwargs["leadtime"]))
+        return drivers[len([e for e in events if e[0] == "upp"]) - 1]
+
+    with (
+        patch.object(post, "wait_for_output", return_value=True),
+        patch.object(post, "run_mpassit", side_effect=mpassit),
+        patch.object(post, "run_component", side_effect=upp) as run_component,
+        patch.object(post, "combine_upp_output"),
+    ):
+        post.run_post(config_file, CYCLE, ["post"], leadtimes)
+    srun_args = "--nodes=2 --relative=0"
+    assert [e for e in events if e[0] == "mpassit"] == [
+        ("mpassit", leadtime, srun_args) for leadtime in leadtimes
+    ]
+    assert [e[1] for e in events if e[0] == "upp"] == leadtimes
+    upp_config = run_component.call_args.kwargs["config_file"]["post"]["upp"]
+    assert upp_config["execution"]["mpiargs"] == [
+        "--nodes=4",
+        "--ntasks-per-node=12",
+        "--relative=2",
+    ]
+
+
+@mark.parametrize(("ready", "mpassit"), [(False, True), (True, False)])
+def test_run_post_failure(expt_config, mpassit, ready, tmp_path):
+    config_file = tmp_path / "experiment.yaml"
+    expt_config.dump(config_file)
+    with (
+        patch.object(post, "wait_for_output", return_value=ready),
+        patch.object(post, "run_mpassit", return_value=mpassit),
+        patch.object(post, "run_component") as run_component,
+        raises(SystemExit),
+    ):
+        post.run_post(config_file, CYCLE, ["post"], [timedelta(hours=0)])
+    run_component.assert_not_called()
+
+
+def test_run_post_upp_failure(expt_config, tmp_path):
+    expt_config["post"]["packing"]["pipelined"] = True
+    config_file = tmp_path / "experiment.yaml"
+    expt_config.dump(config_file)
+    waiting, stopped = Event(), Event()
+
+    def wait_for_output(_config, leadtime, stop):
+        if leadtime:
+            # The next lead time's output would not appear for hours.
+            waiting.set()
+            if stop.wait(60):
+                stopped.set()
+            return False
+        return True
+
+    def upp(**_kwargs):
+        waiting.wait(10)
+        raise SystemExit(1)
+
+    start = time.monotonic()
+    with (
+        patch.object(post, "wait_for_output", side_effect=wait_for_output),
+        patch.object(post, "run_mpassit", return_value=True),
+        patch.object(post, "run_component", side_effect=upp),
+        raises(SystemExit),
+    ):
+        post.run_post(config_file, CYCLE, ["post"], [timedelta(hours=0), timedelta(hours=6)])
+    assert stopped.wait(10)
+    assert time.monotonic() - start < 10
+
+
+def test_wait_for_output(expt_config, tmp_path):
+    sentinel = tmp_path / "forecast" / "ready" / "006"
+    sentinel.parent.mkdir(parents=True)
+    sentinel.touch()
+    assert post.wait_for_output(expt_config, timedelta(hours=6))
+
+
+def test_wait_for_output_appears(caplog, expt_config, tmp_path):
+    caplog.set_level("INFO")
+    expt_config["post"]["packing"]["wait_timeout"] = 60
+    sentinel = tmp_path / "forecast" / "ready" / "012"
+    sentinel.parent.mkdir(parents=True)
+    with patch.object(post.time, "sleep", side_effect=lambda _: sentinel.touch()):
+        assert post.wait_for_output(expt_config, timedelta(hours=12))
+    assert f"Waiting for {sentinel}" in caplog.text
+
+
+def test_wait_for_output_stopped(expt_config):
+    expt_config["post"]["packing"]["wait_timeout"] = 3600
+    expt_config["forecast"]["readiness"]["interval"] = 3600
+    stop = Event()
+    stop.set()
+    assert not post.wait_for_output(expt_config, timedelta(hours=12), stop)
+
+
+def test_wait_for_output_timeout(expt_config):
+    assert not post.wait_for_output(expt_config, timedelta(hours=12))
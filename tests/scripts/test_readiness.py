@@ -0,0 +1,250 @@
+import os
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from unittest.mock import patch
+
+from pytest import fixture, mark, raises
+
+from scripts import readiness
+
+CYCLE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+CLOSED = b"CDF\x05" + (3).to_bytes(8, "big")
+
+
+@fixture
+def block(tmp_path):
+    return {
+        "mpas": {
+            "length": 12,
+            "rundir": str(tmp_path),
+            "streams": {
+                "output": {"filename_template": "history.$h.nc", "output_interval": "06:00:00"},
+                "diagnostics": {"filename_template": "diag.$h.nc", "output_interval": "12:00:00"},
+            },
+        },
+        "readiness": {"interval": 0.01, "settle": 0},
+    }
+
+
+@fixture
+def watcher(block):
+    return readiness.ReadinessWatcher(block, CYCLE)
+
+
+def age(path, seconds):
+    mtime = path.stat().st_mtime - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_readiness_watcher(tmp_path, watcher):
+    assert watcher.sentinel_dir == tmp_path / "ready"
+    assert watcher.leads == {
+        0: ["history.00.nc", "diag.00.nc"],
+        6: ["history.06.nc"],
+        12: ["history.12.nc", "diag.12.nc"],
+    }
+    assert watcher.sentinel(6) == tmp_path / "ready" / "006"
+
+
+def test_readiness_watcher_hours(block):
+    watcher = readiness.ReadinessWatcher(block, CYCLE, hours=(1, 12))
+    assert list(watcher.leads) == [6, 12]
+
+
+def test_readiness_watcher_poll(tmp_path, watcher):
+    for name in ("history.00.nc", "diag.00.nc", "history.06.nc"):
+        (tmp_path / name).write_bytes(CLOSED)
+    (tmp_path / "history.12.nc").write_bytes(b"CDF\x05" + b"\xff" * 8)
+    (tmp_path / "diag.12.nc").write_bytes(CLOSED)
+    # Files must be seen unchanged in two consecutive polls.
+    assert watcher.poll() == []
+    assert watcher.poll() == [0, 6]
+    assert watcher.sentinel(0).read_text() == "history.00.nc 12\ndiag.00.nc 12\n"
+    assert watcher.pending() == [12]
+    # A file that changes between polls is not yet complete.
+    (tmp_path / "history.12.nc").write_bytes(CLOSED + b"more")
+    assert watcher.poll() == []
+    assert watcher.poll() == [12]
+    assert watcher.pending() == []
+
+
+def test_readiness_watcher_poll_once(tmp_path, watcher):
+    watcher.config["settle"] = 60
+    for name in ("history.06.nc", "history.12.nc"):
+        (tmp_path / name).write_bytes(CLOSED)
+    age(tmp_path / "history.06.nc", 120)
+    # A single pass needs files only to have settled, not to be seen twice.
+    assert watcher.poll(once=True) == [6]
+
+
+def test_readiness_watcher_poll_pending_only(tmp_path, watcher):
+    (tmp_path / "history.06.nc").write_bytes(CLOSED)
+    (tmp_path / "restart.nc").write_bytes(CLOSED)
+    watcher.sentinel_dir.mkdir()
+    watcher.sentinel(6).touch()
+    with patch.object(readiness, "is_closed") as is_closed:
+        watcher.poll(final=True)
+    is_closed.assert_not_called()
+
+
+def test_readiness_watcher_poll_settle(tmp_path, watcher):
+    watcher.config["settle"] = 60
+    path = tmp_path / "history.06.nc"
+    path.write_bytes(CLOSED)
+    watcher.poll()
+    assert watcher.poll() == []
+    age(path, 120)
+    watcher.poll()
+    assert watcher.poll() == [6]
+
+
+def test_readiness_watcher_poll_final(tmp_path, watcher):
+    watcher.config["settle"] = 60
+    (tmp_path / "history.06.nc").write_bytes(CLOSED)
+    (tmp_path / "history.12.nc").touch()
+    assert watcher.poll(final=True) == [6]
+
+
+def test_readiness_watcher_poll_no_rundir(block, tmp_path):
+    block["mpas"]["rundir"] = str(tmp_path / "forecast")
+    assert readiness.ReadinessWatcher(block, CYCLE).poll(final=True) == []
+
+
+def test_readiness_watcher_reset(watcher):
+    watcher.sentinel_dir.mkdir()
+    watcher.sentinel(6).touch()
+    (watcher.sentinel_dir / readiness.STATUS).touch()
+    watcher.reset()
+    assert watcher.pending() == [0, 6, 12]
+    assert not (watcher.sentinel_dir / readiness.STATUS).exists()
+
+
+def test_readiness_watcher_run_done(watcher):
+    stop = Event()
+    with (
+        patch.object(watcher, "pending", side_effect=[[0], []]),
+        patch.object(watcher, "poll") as poll,
+    ):
+        watcher.run(stop)
+    poll.assert_called_once_with()
+
+
+def test_readiness_watcher_run_stopped(watcher):
+    stop = Event()
+    stop.set()
+    with patch.object(watcher, "poll") as poll:
+        watcher.run(stop)
+    poll.assert_not_called()
+
+
+def test_readiness_watcher_write_status(tmp_path, watcher):
+    status = tmp_path / "ready" / readiness.STATUS
+    for name in ("history.00.nc", "diag.00.nc", "history.12.nc"):
+        (tmp_path / name).write_bytes(CLOSED)
+    watcher.poll(final=True)
+    assert status.read_text() == "000 ready 2/2\n006 pending 0/1\n012 pending 1/2\n"
+    # An unchanged table is not rewritten.
+    mtime = status.stat().st_mtime_ns
+    age(status, 10)
+    watcher.poll(final=True)
+    assert status.stat().st_mtime_ns < mtime
+
+
+@mark.parametrize(
+    ("header", "closed"),
+    [
+        (b"CDF\x01" + (1).to_bytes(4, "big"), True),
+        (b"CDF\x02" + b"\xff" * 4, False),
+        (b"CDF\x02" + (0).to_bytes(4, "big"), False),
+        (CLOSED, True),
+        (b"CDF\x05" + b"\xff" * 8, False),
+        (b"CDF\x05" + (0).to_bytes(8, "big"), False),
+        (b"CDF\x05\x00", False),
+        (b"\x89HDF\r\n\x1a\n\x00", True),
+        (b"", False),
+    ],
+)
+def test_is_closed(closed, header, tmp_path):
+    path = tmp_path / "a.nc"
+    path.write_bytes(header)
+    assert readiness.is_closed(path) is closed
+
+
+def test_is_closed_missing(tmp_path):
+    assert not readiness.is_closed(tmp_path / "missing.nc")
+
+
+def test_lead_files():
+    streams = {
+        "output": {"filename_template": "history.$h.nc", "output_interval": "03:00:00"},
+        "diagnostics": {"filename_template": "diag.$h.nc", "output_interval": "1_00:00:00"},
+    }
+    leads = readiness.lead_files(streams, ["output"], CYCLE, timedelta(hours=6))
+    assert leads == {0: ["history.00.nc"], 3: ["history.03.nc"], 6: ["history.06.nc"]}
+    leads = readiness.lead_files(streams, ["output", "diagnostics"], CYCLE, timedelta(hours=3))
+    assert leads == {0: ["history.00.nc", "diag.00.nc"], 3: ["history.03.nc"]}
+
+
+def test_ready_files(block, tmp_path):
+    (tmp_path / "ready").mkdir()
+    (tmp_path / "ready" / "000").write_text("history.00.nc 12\ndiag.00.nc 12\n")
+    (tmp_path / "ready" / "status").write_text("000 ready 2/2\n")
+    assert readiness.ready_files(block, CYCLE) == {"history.00.nc", "diag.00.nc"}
+    del block["readiness"]
+    assert readiness.ready_files(block, CYCLE) == set()
+
+
+def test_scan(block, caplog, tmp_path):
+    caplog.set_level("INFO")
+    block["readiness"]["settle"] = 60
+    for name in ("history.00.nc", "diag.00.nc", "history.06.nc"):
+        (tmp_path / name).write_bytes(CLOSED)
+        age(tmp_path / name, 120)
+    (tmp_path / "history.12.nc").write_bytes(CLOSED)
+    assert readiness.scan(block, CYCLE) == [0, 6]
+    assert "Marked 2 lead times ready, 1 still pending" in caplog.text
+    (tmp_path / "diag.12.nc").write_bytes(CLOSED)
+    assert readiness.scan(block, CYCLE, final=True) == [12]
+
+
+def test_scan_disabled(block, caplog):
+    del block["readiness"]
+    with raises(SystemExit):
+        readiness.scan(block, CYCLE)
+    assert "No readiness section" in caplog.text
+
+
+def test_watching(block, tmp_path):
+    (tmp_path / "ready").mkdir()
+    (tmp_path / "ready" / "012").touch()
+    (tmp_path / "history.06.nc").write_bytes(CLOSED)
+    with readiness.watching(block, CYCLE) as watcher:
+        assert watcher is not None
+        assert watcher.pending() == [0, 6, 12]
+    assert watcher.pending() == [0, 12]
+
+
+def test_watching_hours(block, tmp_path):
+    (tmp_path / "ready").mkdir()
+    for hour in ("000", "006"):
+        (tmp_path / "ready" / hour).touch()
+    with readiness.watching(block, CYCLE, hours=(1, 12)) as watcher:
+        assert watcher is not None
+        assert watcher.pending() == [6, 12]
+    assert (tmp_path / "ready" / "000").is_file()
+    assert not (tmp_path / "ready" / "006").exists()
+
+
+def test_watching_disabled(block, tmp_path):
+    del block["readiness"]
+    with readiness.watching(block, CYCLE) as watcher:
+        assert watcher is None
+    assert not (tmp_path / "ready").exists()
+
+
+def test_watching_failure(block, tmp_path):
+    (tmp_path / "history.06.nc").write_bytes(CLOSED)
+    block["readiness"]["interval"] = 60
+    with raises(SystemExit), readiness.watching(block, CYCLE):
+        raise SystemExit(1)
+    assert not (tmp_path / "ready" / "006").exists()
@@ -0,0 +1,144 @@
+import os
+import time
+from threading import Event
+from unittest.mock import patch
+
+from pytest import fixture, mark
+
+from scripts import scratch
+
+CONFIG = {"follow": ["log.*"], "settle": 0, "verify": True}
+
+
+@fixture
+def dirs(tmp_path):
+    workdir, rundir = tmp_path / "scratch", tmp_path / "rundir"
+    workdir.mkdir()
+    rundir.mkdir()
+    return workdir, rundir
+
+
+def age(path, seconds=60):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_stage_back_poll(dirs):
+    workdir, rundir = dirs
+    stager = scratch.StageBack(workdir, rundir, CONFIG, ["*.GrbF*", "sub/*.nc"])
+    (workdir / "PRSLEV.GrbF06").write_bytes(b"grib")
+    (workdir / "log.atmosphere.0000.out").write_text("step 1\n")
+    (workdir / "namelist").write_text("&nml /\n")
+    (workdir / "sub").mkdir()
+    (workdir / "sub" / "open.nc").write_bytes(b"CDF\x01" + b"\xff" * 4)
+    (workdir / "table.TBL").symlink_to("/some/fix/table.TBL")
+    age(workdir / "PRSLEV.GrbF06")
+    # Outputs must be seen unchanged across polls, while followed files are copied at once.
+    assert stager.poll() == ["log.atmosphere.0000.out"]
+    assert sorted(stager.poll()) == ["PRSLEV.GrbF06"]
+    assert stager.poll() == []
+    assert (rundir / "PRSLEV.GrbF06").read_bytes() == b"grib"
+    assert (rundir / "PRSLEV.GrbF06").stat().st_mtime_ns == (
+        workdir / "PRSLEV.GrbF06"
+    ).stat().st_mtime_ns
+    assert not (rundir / "sub").exists()
+    assert not (rundir / "namelist").exists()
+    (workdir / "log.atmosphere.0000.out").write_text("step 1\nstep 2\n")
+    assert stager.poll() == ["log.atmosphere.0000.out"]
+    assert sorted(stager.poll(final=True)) == ["sub/open.nc"]
+    assert stager.bytes == 4 + 7 + 14 + 8
+
+
+def test_stage_back_settle(dirs):
+    workdir, rundir = dirs
+    stager = scratch.StageBack(workdir, rundir, {"settle": 3600}, ["*.nc", "*.TBL"])
+    (workdir / "history.nc").write_bytes(b"CDF\x01\x00\x00\x00\x01")
+    (workdir / "table.TBL").symlink_to("/some/fix/table.TBL")
+    assert stager.poll() == []
+    assert stager.poll() == []
+    assert sorted(stager.poll(final=True)) == ["history.nc", "table.TBL"]
+    assert (rundir / "table.TBL").readlink().as_posix() == "/some/fix/table.TBL"
+
+
+def test_stage_back_copy_fails(caplog, dirs):
+    workdir, rundir = dirs
+    stager = scratch.StageBack(workdir, rundir, CONFIG, ["*.nc"])
+    (workdir / "a.nc").write_bytes(b"x" * 10)
+    with patch.object(scratch, "_crc", return_value=0):
+        assert not stager.copy("a.nc", check=True)
+    assert "does not match" in caplog.text
+    assert stager.failed == ["a.nc"]
+    assert not stager.copy("missing.nc", check=False)
+    assert stager.failed == ["a.nc", "missing.nc"]
+    with patch.object(scratch, "_crc", return_value=0):
+        assert not stager.copy("a.nc", check=True)
+    assert stager.failed == ["a.nc", "missing.nc"]
+    assert stager.copy("a.nc", check=True)
+    assert stager.failed == ["missing.nc"]
+    assert not list(rundir.glob(".*.tmp"))
+
+
+def test_stage_back_run(dirs):
+    workdir, rundir = dirs
+    stager = scratch.StageBack(workdir, rundir, CONFIG, [])
+    stop = Event()
+    with (
+        patch.object(stager, "poll") as poll,
+        patch.object(stop, "wait", side_effect=[False, True]),
+    ):
+        stager.run(stop, 1)
+    poll.assert_called_once_with()
+
+
+def test_relocate(tmp_path):
+    config = {"post": {"upp": {"rundir": "/shared/upp/006", "namelist": {}}}}
+    assert scratch.relocate(config, ["post"], "upp", tmp_path) is config
+    assert config["post"]["upp"]["rundir"] == str(tmp_path)
+
+
+@mark.parametrize(
+    ("setting", "expected"),
+    [("$TMPDIR/x", "tmpdir/x"), ("/not/a/dir", "gettempdir"), ("$UNSET_VAR", "gettempdir")],
+)
+def test_scratch_dir(expected, monkeypatch, setting, tmp_path):
+    (tmp_path / "tmpdir" / "x").mkdir(parents=True)
+    (tmp_path / "gettempdir").mkdir()
+    monkeypatch.setenv("TMPDIR", str(tmp_path / "tmpdir"))
+    monkeypatch.delenv("UNSET_VAR", raising=False)
+    monkeypatch.delenv("SLURM_JOB_NUM_NODES", raising=False)
+    with patch.object(scratch.tempfile, "gettempdir", return_value=str(tmp_path / "gettempdir")):
+        path = scratch.scratch_dir({"dir": setting}, "UPP")
+    assert path is not None
+    assert path.parent == tmp_path / expected
+    assert path.name.startswith("UPP.")
+
+
+def test_scratch_dir_multinode(caplog, monkeypatch):
+    monkeypatch.setenv("SLURM_JOB_NUM_NODES", "4")
+    assert scratch.scratch_dir({}, "MPAS") is None
+    assert "Not using scratch for MPAS, which runs on 4 nodes" in caplog.text
+
+
+@mark.parametrize("fail", [False, True])
+def test_staging_back(caplog, dirs, fail):
+    caplog.set_level("INFO")
+    workdir, rundir = dirs
+    rundir.rmdir()
+    with scratch.staging_back(workdir, rundir, {"interval": 3600}, ["*.nc"]) as stager:
+        (workdir / "history.nc").write_bytes(b"data")
+        if fail:
+            # A directory in the way of the copy.
+            (workdir / "diag.nc").write_bytes(b"data")
+            (rundir / "diag.nc").mkdir()
+    assert isinstance(stager, scratch.StageBack)
+    assert (rundir / "history.nc").read_bytes() == b"data"
+    assert workdir.exists() is fail
+    assert ("Keeping" in caplog.text) is fail
+    assert f"MiB back to {rundir} while running" in caplog.text
+
+
+def test_stat_all_vanished(dirs):
+    workdir, _ = dirs
+    (workdir / "a").touch()
+    with patch.object(scratch.Path, "lstat", side_effect=FileNotFoundError):
+        assert scratch._stat_all(workdir) == {}
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from pytest import fixture, raises
+from uwtools.api.config import get_yaml_config
+
+from scripts import scrub
+
+CYCLE = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@fixture
+def cycle_dir(tmp_path):
+    path = tmp_path / "2025010112"
+    for name in ("history.2025-01-01_18.00.00.nc", "diag.2025-01-01_18.00.00.nc"):
+        (path / "forecast").mkdir(parents=True, exist_ok=True)
+        (path / "forecast" / name).write_bytes(b"x" * 4096)
+    (path / "mpassit" / "006").mkdir(parents=True)
+    (path / "mpassit" / "006" / "MPAS-A_out.nc").write_bytes(b"x" * 4096)
+    return path
+
+
+@fixture
+def expt_config(cycle_dir):
+    return get_yaml_config(
+        {
+            "forecast": {
+                "mpas": {
+                    "length": 12,
+                    "rundir": str(cycle_dir / "forecast"),
+                    "streams": {
+                        "diagnostics": {
+                            "filename_template": "diag.$Y-$M-$D_$h.$m.$s.nc",
+                            "output_interval": "06:00:00",
+                        },
+                        "output": {
+                            "filename_template": "history.$Y-$M-$D_$h.$m.$s.nc",
+                            "output_interval": "06:00:00",
+                        },
+                    },
+                }
+            },
+            "post": {"mpassit": {"rundir": str(cycle_dir / "mpassit")}},
+            "scrubber": {
+                "groups": {
+                    "forecast": {"consumers": ["mpassit"], "streams": ["output", "diagnostics"]},
+                    "mpassit": {"consumers": ["archive_post", "upp"]},
+                },
+                "ledger": str(cycle_dir / "scrub"),
+            },
+        }
+    )
+
+
+def test_files_for_forecast(cycle_dir, expt_config):
+    assert scrub.files_for(expt_config, "forecast", CYCLE, timedelta(hours=6)) == [
+        cycle_dir / "forecast" / "history.2025-01-01_18.00.00.nc",
+        cycle_dir / "forecast" / "diag.2025-01-01_18.00.00.nc",
+    ]
+    assert scrub.files_for(expt_config, "forecast", CYCLE, timedelta(hours=3)) == []
+
+
+def test_files_for_mpassit(cycle_dir, expt_config):
+    assert scrub.files_for(expt_config, "mpassit", CYCLE, timedelta(hours=6)) == [
+        cycle_dir / "mpassit" / "006"
+    ]
+
+
+def test_files_for_unknown(expt_config):
+    with raises(KeyError, match="Unknown scrubber group 'upp'"):
+        scrub.files_for(expt_config, "upp", CYCLE, timedelta(hours=6))
+
+
+def test_footprint(cycle_dir):
+    (cycle_dir / "forecast" / "link").symlink_to(cycle_dir / "mpassit")
+    (cycle_dir / "top.log").write_text("not counted")
+    usage = scrub.footprint(cycle_dir)
+    assert list(usage) == ["forecast", "mpassit"]
+    assert usage["forecast"] >= 2 * usage["mpassit"] > 0
+
+
+def test_main(args, tmp_path):
+    args.leadtime = timedelta(hours=6)
+    with (
+        patch.object(scrub, "parse_args", return_value=args) as parse_args,
+        patch.object(scrub, "use_uwtools_logger"),
+        patch.object(scrub, "get_yaml_config") as get_yaml_config,
+        patch.object(scrub, "release") as release,
+    ):
+        scrub.main(["--group", "mpassit", "--consumer", "upp", "-c", str(tmp_path), "--cycle", "x"])
+    parse_args.assert_called_once_with(["-c", str(tmp_path), "--cycle", "x"], lead_required=True)
+    release.assert_called_once_with(
+        expt_config=get_yaml_config.return_value,
+        group="mpassit",
+        consumers=["upp"],
+        cycle=args.cycle,
+        leadtime=args.leadtime,
+    )
+
+
+def test_release(caplog, cycle_dir, expt_config):
+    caplog.set_level("INFO")
+    six = timedelta(hours=6)
+    assert scrub.release(expt_config, "mpassit", ["upp"], CYCLE, six) == []
+    assert (cycle_dir / "mpassit" / "006").is_dir()
+    assert "Keeping mpassit files for lead time 006 for archive_post" in caplog.text
+    deleted = scrub.release(expt_config, "mpassit", ["archive_post"], CYCLE, six)
+    assert deleted == [cycle_dir / "mpassit" / "006"]
+    assert not (cycle_dir / "mpassit" / "006").exists()
+    assert (cycle_dir / "scrub" / "mpassit" / "006" / "upp").is_file()
+    report = json.loads((cycle_dir / "scrub" / "footprint.json").read_text())
+    assert report["directories"]["mpassit"] == 0
+    assert report["bytes"] == sum(report["directories"].values())
+    assert "Disk footprint of" in caplog.text
+
+
+def test_release_forecast(cycle_dir, expt_config):
+    scrub.release(expt_config, "forecast", ["mpassit"], CYCLE, timedelta(hours=6))
+    assert not list((cycle_dir / "forecast").iterdir())
+
+
+def test_release_unknown_consumer(expt_config):
+    with raises(ValueError, match="graphics not listed as consumers of scrubber group 'forecast'"):
+        scrub.release(expt_config, "forecast", ["graphics"], CYCLE, timedelta(hours=6))
@@ -0,0 +1,136 @@
+import errno
+import os
+from unittest.mock import patch
+
+from pytest import fixture, mark, raises
+
+from scripts import staging
+
+MB = staging.MB
+
+
+@fixture
+def src(tmp_path):
+    path = tmp_path / "src" / "mesh.static.nc"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(3 * MB + 5))
+    path.chmod(0o640)
+    return path
+
+
+def unsupported(*_args, **_kwargs):
+    raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+
+@mark.parametrize("chunk", [MB, 5 * MB])
+def test_deliver_copy(chunk, src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    assert staging.deliver(src, dst, ["copy"], workers=3, chunk=chunk) == "copy"
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mode & 0o777 == 0o640
+    assert dst.stat().st_ino != src.stat().st_ino
+    assert not (tmp_path / ".dst.nc.tmp").exists()
+
+
+def test_deliver_copy_without_copy_file_range(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    with patch.object(staging.os, "copy_file_range", side_effect=unsupported):
+        assert staging.deliver(src, dst, ["copy"], chunk=MB) == "copy"
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_deliver_hardlink(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    assert staging.deliver(src, dst, ["hardlink", "copy"]) == "hardlink"
+    assert dst.stat().st_ino == src.stat().st_ino
+
+
+def test_deliver_falls_back(caplog, src, tmp_path):
+    caplog.set_level("DEBUG")
+    dst = tmp_path / "dst.nc"
+    with (
+        patch.object(staging.fcntl, "ioctl", side_effect=unsupported),
+        patch.object(staging.os, "link", side_effect=unsupported),
+    ):
+        assert staging.deliver(src, dst, ["reflink", "hardlink", "copy"]) == "copy"
+    assert "Cannot reflink" in caplog.text
+    assert "Cannot hardlink" in caplog.text
+
+
+def test_deliver_reflink(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    clone = lambda fd, _, srcfd: os.write(fd, os.pread(srcfd, 4 * MB, 0))  # noqa: E731
+    with patch.object(staging.fcntl, "ioctl", side_effect=clone) as ioctl:
+        assert staging.deliver(src, dst, ["reflink"]) == "reflink"
+    assert ioctl.call_args.args[1] == staging.FICLONE
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_deliver_size_mismatch(caplog, src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    with patch.object(staging.fcntl, "ioctl"):
+        assert staging.deliver(src, dst, ["reflink"]) == ""
+    assert "differs from" in caplog.text
+    assert not dst.exists()
+    assert not (tmp_path / ".dst.nc.tmp").exists()
+
+
+def test_copy_range_dst_offset(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    with src.open("rb") as s, dst.open("wb") as d:
+        staging.copy_range(s.fileno(), d.fileno(), MB, MB, dst_offset=5)
+    assert dst.read_bytes() == bytes(5) + src.read_bytes()[MB : 2 * MB]
+
+
+def test_copy_range_short_copy(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    with (
+        patch.object(staging.os, "copy_file_range", return_value=0),
+        src.open("rb") as s,
+        dst.open("wb") as d,
+    ):
+        staging.copy_range(s.fileno(), d.fileno(), 0, 2 * MB)
+    assert dst.read_bytes() == src.read_bytes()[: 2 * MB]
+
+
+def test_copy_range_short_source(src, tmp_path):
+    dst = tmp_path / "dst.nc"
+    with src.open("rb") as s, dst.open("wb") as d, raises(OSError, match="Unexpected end"):
+        staging.copy_range(s.fileno(), d.fileno(), 3 * MB, MB)
+
+
+def test_stage(caplog, src, tmp_path):
+    caplog.set_level("INFO")
+    small = src.with_name("stream_list.atmosphere.output")
+    small.write_text("theta\n")
+    rundir = tmp_path / "rundir"
+    (rundir / "sub").mkdir(parents=True)
+    (rundir / "sub" / "present.nc").touch()
+    files = {
+        "mesh.static.nc": str(src),
+        "nested/mesh.init.nc": str(src),
+        "stream_list.atmosphere.output": str(small),
+        "missing.nc": str(tmp_path / "missing.nc"),
+        "sub/present.nc": str(src),
+    }
+    config = {"methods": ["hardlink"], "min_size_mb": 1}
+    assert staging.stage(files, rundir, config) == {
+        "mesh.static.nc": "hardlink",
+        "nested/mesh.init.nc": "hardlink",
+    }
+    assert (rundir / "nested/mesh.init.nc").stat().st_ino == src.stat().st_ino
+    assert not (rundir / "stream_list.atmosphere.output").exists()
+    assert (rundir / "sub" / "present.nc").stat().st_size == 0
+    assert f"Staged {rundir}/mesh.static.nc by hardlink" in caplog.text
+
+
+def test_stage_fails(caplog, src, tmp_path):
+    with patch.object(staging.os, "link", side_effect=unsupported):
+        assert staging.stage({"a.nc": str(src)}, tmp_path, {"methods": ["hardlink"]}) == {}
+    assert "Could not stage" not in caplog.text
+    with patch.object(staging.os, "link", side_effect=unsupported):
+        staged = staging.stage(
+            {"a.nc": str(src)}, tmp_path, {"methods": ["hardlink"], "min_size_mb": 0}
+        )
+    assert staged == {}
+    assert f"Could not stage {tmp_path}/a.nc; leaving it to be copied" in caplog.text
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+from pytest import mark, raises
+
+from scripts import streams
+
+
+def test_filename():
+    time = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert streams.filename("history.$Y-$M-$D_$h.$m.$s.nc", time) == (
+        "history.2025-01-02_03.04.05.nc"
+    )
+
+
+@mark.parametrize(
+    ("value", "expected"),
+    [
+        ("06:00:00", timedelta(hours=6)),
+        ("1_00:00:00", timedelta(days=1)),
+        (" 00:30:15 ", timedelta(minutes=30, seconds=15)),
+    ],
+)
+def test_interval(value, expected):
+    assert streams.interval(value) == expected
+
+
+def test_interval_bad():
+    with raises(ValueError, match="Cannot parse MPAS interval 'initial_only'"):
+        streams.interval("initial_only")
+
+
+def test_output_files():
+    config = {
+        "output": {"filename_template": "history.$h.nc", "output_interval": "03:00:00"},
+        "diagnostics": {"filename_template": "diag.$h.nc", "output_interval": "06:00:00"},
+    }
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    files = streams.output_files(config, ["output", "diagnostics"], start, timedelta(hours=6))
+    assert [name for _, name in files] == [
+        "diag.00.nc",
+        "history.00.nc",
+        "history.03.nc",
+        "diag.06.nc",
+        "history.06.nc",
+    ]
+    assert files[-1][0] == start + timedelta(hours=6)
+
+
+def test_output_times():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    times = streams.output_times(start, timedelta(hours=12), timedelta(hours=6))
+    assert times == [start + timedelta(hours=h) for h in (0, 6, 12)]
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import ANY, Mock, call, patch
 
@@ -86,6 +86,7 @@ def test_main(args, wrap):
             config_file=args.config_file,
             cycle=args.cycle,
             key_path=args.key_path,
+            member=args.member,
         )
         if not run_ungrib.ready:
             assert sysexit.assert_called_once_with(1)
@@ -179,6 +180,58 @@ def test_run_ungrib_gfs(outcome, tmp_path, ungrib_config):
             assert not task_state.ready
 
 
+@mark.parametrize("hit", [True, False])
+def test_run_ungrib_cache(hit, tmp_path, ungrib_config):
+    cache_dir = tmp_path / "cache"
+    ungrib_config.update_from({"ungrib_cache": {"dir": str(cache_dir), "max_size_gb": 1}})
+    model_dir = tmp_path.parent / "GFS"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    get_yaml_config({"dst.grib2": "src.grib2"}).dump(model_dir / "ICS.yaml")
+    (model_dir / "dst.grib2").write_text("grib")
+    config_file = tmp_path / "experiment.yaml"
+    ungrib_config.dump(config_file)
+    cycle = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    with (
+        patch.object(ungrib.Ungrib, "run") as run,
+        patch.object(ungrib.ungrib_cache, "digest", return_value="key"),
+        patch.object(ungrib.ungrib_cache, "fetch", return_value=hit) as fetch,
+        patch.object(ungrib.ungrib_cache, "store") as store,
+    ):
+        ungrib.run_ungrib(config_file, cycle, ["ungrib_ics"])
+    fetch.assert_called_once_with(cache_dir, "key", tmp_path, ["FILE:2025-07-31_00"])
+    if hit:
+        run.assert_not_called()
+        store.assert_not_called()
+    else:
+        run.assert_called_once()
+        store.assert_called_once_with(cache_dir, "key", [tmp_path / "FILE:2025-07-31_00"], 2**30)
+
+
+def test_run_ungrib_member(tmp_path, ungrib_config):
+    member_dir = tmp_path / "mem002"
+    ungrib_config.update_from(
+        {
+            "ungrib_ics": {"ungrib": {"rundir": str(member_dir / "ungrib_ics")}},
+            "user": {"ensemble": {"member": 0, "member_data": True}},
+        }
+    )
+    model_dir = tmp_path / "GFS"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    get_yaml_config({"mem001/a.grib2": "src1.grib2", "mem002/a.grib2": "src2.grib2"}).dump(
+        model_dir / "ICS.yaml"
+    )
+    config_file = tmp_path / "experiment.yaml"
+    ungrib_config.dump(config_file)
+    cycle = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    with (
+        patch.object(ungrib.Ungrib, "run"),
+        patch.object(ungrib, "Ungrib", wraps=ungrib.Ungrib) as driver,
+    ):
+        ungrib.run_ungrib(config_file, cycle, ["ungrib_ics"], member=2)
+    config = driver.call_args.kwargs["config"]
+    assert config["ungrib_ics"]["ungrib"]["gribfiles"] == [str(model_dir / "mem002" / "a.grib2")]
+
+
 def test_run_ungrib_rrfs_ics(tmp_path, ungrib_config):
     external_model = "RRFS"
     ungrib_config.update_from({"user": {"ics": {"external_model": external_model}}})
@@ -219,3 +272,146 @@ def test_run_ungrib_rrfs_lbcs(tmp_path, ungrib_config):
         ungrib.run_ungrib(config_file, cycle, ["ungrib_lbcs"])
         regrid_all.assert_called_once_with(ANY, ungrib_config["ungrib_lbcs"]["wgrib2"])
         run.assert_called_once()
+
+
+def lbcs_chunks_config(ungrib_config, gribfiles):
+    block = ungrib_config["ungrib_lbcs"]
+    block["chunks"] = 2
+    block["ungrib"].update(
+        {
+            "gribfiles": gribfiles,
+            "start": datetime(2025, 7, 31, 0, tzinfo=timezone.utc),
+            "stop": datetime(2025, 7, 31, 18, tzinfo=timezone.utc),
+        }
+    )
+    return ungrib_config
+
+
+@mark.parametrize(
+    ("count", "chunks", "expected"),
+    [
+        (4, 1, [(0, 4)]),
+        (4, 2, [(0, 2), (2, 4)]),
+        (5, 2, [(0, 2), (2, 5)]),
+        (2, 4, [(0, 1), (1, 2)]),
+        (1, 0, [(0, 1)]),
+    ],
+)
+def test_chunk_windows(chunks, count, expected):
+    assert ungrib.chunk_windows(count, chunks) == expected
+
+
+def test_chunk_configs(tmp_path, ungrib_config):
+    config = lbcs_chunks_config(ungrib_config, ["f00", "f06", "f12", "f18"])
+    configs = ungrib.chunk_configs(config, ["ungrib_lbcs"], 2)
+    blocks = [c["ungrib_lbcs"]["ungrib"] for c in configs]
+    assert [b["rundir"] for b in blocks] == [
+        str(tmp_path / "chunk_00"),
+        str(tmp_path / "chunk_01"),
+    ]
+    assert [(b["start"].hour, b["stop"].hour) for b in blocks] == [(0, 6), (12, 18)]
+    assert [b["gribfiles"] for b in blocks] == [["f00", "f06"], ["f12", "f18"]]
+    assert config["ungrib_lbcs"]["ungrib"]["rundir"] == str(tmp_path)
+
+
+def test_chunk_configs_timedelta_step(ungrib_config):
+    config = lbcs_chunks_config(ungrib_config, ["f00", "f06", "f12", "f18"])
+    config["ungrib_lbcs"]["ungrib"]["step"] = timedelta(hours=12)
+    blocks = [c["ungrib_lbcs"]["ungrib"] for c in ungrib.chunk_configs(config, ["ungrib_lbcs"], 2)]
+    assert [(b["start"].hour, b["stop"].hour) for b in blocks] == [(0, 0), (12, 12)]
+
+
+def test_chunk_configs_unmatched(caplog, ungrib_config):
+    config = lbcs_chunks_config(ungrib_config, ["all.grib2"])
+    configs = ungrib.chunk_configs(config, ["ungrib_lbcs"], 2)
+    assert [c["ungrib_lbcs"]["ungrib"]["gribfiles"] for c in configs] == [["all.grib2"]] * 2
+    assert "1 GRIB files for 4 valid times" in caplog.text
+
+
+def test_merge_chunks(tmp_path):
+    driver = Mock(rundir=tmp_path / "ungrib")
+    chunk_drivers = []
+    for i, hours in enumerate([(0, 6), (12, 18)]):
+        paths = [ungrib.chunk_rundir(driver.rundir, i) / f"FILE:2025-07-31_{h:02d}" for h in hours]
+        paths[0].parent.mkdir(parents=True)
+        paths[0].touch()
+        chunk_drivers.append(Mock(output={"paths": paths}))
+    moved = ungrib.merge_chunks(driver, chunk_drivers)
+    assert moved == [driver.rundir / "FILE:2025-07-31_00", driver.rundir / "FILE:2025-07-31_12"]
+    assert all(path.is_file() for path in moved)
+
+
+@mark.parametrize("wgrib2_config", [None, {"grid_vectors": "abc"}])
+def test_run_chunks(caplog, tmp_path, wgrib2_config):
+    chunk_drivers = [Mock(rundir=tmp_path / f"chunk_{i:02d}") for i in range(3)]
+    for i, chunk_driver in enumerate(chunk_drivers):
+        chunk_driver.run.return_value.ready = i != 1
+    with patch.object(ungrib, "regrid_all") as regrid_all:
+        assert not ungrib.run_chunks(chunk_drivers, wgrib2_config)
+    for chunk_driver in chunk_drivers:
+        chunk_driver.run.assert_called_once_with()
+    if wgrib2_config is None:
+        regrid_all.assert_not_called()
+    else:
+        assert regrid_all.call_count == 3
+    assert f"Ungrib failed in {tmp_path / 'chunk_01'}" in caplog.text
+
+
+def test_run_ungrib_chunk_failed(caplog, tmp_path, ungrib_config):
+    rundir = Path(ungrib_config["ungrib_lbcs"]["ungrib"]["rundir"])
+    model_dir = rundir.parent / "GFS"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    get_yaml_config({"f00.grib2": "src"}).dump(model_dir / "ICS.yaml")
+    get_yaml_config({"f06.grib2": "src", "f12.grib2": "src", "f18.grib2": "src"}).dump(
+        model_dir / "LBCS.yaml"
+    )
+    config_file = tmp_path / "experiment.yaml"
+    config = lbcs_chunks_config(ungrib_config, [])
+    config["ungrib_cache"] = {"dir": str(tmp_path / "cache")}
+    config.dump(config_file)
+    cycle = datetime(2025, 7, 31, 0, tzinfo=timezone.utc)
+    with (
+        patch.object(ungrib, "run_chunks", return_value=False),
+        patch.object(ungrib, "merge_chunks") as merge_chunks,
+        patch.object(ungrib.ungrib_cache, "store") as store,
+    ):
+        assert not ungrib.run_ungrib(config_file, cycle, ["ungrib_lbcs"]).ready
+    merge_chunks.assert_not_called()
+    store.assert_not_called()
+    assert f"Not merging ungrib chunks under {rundir}" in caplog.text
+
+
+def test_run_ungrib_chunked(tmp_path, ungrib_config):
+    rundir = Path(ungrib_config["ungrib_lbcs"]["ungrib"]["rundir"])
+    model_dir = rundir.parent / "GFS"
+    model_dir.mkdir(parents=True, exist_ok=True)
+    get_yaml_config({"f00.grib2": "src"}).dump(model_dir / "ICS.yaml")
+    get_yaml_config({"f06.grib2": "src", "f12.grib2": "src", "f18.grib2": "src"}).dump(
+        model_dir / "LBCS.yaml"
+    )
+    config_file = tmp_path / "experiment.yaml"
+    lbcs_chunks_config(ungrib_config, []).dump(config_file)
+    cycle = datetime(2025, 7, 31, 0, tzinfo=timezone.utc)
+
+    def write(chunk_drivers, _):
+        for chunk_driver in chunk_drivers:
+            chunk_driver.rundir.mkdir(parents=True)
+            for path in chunk_driver.output["paths"]:
+                path.touch()
+        return True
+
+    with (
+        patch.object(ungrib, "run_chunks", side_effect=write) as run_chunks,
+        patch.object(ungrib.Ungrib, "run") as run,
+    ):
+        assert ungrib.run_ungrib(config_file, cycle, ["ungrib_lbcs"]).ready
+    run.assert_not_called()
+    chunk_drivers, wgrib2_config = run_chunks.call_args.args
+    assert wgrib2_config is None
+    assert [d.config["gribfiles"] for d in chunk_drivers] == [
+        [str(model_dir / "f00.grib2"), str(model_dir / "f06.grib2")],
+        [str(model_dir / "f12.grib2"), str(model_dir / "f18.grib2")],
+    ]
+    assert sorted(p.name for p in rundir.glob("FILE:*")) == [
+        f"FILE:2025-07-31_{h:02d}" for h in (0, 6, 12, 18)
+    ]
@@ -0,0 +1,190 @@
+import os
+from datetime import datetime, timezone
+
+from pytest import fixture
+
+from scripts import ungrib_cache
+
+NAMES = ["FILE:2025-01-01_00", "FILE:2025-01-01_06"]
+
+
+@fixture
+def ungrib(tmp_path):
+    gribdir = tmp_path / "grib"
+    gribdir.mkdir()
+    gribfiles = []
+    for name in ("a.grib2", "b.grib2"):
+        (gribdir / name).write_bytes(name.encode() * 100)
+        gribfiles.append(str(gribdir / name))
+    vtable = tmp_path / "Vtable.GFS"
+    vtable.write_text("vtable")
+    return {
+        "execution": {"executable": "ungrib.exe"},
+        "gribfiles": gribfiles,
+        "rundir": str(tmp_path / "run1"),
+        "start": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "step": 6,
+        "stop": datetime(2025, 1, 1, 6, tzinfo=timezone.utc),
+        "vtable": str(vtable),
+    }
+
+
+@fixture
+def outputs(tmp_path):
+    rundir = tmp_path / "run1"
+    rundir.mkdir()
+    for name in NAMES:
+        (rundir / name).write_bytes(b"x" * 1000)
+    return [rundir / name for name in NAMES]
+
+
+def entry(cache_dir, key, size=1000, mtime=0):
+    path = cache_dir / key
+    path.mkdir(parents=True)
+    (path / NAMES[0]).write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_digest(ungrib, tmp_path):
+    key = ungrib_cache.digest(ungrib)
+    # The rundir and executable do not change the files ungrib writes.
+    moved = {**ungrib, "execution": {"executable": "other"}, "rundir": str(tmp_path / "run2")}
+    assert ungrib_cache.digest(moved) == key
+    assert (
+        ungrib_cache.digest({**ungrib, "stop": datetime(2025, 1, 1, 12, tzinfo=timezone.utc)})
+        != key
+    )
+    assert ungrib_cache.digest(ungrib, {"grid_vectors": "UGRD|VGRD"}) != key
+    # Nor do GRIB file names, but their contents do.
+    renamed = tmp_path / "c.grib2"
+    renamed.write_bytes(b"a.grib2" * 100)
+    assert (
+        ungrib_cache.digest({**ungrib, "gribfiles": [str(renamed), ungrib["gribfiles"][1]]}) == key
+    )
+    renamed.write_bytes(b"changed")
+    assert (
+        ungrib_cache.digest({**ungrib, "gribfiles": [str(renamed), ungrib["gribfiles"][1]]}) != key
+    )
+    (tmp_path / "Vtable.GFS").write_text("changed")
+    assert ungrib_cache.digest(ungrib) != key
+
+
+def test_digest_wgrib2_field_lists(ungrib, tmp_path):
+    fields = tmp_path / "budget_fields.txt"
+    fields.write_text("APCP")
+    wgrib2 = {"budget_fields": str(fields), "grid_specs": "lambert"}
+    key = ungrib_cache.digest(ungrib, wgrib2)
+    fields.write_text("APCP|ACPCP")
+    assert ungrib_cache.digest(ungrib, wgrib2) != key
+
+
+def test_evict(caplog, tmp_path):
+    caplog.set_level("INFO")
+    old = entry(tmp_path, "old", mtime=100)
+    kept = entry(tmp_path, "kept", mtime=50)
+    new = entry(tmp_path, "new", mtime=200)
+    (tmp_path / ".partial.123").mkdir()
+    assert ungrib_cache.evict(tmp_path, 2000, keep="kept") == [old]
+    assert kept.is_dir()
+    assert new.is_dir()
+    assert (tmp_path / ".partial.123").is_dir()
+    assert "Evicted 1 ungrib cache entries" in caplog.text
+    assert ungrib_cache.evict(tmp_path, 2000) == []
+
+
+def test_fetch(caplog, tmp_path):
+    caplog.set_level("INFO")
+    cached = tmp_path / "cache" / "key"
+    cached.mkdir(parents=True)
+    for name in NAMES:
+        (cached / name).write_text(name)
+    os.utime(cached, (0, 0))
+    rundir = tmp_path / "run"
+    assert ungrib_cache.fetch(tmp_path / "cache", "key", rundir, NAMES)
+    for name in NAMES:
+        assert (rundir / name).read_text() == name
+        assert (rundir / name).stat().st_ino == (cached / name).stat().st_ino
+    assert cached.stat().st_mtime > 0
+    assert "Placed 2 files from ungrib cache entry key" in caplog.text
+
+
+def test_fetch_incomplete(caplog, tmp_path):
+    caplog.set_level("INFO")
+    cached = tmp_path / "cache" / "key"
+    cached.mkdir(parents=True)
+    (cached / NAMES[0]).write_text("partial")
+    rundir = tmp_path / "run"
+    rundir.mkdir()
+    (rundir / NAMES[0]).write_text("left over")
+    assert not ungrib_cache.fetch(tmp_path / "cache", "key", rundir, NAMES)
+    assert not (rundir / NAMES[0]).exists()
+    assert (cached / NAMES[0]).read_text() == "partial"
+    assert "No ungrib cache entry key" in caplog.text
+
+
+def test_fetch_not_placed(tmp_path, monkeypatch):
+    cached = tmp_path / "cache" / "key"
+    cached.mkdir(parents=True)
+    for name in NAMES:
+        (cached / name).write_text(name)
+    results = iter(["hardlink", ""])
+    monkeypatch.setattr(ungrib_cache, "deliver", lambda *_: next(results))
+    rundir = tmp_path / "run"
+    rundir.mkdir()
+    (rundir / NAMES[0]).write_text("placed")
+    assert not ungrib_cache.fetch(tmp_path / "cache", "key", rundir, NAMES)
+    assert list(rundir.iterdir()) == []
+
+
+def test_store(caplog, outputs, tmp_path):
+    caplog.set_level("INFO")
+    cache_dir = tmp_path / "cache"
+    old = entry(cache_dir, "old", size=3000, mtime=0)
+    stored = ungrib_cache.store(cache_dir, "key", outputs, 2500)
+    assert stored is not None
+    assert stored == cache_dir / "key"
+    assert sorted(p.name for p in stored.iterdir()) == NAMES
+    assert (stored / NAMES[0]).stat().st_ino == outputs[0].stat().st_ino
+    assert not old.exists()
+    assert [p.name for p in cache_dir.iterdir()] == ["key"]
+    assert "Stored 2 files in ungrib cache entry key" in caplog.text
+    assert ungrib_cache.store(cache_dir, "key", outputs, 2500) == stored
+
+
+def test_store_incomplete(caplog, outputs, tmp_path):
+    outputs[1].unlink()
+    assert ungrib_cache.store(tmp_path / "cache", "key", outputs, 2**30) is None
+    assert not (tmp_path / "cache").exists()
+    assert "Not caching incomplete ungrib output" in caplog.text
+
+
+def test_store_not_delivered(caplog, monkeypatch, outputs, tmp_path):
+    monkeypatch.setattr(ungrib_cache, "deliver", lambda *_: "")
+    assert ungrib_cache.store(tmp_path / "cache", "key", outputs, 2**30) is None
+    assert list((tmp_path / "cache").iterdir()) == []
+    assert "Could not store ungrib output" in caplog.text
+
+
+def test_store_raced(monkeypatch, outputs, tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    def deliver(src, dst, _):
+        # Another run stores the entry while this one is writing its own.
+        (cache_dir / "key").mkdir(exist_ok=True)
+        (cache_dir / "key" / src.name).write_bytes(b"theirs")
+        os.link(src, dst)
+        return "hardlink"
+
+    monkeypatch.setattr(ungrib_cache, "deliver", deliver)
+    assert ungrib_cache.store(cache_dir, "key", outputs, 2**30) == cache_dir / "key"
+    assert [p.name for p in cache_dir.iterdir()] == ["key"]
+    assert (cache_dir / "key" / NAMES[0]).read_bytes() == b"theirs"
+
+
+def test__remove(tmp_path):
+    old = entry(tmp_path, "old")
+    assert ungrib_cache._remove(old)
+    assert list(tmp_path.iterdir()) == []
+    # Another run removed it first.
+    assert not ungrib_cache._remove(old)
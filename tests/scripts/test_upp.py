@@ -9,6 +9,7 @@ from scripts import upp
 def test_main(args):
     with (
         patch.object(upp, "parse_args", return_value=args) as parse_args,
+        patch.object(upp, "member_config", return_value={"scratch": {}}),
         patch.object(upp, "run_component", return_value=Path("/some/rundir")) as run_component,
     ):
         upp.main()
@@ -19,6 +20,8 @@ def test_main(args):
             cycle=args.cycle,
             leadtime=args.leadtime,
             key_path=args.key_path,
+            scratch={},
+            member=None,
         )
 
 
@@ -26,6 +29,7 @@ def test_main_missing_leadtime(args):
     args.leadtime = None
     with (
         patch.object(upp, "parse_args", return_value=args),
+        patch.object(upp, "member_config", return_value={}),
         pytest.raises(TypeError),
     ):
         upp.main()
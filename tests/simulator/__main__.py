@@ -0,0 +1,3 @@
+from tests.simulator.simulate import main
+
+main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+
+"""
+Fakes of the executables the workflow runs, each chosen by the name this script is run as.
+
+The simulator links each executable's name to this script. Fakes of the models and processors
+write their correctly named outputs, SIMULATOR_SIZE bytes each, over SIMULATOR_DURATION seconds,
+unless SIMULATOR_SIZE_<NAME> or SIMULATOR_DURATION_<NAME> set them for one executable, and record
+the time they spent and bytes they wrote in the SIMULATOR_LEDGER file. Fakes of the HPSS and NCO
+tools copy their inputs, with HPSS paths under SIMULATOR_HPSS. Fakes of the MPI launchers run the
+command they are given, and fakes of the environment tools do nothing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from uwtools.api.config import get_nml_config
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from scripts.streams import filename, interval
+from ush.postxconfig import read_flat
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FAKES: dict[str, Callable[[str, list[str]], int]] = {}
+LAUNCHERS = ("mpiexec", "mpirun", "srun")
+NO_OPS = ("conda", "module", "scancel")
+
+# Launcher options given their value as the next argument.
+_VALUED = {
+    "-A",
+    "-N",
+    "-c",
+    "-e",
+    "-n",
+    "-np",
+    "-o",
+    "-p",
+    "-ppn",
+    "-t",
+    "--account",
+    "--bind-to",
+    "--cpus-per-task",
+    "--map-by",
+    "--nodes",
+    "--ntasks",
+    "--ntasks-per-node",
+    "--partition",
+    "--time",
+}
+_CHUNK = 2**20
+_GRIB_MAX = 2**30
+# The indicator, local use section header, and end section of a GRIB2 message.
+_GRIB_MIN = 25
+_HDF5 = b"\x89HDF\r\n\x1a\n"
+
+
+def fake(*names: str) -> Callable:
+    """
+    Register the fake of the named executables: a function taking the name it is run as and its
+    arguments, and returning the bytes it wrote.
+    """
+
+    def register(function: Callable[[str, list[str]], int]) -> Callable[[str, list[str]], int]:
+        for name in names:
+            FAKES[name] = function
+        return function
+
+    return register
+
+
+@fake("gpmetis")
+def gpmetis(name: str, args: list[str]) -> int:
+    """
+    Partition a mesh graph file into a round-robin {graph}.part.{n} file.
+    """
+    graph, parts = [a for a in args if not a.startswith("-")]
+    with Path(graph).open() as f:
+        cells = int(f.readline().split()[0])
+    _pause(name)
+    output = Path(f"{graph}.part.{parts}")
+    output.write_text("".join(f"{i % int(parts)}\n" for i in range(cells)))
+    return output.stat().st_size
+
+
+@fake("hsi")
+def hsi(name: str, args: list[str]) -> int:
+    """
+    List, put from standard input, move, or make directories in the fake HPSS.
+    """
+    command, *operands = [a for a in args if not a.startswith("-") or a == "-"]
+    paths = [_hpss(p) for p in operands if p not in ("-", ":")]
+    written = 0
+    if command == "ls" and not all(p.exists() for p in paths):
+        sys.exit(1)
+    if command == "mkdir":
+        for path in paths:
+            path.mkdir(parents=True, exist_ok=True)
+    elif command == "mv":
+        paths[0].replace(paths[1])
+    elif command == "put":
+        with paths[-1].open("wb") as dst:
+            shutil.copyfileobj(sys.stdin.buffer, dst, _CHUNK)
+        written = paths[-1].stat().st_size
+    _pause(name)
+    return written
+
+
+@fake("htar")
+def htar(name: str, args: list[str]) -> int:
+    """
+    Bundle files into a tar archive in the fake HPSS, following symlinks.
+    """
+    _, destination, *files = args
+    archive = _hpss(destination)
+    with tarfile.open(archive, "w", dereference=True) as tar:
+        for path in files:
+            tar.add(path)
+    _pause(name)
+    return archive.stat().st_size
+
+
+def launched(args: list[str]) -> list[str]:
+    """
+    The command an MPI launcher runs, from the launcher's arguments.
+
+    :param args: The launcher's arguments.
+    """
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        i += 2 if args[i] in _VALUED else 1
+    return args[i:]
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Act as the executable this script is run as.
+    """
+    argv = sys.argv if argv is None else argv
+    name = Path(argv[0]).name
+    if name in NO_OPS:
+        return
+    if name in LAUNCHERS:
+        command = launched(argv[1:])
+        os.execvp(command[0], command)  # noqa: S606
+    if name not in FAKES:
+        print(f"No fake of {name}", file=sys.stderr)
+        sys.exit(1)
+    start = time.time()
+    written = FAKES[name](name, argv[1:])
+    entry = {
+        "bytes": written,
+        "end": time.time(),
+        "exe": name,
+        "start": start,
+        "task": os.environ.get("SIMULATOR_TASK"),
+    }
+    if ledger := os.environ.get("SIMULATOR_LEDGER"):
+        with Path(ledger).open("a") as f:
+            f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+@fake("mpassit")
+def mpassit(name: str, args: list[str]) -> int:
+    """
+    Write the output file named in the MPASSIT namelist.
+    """
+    config = get_nml_config(Path(args[-1]))["config"]
+    return _produce(name, [[Path(config["output_file"])]])
+
+
+@fake("atmosphere_model", "init_atmosphere_model")
+def mpas(name: str, args: list[str]) -> int:  # noqa: ARG001
+    """
+    Write the files of the output streams from the start to the end of the run, a time at a time,
+    logging each time as the model logs its timesteps.
+    """
+    core = name.removesuffix("_model")
+    nhyd = get_nml_config(Path(f"namelist.{core}"))["nhyd_model"]
+    start = _mpas_time(nhyd["config_start_time"])
+    if core == "atmosphere" and nhyd.get("config_run_duration"):
+        stop = start + interval(nhyd["config_run_duration"])
+    else:
+        stop = _mpas_time(nhyd.get("config_stop_time", nhyd["config_start_time"]))
+    files: dict[datetime, list[Path]] = {}
+    for stream in ET.parse(f"streams.{core}").getroot():  # noqa: S314
+        every = stream.get("output_interval", "none")
+        if "output" not in stream.get("type", "") or every == "none":
+            continue
+        times = [start] if every == "initial_only" else _times(start, stop, interval(every))
+        if stream.get("name") == "restart":
+            # Restart files are written from the first interval on.
+            times = [t for t in times if t > start]
+        for t in times:
+            files.setdefault(t, []).append(Path(filename(stream.get("filename_template", ""), t)))
+    times = sorted(files)
+    with Path(f"log.{core}.0000.out").open("w") as log:
+
+        def timestep(step: int) -> None:
+            log.write(f"Begin timestep {times[step].strftime('%Y-%m-%d_%H:%M:%S')}\n")
+            log.flush()
+
+        written = _produce(name, [files[t] for t in times], timestep)
+        log.write(f"Finished running the {core} core\n")
+    return written
+
+
+@fake("ncks")
+def ncks(name: str, args: list[str]) -> int:
+    """
+    Copy the input file to the output file.
+    """
+    src, dst = args[-2:]
+    shutil.copyfile(src, dst)
+    _pause(name)
+    return Path(dst).stat().st_size
+
+
+@fake("ungrib")
+def ungrib(name: str, args: list[str]) -> int:  # noqa: ARG001
+    """
+    Write an intermediate file for each valid time in the WPS namelist.
+    """
+    wps = get_nml_config(Path("namelist.wps"))
+    share = wps["share"]
+    start, stop = (_first(share[k]) for k in ("start_date", "end_date"))
+    every = timedelta(seconds=int(share["interval_seconds"]))
+    prefix = wps.get("ungrib", {}).get("prefix", "FILE")
+    times = _times(_mpas_time(start), _mpas_time(stop), every)
+    return _produce(name, [[Path(f"{prefix}:{t.strftime('%Y-%m-%d_%H')}")] for t in times])
+
+
+@fake("upp.x")
+def upp(name: str, args: list[str]) -> int:  # noqa: ARG001
+    """
+    Write a GRIB file for each paramset of the control file named in the itag namelist.
+
+    UPP takes the lead hour from its input file. The fake takes it from the name of its rundir,
+    which the app names for the lead hour.
+    """
+    inputs = get_nml_config(Path("itag"))["model_inputs"]
+    datsets = [paramset[0] for paramset in read_flat(Path(inputs["filenameflat"]))]
+    rundir = Path.cwd().name
+    fhr = int(rundir) if rundir.isdigit() else 0
+    return _produce(name, [[Path(f"{datset}.GrbF{fhr:02d}") for datset in datsets]])
+
+
+@fake("wgrib2")
+def wgrib2(name: str, args: list[str]) -> int:
+    """
+    Write the output GRIB file, the last argument.
+    """
+    return _produce(name, [[Path(args[-1])]])
+
+
+def write(path: Path, size: int) -> None:
+    """
+    Write a file of zeros in the format its name suggests: netCDF-4, GRIB2, or raw.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        if ".Grb" in path.name or path.suffix in (".grb2", ".grib2"):
+            # Whole messages, so that the GRIB tools can read the file.
+            remaining = max(size, _GRIB_MIN)
+            while remaining > 0:
+                length = min(remaining, _GRIB_MAX)
+                if 0 < remaining - length < _GRIB_MIN:
+                    length -= _GRIB_MIN
+                f.write(_grib(length))
+                _zeros(f, length - _GRIB_MIN)
+                f.write(b"7777")
+                remaining -= length
+        elif path.suffix == ".nc":
+            f.write(_HDF5)
+            _zeros(f, size - len(_HDF5))
+        else:
+            _zeros(f, size)
+
+
+# Private
+
+
+def _first(value: list | str) -> str:
+    """
+    The value for the first domain of a WPS namelist setting.
+    """
+    return value[0] if isinstance(value, list) else value
+
+
+def _grib(length: int) -> bytes:
+    """
+    The indicator section of a GRIB2 message of a length, and the header of the local use section
+    that fills the message up to its end section.
+    """
+    indicator = b"GRIB\x00\x00\x00\x02" + length.to_bytes(8, "big")
+    return indicator + (length - 20).to_bytes(4, "big") + b"\x02"
+
+
+def _hpss(path: str) -> Path:
+    """
+    The local path standing in for an HPSS path.
+    """
+    return Path(os.environ["SIMULATOR_HPSS"], path.lstrip("/"))
+
+
+def _mpas_time(value: str) -> datetime:
+    """
+    An MPAS or WPS date and time, like 2023-09-15_00:00:00.
+    """
+    return datetime.strptime(value, "%Y-%m-%d_%H:%M:%S")  # noqa: DTZ007
+
+
+def _pause(name: str, steps: int = 1) -> None:
+    """
+    Spend the executable's share of its duration on one of its steps.
+    """
+    time.sleep(_setting("DURATION", name, 0.0) / max(steps, 1))
+
+
+def _produce(
+    name: str, steps: list[list[Path]], before: Callable[[int], None] | None = None
+) -> int:
+    """
+    Write the files of each step in turn, each after its share of the duration.
+    """
+    size = int(_setting("SIZE", name, 1024))
+    written = 0
+    for step, paths in enumerate(steps):
+        _pause(name, len(steps))
+        if before:
+            before(step)
+        for path in paths:
+            write(path, size)
+            written += size
+    if not steps:
+        _pause(name)
+    return written
+
+
+def _setting(kind: str, name: str, default: float) -> float:
+    """
+    A size or duration for an executable, from the environment.
+    """
+    specific = f"SIMULATOR_{kind}_{re.sub(r'[^0-9A-Za-z]', '_', name).upper()}"
+    return float(os.environ.get(specific, os.environ.get(f"SIMULATOR_{kind}", default)))
+
+
+def _times(start: datetime, stop: datetime, every: timedelta) -> list[datetime]:
+    """
+    The times from the start to the stop, every interval.
+    """
+    return [start + i * every for i in range(int((stop - start) / every) + 1)]
+
+
+def _zeros(f, count: int) -> None:
+    """
+    Write zeros to a file, a chunk at a time.
+    """
+    while count > 0:
+        n = min(count, _CHUNK)
+        f.write(bytes(n))
+        count -= n
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,584 @@
+"""
+Simulate a shipped workflow end to end, offline, with fake executables.
+
+An experiment is generated from a shipped workflow config by experiment_gen.py, with the platform's
+fix files, the input GRIB files, and HPSS placed in a work directory, and with the executables the
+workflow runs replaced by the fakes in fake.py. The Rocoto task commands of each cycle are then run
+in dependency order on a pool of local workers, and each task's wall-clock time is recorded with
+the part of it spent outside the fakes: the app's own Python and filesystem overhead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import shlex
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+from scripts.monitor import walltime
+from tests.simulator import fake
+from ush import retrieve_data
+from ush.critical_path import expand
+from ush.footprint import parse_size
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+MPAS_APP = Path(__file__).parent.parent.parent.resolve()
+
+# The driver blocks whose executables are named by path, rather than found on PATH.
+EXECUTABLES = {
+    ("create_ics", "mpas_init"): "init_atmosphere_model",
+    ("create_lbcs", "mpas_init"): "init_atmosphere_model",
+    ("forecast", "mpas"): "atmosphere_model",
+    ("post", "upp"): "upp.x",
+}
+
+_CYCLESTR = re.compile(r"@([YmdHMS])")
+_ENTITY = re.compile(r"&(\w+);")
+_OPERATORS: dict[str, Callable[[list[bool]], bool]] = {
+    "and": all,
+    "nand": lambda inner: not all(inner),
+    "nor": lambda inner: not any(inner),
+    "not": lambda inner: not all(inner),
+    "or": any,
+    "xor": lambda inner: sum(inner) == 1,
+}
+# Keys of config values naming files the drivers read.
+_SOURCES = ("base_file", "budget_fields", "neighbor_fields", "vtable")
+
+
+class Simulator:
+    """
+    Run an experiment's cycles, each task once its dependency is met, on a pool of workers.
+    """
+
+    def __init__(
+        self, config: dict, env: dict[str, str], workers: int, skip: list[str], poll: float
+    ):
+        """
+        :param config: The dereferenced experiment config.
+        :param env: The environment the task commands run in.
+        :param workers: The number of tasks to run at once.
+        :param skip: Patterns of names of tasks to skip, as if they succeeded.
+        :param poll: Seconds between checks of the dependencies of waiting tasks.
+        """
+        self.cycles = cycles(config)
+        self.entities = config["workflow"]["entities"]
+        self.env = env
+        self.experiment_dir = Path(config["user"]["experiment_dir"])
+        self.poll = poll
+        self.skip = skip
+        self.states: dict[tuple[datetime, str], str] = {}
+        self.tasks, self.metatasks = expand(config["workflow"]["tasks"])
+        self.workers = workers
+
+    def met(self, dependency: dict, cycle: datetime) -> bool:
+        """
+        Is a Rocoto dependency met?
+
+        Dependencies on tasks of cycles that are not simulated are taken as met, as are
+        dependencies on anything but tasks and data, such as times.
+
+        :param dependency: The dependency block.
+        :param cycle: The cycle of the task with the dependency.
+        """
+        results = []
+        for key, value in dependency.items():
+            kind = key.split("_")[0]
+            if kind in _OPERATORS:
+                inner = [self.met({k: v}, cycle) for k, v in value.items()]
+                results.append(_OPERATORS[kind](inner))
+            elif kind in ("metataskdep", "taskdep"):
+                attrs = value["attrs"]
+                at = cycle + _offset(str(attrs.get("cycle_offset", "0")))
+                wanted = str(attrs.get("state", "SUCCEEDED")).upper()
+                names = (
+                    self.metatasks.get(attrs["metatask"], [])
+                    if kind == "metataskdep"
+                    else [attrs["task"]]
+                )
+                results.append(
+                    at not in self.cycles
+                    or all(self.states.get((at, name)) == wanted for name in names)
+                )
+            elif kind == "datadep":
+                results.append(Path(render(value["value"], cycle, self.entities, "")).exists())
+        return all(results)
+
+    def run_cycle(self, cycle: datetime) -> dict[str, dict]:
+        """
+        Run a cycle's tasks.
+
+        :param cycle: The cycle.
+        :return: Each task's result, by name.
+        """
+        results: dict[str, dict] = {}
+        pending = []
+        for name in self.tasks:
+            if any(fnmatch(name, pattern) for pattern in self.skip):
+                self.states[(cycle, name)] = "SUCCEEDED"
+                results[name] = {"state": "SKIPPED"}
+            else:
+                pending.append(name)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            while True:
+                for name in list(pending):
+                    if self.met(self.tasks[name].get("dependency") or {}, cycle):
+                        running[executor.submit(self.run_task, name, cycle)] = name
+                        pending.remove(name)
+                if not running:
+                    break
+                # Data dependencies are checked again at least every poll interval.
+                done, _ = wait(running, timeout=self.poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    self.states[(cycle, name)] = results[name]["state"]
+                    logging.info(
+                        "%s %s: %s in %.1f s",
+                        cycle.strftime("%Y%m%d%H"),
+                        name,
+                        results[name]["state"],
+                        results[name]["seconds"],
+                    )
+        for name in pending:
+            logging.warning("%s %s: dependency never met", cycle.strftime("%Y%m%d%H"), name)
+            results[name] = {"state": "UNMET"}
+        return results
+
+    def run_task(self, name: str, cycle: datetime) -> dict:
+        """
+        Run a task's command as Rocoto would, in the environment a batch job gives it.
+
+        :param name: The name of the task.
+        :param cycle: The cycle.
+        :return: The task's state, exit status, and run time.
+        """
+        task = self.tasks[name]
+        envars = {
+            k: render(v, cycle, self.entities, name) for k, v in (task.get("envars") or {}).items()
+        }
+        cores, ppn = _cores(task)
+        join = Path(render(task["join"], cycle, self.entities, name))
+        join.parent.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        with join.open("a") as log:
+            result = subprocess.run(
+                render(task["command"], cycle, self.entities, name),
+                check=False,
+                cwd=self.experiment_dir,
+                env={
+                    **self.env,
+                    **envars,
+                    "SIMULATOR_TASK": f"{cycle.strftime('%Y%m%d%H')}/{name}",
+                    "SLURM_CPUS_ON_NODE": str(ppn),
+                    "SLURM_JOB_NAME": name,
+                    "SLURM_NTASKS": str(cores),
+                },
+                executable="/bin/bash",
+                shell=True,
+                stderr=subprocess.STDOUT,
+                stdout=log,
+            )
+        return {
+            "exit_status": result.returncode,
+            "seconds": time.monotonic() - start,
+            "state": "SUCCEEDED" if result.returncode == 0 else "DEAD",
+        }
+
+
+# Public functions
+
+
+def account(results: dict, ledger: Path) -> None:
+    """
+    Add to each task's result the time it spent in fakes and the bytes they wrote, and the rest of
+    its run time, its overhead, and to each cycle's result the overhead of its tasks.
+
+    :param results: The simulation results.
+    :param ledger: Path to the fakes' ledger.
+    """
+    faked = fake_times(ledger)
+    for yyyymmddhh, cycle_results in results["cycles"].items():
+        for name, result in cycle_results["tasks"].items():
+            if "seconds" in result:
+                found = faked.get(f"{yyyymmddhh}/{name}", {"bytes": 0, "seconds": 0.0})
+                result["fake_bytes"] = found["bytes"]
+                result["fake_seconds"] = found["seconds"]
+                result["overhead_seconds"] = result["seconds"] - found["seconds"]
+        cycle_results["overhead_seconds"] = sum(
+            r.get("overhead_seconds", 0.0) for r in cycle_results["tasks"].values()
+        )
+
+
+def cycles(config: dict) -> list[datetime]:
+    """
+    The cycles of an experiment.
+
+    :param config: The dereferenced experiment config.
+    """
+    user = config["user"]
+    every = timedelta(hours=int(user["cycle_frequency"]))
+    count = int((user["last_cycle"] - user["first_cycle"]) / every) + 1
+    return [user["first_cycle"] + i * every for i in range(count)]
+
+
+def environment(workdir: Path, settings: dict[str, str]) -> dict[str, str]:
+    """
+    The environment the app's scripts run in, with the fakes first on PATH.
+
+    :param workdir: The work directory.
+    :param settings: The fakes' sizes and durations, as environment variables.
+    """
+    return {
+        # Exported shell functions, like Lmod's module, would hide the fakes.
+        **{k: v for k, v in os.environ.items() if not k.startswith("BASH_FUNC_")},
+        **settings,
+        "PATH": f"{workdir / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+        "PYTHONUNBUFFERED": "1",
+        "SIMULATOR_HPSS": str(workdir / "hpss"),
+        "SIMULATOR_LEDGER": str(workdir / "ledger.jsonl"),
+    }
+
+
+def fake_times(ledger: Path) -> dict[str, dict]:
+    """
+    The time each task spent in fakes, counting fakes that ran at once only once, and the bytes
+    they wrote.
+
+    :param ledger: Path to the fakes' ledger.
+    :return: The seconds and bytes, by cycle and task, as {YYYYMMDDHH}/{task}.
+    """
+    spans = defaultdict(list)
+    written: dict[str, int] = defaultdict(int)
+    if ledger.is_file():
+        for line in ledger.read_text().splitlines():
+            entry = json.loads(line)
+            spans[entry["task"]].append((entry["start"], entry["end"]))
+            written[entry["task"]] += entry["bytes"]
+    found = {}
+    for task, intervals in spans.items():
+        seconds, reached = 0.0, float("-inf")
+        for start, end in sorted(intervals):
+            seconds += max(0.0, end - max(start, reached))
+            reached = max(reached, end)
+        found[task] = {"bytes": written[task], "seconds": seconds}
+    return found
+
+
+def generate(workflow: Path, user_config: Path, env: dict[str, str]) -> float:
+    """
+    Generate the experiment with experiment_gen.py, as a user would.
+
+    :param workflow: Path to the shipped workflow config.
+    :param user_config: Path to the simulator's user config.
+    :param env: The environment to run in.
+    :return: The seconds it took.
+    """
+    start = time.monotonic()
+    result = subprocess.run(
+        shlex.join([sys.executable, "experiment_gen.py", str(workflow), str(user_config)]),
+        check=False,
+        cwd=MPAS_APP / "ush",
+        env={**env, "SIMULATOR_TASK": "experiment_gen"},
+        shell=True,
+    )
+    if result.returncode != 0:
+        logging.error("Experiment generation failed with status %s", result.returncode)
+        sys.exit(1)
+    return time.monotonic() - start
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Simulate a workflow.
+    """
+    use_uwtools_logger()
+    parser = argparse.ArgumentParser(
+        description="Simulate a shipped workflow offline, with fake executables."
+    )
+    parser.add_argument(
+        "workflow", help="A workflow config in ush/workflows, by name, or the path to one."
+    )
+    parser.add_argument("workdir", type=Path, help="An empty or new directory to work in.")
+    parser.add_argument("--cells", type=int, default=100000, help="Cells in the fake mesh.")
+    parser.add_argument(
+        "--duration", type=float, default=1.0, help="Seconds each fake executable runs for."
+    )
+    parser.add_argument(
+        "--fake",
+        action="append",
+        default=[],
+        metavar=("NAME", "SIZE", "SECONDS"),
+        nargs=3,
+        help="The output file size and run time of one fake executable.",
+    )
+    parser.add_argument(
+        "--platform", default="hera", help="The platform to configure, hera by default."
+    )
+    parser.add_argument(
+        "--poll", type=float, default=1.0, help="Seconds between checks of data dependencies."
+    )
+    parser.add_argument(
+        "--size", default="1M", help="Size of each fake output file, e.g. 512K or 2G."
+    )
+    parser.add_argument(
+        "--skip",
+        default=["graphics*"],
+        nargs="*",
+        help="Patterns of tasks to skip, as if they succeeded: graphics* by default.",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Tasks to run at once.")
+    args = parser.parse_args(argv)
+    workflow = Path(args.workflow)
+    if not workflow.is_file():
+        workflow = MPAS_APP / "ush" / "workflows" / args.workflow
+    if args.workdir.exists() and any(args.workdir.iterdir()):
+        logging.error("Work directory %s is not empty", args.workdir)
+        sys.exit(1)
+    settings = {
+        "SIMULATOR_DURATION": str(args.duration),
+        "SIMULATOR_SIZE": str(parse_size(args.size)),
+    }
+    for name, size, seconds in args.fake:
+        key = re.sub(r"[^0-9A-Za-z]", "_", name).upper()
+        settings[f"SIMULATOR_DURATION_{key}"] = seconds
+        settings[f"SIMULATOR_SIZE_{key}"] = str(parse_size(size))
+    workdir = args.workdir.resolve()
+    env = environment(workdir, settings)
+    results: dict = {
+        "cycles": {},
+        "experiment_gen_seconds": generate(
+            workflow, prepare(workdir, workflow, args.platform, args.cells), env
+        ),
+    }
+    config = get_yaml_config(workdir / "experiment" / "experiment.yaml")
+    config.dereference()
+    missing = stage_fix_files(config, workdir)
+    for path in missing:
+        logging.error("Missing %s, which the simulator cannot fake outside %s", path, workdir)
+    if missing:
+        sys.exit(1)
+    (workdir / "hpss").mkdir()
+    simulator = Simulator(config, env, args.workers, args.skip, args.poll)
+    for cycle in simulator.cycles:
+        stage_inputs(config, cycle, workdir / "grib", int(settings["SIMULATOR_SIZE"]))
+        start = time.monotonic()
+        tasks = simulator.run_cycle(cycle)
+        results["cycles"][cycle.strftime("%Y%m%d%H")] = {
+            "tasks": tasks,
+            "turnaround_seconds": time.monotonic() - start,
+        }
+    account(results, workdir / "ledger.jsonl")
+    report(results)
+    output = workdir / "simulation.json"
+    output.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    logging.info("Wrote results to %s", output)
+
+
+def prepare(workdir: Path, workflow: Path, platform: str, cells: int) -> Path:
+    """
+    Link the fakes into the work directory, and write the fake mesh and a user config that places
+    the experiment, fix files, input data, and executables in the work directory.
+
+    :param workdir: The work directory.
+    :param workflow: Path to the shipped workflow config.
+    :param platform: The platform to configure.
+    :param cells: The number of cells in the fake mesh.
+    :return: Path to the user config.
+    """
+    bindir = workdir / "bin"
+    bindir.mkdir(parents=True)
+    for name in (*fake.FAKES, *fake.LAUNCHERS, *fake.NO_OPS):
+        (bindir / name).symlink_to(Path(fake.__file__).resolve())
+    # The fakes, and the app's scripts, run with this interpreter, in its environment.
+    for name in ("python", "python3"):
+        (bindir / name).write_text(f'#!/bin/sh\nexec {sys.executable} "$@"\n')
+        (bindir / name).chmod(0o755)
+    fix = workdir / "fix"
+    fix.mkdir()
+    default = get_yaml_config(MPAS_APP / "ush" / "default_config.yaml")["user"]
+    mesh_label = {**default, **get_yaml_config(workflow).get("user", {})}["mesh_label"]
+    (fix / f"{mesh_label}.graph.info").write_text(f"{cells} {cells * 3}\n")
+    data = {"data_stores": "disk", "input_file_path": str(workdir / "grib")}
+    config: dict = {
+        "data": {"mesh_files": str(fix)},
+        "platform": {"crtm_dir": str(fix / "crtm"), "hrrr_fix": str(fix / "hrrr")},
+        "post": {"mpassit": {"fixdir": str(fix / "mpassit")}},
+        "user": {
+            "experiment_dir": str(workdir / "experiment"),
+            "hpss_archive_dir": "/simulated/archive",
+            "ics": data,
+            "lbcs": data,
+            "platform": platform,
+        },
+    }
+    for (section, driver), name in EXECUTABLES.items():
+        block = config.setdefault(section, {}).setdefault(driver, {})
+        block["execution"] = {"executable": str(bindir / name)}
+    user_config = workdir / "simulator.yaml"
+    get_yaml_config(config).dump(user_config)
+    return user_config
+
+
+def render(value: object, cycle: datetime, entities: dict[str, str], jobname: str) -> str:
+    """
+    A Rocoto string, with its cycle string tokens, entities, and job name filled in.
+
+    :param value: A string, or a cyclestr block.
+    :param cycle: The cycle.
+    :param entities: The workflow's entities.
+    :param jobname: The name of the task.
+    """
+    if isinstance(value, dict) and "cyclestr" in value:
+        offset = value["cyclestr"].get("attrs", {}).get("offset", "0")
+        at = cycle + _offset(str(offset))
+        text = _CYCLESTR.sub(lambda m: at.strftime(f"%{m[1]}"), str(value["cyclestr"]["value"]))
+    else:
+        text = str(value)
+    text = _ENTITY.sub(lambda m: str(entities.get(m[1], m[0])), text)
+    return text.replace("{{ jobname }}", jobname)
+
+
+def report(results: dict) -> None:
+    """
+    Log each cycle's turnaround and overhead, and its tasks by overhead.
+
+    :param results: The simulation results.
+    """
+    logging.info("Experiment generation: %.1f s", results["experiment_gen_seconds"])
+    for yyyymmddhh, cycle_results in results["cycles"].items():
+        logging.info(
+            "Cycle %s: turnaround %.1f s, %.1f s of task time outside the fakes",
+            yyyymmddhh,
+            cycle_results["turnaround_seconds"],
+            cycle_results["overhead_seconds"],
+        )
+        logging.info("%-24s %-9s %9s %9s %9s", "task", "state", "seconds", "fakes", "overhead")
+        ran = [(n, r) for n, r in cycle_results["tasks"].items() if "seconds" in r]
+        for name, r in sorted(ran, key=lambda item: -item[1]["overhead_seconds"]):
+            logging.info(
+                "%-24s %-9s %9.1f %9.1f %9.1f",
+                name,
+                r["state"],
+                r["seconds"],
+                r["fake_seconds"],
+                r["overhead_seconds"],
+            )
+
+
+def stage_fix_files(config: dict, workdir: Path) -> list[Path]:
+    """
+    Write empty files in place of the fix files in the work directory that the drivers read.
+
+    Files the workflow writes, in the experiment directory, are left to it.
+
+    :param config: The dereferenced experiment config.
+    :param workdir: The work directory.
+    :return: The files the drivers read that are missing outside the work directory.
+    """
+    experiment_dir = Path(config["user"]["experiment_dir"])
+    missing = []
+    for path in sorted(set(_sources(config))):
+        if path.exists() or experiment_dir in path.parents:
+            continue
+        if workdir in path.parents:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        else:
+            missing.append(path)
+    return missing
+
+
+def stage_inputs(config: dict, cycle: datetime, gribdir: Path, size: int) -> None:
+    """
+    Write the GRIB files a cycle's data tasks copy from disk.
+
+    :param config: The dereferenced experiment config.
+    :param cycle: The cycle.
+    :param gribdir: The directory the data tasks copy from.
+    :param size: The size of each file.
+    """
+    locations = get_yaml_config(MPAS_APP / "parm" / "data_locations.yml")
+    length = int(config["forecast"]["mpas"]["length"])
+    for bcs in ("ics", "lbcs"):
+        block = config["user"][bcs]
+        offset = int(block.get("offset_hours", 0))
+        if bcs == "ics":
+            hours = [offset]
+            fileset = "anl" if offset == 0 else "fcst"
+        else:
+            every = int(block["interval_hours"])
+            hours = list(range(offset + every, offset + length + 1, every))
+            fileset = "fcst"
+        model = block["external_model"]
+        templates = retrieve_data.get_filenames(locations[model]["filenames"], "grib2", fileset)
+        copies = retrieve_data.prepare_fs_copy_config(
+            locations,
+            cycle,
+            model,
+            templates,
+            [timedelta(hours=h) for h in hours],
+            [gribdir],
+            [-999],
+        )
+        for path in next(copies).values():
+            fake.write(Path(path), size)
+
+
+# Private
+
+
+def _cores(task: dict) -> tuple[int, int]:
+    """
+    A task's cores, and cores per node, from its cores or nodes setting.
+    """
+    if "cores" in task:
+        return int(task["cores"]), int(task["cores"])
+    groups = [g.split(":ppn=") for g in str(task.get("nodes", "1:ppn=1")).split("+")]
+    return sum(int(n) * int(ppn) for n, ppn in groups), int(groups[0][1])
+
+
+def _offset(value: str) -> timedelta:
+    """
+    A Rocoto offset like -06:00:00, or a number of seconds.
+    """
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-")
+    return sign * (walltime(value) if ":" in value else timedelta(seconds=int(value)))
+
+
+def _sources(value: object, key: str = "") -> Iterator[Path]:
+    """
+    The absolute paths of the files the driver blocks of a config read.
+    """
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k in ("files_to_copy", "files_to_link") and isinstance(v, dict):
+                for source in v.values():
+                    yield from _sources(source, "source")
+            elif k != "workflow":
+                yield from _sources(v, k)
+    elif (
+        isinstance(value, str)
+        and key in ("source", *_SOURCES)
+        and value.startswith("/")
+        and not re.search(r"{{|{%", value)
+    ):
+        yield Path(os.path.normpath(value))
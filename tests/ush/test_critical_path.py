@@ -0,0 +1,227 @@
+import sqlite3
+
+import yaml
+from pytest import approx, fixture
+
+from ush import critical_path
+
+
+def taskdep(task: str) -> dict:
+    return {"attrs": {"task": task}}
+
+
+@fixture
+def workflow():
+    return {
+        "tasks": {
+            "task_get_ics_data": {"walltime": "00:01:00"},
+            "task_ungrib_ics": {"dependency": {"taskdep": taskdep("get_ics_data")}},
+            "task_mpas": {
+                "dependency": {
+                    "and": {
+                        "taskdep": taskdep("ungrib_ics"),
+                        "datadep": {"value": "/path/to/data"},
+                    }
+                }
+            },
+            "task_graphics": {
+                "dependency": {"datadep_first_output": {"value": "/path/upp/COMBINED.GrbF06"}}
+            },
+            "metatask_post": {
+                "var": {"fhr": " 000 006"},
+                "task_mpassit_#fhr#": {
+                    "dependency": {
+                        "or": {
+                            "taskdep": taskdep("mpas"),
+                            "datadep_ready": {
+                                "value": {"cyclestr": {"value": "/path/forecast/ready/#fhr#"}}
+                            },
+                        }
+                    }
+                },
+                "task_upp_#fhr#": {"dependency": {"taskdep": taskdep("mpassit_#fhr#")}},
+                "task_combine_grib_#fhr#": {"dependency": {"taskdep": taskdep("upp_#fhr#")}},
+            },
+            "task_archive_post": {"dependency": {"metataskdep": {"attrs": {"metatask": "post"}}}},
+        }
+    }
+
+
+@fixture
+def runs():
+    return {
+        "archive_post": 10.0,
+        "combine_grib_000": 10.0,
+        "combine_grib_006": 10.0,
+        "get_ics_data": 60.0,
+        "graphics": 300.0,
+        "mpas": 600.0,
+        "mpassit_000": 60.0,
+        "mpassit_006": 60.0,
+        "ungrib_ics": 120.0,
+        "upp_000": 30.0,
+        "upp_006": 30.0,
+    }
+
+
+def test_critical(runs, workflow):
+    times = critical_path.schedule(*critical_path.expand(workflow["tasks"]), runs, {})
+    assert critical_path.critical(times) == [
+        "get_ics_data",
+        "ungrib_ics",
+        "mpas",
+        "mpassit_006",
+        "upp_006",
+        "combine_grib_006",
+        "graphics",
+    ]
+
+
+def test_durations(caplog, tmp_path, workflow):
+    caplog.set_level("INFO")
+    database = tmp_path / "rocoto.db"
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "CREATE TABLE jobs (taskname VARCHAR(64), state VARCHAR(64), duration REAL)"
+        )
+        connection.executemany(
+            "INSERT INTO jobs VALUES (?, ?, ?)",
+            [("mpas", "SUCCEEDED", 500.0), ("mpas", "SUCCEEDED", 700.0), ("mpas", "DEAD", 5.0)],
+        )
+    tasks, _ = critical_path.expand(workflow["tasks"])
+    found = critical_path.durations(tasks, database)
+    assert found["mpas"] == 600
+    assert found["get_ics_data"] == 60
+    assert found["upp_006"] == 0
+    assert "No completed jobs of get_ics_data, using its walltime" in caplog.text
+    assert critical_path.durations(tasks, None)["mpas"] == 0
+
+
+def test_expand(workflow):
+    tasks, metatasks = critical_path.expand(workflow["tasks"])
+    assert list(tasks) == [
+        "get_ics_data",
+        "ungrib_ics",
+        "mpas",
+        "graphics",
+        "mpassit_000",
+        "upp_000",
+        "combine_grib_000",
+        "mpassit_006",
+        "upp_006",
+        "combine_grib_006",
+        "archive_post",
+    ]
+    assert metatasks == {
+        "post": [
+            "mpassit_000",
+            "upp_000",
+            "combine_grib_000",
+            "mpassit_006",
+            "upp_006",
+            "combine_grib_006",
+        ]
+    }
+    assert tasks["upp_006"]["dependency"] == {"taskdep": taskdep("mpassit_006")}
+    assert tasks["mpassit_006"]["dependency"]["or"]["datadep_ready"]["value"]["cyclestr"][
+        "value"
+    ].endswith("/006")
+
+
+def test_expand_serial():
+    tasks, metatasks = critical_path.expand(
+        {
+            "metatask_mpas_segments": {
+                "attrs": {"mode": "serial"},
+                "var": {"segment": "0 1"},
+                "task_mpas_segment_#segment#": {"dependency": {"taskdep": taskdep("mpas_lbcs")}},
+            }
+        }
+    )
+    assert metatasks == {"mpas_segments": ["mpas_segment_0", "mpas_segment_1"]}
+    assert tasks["mpas_segment_1"]["dependency"] == {
+        "and": {"taskdep_serial": taskdep("mpas_segment_0"), "taskdep": taskdep("mpas_lbcs")}
+    }
+
+
+def test_main(caplog, runs, tmp_path, workflow):
+    caplog.set_level("INFO")
+    for name in runs:
+        workflow["tasks"].get(f"task_{name}", {})["walltime"] = "00:10:00"
+    (tmp_path / "experiment.yaml").write_text(yaml.safe_dump({"workflow": workflow}))
+    critical_path.main([str(tmp_path), "--speedup", "50"])
+    assert "No Rocoto log at" in caplog.text
+    # get_ics_data, ungrib_ics, mpas, and graphics take their 10-minute walltimes.
+    assert "Cycle turnaround: 40.0 minutes" in caplog.text
+    assert "Times are in minutes; saves is the turnaround saved by a 50.0% speedup" in caplog.text
+
+
+def test_queue_waits(tmp_path):
+    log = tmp_path / "workflow.log"
+    log.write_text(
+        "2023-09-15 12:00:05 +0000 :: hfe01 :: Submission status of previously pending ungrib_ics"
+        " is success, jobid=101\n"
+        "2023-09-15 12:00:05 +0000 :: hfe01 :: Submission of mpas succeeded, jobid=102\n"
+        "2023-09-15 12:05:05 +0000 :: hfe01 :: Task ungrib_ics, jobid=101, in state SUCCEEDED"
+        " (COMPLETED), ran for 120.0 seconds, exit status=0, try=1 (of 2)\n"
+        "2023-09-15 12:05:05 +0000 :: hfe01 :: Task mpas, jobid=102, in state RUNNING (RUNNING)\n"
+        "2023-09-15 12:05:05 +0000 :: hfe01 :: Task mpassit_000, jobid=103, in state SUCCEEDED"
+        " (COMPLETED), ran for 10.0 seconds, exit status=0, try=1 (of 2)\n"
+        "Not a Rocoto log line\n"
+    )
+    assert critical_path.queue_waits(log) == {"ungrib_ics": 180.0}
+
+
+def test_report(caplog, runs, workflow):
+    caplog.set_level("INFO")
+    tasks, metatasks = critical_path.expand(workflow["tasks"])
+    times = critical_path.report(tasks, metatasks, runs, {"ungrib_ics": 60.0}, 50)
+    assert times["mpas"]["start"] == 240
+    assert times["mpas"]["saves"] == 300
+    assert times["graphics"]["saves"] == 150
+    assert times["upp_000"]["saves"] == approx(0)
+    assert times["upp_006"]["saves"] == 15
+    assert "Cycle turnaround: 20.7 minutes" in caplog.text
+    assert (
+        "Critical path: get_ics_data -> ungrib_ics -> mpas -> mpassit_006 -> upp_006"
+        " -> combine_grib_006 -> graphics"
+    ) in caplog.text
+
+
+def test_schedule(runs, workflow):
+    times = critical_path.schedule(*critical_path.expand(workflow["tasks"]), runs, {})
+    assert {name: (t["start"], t["finish"], t["slack"]) for name, t in times.items()} == {
+        "archive_post": (880, 890, 290),
+        "combine_grib_000": (870, 880, 290),
+        "combine_grib_006": (870, 880, 0),
+        "get_ics_data": (0, 60, 0),
+        # Waits on the combined GRIB file of lead time 006.
+        "graphics": (880, 1180, 0),
+        "mpas": (180, 780, 0),
+        "mpassit_000": (780, 840, 290),
+        "mpassit_006": (780, 840, 0),
+        "ungrib_ics": (60, 180, 0),
+        "upp_000": (840, 870, 290),
+        "upp_006": (840, 870, 0),
+    }
+
+
+def test_schedule_outside_graph(caplog):
+    # As with post_packed.yaml, which has no combine_grib tasks, and an ensemble's sentinels.
+    tasks, metatasks = critical_path.expand(
+        {
+            "task_graphics": {
+                "dependency": {"datadep_first_output": {"value": "/path/upp/COMBINED.GrbF06"}}
+            },
+            "task_get_ics_data": {},
+            "task_mpassit_mem001_006": {
+                "dependency": {"datadep_ready": {"value": "/path/mem001/forecast/ready/006"}}
+            },
+        }
+    )
+    times = critical_path.schedule(tasks, metatasks, dict.fromkeys(tasks, 60.0), {})
+    assert times["graphics"]["start"] == 0
+    assert times["mpassit_mem001_006"]["start"] == 0
+    assert "graphics waits only on dependencies outside the graph" in caplog.text
+    assert "mpassit_mem001_006 waits only on dependencies outside the graph" in caplog.text
+    assert "get_ics_data waits" not in caplog.text
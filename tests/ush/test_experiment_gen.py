@@ -57,6 +57,43 @@ def validated_config(tmp_path):
     )
 
 
+def test_app_config(test_config):
+    test_config["post"] = {"mpassit": {"parmdir": "{{ user.mpas_app }}/parm/mpassit"}}
+    experiment_config = get_yaml_config(test_config)
+    config = experiment_gen.app_config(experiment_config, Path("/some/mpas_app"))
+    assert config["post"]["mpassit"]["parmdir"] == "/some/mpas_app/parm/mpassit"
+    assert "mpas_app" not in experiment_config["user"]
+
+
+def test_chain_segments():
+    # As in ush/workflows/hfip_2025.yaml, which has no task_mpas_lbcs.
+    dependency = {"taskdep": {"attrs": {"task": "mpas_ics"}}}
+    segments = {"metataskdep": {"attrs": {"metatask": "mpas_segments"}}}
+    unsegmented = get_yaml_config(
+        {"workflow": {"tasks": {"task_mpas": {"dependency": dependency}}}}
+    )
+    workflow_config = get_yaml_config(
+        {
+            "workflow": {
+                "tasks": {
+                    "metatask_mpas_segments": {
+                        "task_mpas_segment_#segment#": {
+                            "dependency": {"taskdep": {"attrs": {"task": "mpas_lbcs"}}}
+                        }
+                    },
+                    "task_mpas": {"dependency": {**segments, **dependency}},
+                }
+            }
+        }
+    )
+    experiment_gen.chain_segments(workflow_config, unsegmented)
+    tasks = workflow_config["workflow"]["tasks"]
+    assert tasks["metatask_mpas_segments"]["task_mpas_segment_#segment#"]["dependency"] == (
+        dependency
+    )
+    assert tasks["task_mpas"]["dependency"] == segments
+
+
 def test_create_grid_files(tmp_path):
     src_mesh = tmp_path / "mesh.graph.info"
     exp_dir = tmp_path / "experiment"
@@ -140,6 +177,149 @@ def test_generate_workflow_files(tmp_path, test_config, validated_config):
         assert f'<task name="{task}">' in xml_content
 
 
+def test_generate_workflow_files_cyclethrottle(tmp_path, test_config, validated_config):
+    experiment_file = tmp_path / "experiment.yaml"
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(experiment_gen, "plan_disk_usage", return_value=3),
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=get_yaml_config(test_config),
+            experiment_file=experiment_file,
+            mpas_app=tmp_path / "mpas_app",
+            user_config=get_yaml_config({}),
+            validated=validated_config,
+        )
+    workflow_config = realize.call_args.kwargs["input_config"]
+    assert workflow_config["workflow"]["attrs"]["cyclethrottle"] == 3
+
+
+def test_generate_workflow_files_cyclethrottle_user(tmp_path, test_config, validated_config):
+    experiment_file = tmp_path / "experiment.yaml"
+    user_config = get_yaml_config({"workflow": {"attrs": {"cyclethrottle": 5}}})
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(experiment_gen, "plan_disk_usage", return_value=3),
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=get_yaml_config(test_config),
+            experiment_file=experiment_file,
+            mpas_app=tmp_path / "mpas_app",
+            user_config=user_config,
+            validated=validated_config,
+        )
+    workflow_config = realize.call_args.kwargs["input_config"]
+    assert workflow_config["workflow"]["attrs"]["cyclethrottle"] == 5
+
+
+def test_generate_workflow_files_io_layout(tmp_path, test_config, validated_config):
+    layout = {"config_pio_num_iotasks": 2, "config_pio_stride": 32}
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(experiment_gen, "plan_io_layout", return_value=layout),
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=get_yaml_config(test_config),
+            experiment_file=tmp_path / "experiment.yaml",
+            mpas_app=tmp_path / "mpas_app",
+            user_config=get_yaml_config({}),
+            validated=validated_config,
+        )
+    workflow_config = realize.call_args.kwargs["input_config"]
+    assert workflow_config["forecast"]["mpas"]["namelist"]["update_values"]["io"] == layout
+
+
+def test_generate_workflow_files_io_layout_user(tmp_path, test_config, validated_config):
+    user_io = {"config_pio_num_iotasks": 4}
+    user_config = get_yaml_config(
+        {"forecast": {"mpas": {"namelist": {"update_values": {"io": user_io}}}}}
+    )
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(
+            experiment_gen,
+            "plan_io_layout",
+            return_value={"config_pio_num_iotasks": 2, "config_pio_stride": 32},
+        ),
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=get_yaml_config(test_config),
+            experiment_file=tmp_path / "experiment.yaml",
+            mpas_app=tmp_path / "mpas_app",
+            user_config=user_config,
+            validated=validated_config,
+        )
+    workflow_config = realize.call_args.kwargs["input_config"]
+    assert workflow_config["forecast"]["mpas"]["namelist"]["update_values"]["io"] == user_io
+
+
+def test_generate_workflow_files_stream_lists(tmp_path, test_config, validated_config):
+    pruned = {"stream_list.atmosphere.output": str(tmp_path / "stream_lists" / "output")}
+    experiment_config = get_yaml_config(test_config)
+    user_config = get_yaml_config(
+        {"forecast": {"mpas": {"files_to_copy": {"stream_list.atmosphere.output": "/user/list"}}}}
+    )
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(experiment_gen, "prune_stream_lists", return_value=pruned),
+        patch.object(experiment_gen, "plan_disk_usage", return_value=None) as plan_disk_usage,
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=experiment_config,
+            experiment_file=tmp_path / "experiment.yaml",
+            mpas_app=tmp_path / "mpas_app",
+            user_config=user_config,
+            validated=validated_config,
+        )
+    workflow_config = realize.call_args.kwargs["input_config"]
+    assert workflow_config["forecast"]["mpas"]["files_to_copy"] == pruned
+    planned = plan_disk_usage.call_args.args[0]
+    assert planned["forecast"]["mpas"]["files_to_copy"] == pruned
+
+
+def test_generate_workflow_files_upp_products(tmp_path, test_config, validated_config):
+    test_config["post"] = {
+        "combine": {"inputs": ["WRFPRS", "WRFNAT", "WRFTWO"]},
+        "upp": {"files_to_copy": {"postxconfig-NT.txt": "/full/postxconfig-NT.txt"}},
+    }
+    upp_control = {"datsets": ["WRFTWO", "WRFPRS"], "flat": "/pruned/flat", "xml": "/pruned/xml"}
+    experiment_config = get_yaml_config(test_config)
+    with (
+        patch.object(experiment_gen, "get_yaml_config", return_value=YAMLConfig(test_config)),
+        patch.object(experiment_gen, "prune_upp_products", return_value=upp_control),
+        patch.object(experiment_gen, "validate_driver_blocks"),
+        patch.object(experiment_gen, "realize") as realize,
+        patch.object(experiment_gen.rocoto, "realize", return_value=True),
+    ):
+        experiment_gen.generate_workflow_files(
+            experiment_config=experiment_config,
+            experiment_file=tmp_path / "experiment.yaml",
+            mpas_app=tmp_path / "mpas_app",
+            user_config=get_yaml_config({}),
+            validated=validated_config,
+        )
+    post = realize.call_args.kwargs["input_config"]["post"]
+    assert post["combine"]["inputs"] == ["WRFPRS", "WRFTWO"]
+    assert post["upp"]["control_file"] == "/pruned/flat"
+    assert post["upp"]["files_to_copy"] == {"postxconfig-NT.txt": "/pruned/flat"}
+    assert post["upp"]["files_to_link"] == {"postcntrl.xml": "/pruned/xml"}
+
+
 def test_generate_workflow_files_failure(tmp_path, test_config, validated_config):
     experiment_file = tmp_path / "experiment.yaml"
     experiment_config = get_yaml_config(test_config)
@@ -184,12 +364,91 @@ def test_main(validated_config, test_config, tmp_path):
         stage.assert_called_once()
 
 
+def test_merge_workflow(tmp_path):
+    blocks = [tmp_path / "a.yaml", tmp_path / "b.yaml"]
+    get_yaml_config({"workflow": {"tasks": {"task_a": {"cores": 1}}}}).dump(blocks[0])
+    get_yaml_config({"workflow": {"tasks": {"task_a": {"cores": 2, "walltime": "1"}}}}).dump(
+        blocks[1]
+    )
+    user = get_yaml_config({"workflow": {"tasks": {"task_a": {"walltime": "2"}}}})
+    merged = experiment_gen.merge_workflow(blocks, [user])
+    assert merged["workflow"]["tasks"]["task_a"] == {"cores": 2, "walltime": "2"}
+
+
 def test_parse_args():
     with patch("sys.argv", ["progname", "config1.yaml", "config2.yaml"]):
         result = experiment_gen.parse_args()
     assert result == [Path("config1.yaml"), Path("config2.yaml")]
 
 
+def test_plan_disk_usage(test_config, tmp_path, validated_config):
+    experiment_config = get_yaml_config(test_config)
+    with patch.object(experiment_gen.footprint, "plan", return_value=2) as plan:
+        assert experiment_gen.plan_disk_usage(experiment_config, validated_config) == 2
+    plan.assert_called_once_with(
+        experiment_config, tmp_path / "meshes" / "testmesh.graph.info", 5, ["block1.yaml"]
+    )
+
+
+def test_plan_io_layout(test_config, tmp_path, validated_config):
+    experiment_config = get_yaml_config(test_config)
+    with patch.object(experiment_gen.pio, "plan", return_value=None) as plan:
+        assert experiment_gen.plan_io_layout(experiment_config, validated_config) is None
+    plan.assert_called_once_with(experiment_config, tmp_path / "meshes" / "testmesh.graph.info")
+
+
+def test_prune_stream_lists(test_config, tmp_path, validated_config):
+    experiment_config = get_yaml_config(test_config)
+    mpas_app = Path("/some/mpas_app")
+    with patch.object(experiment_gen.stream_lists, "plan", return_value={}) as plan:
+        pruned = experiment_gen.prune_stream_lists(experiment_config, mpas_app, validated_config)
+    assert pruned == {}
+    config, graph_info, outdir = plan.call_args.args
+    assert config["user"]["mpas_app"] == "/some/mpas_app"
+    assert graph_info == tmp_path / "meshes" / "testmesh.graph.info"
+    assert outdir == tmp_path / "stream_lists"
+    assert "mpas_app" not in experiment_config["user"]
+
+
+def test_prune_upp_products(test_config, tmp_path, validated_config):
+    experiment_config = get_yaml_config(test_config)
+    mpas_app = Path("/some/mpas_app")
+    with patch.object(experiment_gen.postxconfig, "plan", return_value=None) as plan:
+        result = experiment_gen.prune_upp_products(experiment_config, mpas_app, validated_config)
+    assert result is None
+    config, outdir = plan.call_args.args
+    assert config["user"]["mpas_app"] == "/some/mpas_app"
+    assert outdir == tmp_path / "upp_control"
+
+
+def test_plan_resources(test_config, tmp_path):
+    test_config["user"]["mesh_label"] = "testmesh"
+    test_config["resources"] = {"auto": True}
+    planned = {"create_ics": {"cores": 80}, "forecast": {"cores": 160, "walltime": "01:00:00"}}
+    user_config = get_yaml_config(
+        {"forecast": {"mpas": {"execution": {"batchargs": {"walltime": "02:00:00"}}}}}
+    )
+    with patch.object(experiment_gen.resources, "plan", return_value=planned) as plan:
+        update = experiment_gen.plan_resources(
+            get_yaml_config(test_config), user_config, Path("/some/mpas_app")
+        )
+    assert plan.call_args.args[1] == tmp_path / "meshes" / "testmesh.graph.info"
+    assert update == {"create_ics": {"mpas_init": {"execution": {"batchargs": {"cores": 80}}}}}
+
+
+def test_plan_resources_not_auto(test_config):
+    test_config["user"]["mesh_label"] = "testmesh"
+    test_config["resources"] = {"auto": False}
+    with patch.object(experiment_gen.resources, "plan", return_value={"upp": {}}) as plan:
+        update = experiment_gen.plan_resources(
+            get_yaml_config(test_config), get_yaml_config({}), Path("/some/mpas_app")
+        )
+    plan.assert_called_once()
+    assert update == {}
+    del test_config["resources"]
+    assert experiment_gen.plan_resources(get_yaml_config(test_config), {}, Path("/")) == {}
+
+
 def test_prepare_configs(test_config):
     config_dicts = [
         test_config,
@@ -0,0 +1,194 @@
+import logging
+
+from pytest import approx, fixture, mark, raises
+
+from ush import footprint
+
+CELLS = 1000
+
+
+@fixture
+def config(tmp_path):
+    stream_list = tmp_path / "stream_list.atmosphere.output"
+    stream_list.write_text("theta\nuReconstructZonal\n\nt2m\nq2\n")
+    return {
+        "create_ics": {
+            "mpas_init": {"namelist": {"update_values": {"dimensions": {"config_nvertlevels": 9}}}}
+        },
+        "create_lbcs": {},
+        "footprint": {
+            "bytes_per_cell": {
+                "diagnostics": 10,
+                "init": 100,
+                "lbc": 20,
+                "mpassit": 30,
+                "restart": 200,
+                "upp": 5,
+            },
+            "live_leads": 1,
+            "quota": None,
+            "share_3d": {"default": 0.5},
+        },
+        "forecast": {
+            "mpas": {
+                "files_to_copy": {"stream_list.atmosphere.output": str(stream_list)},
+                "length": 12,
+                "streams": {
+                    "input": {"type": "input", "input_interval": "initial_only"},
+                    "restart": {"type": "input;output", "output_interval": "06:00:00"},
+                    "output": {
+                        "type": "output",
+                        "output_interval": "06:00:00",
+                        "files": ["stream_list.atmosphere.output"],
+                    },
+                    "diagnostics": {
+                        "type": "output",
+                        "output_interval": "03:00:00",
+                        "files": ["stream_list.atmosphere.diagnostics"],
+                    },
+                    "surface": {"type": "output", "output_interval": "none"},
+                },
+            }
+        },
+        "post": {},
+        "scrubber": {"groups": {"forecast": {"streams": ["output", "diagnostics"]}}},
+        "user": {"lbcs": {"interval_hours": 6}},
+    }
+
+
+@fixture
+def graph_info(tmp_path):
+    path = tmp_path / "mesh.graph.info"
+    path.write_text(f"{CELLS} 2990\n2 3 4\n")
+    return path
+
+
+def test_cell_count(graph_info):
+    assert footprint.cell_count(graph_info) == CELLS
+
+
+def test_cycle_usage(config):
+    usage = footprint.cycle_usage(config, CELLS)
+    assert list(usage) == ["forecast", "mpas_ics", "mpas_lbcs", "mpassit", "upp"]
+    streams = footprint.stream_usage(config, CELLS)
+    assert usage["forecast"] == CELLS * 100 + sum(streams.values())
+    assert usage["mpas_ics"] == CELLS * 100
+    assert usage["mpas_lbcs"] == CELLS * 20 * 3
+    assert usage["mpassit"] == CELLS * 30 * 3
+    assert usage["upp"] == 2 * CELLS * 5 * 3
+
+
+def test_cycle_usage_forecast_only(config):
+    del config["create_lbcs"], config["post"]
+    assert list(footprint.cycle_usage(config, CELLS)) == ["forecast", "mpas_ics"]
+
+
+@mark.parametrize(
+    ("cycles", "peak", "retained", "quota", "expected"),
+    [
+        (10, 100, 10, 1000, 10),
+        (10, 100, 10, 460, 4),
+        (10, 100, 10, 100, 1),
+        (10, 100, 100, 100, 10),
+    ],
+)
+def test_cyclethrottle(cycles, expected, peak, quota, retained):
+    assert footprint.cyclethrottle(cycles, peak, retained, quota) == expected
+
+
+@mark.parametrize(
+    ("value", "expected"),
+    [(1024, 1024), ("500", 500), ("2K", 2048), ("1.5 GiB", 3 * 2**29), ("2t", 2 * 2**40)],
+)
+def test_parse_size(expected, value):
+    assert footprint.parse_size(value) == expected
+
+
+def test_parse_size_bad():
+    with raises(ValueError, match="Cannot parse size '2 apples'"):
+        footprint.parse_size("2 apples")
+
+
+def test_plan(caplog, config, graph_info):
+    caplog.set_level(logging.INFO)
+    assert footprint.plan(config, graph_info, 4, ["cold_start.yaml", "post.yaml"]) is None
+    assert f"Estimated disk usage per cycle for {CELLS} cells:" in caplog.text
+    assert "Total for 4 cycles:" in caplog.text
+
+
+def test_plan_ensemble(caplog, config, graph_info):
+    caplog.set_level(logging.INFO)
+    config["user"]["ensemble"] = {"members": 3}
+    assert footprint.plan(config, graph_info, 4, ["cold_start.yaml", "ensemble.yaml"]) is None
+    total = 4 * 3 * sum(footprint.cycle_usage(config, CELLS).values())
+    assert f"Total for 4 cycles: {footprint._human(total)}" in caplog.text
+
+
+def test_plan_missing_graph_info(caplog, config, tmp_path):
+    assert footprint.plan(config, tmp_path / "missing", 4, []) is None
+    assert "Cannot estimate disk usage without" in caplog.text
+
+
+def test_plan_quota(caplog, config, graph_info):
+    caplog.set_level(logging.INFO)
+    config["footprint"]["quota"] = "1G"
+    assert footprint.plan(config, graph_info, 4, ["scrubbing.yaml"]) == 4
+    assert "At most 4 active cycles" in caplog.text
+    assert "exceeds the quota" not in caplog.text
+
+
+def test_plan_quota_exceeded(caplog, config, graph_info):
+    config["footprint"]["quota"] = 1000
+    assert footprint.plan(config, graph_info, 4, ["scrubbing.yaml"]) == 1
+    assert "Estimated disk usage exceeds the quota even one cycle at a time" in caplog.text
+
+
+def test_scrubbed(config):
+    usage = footprint.cycle_usage(config, CELLS)
+    total = sum(usage.values())
+    assert footprint.scrubbed(config, usage, CELLS, ["post.yaml"]) == (total, total)
+    peak, retained = footprint.scrubbed(config, usage, CELLS, ["scrubbing.yaml"])
+    assert peak == total
+    assert retained == usage["mpas_lbcs"] + usage["upp"]
+    eager, eager_retained = footprint.scrubbed(
+        config, usage, CELLS, ["scrubbing.yaml", "scrubbing_leads.yaml"]
+    )
+    streams = footprint.stream_usage(config, CELLS)
+    assert eager == total - int(
+        (streams["output"] + streams["diagnostics"] + usage["mpassit"]) * 2 / 3
+    )
+    assert eager_retained == retained
+
+
+@mark.parametrize("blocks", [["scrubbing.yaml"], ["scrubbing.yaml", "scrubbing_leads.yaml"]])
+def test_scrubbed_members(blocks, config):
+    usage = footprint.cycle_usage(config, CELLS)
+    one = footprint.scrubbed(config, usage, CELLS, blocks)
+    three = footprint.scrubbed(
+        config, {name: size * 3 for name, size in usage.items()}, CELLS, blocks, members=3
+    )
+    # Only rounding to whole bytes differs.
+    assert three == approx((one[0] * 3, one[1] * 3), abs=3)
+
+
+def test_stream_usage(config):
+    usage = footprint.stream_usage(config, CELLS)
+    assert list(usage) == ["restart", "output", "diagnostics"]
+    assert usage["restart"] == CELLS * 200 * 2
+    # Four listed fields, half of them on all ten levels and half on one, in four-byte words.
+    assert usage["output"] == CELLS * int(4 * (0.5 * 10 + 0.5) * 4) * 3
+    assert usage["diagnostics"] == CELLS * 10 * 5
+
+
+def test_write_sizes(config):
+    assert footprint.write_sizes(config, CELLS) == {
+        "restart": CELLS * 200,
+        "output": CELLS * int(4 * (0.5 * 10 + 0.5) * 4),
+        "diagnostics": CELLS * 10,
+    }
+
+
+def test__human():
+    assert footprint._human(512) == "512.0 B"
+    assert footprint._human(3 * 2**30) == "3.0 GiB"
+    assert footprint._human(2**52) == "4096.0 TiB"
@@ -0,0 +1,82 @@
+from pytest import fixture, mark
+
+from ush import pio
+
+CELLS = 1000
+
+
+@fixture
+def config():
+    return {
+        "create_ics": {
+            "mpas_init": {"namelist": {"update_values": {"dimensions": {"config_nvertlevels": 9}}}}
+        },
+        "footprint": {"bytes_per_cell": {"restart": 200, "output": 50}, "share_3d": {}},
+        "forecast": {
+            "mpas": {
+                "execution": {"batchargs": {"cores": 64}},
+                "streams": {
+                    "restart": {"type": "input;output", "output_interval": "06:00:00"},
+                    "output": {"type": "output", "output_interval": "01:00:00"},
+                },
+            }
+        },
+        "pio": {"auto": True, "mb_per_iotask": 0.05},
+        "platform": {"cores_per_node": 8},
+    }
+
+
+@fixture
+def graph_info(tmp_path):
+    path = tmp_path / "mesh.graph.info"
+    path.write_text(f"{CELLS} 2990\n")
+    return path
+
+
+@mark.parametrize(
+    ("cores", "tasks_per_node", "write_bytes", "expected"),
+    [
+        (800, 40, 1, (1, 800)),
+        (800, 40, 3 * 2**20, (4, 200)),
+        (800, 40, 7 * 2**20, (10, 80)),
+        (800, 40, 2**40, (20, 40)),
+        (100, 40, 2 * 2**20, (3, 40)),
+        (64, 8, 0, (1, 64)),
+    ],
+)
+def test_layout(cores, expected, tasks_per_node, write_bytes):
+    iotasks, stride = pio.layout(cores, tasks_per_node, write_bytes, 2**20)
+    assert (iotasks, stride) == expected
+    assert (iotasks - 1) * stride < cores
+
+
+def test_plan(caplog, config, graph_info):
+    caplog.set_level("INFO")
+    # The 200,000-byte restart write at 0.05 MiB per I/O task wants four of the eight nodes.
+    assert pio.plan(config, graph_info) == {"config_pio_num_iotasks": 4, "config_pio_stride": 16}
+    assert "Using 4 PIO I/O tasks with stride 16 on 64 cores" in caplog.text
+
+
+def test_plan_batchargs(config, graph_info):
+    config["forecast"]["mpas"]["execution"]["batchargs"] = {"nodes": 2, "tasks_per_node": 32}
+    assert pio.plan(config, graph_info) == {"config_pio_num_iotasks": 2, "config_pio_stride": 32}
+
+
+@mark.parametrize("change", ["auto", "forecast"])
+def test_plan_disabled(change, config, graph_info):
+    if change == "auto":
+        config["pio"]["auto"] = False
+    else:
+        del config["forecast"]
+    assert pio.plan(config, graph_info) is None
+
+
+def test_plan_missing_graph_info(caplog, config, tmp_path):
+    assert pio.plan(config, tmp_path / "missing") is None
+    assert "Cannot choose a PIO layout without" in caplog.text
+
+
+def test_plan_no_node_layout(caplog, config, graph_info):
+    del config["platform"]["cores_per_node"]
+    assert pio.plan(config, graph_info) is None
+    assert "without tasks_per_node or cores_per_node" in caplog.text
@@ -0,0 +1,223 @@
+from pathlib import Path
+
+from pytest import fixture, raises
+
+from ush import postxconfig
+
+XML = """<?xml version="1.0"?>
+<postxml>
+    <paramset>
+    <datset>WRFTWO</datset>
+    <grid_num>4</grid_num>
+
+       <param>
+          <shortname>TMP_ON_ISOBARIC_SFC</shortname>
+          <level>50000. 85000.</level>
+       </param>
+
+       <param>
+          <shortname>REFC_ON_ENTIRE_ATMOS</shortname>
+       </param>
+
+    </paramset>
+
+    <paramset>
+    <datset>WRFNAT</datset>
+    <grid_num>4</grid_num>
+
+       <param>
+          <shortname>TKE_ON_HYBRID_LVL</shortname>
+       </param>
+
+    </paramset>
+
+</postxml>
+"""
+
+
+def field(shortname: str, pname: str, levels: list[str]) -> list[str]:
+    lines = ["1", shortname, "?", "1", "tmpl4_0", pname, "?", "?", "isobaric_sfc", "0", "?"]
+    lines += [str(len(levels)), " ".join(levels)]
+    return lines + ["?"] * (postxconfig.FIELD_LINES - len(lines))
+
+
+def header(datset: str) -> list[str]:
+    return [datset] + ["?"] * (postxconfig.HEADER_LINES - 1)
+
+
+@fixture
+def paramsets():
+    return [
+        (
+            "WRFTWO",
+            header("WRFTWO"),
+            [
+                field("TMP_ON_ISOBARIC_SFC", "TMP", ["50000.", "85000."]),
+                field("REFC_ON_ENTIRE_ATMOS", "REFC", []),
+            ],
+        ),
+        ("WRFNAT", header("WRFNAT"), [field("TKE_ON_HYBRID_LVL", "TKE", [])]),
+    ]
+
+
+@fixture
+def config(paramsets, tmp_path):
+    flat = tmp_path / "postxconfig-NT-test.txt"
+    postxconfig.write_flat(paramsets, flat)
+    xml = tmp_path / "test_postcntrl.xml"
+    xml.write_text(XML)
+    image_list = tmp_path / "image_list.yml"
+    image_list.write_text("hourly:\n  model: hrrr\n  variables:\n    cref:\n      - sfc\n")
+    specs = tmp_path / "specs.yml"
+    specs.write_text(
+        "cref:\n"
+        "  sfc:\n"
+        "    clevs: !!python/object/apply:numpy.arange [5, 76, 5]\n"
+        "    ncl_name:\n"
+        "      hrrr: REFC_P0_L10_{grid}\n"
+        "      rrfs: REFC_P0_L200_{grid}\n"
+    )
+    return {
+        "graphics": {"config": {"image_list": str(image_list), "specs_file": str(specs)}},
+        "post": {
+            "upp": {
+                "files_to_copy": {"postxconfig-NT.txt": str(flat)},
+                "files_to_link": {"postcntrl.xml": str(xml)},
+            }
+        },
+        "upp_products": {"graphics": False, "products": ["TMP_ON_ISOBARIC_SFC"]},
+    }
+
+
+def test_graphics_parameters(tmp_path):
+    image_list = tmp_path / "image_list.yml"
+    image_list.write_text(
+        """
+hourly:
+  model: hrrr
+  variables:
+    temp: [500mb, sfc]
+    cape: [sfc]
+    missing: [sfc]
+"""
+    )
+    specs = tmp_path / "specs.yml"
+    specs.write_text(
+        """
+cape:
+  sfc:
+    clevs: !join_ranges [[0, 100, 10]]
+    contours:
+      cin: {colors: white}
+    hatches:
+      lpl_agl: {alpha: 0.3}
+    ncl_name: CAPE_P0_L1_{grid}
+cin:
+  sfc:
+    ncl_name: CIN_P0_L1_{grid}
+lpl:
+  agl:
+    ncl_name: ["PLPL_P0_2L108_{grid}", 3]
+temp:
+  500mb:
+    ncl_name:
+      hrrr: TMP_P0_L100_{grid}
+      rap: TMP_P0_L100_GLC0
+    wind: true
+  sfc:
+    ncl_name:
+      rap: TMP_P0_L1_GLC0
+"""
+    )
+    assert postxconfig.graphics_parameters(image_list, specs) == {
+        "CAPE",
+        "CIN",
+        "PLPL",
+        "TMP",
+        "UGRD",
+        "VGRD",
+    }
+
+
+def test_plan(caplog, config, tmp_path):
+    caplog.set_level("INFO")
+    result = postxconfig.plan(config, tmp_path / "out")
+    assert result == {
+        "datsets": ["WRFTWO"],
+        "flat": str(tmp_path / "out" / "postxconfig-NT-test.txt"),
+        "xml": str(tmp_path / "out" / "test_postcntrl.xml"),
+    }
+    [(datset, _, fields)] = postxconfig.read_flat(Path(result["flat"]))
+    assert datset == "WRFTWO"
+    assert [f[1] for f in fields] == ["TMP_ON_ISOBARIC_SFC"]
+    xml = Path(result["xml"]).read_text()
+    assert "TMP_ON_ISOBARIC_SFC" in xml
+    assert "REFC_ON_ENTIRE_ATMOS" not in xml
+    assert "WRFNAT" not in xml
+    assert "Keeping 1 of 2 fields, 2 of 3 GRIB records, in WRFTWO" in caplog.text
+    assert "Keeping 0 of 1 fields, 0 of 1 GRIB records, in WRFNAT" in caplog.text
+
+
+def test_plan_graphics(config, tmp_path):
+    config["upp_products"] = {"graphics": True, "products": []}
+    result = postxconfig.plan(config, tmp_path / "out")
+    assert result is not None
+    [(_, _, fields)] = postxconfig.read_flat(Path(result["flat"]))
+    assert [f[1] for f in fields] == ["REFC_ON_ENTIRE_ATMOS"]
+
+
+def test_plan_bad_layout(caplog, config, tmp_path):
+    flat = Path(config["post"]["upp"]["files_to_copy"]["postxconfig-NT.txt"])
+    flat.write_text(flat.read_text() + "extra\n")
+    assert postxconfig.plan(config, tmp_path / "out") is None
+    assert "Unexpected layout of" in caplog.text
+
+
+def test_plan_disabled(config, tmp_path):
+    config["upp_products"]["products"] = []
+    assert postxconfig.plan(config, tmp_path / "out") is None
+    config["upp_products"]["products"] = ["TMP_ON_ISOBARIC_SFC"]
+    del config["post"]
+    assert postxconfig.plan(config, tmp_path / "out") is None
+
+
+def test_plan_missing_file(caplog, config, tmp_path):
+    Path(config["post"]["upp"]["files_to_link"]["postcntrl.xml"]).unlink()
+    assert postxconfig.plan(config, tmp_path / "out") is None
+    assert "Cannot prune UPP products without" in caplog.text
+
+
+def test_plan_no_match(caplog, config, tmp_path):
+    config["upp_products"]["products"] = ["NOTHING"]
+    assert postxconfig.plan(config, tmp_path / "out") is None
+    assert "No UPP fields match the requested products" in caplog.text
+
+
+def test_read_flat_write_flat(paramsets, tmp_path):
+    path = tmp_path / "postxconfig-NT.txt"
+    postxconfig.write_flat(paramsets, path)
+    lines = path.read_text().splitlines()
+    # The field counts are listed last paramset first.
+    assert lines[:3] == ["2", "1", "2"]
+    assert lines[3] == "WRFTWO"
+    assert postxconfig.read_flat(path) == paramsets
+
+
+def test_read_flat_bad_layout(tmp_path):
+    path = tmp_path / "postxconfig-NT.txt"
+    path.write_text("1\n2\nWRFTWO\n")
+    with raises(ValueError, match="Unexpected layout"):
+        postxconfig.read_flat(path)
+
+
+def test_records(paramsets):
+    assert postxconfig.records(paramsets[0][2]) == 3
+
+
+def test_subset_xml():
+    xml = postxconfig.subset_xml(XML, {"REFC_ON_ENTIRE_ATMOS", "TKE_ON_HYBRID_LVL"}, ["WRFNAT"])
+    assert "WRFTWO" not in xml
+    assert "REFC_ON_ENTIRE_ATMOS" not in xml
+    assert "<shortname>TKE_ON_HYBRID_LVL</shortname>" in xml
+    assert xml.startswith('<?xml version="1.0"?>\n<postxml>\n    <paramset>\n    <datset>WRFNAT')
+    assert xml.endswith("    </paramset>\n\n</postxml>\n")
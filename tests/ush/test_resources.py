@@ -0,0 +1,168 @@
+import sqlite3
+
+import yaml
+from pytest import approx, fixture, mark
+
+from ush import resources
+
+CELLS = 1000
+
+
+@fixture
+def config():
+    init = {"namelist": {"update_values": {"dimensions": {"config_nvertlevels": 10}}}}
+    model = {"bytes": 100, "core_seconds": 0.01, "overhead": 0}
+    return {
+        "create_ics": {"mpas_init": {"execution": {"batchargs": {"cores": 4}}, **init}},
+        "create_lbcs": {"mpas_init": {"execution": {"batchargs": {"cores": 4}}}},
+        "forecast": {
+            "mpas": {
+                "execution": {"batchargs": {"cores": 4, "walltime": "01:00:00"}},
+                "length": 6,
+                "namelist": {"update_values": {"nhyd_model": {"config_dt": 20.0}}},
+            }
+        },
+        "platform": {"cores_per_node": 8},
+        "post": {
+            "mpassit": {"execution": {"batchargs": {"cores": 4, "nodes": 1}}},
+            "upp": {"execution": {"batchargs": {"nodes": 1, "tasks_per_node": 4}}},
+        },
+        "resources": {
+            "margin": 1.5,
+            "model": {task: dict(model) for task in resources.TASKS},
+            "target_minutes": {"create_ics": 10, "create_lbcs": 20},
+            "throughput": 6,
+        },
+        "user": {"forecast": {"output_interval": 1}, "lbcs": {"interval_hours": 3}},
+    }
+
+
+@fixture
+def database(tmp_path):
+    path = tmp_path / "rocoto.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE jobs (taskname VARCHAR(64), cores INTEGER, state VARCHAR(64),"
+            " duration REAL)"
+        )
+        connection.executemany(
+            "INSERT INTO jobs VALUES (?, ?, ?, ?)",
+            [
+                ("mpas", 16, "SUCCEEDED", 700.0),
+                ("mpas", 32, "SUCCEEDED", 400.0),
+                ("mpas", 32, "DEAD", 10.0),
+                ("mpassit_006", 8, "SUCCEEDED", 60.0),
+                ("mpas_lbcs_01", 8, "SUCCEEDED", 60.0),
+                ("get_ics_data", 1, "SUCCEEDED", 60.0),
+            ],
+        )
+    return path
+
+
+@fixture
+def graph_info(tmp_path):
+    path = tmp_path / "mesh.graph.info"
+    path.write_text(f"{CELLS} 2990\n")
+    return path
+
+
+@mark.parametrize(
+    ("samples", "expected"),
+    [
+        ([(1000, 700), (500, 400)], (0.6, 100)),
+        ([(1000, 500)], (0.4, 100)),
+        ([(1000, 1000), (500, 400)], (700 / 750, 0)),
+        ([(1000, 50), (500, 50)], (0, 50)),
+    ],
+)
+def test_fit(expected, samples):
+    assert resources.fit(samples, 100) == approx(expected)
+
+
+def test_jobs(database):
+    found = resources.jobs(database)
+    assert found["forecast"] == [(16, 700.0), (32, 400.0)]
+    assert found["mpassit"] == [(8, 60.0)]
+    assert found["create_lbcs"] == []
+    assert found["upp"] == []
+
+
+def test_main(config, database, graph_info, tmp_path):
+    config["data"] = {"mesh_files": str(graph_info.parent)}
+    config["user"]["mesh_label"] = "mesh"
+    (tmp_path / "experiment.yaml").write_text(yaml.safe_dump(config))
+    resources.main([str(tmp_path), "--database", str(database)])
+    model = yaml.safe_load((tmp_path / "resources_fit.yaml").read_text())["resources"]["model"]
+    # 10,800,000 units of forecast work: 700 s on 16 cores and 400 s on 32.
+    assert model["forecast"]["core_seconds"] == approx(16 * 600 / 10_800_000)
+    assert model["forecast"]["overhead"] == 100
+    assert model["upp"] == config["resources"]["model"]["upp"]
+
+
+def test_plan(caplog, config, graph_info):
+    caplog.set_level("INFO")
+    planned = resources.plan(config, graph_info)
+    assert planned is not None
+    # 108,000 core-seconds of forecast in an hour needs 30 cores, or 4 nodes, and takes 3,375 s.
+    assert planned["forecast"] == {"cores": 32, "walltime": "01:25:00"}
+    assert planned["create_ics"] == {"cores": 8}
+    assert planned["create_lbcs"] == {"cores": 8}
+    assert planned["mpassit"] == {"cores": 8, "nodes": 1}
+    assert planned["upp"] == {"nodes": 1, "tasks_per_node": 8}
+    assert "Planned forecast: 32 cores on 4 nodes, 01:25:00 for an estimated 57 minutes" in (
+        caplog.text
+    )
+
+
+def test_plan_memory(config, graph_info):
+    # 10,800,000 units at 100 bytes with a 1.5 margin is about 1.5 GiB: two 1 GiB nodes.
+    config["platform"]["memory_per_node_gb"] = 1
+    config["resources"]["throughput"] = 0.1
+    planned = resources.plan(config, graph_info)
+    assert planned is not None
+    assert planned["forecast"]["cores"] == 16
+    # The memory each node needs is requested too.
+    assert planned["forecast"]["memory"] == "1G"
+    assert planned["mpassit"] == {"cores": 8, "memory": "1G", "nodes": 1}
+
+
+def test_plan_missing_graph_info(caplog, config, tmp_path):
+    assert resources.plan(config, tmp_path / "missing") is None
+    assert "Cannot plan resources without" in caplog.text
+
+
+def test_plan_no_cores_per_node(caplog, config, graph_info):
+    del config["platform"]["cores_per_node"]
+    assert resources.plan(config, graph_info) is None
+    assert "Cannot plan resources without platform.cores_per_node" in caplog.text
+
+
+def test_refit(caplog, config):
+    caplog.set_level("INFO")
+    del config["post"]
+    model = resources.refit(
+        config, CELLS, {"create_ics": [(10, 120.0)], "mpassit": [(8, 60.0)], "upp": []}
+    )
+    assert model["create_ics"]["core_seconds"] == approx(0.12)
+    assert model["mpassit"] == {"bytes": 100, "core_seconds": 0.01, "overhead": 0}
+    assert "Refit create_ics from 1 jobs" in caplog.text
+
+
+def test_targets(config):
+    assert resources.targets(config) == {
+        "create_ics": 600,
+        "create_lbcs": 1200,
+        "forecast": 3600,
+        "mpassit": 600,
+        "upp": 600,
+    }
+    del config["post"]
+    assert set(resources.targets(config)) == {"create_ics", "create_lbcs", "forecast"}
+
+
+@mark.parametrize(
+    ("task", "expected"),
+    [("create_ics", 10_000), ("create_lbcs", 30_000), ("forecast", 10_800_000), ("upp", 10_000)],
+)
+def test_units(config, expected, task):
+    assert resources.units(config, task, CELLS) == expected
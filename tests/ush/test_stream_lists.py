@@ -0,0 +1,141 @@
+from pathlib import Path
+
+from pytest import fixture, mark
+
+from ush import stream_lists
+
+CELLS = 1000
+
+
+@fixture
+def parmdir(tmp_path):
+    path = tmp_path / "mpassit"
+    path.mkdir()
+    (path / "diaglist").write_text("refl10cm_max  REFL_MAX\n\nt2m  T2\n")
+    (path / "histlist_2d").write_text("surface_pressure  PSFC\n")
+    (path / "histlist_3d").write_text("theta  THETA\nqv  QVAPOR\n")
+    (path / "histlist_3d.NSSL").write_text("nr  QRAIN\n")
+    return path
+
+
+@fixture
+def config(parmdir, tmp_path):
+    lists = tmp_path / "mpas"
+    lists.mkdir()
+    (lists / "stream_list.atmosphere.diagnostics").write_text("t2m\nq2\nrefl10cm_max\n")
+    (lists / "stream_list.atmosphere.output").write_text(
+        "initial_time\nxtime\nsurface_pressure\ntheta\nqv\nnr\nqc\nu\n"
+    )
+    (lists / "stream_list.atmosphere.surface").write_text("sst\nxice\n")
+    return {
+        "create_ics": {
+            "mpas_init": {"namelist": {"update_values": {"dimensions": {"config_nvertlevels": 9}}}}
+        },
+        "footprint": {"bytes_per_cell": {}, "share_3d": {"default": 0.5}},
+        "forecast": {
+            "mpas": {
+                "files_to_copy": {
+                    f"stream_list.atmosphere.{name}": str(lists / f"stream_list.atmosphere.{name}")
+                    for name in ("diagnostics", "output", "surface")
+                },
+                "streams": {
+                    "diagnostics": {
+                        "files": ["stream_list.atmosphere.diagnostics"],
+                        "output_interval": "01:00:00",
+                        "type": "output",
+                    },
+                    "output": {
+                        "files": ["stream_list.atmosphere.output"],
+                        "output_interval": "01:00:00",
+                        "type": "output",
+                    },
+                    "surface": {
+                        "files": ["stream_list.atmosphere.surface"],
+                        "filename_interval": "none",
+                        "type": "input",
+                    },
+                },
+            }
+        },
+        "post": {"mpassit": {"parmdir": str(parmdir)}},
+        "stream_lists": {
+            "consumers": {
+                "diagnostics": ["diaglist"],
+                "output": ["histlist_2d", "histlist_3d", "histlist_soil"],
+            },
+            "keep": ["initial_time", "xtime"],
+            "prune": True,
+        },
+    }
+
+
+@fixture
+def graph_info(tmp_path):
+    path = tmp_path / "mesh.graph.info"
+    path.write_text(f"{CELLS} 2990\n")
+    return path
+
+
+def test_consumed(parmdir):
+    assert stream_lists.consumed(parmdir, ["histlist_2d", "histlist_3d"]) == {
+        "surface_pressure",
+        "theta",
+        "qv",
+        "nr",
+    }
+
+
+def test_consumed_missing(caplog, parmdir):
+    assert stream_lists.consumed(parmdir, ["histlist_soil"]) is None
+    assert "Cannot prune stream lists without" in caplog.text
+
+
+def test_plan(caplog, config, graph_info, parmdir, tmp_path):
+    caplog.set_level("INFO")
+    (parmdir / "histlist_soil").write_text("tslb  TSLB\n")
+    pruned = stream_lists.plan(config, graph_info, tmp_path / "out")
+    assert pruned == {
+        "stream_list.atmosphere.diagnostics": str(
+            tmp_path / "out" / "stream_list.atmosphere.diagnostics"
+        ),
+        "stream_list.atmosphere.output": str(tmp_path / "out" / "stream_list.atmosphere.output"),
+    }
+    assert Path(pruned["stream_list.atmosphere.diagnostics"]).read_text() == "t2m\nrefl10cm_max\n"
+    assert Path(pruned["stream_list.atmosphere.output"]).read_text() == (
+        "initial_time\nxtime\nsurface_pressure\ntheta\nqv\nnr\n"
+    )
+    assert "Keeping 6 of 8 variables of stream_list.atmosphere.output" in caplog.text
+    assert "Pruning saves an estimated" in caplog.text
+    assert "per output write" in caplog.text
+    # The config itself still names the full stream lists.
+    assert config["forecast"]["mpas"]["files_to_copy"]["stream_list.atmosphere.output"] == str(
+        tmp_path / "mpas" / "stream_list.atmosphere.output"
+    )
+
+
+def test_plan_skips_stream(caplog, config, graph_info, tmp_path):
+    pruned = stream_lists.plan(config, graph_info, tmp_path / "out")
+    assert list(pruned) == ["stream_list.atmosphere.diagnostics"]
+    assert "Cannot prune stream lists without" in caplog.text
+
+
+def test_plan_missing_stream_list(caplog, config, graph_info, tmp_path):
+    (tmp_path / "mpas" / "stream_list.atmosphere.diagnostics").unlink()
+    assert stream_lists.plan(config, graph_info, tmp_path / "out") == {}
+    assert "Cannot prune missing stream list" in caplog.text
+
+
+@mark.parametrize("change", ["post", "prune"])
+def test_plan_disabled(change, config, graph_info, tmp_path):
+    if change == "post":
+        del config["post"]
+    else:
+        config["stream_lists"]["prune"] = False
+    assert stream_lists.plan(config, graph_info, tmp_path / "out") == {}
+    assert not (tmp_path / "out").exists()
+
+
+def test_report(config):
+    pruned = {"stream_list.atmosphere.diagnostics": "/no/such/list"}
+    # An unreadable stream list falls back to bytes_per_cell, here nothing, so saves everything.
+    assert stream_lists.report(config, pruned, CELLS) == CELLS * 3 * 4 * 5.5
@@ -0,0 +1,195 @@
+import sqlite3
+from datetime import datetime, timezone
+
+from pytest import approx, fixture
+
+from ush import telemetry
+
+CYCLE = int(datetime(2023, 9, 15, 12, tzinfo=timezone.utc).timestamp())
+
+WORKFLOW_LOG = """\
+Rocoto started
+2023-09-15 12:00:05 +0000 :: hfe01 :: Submission status of previously pending mpas is success, \
+jobid=101
+2023-09-15 12:10:05 +0000 :: hfe01 :: Task mpas, jobid=101, in state RUNNING (RUNNING)
+2023-09-15 12:30:05 +0000 :: hfe01 :: Task mpas, jobid=101, in state SUCCEEDED (COMPLETED), \
+ran for 1500.0 seconds, exit status=0, try=1 (of 2)
+2023-09-15 12:30:05 +0000 :: hfe01 :: Submission of mpassit_000 succeeded, jobid=102
+"""
+
+
+@fixture
+def experiment(tmp_path):
+    (tmp_path / "workflow.log").write_text(WORKFLOW_LOG)
+    with sqlite3.connect(tmp_path / "rocoto.db") as connection:
+        connection.execute(
+            "CREATE TABLE jobs (id INTEGER, jobid VARCHAR(64), taskname VARCHAR(64),"
+            " cycle DATETIME, cores INTEGER, state VARCHAR(64), native_state VARCHAR(64),"
+            " exit_status INTEGER, tries INTEGER, nunknowns INTEGER, duration REAL)"
+        )
+        connection.executemany(
+            "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (1, "101", "mpas", CYCLE, 32, "SUCCEEDED", "COMPLETED", 0, 1, 0, 1500.0),
+                (2, "102", "mpassit_000", CYCLE, 8, "QUEUED", "PENDING", None, 1, 0, None),
+            ],
+        )
+    log = tmp_path / "log"
+    log.mkdir()
+    (log / "mpas_2023091512.log").write_text(
+        "[2023-09-15T12:10:00]     INFO Staged /rundir/init.nc by hardlink in 0.5 s\n"
+        "[2023-09-15T12:10:01]     INFO Staged /rundir/lbc.nc by copy in 1.5 s\n"
+        "[2023-09-15T12:29:59]     INFO MPAS timings: setup 30.0 s, run 1450.0 s\n"
+    )
+    (log / "notes.log").write_text("MPAS timings: setup 1.0 s, run 1.0 s\n")
+    return tmp_path
+
+
+def rows(output, query):
+    with sqlite3.connect(output) as connection:
+        return connection.execute(query).fetchall()
+
+
+def test_collect(experiment):
+    output = experiment / "telemetry.db"
+    telemetry.collect(experiment, output)
+    assert rows(output, "SELECT * FROM jobs ORDER BY jobid") == [
+        (
+            "101",
+            "2023091512",
+            "mpas",
+            32,
+            "2023-09-15 12:00:05",
+            "2023-09-15 12:05:05",
+            "2023-09-15 12:30:05",
+            approx(300.0),
+            1500.0,
+            "SUCCEEDED",
+            0,
+            1,
+        ),
+        (
+            "102",
+            "2023091512",
+            "mpassit_000",
+            8,
+            "2023-09-15 12:30:05",
+            None,
+            None,
+            None,
+            None,
+            "QUEUED",
+            None,
+            1,
+        ),
+    ]
+    assert rows(output, "SELECT * FROM metrics ORDER BY name") == [
+        ("2023091512", "mpas", "MPAS.run_s", 1450.0),
+        ("2023091512", "mpas", "MPAS.setup_s", 30.0),
+        ("2023091512", "mpas", "staging_s", 2.0),
+    ]
+    [(cycle, jobs, turnaround, unsuccessful)] = rows(
+        output, "SELECT cycle, jobs, turnaround, unsuccessful FROM cycles"
+    )
+    assert (cycle, jobs, unsuccessful) == ("2023091512", 2, 1)
+    assert turnaround == approx(1800.0)
+
+
+def test_collect_incremental(experiment):
+    output = experiment / "telemetry.db"
+    telemetry.collect(experiment, output)
+    task_log = experiment / "log" / "mpas_2023091512.log"
+    with task_log.open("a") as f:
+        f.write("[2023-09-15T12:30:00]     INFO Staged /rundir/restart.nc by copy in 3.0 s\n")
+        f.write("[2023-09-15T12:30:01]     INFO Staged /rundir/partial")
+    with (experiment / "workflow.log").open("a") as f:
+        f.write(
+            "2023-09-15 13:00:05 +0000 :: hfe01 :: Task mpassit_000, jobid=102, in state DEAD"
+            " (FAILED), ran for 60.0 seconds, exit status=1, try=2 (of 2)\n"
+        )
+    with sqlite3.connect(experiment / "rocoto.db") as connection:
+        connection.execute(
+            "UPDATE jobs SET state = 'DEAD', exit_status = 1, tries = 2, duration = 60.0"
+            " WHERE jobid = '102'"
+        )
+    telemetry.collect(experiment, output)
+    # Lines already read are not counted again, and the partly written line is left for later.
+    assert rows(output, "SELECT value FROM metrics WHERE name = 'staging_s'") == [(5.0,)]
+    assert rows(
+        output,
+        "SELECT state, exit_status, tries, queue_wait FROM jobs WHERE jobid = '102'",
+    ) == [("DEAD", 1, 2, approx(1740.0))]
+
+
+def test_collect_rerun(experiment):
+    output = experiment / "telemetry.db"
+    telemetry.collect(experiment, output)
+    # A rerun replaces the task log with a shorter one.
+    (experiment / "log" / "mpas_2023091512.log").write_text(
+        "[2023-09-15T13:10:00]     INFO Staged /rundir/init.nc by hardlink in 0.5 s\n"
+    )
+    telemetry.collect(experiment, output)
+    assert rows(output, "SELECT name, value FROM metrics") == [("staging_s", 0.5)]
+
+
+def test_collect_rerun_longer(experiment):
+    output = experiment / "telemetry.db"
+    telemetry.collect(experiment, output)
+    # A rerun rewrites the task log in place with a longer one.
+    task_log = experiment / "log" / "mpas_2023091512.log"
+    task_log.write_text(
+        "[2023-09-15T13:10:00]     INFO Staged /rundir/init.nc by hardlink in 0.25 s\n"
+        "[2023-09-15T13:10:01]     INFO Staged /rundir/lbc.nc by copy in 0.75 s\n"
+        "[2023-09-15T13:29:59]     INFO MPAS timings: setup 20.0 s, run 1400.0 s\n"
+        "[2023-09-15T13:30:00]     INFO Staged /rundir/restart.nc by copy in 3.0 s\n"
+    )
+    telemetry.collect(experiment, output)
+    assert rows(output, "SELECT name, value FROM metrics ORDER BY name") == [
+        ("MPAS.run_s", 1400.0),
+        ("MPAS.setup_s", 20.0),
+        ("staging_s", 4.0),
+    ]
+
+
+def test_collect_old_files_table(experiment):
+    output = experiment / "telemetry.db"
+    with sqlite3.connect(output) as connection:
+        connection.execute("CREATE TABLE files (path TEXT PRIMARY KEY, offset INTEGER)")
+        connection.execute(
+            "INSERT INTO files VALUES (?, ?)", (str(experiment / "workflow.log"), 10**6)
+        )
+    telemetry.collect(experiment, output)
+    assert rows(output, "SELECT COUNT(*) FROM jobs WHERE submitted IS NOT NULL") == [(2,)]
+
+
+def test_main(experiment, tmp_path):
+    telemetry.main([str(experiment), "--output", str(tmp_path / "out.db")])
+    assert rows(tmp_path / "out.db", "SELECT COUNT(*) FROM jobs") == [(2,)]
+
+
+def test_new_lines(tmp_path):
+    path = tmp_path / "file.log"
+    with sqlite3.connect(":memory:") as connection:
+        connection.executescript(telemetry.SCHEMA)
+        assert telemetry.new_lines(connection, path) == []
+        path.write_text("a\nb\n")
+        assert telemetry.new_lines(connection, path) == ["a", "b"]
+        assert telemetry.new_lines(connection, path) == []
+        # A file rewritten smaller is read again from its start.
+        path.write_text("c\n")
+        assert telemetry.new_lines(connection, path) == ["c"]
+        # So is one rewritten no smaller, or replaced by another file that begins the same way.
+        path.write_text("d\ne\n")
+        assert telemetry.new_lines(connection, path) == ["d", "e"]
+        replacement = tmp_path / "replacement.log"
+        replacement.write_text("d\ne\n")
+        replacement.replace(path)
+        assert telemetry.new_lines(connection, path) == ["d", "e"]
+        assert telemetry.new_lines(connection, path) == []
+
+
+def test_scan_database_missing(caplog, tmp_path):
+    with sqlite3.connect(":memory:") as connection:
+        connection.executescript(telemetry.SCHEMA)
+        telemetry.scan_database(connection, tmp_path / "rocoto.db")
+    assert "No Rocoto database at" in caplog.text
@@ -55,6 +55,9 @@ def test_validate__user_first_and_last_cycle(config):
         (["cycle_frequency"], MSG.gt0, 0),
         (["cycle_frequency"], MSG.int, None),
         (["driver_validation_blocks"], MSG.str, [None]),
+        (["ensemble", "member"], MSG.ge0, -1),
+        (["ensemble", "members"], MSG.gt0, 0),
+        (["ensemble", "pack"], MSG.gt0, 0),
         (["first_cycle"], MSG.dt, None),
         (["ics", "external_model"], MSG.model, "FOO"),
         (["ics", "offset_hours"], MSG.ge0, -1),
@@ -136,6 +139,7 @@ def config(tmp_path):
         "user": {
             "cycle_frequency": 12,
             "driver_validation_blocks": ["forecast.mpas", "post.upp"],
+            "ensemble": {"member": 0, "member_data": True, "members": 3, "pack": 1},
             "experiment_dir": tmp_path,
             "first_cycle": datetime(2025, 4, 30, 12, tzinfo=timezone.utc),
             "ics": {"external_model": "GFS", "offset_hours": 0},
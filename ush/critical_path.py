@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+"""
+Find the critical path of an experiment's cycle through its Rocoto workflow.
+
+The task graph is built from the workflow block of the realized experiment.yaml, with metatasks
+expanded. Each task waits in the queue once its dependencies are met, then runs. Run times are the
+mean of the task's successful jobs in the Rocoto database, or its walltime if it has none, and
+queue waits are taken from the Rocoto log. The report gives each task's start, finish, and slack,
+the tasks on the critical path, and how much a speedup of each task would shorten the cycle.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.monitor import walltime
+
+_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) [+-]\d{4} :: \S+ :: (.*)$")
+_SUBMITTED = re.compile(
+    r"Submission (?:of|status of previously pending) (\S+) (?:succeeded|is success), jobid=(\S+)"
+)
+_SUCCEEDED = re.compile(r"Task (\S+), jobid=(\S+), in state SUCCEEDED .*ran for ([\d.]+) seconds")
+# The files that tasks wait on, and the tasks that write them: the forecast's readiness sentinels,
+# and the combined GRIB file of each lead time.
+_PRODUCERS = (
+    (re.compile(r"/forecast/[^/]+/\d+$"), lambda _: "mpas"),
+    (re.compile(r"/upp/[^/]+\.GrbF(\d+)$"), lambda m: f"combine_grib_{int(m[1]):03d}"),
+)
+
+
+def critical(times: dict[str, dict]) -> list[str]:
+    """
+    The tasks on the critical path, from the last task to finish back to the start of the cycle.
+
+    :param times: Each task's schedule, by name.
+    :return: The tasks in the order they run.
+    """
+    path: list[str] = []
+    name = max(times, key=lambda n: times[n]["finish"], default=None)
+    while name is not None:
+        path.insert(0, name)
+        name = max(times[name]["after"], key=lambda n: times[n]["finish"], default=None)
+    return path
+
+
+def durations(tasks: dict[str, dict], database: Path | None) -> dict[str, float]:
+    """
+    The run time in seconds of each task: the mean of its successful jobs, or else its walltime.
+
+    :param tasks: The expanded workflow tasks, by name.
+    :param database: Path to the experiment's Rocoto database, if there is one.
+    """
+    runs = defaultdict(list)
+    if database and database.is_file():
+        query = "SELECT taskname, duration FROM jobs WHERE state = 'SUCCEEDED'"
+        with sqlite3.connect(database) as connection:
+            for taskname, duration in connection.execute(query).fetchall():
+                if duration:
+                    runs[taskname].append(float(duration))
+    found = {}
+    for name, task in tasks.items():
+        if runs[name]:
+            found[name] = sum(runs[name]) / len(runs[name])
+        else:
+            found[name] = walltime(str(task.get("walltime", "0"))).total_seconds()
+            logging.info("No completed jobs of %s, using its walltime", name)
+    return found
+
+
+def expand(tasks: dict) -> tuple[dict[str, dict], dict[str, list[str]]]:
+    """
+    The tasks of a workflow's tasks block, with metatasks expanded.
+
+    :param tasks: The tasks block of the realized workflow.
+    :return: Each task's block, by name, and the names of the tasks in each metatask.
+    """
+    expanded: dict[str, dict] = {}
+    metatasks: dict[str, list[str]] = {}
+    for key, block in tasks.items():
+        if key.startswith("task_"):
+            expanded[key[len("task_") :]] = block
+        elif key.startswith("metatask_"):
+            var = {k: str(v).split() for k, v in block.get("var", {}).items()}
+            members = {k: v for k, v in block.items() if k not in ("attrs", "var")}
+            names: list[str] = []
+            for values in zip(*var.values()):
+                inner, nested = expand(_substitute(members, dict(zip(var, values))))
+                if block.get("attrs", {}).get("mode") == "serial" and names:
+                    # Each task of a serial metatask also waits on the one before it.
+                    first = next(iter(inner))
+                    previous = {"taskdep_serial": {"attrs": {"task": names[-1]}}}
+                    dependency = {"and": {**previous, **(inner[first].get("dependency") or {})}}
+                    inner[first] = {**inner[first], "dependency": dependency}
+                expanded.update(inner)
+                metatasks.update(nested)
+                names += inner
+            metatasks[key[len("metatask_") :]] = names
+    return expanded, metatasks
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Report the critical path of an experiment's cycle.
+    """
+    use_uwtools_logger()
+    parser = argparse.ArgumentParser(
+        description="Find the critical path of an experiment's cycle through its workflow."
+    )
+    parser.add_argument("experiment_dir", type=Path, help="Path to the experiment directory.")
+    parser.add_argument(
+        "--database", type=Path, help="Path to the Rocoto database, rocoto.db by default."
+    )
+    parser.add_argument("--log", type=Path, help="Path to the Rocoto log, workflow.log by default.")
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=10.0,
+        help="Percent by which to shorten each task's run time when reporting its effect.",
+    )
+    args = parser.parse_args(argv)
+    config = get_yaml_config(args.experiment_dir / "experiment.yaml")
+    config.dereference()
+    tasks, metatasks = expand(config["workflow"]["tasks"])
+    report(
+        tasks,
+        metatasks,
+        durations(tasks, args.database or args.experiment_dir / "rocoto.db"),
+        queue_waits(args.log or args.experiment_dir / "workflow.log"),
+        args.speedup,
+    )
+
+
+def queue_waits(log: Path) -> dict[str, float]:
+    """
+    The mean queue wait in seconds of each task's successful jobs in a Rocoto log.
+
+    Rocoto logs a job's submission and, when it next finds the job done, its run time, so the wait
+    also includes the time until Rocoto next runs after the job ends.
+
+    :param log: Path to the Rocoto log.
+    """
+    if not log.is_file():
+        logging.warning("No Rocoto log at %s, so no queue waits", log)
+        return {}
+    submitted = {}
+    waits = defaultdict(list)
+    for line in log.read_text().splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        time = datetime.strptime(match[1], "%Y-%m-%d %H:%M:%S")  # noqa: DTZ007
+        if event := _SUBMITTED.search(match[2]):
+            submitted[event[2]] = time
+        elif (event := _SUCCEEDED.search(match[2])) and event[2] in submitted:
+            elapsed = (time - submitted[event[2]]).total_seconds()
+            waits[event[1]].append(max(0.0, elapsed - float(event[3])))
+    return {name: sum(values) / len(values) for name, values in waits.items()}
+
+
+def report(
+    tasks: dict[str, dict],
+    metatasks: dict[str, list[str]],
+    runs: dict[str, float],
+    waits: dict[str, float],
+    speedup: float,
+) -> dict[str, dict]:
+    """
+    Log the schedule and critical path of a cycle, and the effect of speeding up each task.
+
+    :param tasks: The expanded workflow tasks, by name.
+    :param metatasks: The names of the tasks in each metatask.
+    :param runs: The run time in seconds of each task.
+    :param waits: The queue wait in seconds of each task.
+    :param speedup: The percent by which to shorten each task's run time.
+    :return: Each task's schedule, and the cycle time saved by its speedup, by name.
+    """
+    times = schedule(tasks, metatasks, runs, waits)
+    turnaround = max((t["finish"] for t in times.values()), default=0.0)
+    logging.info("Cycle turnaround: %s minutes", _minutes(turnaround))
+    logging.info(
+        "%-24s %8s %8s %8s %8s %8s %8s",
+        "task",
+        "wait",
+        "run",
+        "start",
+        "finish",
+        "slack",
+        "saves",
+    )
+    for name, t in sorted(times.items(), key=lambda item: (item[1]["start"], item[0])):
+        faster = {**runs, name: runs[name] * (1 - speedup / 100)}
+        shorter = schedule(tasks, metatasks, faster, waits)
+        t["saves"] = turnaround - max(s["finish"] for s in shorter.values())
+        logging.info(
+            "%-24s %8s %8s %8s %8s %8s %8s",
+            name,
+            *[_minutes(t[k]) for k in ("wait", "run", "start", "finish", "slack", "saves")],
+        )
+    logging.info("Critical path: %s", " -> ".join(critical(times)))
+    logging.info("Times are in minutes; saves is the turnaround saved by a %s%% speedup", speedup)
+    return times
+
+
+def schedule(
+    tasks: dict[str, dict],
+    metatasks: dict[str, list[str]],
+    runs: dict[str, float],
+    waits: dict[str, float],
+) -> dict[str, dict]:
+    """
+    The earliest schedule of a cycle's tasks, from its start, and each task's slack.
+
+    A task starts running after its queue wait, once its dependency is met: when all of the
+    dependencies of an and are met, and when the first of an or is. Data written by a known task,
+    such as a readiness sentinel or a combined GRIB file, is taken to be ready when that task
+    finishes. Dependencies on other data or on times are outside the graph and taken as met, so an
+    or of a task and such data waits for the task.
+
+    :param tasks: The expanded workflow tasks, by name.
+    :param metatasks: The names of the tasks in each metatask.
+    :param runs: The run time in seconds of each task.
+    :param waits: The queue wait in seconds of each task.
+    :return: The wait, run, start, and finish times, the slack, and the tasks the start waits on,
+        of each task, by name.
+    """
+    times: dict[str, dict] = {}
+    order: list[str] = []
+
+    def visit(name: str) -> float:
+        if name not in times:
+            dependency = tasks[name].get("dependency") or {}
+            ready = _ready(dependency, metatasks, tasks, visit)
+            if ready is None and dependency:
+                logging.warning("%s waits only on dependencies outside the graph", name)
+            at, after = ready or (0.0, [])
+            wait = waits.get(name, 0.0)
+            times[name] = {
+                "after": after,
+                "finish": at + wait + runs[name],
+                "run": runs[name],
+                "start": at + wait,
+                "wait": wait,
+            }
+            order.append(name)
+        finish: float = times[name]["finish"]
+        return finish
+
+    for name in tasks:
+        visit(name)
+    turnaround = max((t["finish"] for t in times.values()), default=0.0)
+    latest = dict.fromkeys(times, turnaround)
+    # Tasks are visited after the tasks they wait on, so the reverse order visits successors first.
+    for name in reversed(order):
+        t = times[name]
+        t["slack"] = latest[name] - t["finish"]
+        for before in t["after"]:
+            latest[before] = min(latest[before], latest[name] - t["run"] - t["wait"])
+    return times
+
+
+# Private
+
+
+def _minutes(seconds: float) -> str:
+    """
+    Seconds as minutes, for the report.
+    """
+    return f"{seconds / 60:.1f}"
+
+
+def _ready(dependency: dict, metatasks: dict, tasks: dict, visit) -> tuple[float, list] | None:
+    """
+    The time a dependency is met, and the tasks it waits on, or None if it is outside the graph.
+    """
+    found: list[tuple[float, list]] = []
+    for key, value in dependency.items():
+        kind = key.split("_")[0]
+        if kind in ("and", "or"):
+            inner = [
+                r
+                for k, v in value.items()
+                if (r := _ready({k: v}, metatasks, tasks, visit)) is not None
+            ]
+            if inner and kind == "or":
+                inner = [min(inner, key=lambda r: r[0])]
+            found += inner
+        elif kind == "taskdep" and value["attrs"]["task"] in tasks:
+            name = value["attrs"]["task"]
+            found.append((visit(name), [name]))
+        elif kind == "datadep" and (name := _producer(value, tasks)):
+            found.append((visit(name), [name]))
+        elif kind == "metataskdep" and metatasks.get(value["attrs"]["metatask"]):
+            names = metatasks[value["attrs"]["metatask"]]
+            found.append((max(visit(n) for n in names), names))
+    if not found:
+        return None
+    return max(r[0] for r in found), [n for r in found for n in r[1]]
+
+
+def _producer(datadep: dict, tasks: dict) -> str | None:
+    """
+    The task in the graph that writes the file a data dependency waits on, if known.
+    """
+    path = datadep.get("value", "")
+    if isinstance(path, dict):
+        path = path.get("cyclestr", {}).get("value", "")
+    for pattern, producer in _PRODUCERS:
+        if (match := pattern.search(str(path))) and (name := producer(match)) in tasks:
+            return name
+    return None
+
+
+def _substitute(value, var: dict[str, str]):
+    """
+    A metatask member's keys and values, with each #name# of its variables replaced.
+    """
+    if isinstance(value, dict):
+        return {_substitute(k, var): _substitute(v, var) for k, v in value.items()}
+    if isinstance(value, str):
+        for name, replacement in var.items():
+            value = value.replace(f"#{name}#", replacement)
+    return value
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
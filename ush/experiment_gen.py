@@ -4,6 +4,8 @@
 Creates the experiment directory and populates it with necessary configuration and workflow files.
 """
 
+from __future__ import annotations
+
 import argparse
 import inspect
 import logging
@@ -20,9 +22,32 @@ from uwtools.api.logging import use_uwtools_logger
 
 sys.path.append(str(Path(__file__).parent.parent))
 
+from ush import footprint, pio, postxconfig, resources, stream_lists
 from ush.validation import Config, validate
 
 
+def app_config(experiment_config: YAMLConfig, mpas_app: Path) -> YAMLConfig:
+    """
+    A copy of the experiment config with paths in the app resolved.
+    """
+    # The app's location is only set in the config once realized.
+    config = YAMLConfig(experiment_config.as_dict())
+    config.update_from({"user": {"mpas_app": str(mpas_app)}})
+    config.dereference()
+    return config
+
+
+def chain_segments(workflow_config: YAMLConfig, unsegmented: YAMLConfig) -> None:
+    """
+    Make the forecast segments wait on whatever task_mpas waits on without them, and task_mpas on
+    the segments alone.
+    """
+    tasks = workflow_config["workflow"]["tasks"]
+    dependency = unsegmented["workflow"]["tasks"]["task_mpas"]["dependency"]
+    tasks["metatask_mpas_segments"]["task_mpas_segment_#segment#"]["dependency"] = dependency
+    tasks["task_mpas"]["dependency"] = {"metataskdep": {"attrs": {"metatask": "mpas_segments"}}}
+
+
 def create_grid_files(expt_dir: Path, mesh_file_path: Path, nprocs: int) -> None:
     """
     Stage the mesh file in the experiment directory and decompose them for the current experiment.
@@ -51,12 +76,42 @@ def generate_workflow_files(
     """
     Generate the Rocoto XML and the experiment YAML.
     """
+    pruned = prune_stream_lists(experiment_config, mpas_app, validated)
+    if pruned:
+        # Applied to the experiment config too, so the estimates below see the pruned streams.
+        for config in (experiment_config, user_config):
+            config.update_from({"forecast": {"mpas": {"files_to_copy": pruned}}})
+    upp_control = prune_upp_products(experiment_config, mpas_app, validated)
+    if upp_control:
+        inputs = app_config(experiment_config, mpas_app)["post"]["combine"]["inputs"]
+        update = {
+            "combine": {"inputs": [i for i in inputs if i in upp_control["datsets"]]},
+            "upp": {
+                "control_file": upp_control["flat"],
+                "files_to_copy": {"postxconfig-NT.txt": upp_control["flat"]},
+                "files_to_link": {"postcntrl.xml": upp_control["xml"]},
+            },
+        }
+        for config in (experiment_config, user_config):
+            config.update_from({"post": update})
     workflow_blocks = [mpas_app / "parm" / "wflow" / b for b in validated.user.workflow_blocks]
-    workflow_config = get_yaml_config({})
-    for block in workflow_blocks:
-        workflow_config.update_from(get_yaml_config(block))
-    for config in (experiment_config, user_config):
-        workflow_config.update_from(config)
+    configs = [experiment_config, user_config]
+    workflow_config = merge_workflow(workflow_blocks, configs)
+    if "forecast_segments.yaml" in validated.user.workflow_blocks:
+        others = [b for b in workflow_blocks if b.name != "forecast_segments.yaml"]
+        chain_segments(workflow_config, merge_workflow(others, configs))
+    throttle = plan_disk_usage(experiment_config, validated)
+    user_attrs = user_config.get("workflow", {}).get("attrs", {})
+    if throttle is not None and "cyclethrottle" not in user_attrs:
+        logging.info("Setting cyclethrottle to %s", throttle)
+        workflow_config["workflow"]["attrs"]["cyclethrottle"] = throttle
+    io_layout = plan_io_layout(experiment_config, validated)
+    user_mpas = user_config.get("forecast", {}).get("mpas", {})
+    user_io = user_mpas.get("namelist", {}).get("update_values", {}).get("io", {})
+    if io_layout is not None and not set(io_layout) & set(user_io):
+        workflow_config.update_from(
+            {"forecast": {"mpas": {"namelist": {"update_values": {"io": io_layout}}}}}
+        )
     validate_driver_blocks(validated.user.driver_validation_blocks, workflow_config)
     realize(
         input_config=workflow_config,
@@ -82,6 +137,18 @@ def main():
     stage_grid_files(experiment_config, experiment_dir, validated)
 
 
+def merge_workflow(workflow_blocks: list[Path], configs: list[YAMLConfig]) -> YAMLConfig:
+    """
+    Merge workflow blocks, in order, then the given configs over them.
+    """
+    workflow_config = get_yaml_config({})
+    for block in workflow_blocks:
+        workflow_config.update_from(get_yaml_config(block))
+    for config in configs:
+        workflow_config.update_from(config)
+    return workflow_config
+
+
 def parse_args() -> list[Path]:
     """
     Parse command-line arguments.
@@ -94,6 +161,48 @@ def parse_args() -> list[Path]:
     return [Path(p) for p in parser.parse_args().user_config_files]
 
 
+def plan_disk_usage(experiment_config: YAMLConfig, validated: Config) -> int | None:
+    """
+    Estimate per-cycle disk usage and, given a quota, the cycle throttle that respects it.
+    """
+    user = validated.user
+    graph_info = Path(experiment_config["data"]["mesh_files"]) / f"{user.mesh_label}.graph.info"
+    cycles = int((user.last_cycle - user.first_cycle) / timedelta(hours=user.cycle_frequency)) + 1
+    return footprint.plan(experiment_config, graph_info, cycles, user.workflow_blocks)
+
+
+def plan_io_layout(experiment_config: YAMLConfig, validated: Config) -> dict[str, int] | None:
+    """
+    Choose the forecast's PIO layout from its core count, node layout, and output volume.
+    """
+    graph_info = (
+        Path(experiment_config["data"]["mesh_files"]) / f"{validated.user.mesh_label}.graph.info"
+    )
+    return pio.plan(experiment_config, graph_info)
+
+
+def plan_resources(experiment_config: YAMLConfig, user_config: YAMLConfig, mpas_app: Path) -> dict:
+    """
+    Plan task resources from the mesh and forecast, for the tasks no user config sets them for.
+    """
+    if "resources" not in experiment_config:
+        return {}
+    config = app_config(experiment_config, mpas_app)
+    graph_info = Path(config["data"]["mesh_files"]) / f"{config['user']['mesh_label']}.graph.info"
+    planned = resources.plan(config, graph_info)
+    if not planned or not config["resources"]["auto"]:
+        return {}
+    update: dict = {}
+    for task, values in planned.items():
+        section, driver = resources.TASKS[task][0]
+        user_block = user_config.get(section, {}).get(driver, {})
+        if set(user_block.get("execution", {}).get("batchargs", {})) & set(resources.RESOURCE_KEYS):
+            logging.info("Using the %s resources set in a user config", task)
+            continue
+        update.setdefault(section, {})[driver] = {"execution": {"batchargs": values}}
+    return update
+
+
 def prepare_configs(user_config_files: list[Path]) -> tuple[YAMLConfig, YAMLConfig, Path]:
     """
     Combine base, user, platform, and external model configs into one experiment config.
@@ -119,10 +228,34 @@ def prepare_configs(user_config_files: list[Path]) -> tuple[YAMLConfig, YAMLConf
     # Make sure user_config is last to override any settings from supplementals
     for supp_config in (platform_config, user_config):
         experiment_config.update_from(supp_config)
+    # Planned before dereferencing, so that values derived from a task's cores follow the plan.
+    experiment_config.update_from(plan_resources(experiment_config, user_config, mpas_app))
     experiment_config.dereference()
     return experiment_config, user_config, mpas_app
 
 
+def prune_stream_lists(
+    experiment_config: YAMLConfig, mpas_app: Path, validated: Config
+) -> dict[str, str]:
+    """
+    Write the forecast's stream list files pruned to the variables post-processing reads.
+    """
+    config = app_config(experiment_config, mpas_app)
+    user = validated.user
+    graph_info = Path(config["data"]["mesh_files"]) / f"{user.mesh_label}.graph.info"
+    return stream_lists.plan(config, graph_info, user.experiment_dir / "stream_lists")
+
+
+def prune_upp_products(
+    experiment_config: YAMLConfig, mpas_app: Path, validated: Config
+) -> dict | None:
+    """
+    Write the UPP control files pruned to the requested products.
+    """
+    config = app_config(experiment_config, mpas_app)
+    return postxconfig.plan(config, validated.user.experiment_dir / "upp_control")
+
+
 def required_nprocs(experiment_config: YAMLConfig) -> list[int]:
     """
     Get the processor count required for relevant workflow sections.
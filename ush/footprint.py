@@ -0,0 +1,230 @@
+"""
+Estimate the scratch disk an experiment's cycles will use, and the cycle throttle that keeps the
+experiment within a quota.
+
+Sizes are modeled as bytes per mesh cell. MPAS output streams that list their fields in a stream
+list file are sized from the number of fields, a share of which are taken to have a value on every
+vertical level. Other files use per-kind bytes-per-cell estimates from the footprint config, which
+can be calibrated against the footprint.json written by scripts/scrub.py for a real cycle.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from scripts.streams import interval
+
+UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40, "P": 2**50}
+WORD = 4  # Bytes per value in MPAS output written in single precision.
+
+
+def cell_count(graph_info: Path) -> int:
+    """
+    The number of cells in a mesh, from the header line of its METIS graph file.
+
+    :param graph_info: Path to the graph.info file.
+    """
+    with graph_info.open() as f:
+        return int(f.readline().split()[0])
+
+
+def cycle_usage(config: dict, cells: int) -> dict[str, int]:
+    """
+    The bytes each directory of a cycle holds once every task has run, without scrubbing.
+
+    :param config: The dereferenced experiment config.
+    :param cells: The number of mesh cells.
+    """
+    sizes = config["footprint"]["bytes_per_cell"]
+    length = timedelta(hours=int(config["forecast"]["mpas"]["length"]))
+    usage = {"forecast": cells * sizes["init"], "mpas_ics": cells * sizes["init"]}
+    usage["forecast"] += sum(stream_usage(config, cells).values())
+    if "create_lbcs" in config:
+        every = timedelta(hours=int(config["user"]["lbcs"]["interval_hours"]))
+        usage["mpas_lbcs"] = cells * sizes["lbc"] * (length // every + 1)
+    if "post" in config:
+        leads = int(length.total_seconds()) // (6 * 3600) + 1
+        usage["mpassit"] = cells * sizes["mpassit"] * leads
+        # UPP writes its GRIB files, which are then concatenated into a combined copy.
+        usage["upp"] = 2 * cells * sizes["upp"] * leads
+    return dict(sorted(usage.items()))
+
+
+def cyclethrottle(cycles: int, peak: int, retained: int, quota: int) -> int:
+    """
+    The most cycles that can be active at once without exceeding the quota.
+
+    Every finished cycle keeps its retained bytes, and every active cycle may reach its peak.
+
+    :param cycles: The number of cycles in the experiment.
+    :param peak: The most bytes one cycle holds while it runs.
+    :param retained: The bytes one cycle keeps after scrubbing.
+    :param quota: The disk quota in bytes.
+    """
+    spare = quota - cycles * retained
+    growth = peak - retained
+    if growth <= 0:
+        return cycles
+    return max(1, min(cycles, spare // growth))
+
+
+def parse_size(value: int | str) -> int:
+    """
+    Convert a size like 500G or 2.5T, in powers of 1024, to bytes.
+
+    :param value: The size, either in bytes or as a string with an optional unit suffix.
+    :raises: ValueError for an unrecognized size.
+    """
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGTP]?)i?B?\s*", str(value), re.IGNORECASE)
+    if not match:
+        msg = f"Cannot parse size '{value}'"
+        raise ValueError(msg)
+    number, unit = match.groups()
+    return int(float(number) * UNITS[unit.upper()])
+
+
+def plan(config: dict, graph_info: Path, cycles: int, workflow_blocks: list[str]) -> int | None:
+    """
+    Log the estimated disk usage of the experiment and recommend a cycle throttle.
+
+    :param config: The dereferenced experiment config.
+    :param graph_info: Path to the mesh's graph.info file.
+    :param cycles: The number of cycles in the experiment.
+    :param workflow_blocks: The workflow blocks in use.
+    :return: The cycle throttle that keeps usage within the configured quota, if there is one.
+    """
+    if not graph_info.is_file():
+        logging.warning("Cannot estimate disk usage without %s", graph_info)
+        return None
+    cells = cell_count(graph_info)
+    usage = cycle_usage(config, cells)
+    members = 1
+    if "ensemble.yaml" in workflow_blocks:
+        # Every member fills its own copy of the cycle's directories.
+        members = int(config["user"]["ensemble"]["members"])
+        usage = {name: size * members for name, size in usage.items()}
+    peak, retained = scrubbed(config, usage, cells, workflow_blocks, members)
+    logging.info("Estimated disk usage per cycle for %s cells:", cells)
+    for name, size in usage.items():
+        logging.info("  %-10s %s", name, _human(size))
+    logging.info("  %-10s %s", "peak", _human(peak))
+    logging.info("  %-10s %s", "retained", _human(retained))
+    quota = config["footprint"].get("quota")
+    if quota is None:
+        logging.info("Total for %s cycles: %s", cycles, _human(cycles * peak))
+        return None
+    limit = parse_size(quota)
+    throttle = cyclethrottle(cycles, peak, retained, limit)
+    expected = cycles * retained + throttle * (peak - retained)
+    logging.info(
+        "At most %s active cycles keep usage to %s of the %s quota",
+        throttle,
+        _human(expected),
+        _human(limit),
+    )
+    if expected > limit:
+        logging.warning("Estimated disk usage exceeds the quota even one cycle at a time")
+    return throttle
+
+
+def scrubbed(
+    config: dict, usage: dict[str, int], cells: int, workflow_blocks: list[str], members: int = 1
+) -> tuple[int, int]:
+    """
+    The peak bytes a cycle holds while it runs, and the bytes it keeps, given the scrubbing in use.
+
+    :param config: The dereferenced experiment config.
+    :param usage: The bytes in each directory of the cycle, without scrubbing, for all members.
+    :param cells: The number of mesh cells.
+    :param workflow_blocks: The workflow blocks in use.
+    :param members: The number of ensemble members, each scrubbing its own forecast output.
+    """
+    peak = sum(usage.values())
+    if "scrubbing.yaml" not in workflow_blocks:
+        return peak, peak
+    streams = {name: size * members for name, size in stream_usage(config, cells).items()}
+    scrubbed_forecast = cells * config["footprint"]["bytes_per_cell"]["init"] * members + sum(
+        streams.values()
+    )
+    retained = peak - scrubbed_forecast - usage["mpas_ics"] - usage.get("mpassit", 0)
+    if "scrubbing_leads.yaml" in workflow_blocks:
+        # Only the lead times still waiting on MPASSIT hold forecast output, and only those still
+        # waiting on UPP or their archive task hold MPASSIT output.
+        leads = int(config["forecast"]["mpas"]["length"]) // 6 + 1
+        live = min(1.0, int(config["footprint"]["live_leads"]) / leads)
+        groups = config["scrubber"]["groups"]["forecast"]["streams"]
+        eager = sum(size for name, size in streams.items() if name in groups)
+        peak -= int((eager + usage.get("mpassit", 0)) * (1 - live))
+    return peak, retained
+
+
+def stream_usage(config: dict, cells: int) -> dict[str, int]:
+    """
+    The bytes written over a forecast by each MPAS output stream.
+
+    :param config: The dereferenced experiment config.
+    :param cells: The number of mesh cells.
+    """
+    mpas = config["forecast"]["mpas"]
+    length = timedelta(hours=int(mpas["length"]))
+    usage = {}
+    for name, size in write_sizes(config, cells).items():
+        # Restart files are not written at the initial time.
+        files = length // interval(str(mpas["streams"][name]["output_interval"]))
+        usage[name] = size * (files + (0 if name == "restart" else 1))
+    return usage
+
+
+def write_sizes(config: dict, cells: int) -> dict[str, int]:
+    """
+    The bytes each MPAS output stream writes at each of its output times.
+
+    :param config: The dereferenced experiment config.
+    :param cells: The number of mesh cells.
+    """
+    footprint = config["footprint"]
+    mpas = config["forecast"]["mpas"]
+    # The forecast takes its vertical levels from the initial conditions.
+    init = config["create_ics"]["mpas_init"]["namelist"]["update_values"]
+    levels = int(init["dimensions"]["config_nvertlevels"]) + 1
+    staged = {**mpas.get("files_to_copy", {}), **mpas.get("files_to_link", {})}
+    sizes = {}
+    for name, stream in mpas["streams"].items():
+        every = str(stream.get("output_interval", "none"))
+        if "output" not in stream["type"] or every in ("none", "initial_only"):
+            continue
+        fields = _fields(stream, staged)
+        if fields:
+            share = float(footprint["share_3d"].get(name, footprint["share_3d"]["default"]))
+            per_cell = int(fields * (share * levels + 1 - share) * WORD)
+        else:
+            per_cell = footprint["bytes_per_cell"].get(name, 0)
+        sizes[name] = cells * per_cell
+    return sizes
+
+
+# Private
+
+
+def _fields(stream: dict, staged: dict) -> int:
+    """
+    The number of fields named in a stream's stream list files, if they can be read.
+    """
+    count = 0
+    for name in stream.get("files", []):
+        path = Path(staged.get(name, name))
+        if not path.is_file():
+            return 0
+        count += sum(1 for line in path.read_text().splitlines() if line.strip())
+    return count
+
+
+def _human(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            break
+        size /= 1024
+    return f"{size:.1f} {unit}"
@@ -1,9 +1,21 @@
 #!/bin/bash
 
+# Usage: output_is_available_for.sh forecast_dir start_time lead_time output_interval [sentinel_dir]
+#
+# Succeeds once the forecast output for the lead time is available. Where the readiness watcher, or
+# "scripts/mpas.py --readiness", keeps a sentinel directory in the forecast rundir, this is a single
+# test of the lead time's sentinel, with no command forked. Otherwise the output valid one interval
+# later must exist, which shows the model has moved on from the lead time.
+
 forecast_dir="$1"
 start_time="$2"
 lead_time="$3"
 output_interval="$4"
+sentinel_dir="$forecast_dir/${5:-ready}"
+
+printf -v sentinel "%s/%03d" "$sentinel_dir" "$(( 10#$lead_time ))"
+[[ -f $sentinel ]] && exit 0
+[[ -d $sentinel_dir ]] && exit 1
 
 check_time=$(( "10#$lead_time" + "10#$output_interval" ))
 
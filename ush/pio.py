@@ -0,0 +1,72 @@
+"""
+Choose the MPAS parallel I/O layout for a forecast: how many MPI tasks write its output, and how
+far apart they are.
+
+PIO gathers each field onto the I/O tasks, which write it with parallel netCDF. Too few I/O tasks
+funnel every write through a few ranks, and too many make each write small and contend for the
+filesystem. The layout gives each I/O task about a target volume of the largest stream written at
+one output time, with at most one I/O task per node and the I/O tasks spread evenly across nodes.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import TYPE_CHECKING
+
+from ush.footprint import cell_count, write_sizes
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+MB = 2**20
+
+
+def layout(cores: int, tasks_per_node: int, write_bytes: int, target: int) -> tuple[int, int]:
+    """
+    The number of I/O tasks and the stride between them.
+
+    The number of I/O tasks is rounded up to a divisor of the node count, so the I/O tasks are on
+    evenly spaced nodes.
+
+    :param cores: The number of MPI tasks.
+    :param tasks_per_node: The number of MPI tasks on each node.
+    :param write_bytes: The bytes of the largest stream written at one output time.
+    :param target: The bytes each I/O task should write.
+    """
+    nodes = math.ceil(cores / tasks_per_node)
+    iotasks = max(1, min(nodes, math.ceil(write_bytes / target)))
+    while nodes % iotasks:
+        iotasks += 1
+    return iotasks, nodes // iotasks * tasks_per_node
+
+
+def plan(config: dict, graph_info: Path) -> dict[str, int] | None:
+    """
+    Log the estimated output volume of the forecast and choose its PIO layout.
+
+    :param config: The dereferenced experiment config.
+    :param graph_info: Path to the mesh's graph.info file.
+    :return: The namelist io values, if a layout can be chosen.
+    """
+    settings = config.get("pio", {})
+    if not settings.get("auto") or "forecast" not in config:
+        return None
+    batchargs = config["forecast"]["mpas"]["execution"]["batchargs"]
+    tasks_per_node = batchargs.get("tasks_per_node") or config["platform"].get("cores_per_node")
+    if not tasks_per_node:
+        logging.warning("Cannot choose a PIO layout without tasks_per_node or cores_per_node")
+        return None
+    if not graph_info.is_file():
+        logging.warning("Cannot choose a PIO layout without %s", graph_info)
+        return None
+    cores = int(batchargs.get("cores") or batchargs["nodes"] * batchargs["tasks_per_node"])
+    sizes = write_sizes(config, cell_count(graph_info))
+    largest = max(sizes.values(), default=0)
+    for name, size in sizes.items():
+        logging.info("Estimated %s output per write: %.1f MiB", name, size / MB)
+    iotasks, stride = layout(
+        cores, int(tasks_per_node), largest, int(float(settings["mb_per_iotask"]) * MB)
+    )
+    logging.info("Using %s PIO I/O tasks with stride %s on %s cores", iotasks, stride, cores)
+    return {"config_pio_num_iotasks": iotasks, "config_pio_stride": stride}
@@ -0,0 +1,196 @@
+"""
+Prune the UPP control files to the products an experiment uses.
+
+UPP computes and writes every field in its flat control file, the postxconfig-NT file generated
+from a postcntrl XML file. A pruned copy of each keeps the fields named in a list of products, by
+UPP short name, and, optionally, every field of a GRIB parameter the graphics plot. Paramsets left
+without fields are dropped, along with their files from the GRIB combine step.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from pathlib import Path
+
+import yaml
+
+# Lines in the header of each paramset, and in each of its fields, in a postxconfig-NT file.
+HEADER_LINES = 16
+FIELD_LINES = 42
+
+_PARAM = re.compile(
+    r"^[ \t]*<param>.*?<shortname>(.*?)</shortname>.*?</param>[ \t]*\n(?:[ \t]*\n)?",
+    re.DOTALL | re.MULTILINE,
+)
+_PARAMSET = re.compile(
+    r"^[ \t]*<paramset>.*?<datset>(.*?)</datset>.*?</paramset>[ \t]*\n(?:[ \t]*\n)?",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+class _Loader(yaml.SafeLoader):
+    """
+    Loads pygraf YAML, leaving out the values of its custom tags, which only configure plots.
+    """
+
+
+_Loader.add_multi_constructor("", lambda *_: None)
+
+
+def graphics_parameters(image_list: Path, specs_file: Path) -> set[str]:
+    """
+    The GRIB parameters, such as TMP, of the fields the graphics in an image list plot.
+
+    Each plot's ncl_name, wind barbs, and the fields of its contours and hatches are included.
+
+    :param image_list: Path to the pygraf image list.
+    :param specs_file: Path to the pygraf specs file.
+    """
+    specs = yaml.load(specs_file.read_text(), Loader=_Loader)  # noqa: S506
+    names = set()
+    for group in yaml.load(image_list.read_text(), Loader=_Loader).values():  # noqa: S506
+        model = group.get("model")
+        for var, levels in group.get("variables", {}).items():
+            for level in levels:
+                spec = specs.get(var, {}).get(level) or {}
+                names |= _ncl_names(spec, model)
+                for key in (*spec.get("contours", {}), *spec.get("hatches", {})):
+                    # A key names another variable at the same level, or at the level after an _.
+                    other, other_level = (key, level) if key in specs else key.rsplit("_", 1)
+                    names |= _ncl_names(specs.get(other, {}).get(other_level) or {}, model)
+                if spec.get("wind"):
+                    names |= {"UGRD", "VGRD"}
+    return {name.split("_")[0] for name in names}
+
+
+def plan(config: dict, outdir: Path) -> dict | None:
+    """
+    Write pruned copies of the UPP control files, and log the GRIB records they save.
+
+    :param config: The dereferenced experiment config.
+    :param outdir: The directory to write the pruned control files to.
+    :return: The paths to the pruned flat and XML control files, and the paramsets they keep.
+    """
+    settings = config.get("upp_products", {})
+    if "post" not in config or not (settings.get("products") or settings.get("graphics")):
+        return None
+    upp = config["post"]["upp"]
+    flat = Path(upp["files_to_copy"]["postxconfig-NT.txt"])
+    xml = Path(upp["files_to_link"]["postcntrl.xml"])
+    for path in (flat, xml):
+        if not path.is_file():
+            logging.warning("Cannot prune UPP products without %s", path)
+            return None
+    parameters = set()
+    if settings.get("graphics") and "graphics" in config:
+        graphics = config["graphics"]["config"]
+        parameters = graphics_parameters(Path(graphics["image_list"]), Path(graphics["specs_file"]))
+    products = set(settings.get("products", []))
+    try:
+        paramsets = read_flat(flat)
+    except ValueError as e:
+        logging.warning("Cannot prune UPP products: %s", e)
+        return None
+    pruned = []
+    for datset, header, fields in paramsets:
+        kept = [f for f in fields if f[1] in products or f[5] in parameters]
+        logging.info(
+            "Keeping %s of %s fields, %s of %s GRIB records, in %s",
+            len(kept),
+            len(fields),
+            records(kept),
+            records(fields),
+            datset,
+        )
+        if kept:
+            pruned.append((datset, header, kept))
+    if not pruned:
+        logging.warning("No UPP fields match the requested products")
+        return None
+    outdir.mkdir(parents=True, exist_ok=True)
+    datsets = [datset for datset, _, _ in pruned]
+    shortnames = {field[1] for _, _, fields in pruned for field in fields}
+    paths = {"flat": outdir / flat.name, "xml": outdir / xml.name}
+    write_flat(pruned, paths["flat"])
+    paths["xml"].write_text(subset_xml(xml.read_text(), shortnames, datsets))
+    logging.info("Wrote pruned UPP control files to %s", outdir)
+    return {**{k: str(v) for k, v in paths.items()}, "datsets": datsets}
+
+
+def read_flat(path: Path) -> list[tuple[str, list[str], list[list[str]]]]:
+    """
+    The paramsets in a postxconfig-NT file.
+
+    :param path: Path to the file.
+    :return: The name, header lines, and lines of each field, of each paramset.
+    """
+    lines = path.read_text().splitlines()
+    count = int(lines[0])
+    # The field count of each paramset is listed before the paramsets, last paramset first.
+    counts = [int(line) for line in reversed(lines[1 : count + 1])]
+    paramsets = []
+    pos = count + 1
+    for n in counts:
+        header = lines[pos : pos + HEADER_LINES]
+        pos += HEADER_LINES
+        fields = [lines[pos + i * FIELD_LINES : pos + (i + 1) * FIELD_LINES] for i in range(n)]
+        pos += n * FIELD_LINES
+        paramsets.append((header[0], header, fields))
+    if pos != len(lines):
+        msg = f"Unexpected layout of {path}: {len(lines)} lines, {pos} in its paramsets"
+        raise ValueError(msg)
+    return paramsets
+
+
+def records(fields: list[list[str]]) -> int:
+    """
+    The number of GRIB records a list of fields writes, one for each of their levels.
+
+    :param fields: The lines of each field in a postxconfig-NT file.
+    """
+    # The 12th line of a field is its number of levels, where 0 means a single-level field.
+    return sum(max(1, int(field[11])) for field in fields)
+
+
+def subset_xml(text: str, shortnames: set[str], datsets: list[str]) -> str:
+    """
+    A postcntrl XML file keeping only some params and paramsets.
+
+    :param text: The XML file's contents.
+    :param shortnames: The short names of the params to keep.
+    :param datsets: The names of the paramsets to keep.
+    """
+    text = _PARAM.sub(lambda m: m.group(0) if m.group(1) in shortnames else "", text)
+    return _PARAMSET.sub(lambda m: m.group(0) if m.group(1) in datsets else "", text)
+
+
+def write_flat(paramsets: list[tuple[str, list[str], list[list[str]]]], path: Path) -> None:
+    """
+    Write paramsets to a postxconfig-NT file.
+
+    :param paramsets: The name, header lines, and lines of each field, of each paramset.
+    :param path: Path to the file.
+    """
+    lines = [str(len(paramsets))]
+    lines += [str(len(fields)) for _, _, fields in reversed(paramsets)]
+    for _, header, fields in paramsets:
+        lines += header
+        for field in fields:
+            lines += field
+    path.write_text("\n".join(lines) + "\n")
+
+
+# Private
+
+
+def _ncl_names(spec: dict, model: str | None) -> set[str]:
+    """
+    The NCL names of the fields a pygraf spec plots, for a model if it names one.
+    """
+    name = spec.get("ncl_name")
+    if isinstance(name, dict):
+        name = name.get(model) or list(name.values())
+    if isinstance(name, str):
+        return {name}
+    return {n for n in name or [] if isinstance(n, str)}
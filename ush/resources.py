@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+"""
+Plan the cores, nodes, and walltime of the experiment's main tasks from the mesh and forecast, and
+refit the cost model behind the plan from an experiment's completed jobs.
+
+Each task's run time is modeled as a fixed overhead plus its work over its cores, where a unit of
+work is one mesh cell on one vertical level, once for each forecast time step, LBC time, or, for
+the other tasks, once per job. Cores are chosen so the forecast runs at a target throughput, the
+per-lead-time MPASSIT and UPP jobs keep pace with it, and the init tasks take a target time, on
+whole nodes with enough memory for the task.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+import yaml
+from uwtools.api.config import get_yaml_config
+from uwtools.api.logging import use_uwtools_logger
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ush.footprint import cell_count
+
+GB = 2**30
+
+# The driver block of each planned task, and the Rocoto task names of its jobs.
+TASKS = {
+    "create_ics": (("create_ics", "mpas_init"), r"mpas_ics"),
+    "create_lbcs": (("create_lbcs", "mpas_init"), r"mpas_lbcs"),
+    "forecast": (("forecast", "mpas"), r"mpas"),
+    "mpassit": (("post", "mpassit"), r"mpassit_\d+"),
+    "upp": (("post", "upp"), r"upp_\d+"),
+}
+RESOURCE_KEYS = ("cores", "memory", "nodes", "tasks_per_node", "walltime")
+
+
+def batchargs(config: dict, task: str) -> dict:
+    """
+    The batchargs of a task's driver block.
+
+    :param config: The experiment config.
+    :param task: The planned task.
+    """
+    section, driver = TASKS[task][0]
+    values: dict = config[section][driver]["execution"]["batchargs"]
+    return values
+
+
+def fit(samples: list[tuple[float, float]], overhead: float) -> tuple[float, float]:
+    """
+    Fit a task's cost model to its jobs by least squares.
+
+    With too few distinct jobs to fit both, the overhead is kept and only the core-seconds per unit
+    are fit, as they are with no overhead when the fitted overhead is negative. Run times that do
+    not fall with more cores per unit of work are all overhead.
+
+    :param samples: Each job's units of work per core, and its run time in seconds.
+    :param overhead: The task's current overhead in seconds.
+    :return: The core-seconds per unit and the overhead in seconds.
+    """
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in samples)
+    if sxx > 0:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / sxx
+        intercept = mean_y - slope * mean_x
+        if slope <= 0:
+            return 0.0, mean_y
+        if intercept >= 0:
+            return slope, intercept
+        overhead = 0.0
+    return max(0.0, (mean_y - overhead) / mean_x), overhead
+
+
+def jobs(database: Path) -> dict[str, list[tuple[int, float]]]:
+    """
+    The cores and run time in seconds of each successful job of the planned tasks.
+
+    :param database: Path to the experiment's Rocoto database.
+    """
+    query = "SELECT taskname, cores, duration FROM jobs WHERE state = 'SUCCEEDED'"
+    with sqlite3.connect(database) as connection:
+        rows = connection.execute(query).fetchall()
+    found: dict[str, list[tuple[int, float]]] = {task: [] for task in TASKS}
+    for taskname, cores, duration in rows:
+        for task, (_, pattern) in TASKS.items():
+            if re.fullmatch(pattern, taskname) and cores and duration:
+                found[task].append((int(cores), float(duration)))
+    return found
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Refit the cost model from an experiment's completed jobs, and write it for use in a user
+    config.
+    """
+    use_uwtools_logger()
+    parser = argparse.ArgumentParser(
+        description="Refit the resource planner's cost model from an experiment's jobs."
+    )
+    parser.add_argument("experiment_dir", type=Path, help="Path to the experiment directory.")
+    parser.add_argument(
+        "--database", type=Path, help="Path to the Rocoto database, rocoto.db by default."
+    )
+    args = parser.parse_args(argv)
+    config = get_yaml_config(args.experiment_dir / "experiment.yaml")
+    config.dereference()
+    graph_info = Path(config["data"]["mesh_files"]) / f"{config['user']['mesh_label']}.graph.info"
+    model = refit(
+        config, cell_count(graph_info), jobs(args.database or args.experiment_dir / "rocoto.db")
+    )
+    path = args.experiment_dir / "resources_fit.yaml"
+    path.write_text(yaml.safe_dump({"resources": {"model": model}}))
+    logging.info("Wrote the refit cost model to %s", path)
+
+
+def plan(config: dict, graph_info: Path) -> dict[str, dict] | None:
+    """
+    Log the planned resources of each task, from the cost model.
+
+    :param config: The dereferenced experiment config.
+    :param graph_info: Path to the mesh's graph.info file.
+    :return: The planned batchargs of each task in the config.
+    """
+    settings = config.get("resources", {})
+    cores_per_node = config["platform"].get("cores_per_node")
+    if not cores_per_node:
+        logging.warning("Cannot plan resources without platform.cores_per_node")
+        return None
+    if not graph_info.is_file():
+        logging.warning("Cannot plan resources without %s", graph_info)
+        return None
+    cells = cell_count(graph_info)
+    memory = config["platform"].get("memory_per_node_gb")
+    planned = {}
+    for task, target in targets(config).items():
+        model = settings["model"][task]
+        work = units(config, task, cells)
+        seconds = max(target - model["overhead"], 1.0)
+        cores = max(1, math.ceil(model["core_seconds"] * work / seconds))
+        nodes = math.ceil(cores / cores_per_node)
+        need = model["bytes"] * work * settings["margin"] / GB
+        if memory:
+            nodes = max(nodes, math.ceil(need / memory))
+        cores = nodes * cores_per_node
+        estimate = model["overhead"] + model["core_seconds"] * work / cores
+        walltime = math.ceil(estimate * settings["margin"] / 300) * 300
+        values = {
+            "cores": cores,
+            "nodes": nodes,
+            "tasks_per_node": cores_per_node,
+            "walltime": "%02d:%02d:00" % divmod(walltime // 60, 60),
+        }
+        current = batchargs(config, task)
+        # Only the keys the task's batchargs already use are set, and the memory per node.
+        planned[task] = {k: v for k, v in values.items() if k in current}
+        if memory:
+            planned[task]["memory"] = f"{max(1, math.ceil(need / nodes))}G"
+        logging.info(
+            "Planned %s: %s cores on %s nodes, %s for an estimated %s minutes",
+            task,
+            cores,
+            nodes,
+            values["walltime"],
+            math.ceil(estimate / 60),
+        )
+    return planned
+
+
+def refit(
+    config: dict, cells: int, found: dict[str, list[tuple[int, float]]]
+) -> dict[str, dict[str, float]]:
+    """
+    Refit the cost model of each task with completed jobs.
+
+    :param config: The dereferenced experiment config the jobs ran with.
+    :param cells: The number of mesh cells.
+    :param found: The cores and run time of each job, by task.
+    :return: The cost model, refit for each task with jobs.
+    """
+    model: dict[str, dict[str, float]] = config["resources"]["model"]
+    for task, runs in found.items():
+        if not runs or task not in targets(config):
+            continue
+        work = units(config, task, cells)
+        core_seconds, overhead = fit(
+            [(work / cores, seconds) for cores, seconds in runs], model[task]["overhead"]
+        )
+        logging.info(
+            "Refit %s from %s jobs: %.3g core-seconds per unit, %.0f s overhead",
+            task,
+            len(runs),
+            core_seconds,
+            overhead,
+        )
+        model[task] = {**model[task], "core_seconds": core_seconds, "overhead": round(overhead)}
+    return model
+
+
+def targets(config: dict) -> dict[str, float]:
+    """
+    The target run time in seconds of each task in the config.
+
+    :param config: The dereferenced experiment config.
+    """
+    settings = config["resources"]
+    hours = float(config["forecast"]["mpas"]["length"])
+    interval = float(config["user"]["forecast"]["output_interval"])
+    seconds = {
+        "forecast": hours * 3600 / settings["throughput"],
+        # Each lead time's job should finish before the forecast reaches the next output time.
+        "mpassit": interval * 3600 / settings["throughput"],
+        "upp": interval * 3600 / settings["throughput"],
+        **{task: 60 * minutes for task, minutes in settings["target_minutes"].items()},
+    }
+    return {task: seconds[task] for task, (path, _) in TASKS.items() if path[0] in config}
+
+
+def units(config: dict, task: str, cells: int) -> float:
+    """
+    The units of work of one job of a task: mesh cells times vertical levels, for each forecast
+    time step or LBC time.
+
+    :param config: The dereferenced experiment config.
+    :param task: The planned task.
+    :param cells: The number of mesh cells.
+    """
+    init = config["create_ics"]["mpas_init"]["namelist"]["update_values"]
+    work = cells * int(init["dimensions"]["config_nvertlevels"])
+    if task == "forecast":
+        mpas = config["forecast"]["mpas"]
+        dt = float(mpas["namelist"]["update_values"]["nhyd_model"]["config_dt"])
+        return work * float(mpas["length"]) * 3600 / dt
+    if task == "create_lbcs":
+        lbcs = config["user"]["lbcs"]
+        return work * (int(config["forecast"]["mpas"]["length"]) // int(lbcs["interval_hours"]) + 1)
+    return work
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
@@ -0,0 +1,103 @@
+"""
+Prune the forecast's MPAS output stream lists to the variables that post-processing reads.
+
+MPASSIT reads only the variables named in the first column of its variable lists, one set of lists
+for each stream it reads, and everything downstream of it, UPP and the graphics, sees only what
+MPASSIT interpolates. A pruned copy of each stream list file keeps the variables named in any of
+the stream's lists, or any variant of them for another microphysics scheme, and those configured
+to be kept regardless.
+"""
+
+from __future__ import annotations
+
+import logging
+from copy import deepcopy
+from pathlib import Path
+
+from ush.footprint import cell_count, write_sizes
+
+
+def consumed(parmdir: Path, lists: list[str]) -> set[str] | None:
+    """
+    The MPAS variables named in a set of MPASSIT variable lists.
+
+    :param parmdir: The directory holding the lists.
+    :param lists: The list file names, each also read with any suffixed variants.
+    :return: The variable names, or None if a list is missing.
+    """
+    names: set[str] = set()
+    for name in lists:
+        paths = sorted({parmdir / name, *parmdir.glob(f"{name}.*")})
+        if not any(path.is_file() for path in paths):
+            logging.warning("Cannot prune stream lists without %s", parmdir / name)
+            return None
+        for path in paths:
+            if path.is_file():
+                names.update(
+                    line.split()[0] for line in path.read_text().splitlines() if line.strip()
+                )
+    return names
+
+
+def plan(config: dict, graph_info: Path, outdir: Path) -> dict[str, str]:
+    """
+    Write pruned copies of the forecast's stream list files, and log the output they save.
+
+    :param config: The dereferenced experiment config.
+    :param graph_info: Path to the mesh's graph.info file.
+    :param outdir: The directory to write the pruned stream list files to.
+    :return: The path to each pruned stream list file, by the name the forecast copies it to.
+    """
+    settings = config.get("stream_lists", {})
+    if not settings.get("prune") or "post" not in config:
+        return {}
+    mpas = config["forecast"]["mpas"]
+    staged = mpas.get("files_to_copy", {})
+    parmdir = Path(config["post"]["mpassit"]["parmdir"])
+    pruned = {}
+    for stream, lists in settings["consumers"].items():
+        needed = consumed(parmdir, lists)
+        if needed is None:
+            continue
+        needed |= set(settings.get("keep", []))
+        for name in mpas["streams"][stream].get("files", []):
+            src = Path(staged.get(name, name))
+            if not src.is_file():
+                logging.warning("Cannot prune missing stream list %s", src)
+                continue
+            names = [line.strip() for line in src.read_text().splitlines() if line.strip()]
+            kept = [n for n in names if n in needed]
+            dst = outdir / name
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            dst.write_text("".join(f"{n}\n" for n in kept))
+            logging.info("Keeping %s of %s variables of %s in %s", len(kept), len(names), name, dst)
+            pruned[name] = str(dst)
+    if pruned and graph_info.is_file():
+        report(config, pruned, cell_count(graph_info))
+    return pruned
+
+
+def report(config: dict, pruned: dict[str, str], cells: int) -> int:
+    """
+    Log the estimated bytes that pruned stream lists save at each output time of each stream.
+
+    :param config: The dereferenced experiment config.
+    :param pruned: The path to each pruned stream list file, by the name the forecast copies it to.
+    :param cells: The number of mesh cells.
+    :return: The bytes saved over the forecast.
+    """
+    before = write_sizes(config, cells)
+    after_config = deepcopy(config)
+    after_config["forecast"]["mpas"]["files_to_copy"].update(pruned)
+    after = write_sizes(after_config, cells)
+    saved = 0
+    for stream, size in before.items():
+        if after[stream] < size:
+            logging.info(
+                "Pruning saves an estimated %.1f of %.1f MiB per %s write",
+                (size - after[stream]) / 2**20,
+                size / 2**20,
+                stream,
+            )
+            saved += size - after[stream]
+    return saved
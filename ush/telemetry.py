@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+"""
+Collect workflow telemetry from an experiment's Rocoto log, Rocoto database, and task logs.
+
+Each scan reads only what the logs have gained since the last one, and stores the submit, start,
+and end times, queue wait, state, exit status, and tries of every job, and the metrics the run
+scripts log, such as driver timings, in a SQLite database for dashboards and trend queries.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from uwtools.api.logging import use_uwtools_logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, offset INTEGER, inode INTEGER, head TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+  jobid TEXT PRIMARY KEY, cycle TEXT, task TEXT, cores INTEGER, submitted TEXT, started TEXT,
+  ended TEXT, queue_wait REAL, duration REAL, state TEXT, exit_status INTEGER, tries INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+  cycle TEXT, task TEXT, name TEXT, value REAL, PRIMARY KEY (cycle, task, name)
+);
+CREATE VIEW IF NOT EXISTS cycles AS SELECT
+  cycle, COUNT(*) AS jobs, MIN(submitted) AS submitted, MAX(ended) AS ended,
+  (julianday(MAX(ended)) - julianday(MIN(submitted))) * 86400 AS turnaround,
+  SUM(queue_wait) AS queue_wait, SUM(duration) AS duration, SUM(tries > 1) AS retried,
+  SUM(state != 'SUCCEEDED') AS unsuccessful
+  FROM jobs WHERE cycle IS NOT NULL GROUP BY cycle;
+"""
+
+# The most leading bytes of a file checksummed to tell whether it was rewritten since it was read.
+HEAD = 1024
+
+# Metrics the run scripts log: a pattern, the metric names of its groups, and whether the values
+# of a job's matching lines are summed, rather than the last one kept.
+METRICS = [
+    (r"(\w+) timings: setup ([\d.]+) s, run ([\d.]+) s", ("{0}.setup_s", "{0}.run_s"), False),
+    (r"Staged \S+ by \w+ in ([\d.]+) s", ("staging_s",), True),
+    (r"Disk footprint of \S+: ([\d.]+) GiB", ("footprint_gib",), False),
+    (r": Archived (\d+) files to", ("archived_files",), True),
+]
+
+_ADD_METRIC = (
+    "INSERT INTO metrics VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (cycle, task, name) DO UPDATE SET value = value + excluded.value"
+)
+_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d [+-]\d{4}) :: \S+ :: (.*)$")
+_SET_METRIC = (
+    "INSERT INTO metrics VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (cycle, task, name) DO UPDATE SET value = excluded.value"
+)
+_STATE = re.compile(
+    r"Task (\S+), jobid=(\S+), in state (\w+) \([^)]*\)(?:, ran for ([\d.]+) seconds)?"
+    r"(?:, exit status=(-?\d+))?(?:, try=(\d+))?"
+)
+_SUBMITTED = re.compile(
+    r"Submission (?:of|status of previously pending) (\S+) (?:succeeded|is success), jobid=(\S+)"
+)
+_TASK_LOG = re.compile(r"(.+)_(\d{10})\.log")
+
+
+def collect(experiment_dir: Path, output: Path, database: Path | None = None) -> None:
+    """
+    Scan an experiment's logs and Rocoto database into a telemetry database.
+
+    :param experiment_dir: Path to the experiment directory.
+    :param output: Path to the telemetry database, created if needed.
+    :param database: Path to the Rocoto database, rocoto.db in the experiment directory by default.
+    """
+    with sqlite3.connect(output) as connection:
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(files)")]
+        if columns and "head" not in columns:
+            # Files recorded without what identifies them are read again from their start.
+            connection.execute("DROP TABLE files")
+        connection.executescript(SCHEMA)
+        scan_workflow_log(connection, experiment_dir / "workflow.log")
+        scan_database(connection, database or experiment_dir / "rocoto.db")
+        for path in sorted((experiment_dir / "log").glob("*.log")):
+            scan_task_log(connection, path)
+        count = connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    logging.info("Telemetry for %s jobs in %s", count, output)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Collect an experiment's workflow telemetry.
+    """
+    use_uwtools_logger()
+    parser = argparse.ArgumentParser(
+        description="Collect workflow telemetry from an experiment's Rocoto and task logs."
+    )
+    parser.add_argument("experiment_dir", type=Path, help="Path to the experiment directory.")
+    parser.add_argument(
+        "--database", type=Path, help="Path to the Rocoto database, rocoto.db by default."
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Path to the telemetry database, telemetry.db by default."
+    )
+    args = parser.parse_args(argv)
+    collect(args.experiment_dir, args.output or args.experiment_dir / "telemetry.db", args.database)
+
+
+def new_lines(connection: sqlite3.Connection, path: Path) -> list[str]:
+    """
+    The complete lines a file has gained since it was last read, recording how far it was read.
+
+    A file that has since been replaced, truncated, or rewritten is read again from its start.
+
+    :param connection: The telemetry database.
+    :param path: Path to the file.
+    """
+    if not path.is_file():
+        return []
+    offset = _offset(connection, path)
+    with path.open("rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # A partly written last line is left for the next scan.
+    data = data[: data.rfind(b"\n") + 1]
+    offset += len(data)
+    connection.execute(
+        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+        (str(path), offset, path.stat().st_ino, _head(path, offset)),
+    )
+    return data.decode(errors="replace").splitlines()
+
+
+def scan_database(connection: sqlite3.Connection, database: Path) -> None:
+    """
+    Update the jobs with their cycle, cores, state, exit status, tries, and run time from the
+    Rocoto database.
+
+    :param connection: The telemetry database.
+    :param database: Path to the Rocoto database.
+    """
+    if not database.is_file():
+        logging.warning("No Rocoto database at %s", database)
+        return
+    query = "SELECT jobid, cycle, taskname, cores, state, exit_status, tries, duration FROM jobs"
+    with sqlite3.connect(database) as rocoto:
+        rows = rocoto.execute(query).fetchall()
+    for jobid, cycle, task, cores, state, exit_status, tries, duration in rows:
+        connection.execute(
+            "INSERT INTO jobs (jobid, cycle, task, cores, state, exit_status, tries, duration)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (jobid) DO UPDATE SET"
+            " cycle = excluded.cycle, cores = excluded.cores, state = excluded.state,"
+            " exit_status = COALESCE(excluded.exit_status, exit_status),"
+            " tries = COALESCE(excluded.tries, tries),"
+            " duration = COALESCE(excluded.duration, duration)",
+            (
+                str(jobid),
+                datetime.fromtimestamp(cycle, tz=timezone.utc).strftime("%Y%m%d%H"),
+                task,
+                cores,
+                state,
+                exit_status,
+                tries,
+                duration,
+            ),
+        )
+
+
+def scan_task_log(connection: sqlite3.Connection, path: Path) -> None:
+    """
+    Store the metrics in the new lines of a task log, named {task}_{YYYYMMDDHH}.log.
+
+    A log read again from its start, as when a rerun replaces it, replaces the task's metrics, so
+    that summed metrics are not counted twice.
+
+    :param connection: The telemetry database.
+    :param path: Path to the task log.
+    """
+    match = _TASK_LOG.fullmatch(path.name)
+    if not match or not path.is_file():
+        return
+    task, cycle = match.groups()
+    if _offset(connection, path) == 0:
+        connection.execute("DELETE FROM metrics WHERE cycle = ? AND task = ?", (cycle, task))
+    for line in new_lines(connection, path):
+        for pattern, names, summed in METRICS:
+            if found := re.search(pattern, line):
+                values = found.groups()
+                # Any groups before those of the values fill in the metric names.
+                fields, values = values[: len(values) - len(names)], values[-len(names) :]
+                for name, value in zip(names, values):
+                    connection.execute(
+                        _ADD_METRIC if summed else _SET_METRIC,
+                        (cycle, task, name.format(*fields), float(value)),
+                    )
+
+
+def scan_workflow_log(connection: sqlite3.Connection, path: Path) -> None:
+    """
+    Update the jobs with their submit, start, and end times and queue waits from the new lines of
+    the Rocoto log.
+
+    Rocoto logs a job's state when it checks on it, so the start is the end less the run time, or
+    else when the job was first seen running, and the times are late by up to the interval
+    between rocotorun calls.
+
+    :param connection: The telemetry database.
+    :param path: Path to the Rocoto log.
+    """
+    for line in new_lines(connection, path):
+        match = _LINE.match(line)
+        if not match:
+            continue
+        time = datetime.strptime(match[1], "%Y-%m-%d %H:%M:%S %z").astimezone(timezone.utc)
+        at = time.strftime("%Y-%m-%d %H:%M:%S")
+        if event := _SUBMITTED.search(match[2]):
+            task, jobid = event.groups()
+            connection.execute(
+                "INSERT INTO jobs (jobid, task, submitted) VALUES (?, ?, ?)"
+                " ON CONFLICT (jobid) DO UPDATE SET submitted = excluded.submitted",
+                (jobid, task, at),
+            )
+        elif event := _STATE.search(match[2]):
+            task, jobid, state, duration, exit_status, tries = event.groups()
+            connection.execute(
+                "INSERT INTO jobs (jobid, task, state) VALUES (?, ?, ?)"
+                " ON CONFLICT (jobid) DO UPDATE SET state = excluded.state",
+                (jobid, task, state),
+            )
+            if state == "RUNNING":
+                connection.execute(
+                    "UPDATE jobs SET started = COALESCE(started, ?) WHERE jobid = ?", (at, jobid)
+                )
+            elif duration is not None:
+                started = datetime.fromtimestamp(time.timestamp() - float(duration), timezone.utc)
+                connection.execute(
+                    "UPDATE jobs SET started = ?, ended = ?, duration = ?, exit_status = ?,"
+                    " tries = ? WHERE jobid = ?",
+                    (
+                        started.strftime("%Y-%m-%d %H:%M:%S"),
+                        at,
+                        float(duration),
+                        exit_status and int(exit_status),
+                        tries and int(tries),
+                        jobid,
+                    ),
+                )
+    connection.execute(
+        "UPDATE jobs SET queue_wait = MAX(0, (julianday(started) - julianday(submitted)) * 86400)"
+        " WHERE started IS NOT NULL AND submitted IS NOT NULL"
+    )
+
+
+# Private
+
+
+def _head(path: Path, size: int) -> str:
+    """
+    The checksum of the leading bytes of a file, up to a size.
+    """
+    with path.open("rb") as f:
+        return hashlib.blake2b(f.read(min(size, HEAD))).hexdigest()
+
+
+def _offset(connection: sqlite3.Connection, path: Path) -> int:
+    """
+    Where to resume reading a file: how far it was last read, or its start if it is no longer the
+    same file, is smaller, or begins differently than when it was last read.
+    """
+    row = connection.execute(
+        "SELECT offset, inode, head FROM files WHERE path = ?", (str(path),)
+    ).fetchone()
+    if not row:
+        return 0
+    offset, inode, head = row
+    stat = path.stat()
+    if offset > stat.st_size or inode != stat.st_ino or head != _head(path, offset):
+        return 0
+    return int(offset)
+
+
+if __name__ == "__main__":
+    main()  # pragma: no cover
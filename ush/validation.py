@@ -14,6 +14,13 @@ class Config(BaseModel):
     user: User
 
 
+class Ensemble(BaseModel):
+    member: NonNegativeInt = 0
+    member_data: bool = True
+    members: PositiveInt = 1
+    pack: PositiveInt = 1
+
+
 class ICs(BaseModel):
     external_model: Model
     offset_hours: NonNegativeInt
@@ -28,6 +35,7 @@ class LBCs(BaseModel):
 class User(BaseModel):
     cycle_frequency: PositiveInt
     driver_validation_blocks: list[str] = Field(default_factory=list)
+    ensemble: Ensemble = Field(default_factory=Ensemble)
     experiment_dir: Path
     first_cycle: datetime
     ics: ICs